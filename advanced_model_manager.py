@@ -12,6 +12,9 @@ from typing import Dict, List, Optional, Tuple, Set, Any
 from datetime import datetime, timedelta
 from dataclasses import dataclass, field
 
+from core.model_registry import ModelRegistry, RegistryEvent, RegistrySnapshot, get_model_registry
+from core.model_footprint import ModelFootprintProfiler, get_footprint_profiler
+
 @dataclass
 class ModelStatus:
     """Tracks detailed status of a specific model"""
@@ -27,6 +30,9 @@ class ModelStatus:
     memory_usage: Optional[int] = None
     load_time: Optional[datetime] = None
     capabilities: Dict = field(default_factory=dict)
+    # Generation probe schedule (time.monotonic seconds)
+    next_probe_at: float = 0.0
+    consecutive_failures: int = 0
 
 @dataclass 
 class ProviderStatus:
@@ -46,9 +52,31 @@ class ProviderStatus:
 class AdvancedModelManager:
     """Advanced Model Discovery and Management System"""
 
-    def __init__(self, check_interval: int = 15):
+    def __init__(self, check_interval: int = 15, probe_interval: int = 600,
+                 failure_probe_interval: int = 15, probe_timeout: float = 8.0,
+                 registry: Optional[ModelRegistry] = None,
+                 footprints: Optional[ModelFootprintProfiler] = None):
         self.logger = logging.getLogger("AdvancedModelManager")
         self.check_interval = check_interval
+        # Liveness comes from registry snapshots at most check_interval old; real generation
+        # probes run every probe_interval, and sooner while a model is failing
+        self.probe_interval = probe_interval
+        self.failure_probe_interval = failure_probe_interval
+        self.probe_timeout = probe_timeout
+
+        # Provider listings come from the process-wide registry; probes and loads share its session
+        self.registry = registry or get_model_registry()
+        self.footprints = footprints or get_footprint_profiler()
+        self.footprints.attach_registry(self.registry)
+        self._applied_version = 0
+        self._polling = False
+
+        # Cost of discovery: the last cycle and running totals
+        self.last_discovery: Dict[str, Any] = {}
+        self.discovery_stats = {
+            'cycles': 0, 'discovery_seconds': 0.0, 'metadata_requests': 0,
+            'probes': 0, 'probe_failures': 0, 'probe_seconds': 0.0
+        }
 
         self.models = {}  # Track all models and their status
         self.currently_loaded_models = []  # Track which models are actually loaded
@@ -112,237 +140,187 @@ class AdvancedModelManager:
     async def initialize(self):
         """Initialize the model manager and start monitoring."""
         await self._discover_model_states()
+        # Verify every loaded model once before reporting it as active
+        await self._run_due_probes()
         await self._start_monitoring()
 
-    async def _discover_model_states(self):
-        """Discover current state of all models"""
-        self.logger.info("Discovering model states...")
-        for name, config in self.provider_configs.items():
-            self.providers[name] = ProviderStatus(
-                name=name,
-                base_url=config['base_url'],
-                can_load_models=config['can_load_models'],
-                can_unload_models=config['can_unload_models'],
-                max_concurrent_models=config['max_concurrent_models']
-            )
-        
-        # Now check each provider for active models
-        for name, provider in self.providers.items():
-            if name == 'lmstudio':
-                await self._check_lmstudio_models(provider)
-            elif name == 'ollama':
-                await self._check_ollama_models(provider)
-            elif name == 'vllm':
-                await self._check_vllm_models(provider)
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """HTTP session shared with the model registry"""
+        return await self.registry.get_session()
+
+    async def close(self):
+        """Stop receiving registry updates and release its poller"""
+        self.registry.unsubscribe(self._on_registry_change)
+        self.footprints.detach_registry(self.registry)
+        if self._polling:
+            self._polling = False
+            await self.registry.stop()
+
+    async def _discover_model_states(self, max_age: Optional[float] = None) -> Dict[str, Any]:
+        """Discover current state of all models from the shared registry snapshot"""
+        snapshot = await self.registry.snapshot(max_age=self.check_interval if max_age is None else max_age)
+        return self._apply_snapshot(snapshot)
     
-    async def _check_lmstudio_models(self, provider: ProviderStatus):
-        """Check LM Studio model states with responsiveness testing"""
-        try:
-            async with aiohttp.ClientSession() as session:
-                # Check if server is online
-                async with session.get(f"{provider.base_url}/v1/models", timeout=aiohttp.ClientTimeout(total=5)) as response:
-                    if response.status == 200:
-                        provider.is_online = True
-                        data = await response.json()
-                        models = data.get('data', [])
-                        
-                        provider.loaded_models.clear()
-                        
-                        for model_info in models:
-                            model_id = model_info.get('id', '')
-                            if model_id:
-                                provider.loaded_models.add(model_id)
-                                
-                                # Test if model is actually responsive
-                                is_responsive = await self._test_model_responsiveness(
-                                    'lmstudio', model_id
-                                )
-                                
-                                # Update model status
-                                model_key = f"lmstudio/{model_id}"
-                                if model_key not in self.models:
-                                    self.models[model_key] = ModelStatus(
-                                        provider='lmstudio',
-                                        model_id=model_id
-                                    )
-                                
-                                model_status = self.models[model_key]
-                                model_status.is_loaded = True
-                                model_status.is_responsive = is_responsive
-                                model_status.last_check = datetime.now()
-                                
-                                if not model_status.load_time:
-                                    model_status.load_time = datetime.now()
-                        
-                        self.logger.info(f"LM Studio: {len(provider.loaded_models)} models loaded")
-                    else:
-                        provider.is_online = False
-                        
-        except Exception as e:
-            provider.is_online = False
-            self.logger.warning(f"LM Studio check failed: {e}")
+    def _on_registry_change(self, snapshot: RegistrySnapshot, events: List[RegistryEvent]):
+        """Registry subscriber: apply changes as soon as any consumer's refresh sees them"""
+        self._apply_snapshot(snapshot)
     
-    async def _check_ollama_models(self, provider: ProviderStatus):
-        """Check Ollama model states with detailed analysis"""
-        try:
-            async with aiohttp.ClientSession() as session:
-                # Get list of installed models
-                async with session.get(f"{provider.base_url}/api/tags", timeout=aiohttp.ClientTimeout(total=5)) as response:
-                    if response.status == 200:
-                        provider.is_online = True
-                        data = await response.json()
-                        models = data.get('models', [])
-                        
-                        provider.available_models.clear()
-                        provider.loaded_models.clear()
-                        
-                        for model_info in models:
-                            model_name = model_info.get('name', '')
-                            if model_name:
-                                provider.available_models.add(model_name)
-                                
-                                # For Ollama, we need to test if model is actually loaded/responsive
-                                is_responsive = await self._test_model_responsiveness(
-                                    'ollama', model_name
-                                )
-                                
-                                if is_responsive:
-                                    provider.loaded_models.add(model_name)
-                                
-                                # Update model status
-                                model_key = f"ollama/{model_name}"
-                                if model_key not in self.models:
-                                    self.models[model_key] = ModelStatus(
-                                        provider='ollama',
-                                        model_id=model_name
-                                    )
-                                
-                                model_status = self.models[model_key]
-                                model_status.is_loaded = is_responsive  # Only loaded if responsive
-                                model_status.is_responsive = is_responsive
-                                model_status.last_check = datetime.now()
-                        
-                        self.logger.info(f"Ollama: {len(provider.loaded_models)}/{len(provider.available_models)} models active")
-                    else:
-                        provider.is_online = False
-                        
-        except Exception as e:
-            provider.is_online = False
-            self.logger.warning(f"Ollama check failed: {e}")
+    def _apply_snapshot(self, snapshot: RegistrySnapshot) -> Dict[str, Any]:
+        """Update providers and models from a registry snapshot"""
+        if snapshot.version == self._applied_version:
+            return self.last_discovery
+        first_cycle = not self._applied_version
+        self._applied_version = snapshot.version
+        
+        for name, config in self.provider_configs.items():
+            if name not in self.providers:
+                self.providers[name] = ProviderStatus(
+                    name=name,
+                    base_url=config['base_url'],
+                    can_load_models=config['can_load_models'],
+                    can_unload_models=config['can_unload_models'],
+                    max_concurrent_models=config['max_concurrent_models']
+                )
+        
+        providers = {}
+        for name, provider in self.providers.items():
+            state = snapshot.providers.get(name)
+            online = state is not None and state.online
+            # Warn when a provider goes away, not on every cycle it stays away
+            if not online and (provider.is_online or first_cycle):
+                self.logger.warning(f"{name} check failed: {state.error if state else 'not in registry'}")
+            
+            provider.is_online = online
+            provider.last_check = datetime.now()
+            loaded = {model.model_id for model in state.loaded_models} if online else set()
+            provider.available_models = {model.model_id for model in state.models} if online else set()
+            provider.loaded_models = loaded
+            self._apply_listing(name, loaded, provider.available_models)
+            
+            providers[name] = {
+                'online': online,
+                'loaded_models': len(loaded),
+                'requests': state.requests if state else 0,
+                'bytes': state.bytes if state else 0,
+                'duration_seconds': state.duration_seconds if state else 0.0
+            }
+        
+        # The cost is the registry refresh that produced this snapshot, shared by every consumer
+        report = {
+            'timestamp': datetime.fromtimestamp(snapshot.timestamp).isoformat(),
+            'snapshot_version': snapshot.version,
+            'duration_seconds': snapshot.duration_seconds,
+            'requests': snapshot.requests,
+            'bytes': snapshot.bytes,
+            'providers': providers
+        }
+        self.last_discovery = report
+        self.discovery_stats['cycles'] += 1
+        self.discovery_stats['discovery_seconds'] += report['duration_seconds']
+        self.discovery_stats['metadata_requests'] += report['requests']
+        
+        online = [name for name, cost in providers.items() if cost['online']]
+        loaded = sum(cost['loaded_models'] for cost in providers.values())
+        self.logger.info(
+            f"Discovery: {len(online)}/{len(providers)} providers online, {loaded} models loaded, "
+            f"{report['duration_seconds'] * 1000:.0f}ms, {report['requests']} requests, {report['bytes']} bytes"
+        )
+        return report
     
-    async def _check_vllm_models(self, provider: ProviderStatus):
-        """Check vLLM model states and server responsiveness"""
-        try:
-            async with aiohttp.ClientSession() as session:
-                # Check server health first
-                try:
-                    async with session.get(f"{provider.base_url}/health", timeout=aiohttp.ClientTimeout(total=3)) as response:
-                        if response.status != 200:
-                            provider.is_online = False
-                            return
-                except:
-                    # Health endpoint might not exist, try models endpoint
-                    pass
-                
-                # Get list of available models
-                async with session.get(f"{provider.base_url}/v1/models", timeout=aiohttp.ClientTimeout(total=5)) as response:
-                    if response.status == 200:
-                        provider.is_online = True
-                        data = await response.json()
-                        models = data.get('data', [])
-                        
-                        provider.loaded_models.clear()
-                        
-                        for model_info in models:
-                            model_id = model_info.get('id', '')
-                            if model_id:
-                                provider.loaded_models.add(model_id)
-                                
-                                # Test if model is actually responsive
-                                is_responsive = await self._test_model_responsiveness(
-                                    'vllm', model_id
-                                )
-                                
-                                # Update model status
-                                model_key = f"vllm/{model_id}"
-                                if model_key not in self.models:
-                                    self.models[model_key] = ModelStatus(
-                                        provider='vllm',
-                                        model_id=model_id
-                                    )
-                                
-                        self.logger.info(f"vLLM: {len(provider.loaded_models)} model(s) loaded")
-                    else:
-                        provider.is_online = False
-
-        except Exception as e:
-            provider.is_online = False
-            self.logger.warning(f"vLLM check failed: {e}")
+    def _apply_listing(self, provider: str, loaded: Set[str], available: Set[str]):
+        """Update model statuses from a provider's listing"""
+        now = datetime.now()
+        for model_id in set(loaded) | set(available):
+            model_key = f"{provider}/{model_id}"
+            if model_key not in self.models:
+                self.models[model_key] = ModelStatus(provider=provider, model_id=model_id)
+            model_status = self.models[model_key]
+            model_status.last_check = now
+            
+            is_loaded = model_id in loaded
+            if is_loaded and not model_status.is_loaded:
+                # Newly loaded: probe it soon, forgetting failures from before the reload
+                model_status.load_time = now
+                model_status.consecutive_failures = 0
+                model_status.next_probe_at = 0.0
+            model_status.is_loaded = is_loaded
+            # Listed models count as responsive unless their last generation probe failed
+            model_status.is_responsive = is_loaded and model_status.consecutive_failures == 0
+        
+        for model_status in self.models.values():
+            if model_status.provider == provider and model_status.model_id not in loaded:
+                model_status.is_loaded = False
+                model_status.is_responsive = False
+
+    async def _run_due_probes(self) -> int:
+        """Send a generation probe to every loaded model whose probe is due"""
+        now = time.monotonic()
+        due: Dict[str, List[ModelStatus]] = {}
+        for model_status in self.models.values():
+            provider = self.providers.get(model_status.provider)
+            if (model_status.is_loaded and model_status.next_probe_at <= now
+                    and provider is not None and provider.is_online):
+                due.setdefault(model_status.provider, []).append(model_status)
+        
+        async def probe_provider(statuses: List[ModelStatus]):
+            # One probe at a time per provider, since its models share a GPU
+            for model_status in statuses:
+                await self._test_model_responsiveness(model_status.provider, model_status.model_id)
+        
+        await asyncio.gather(*(probe_provider(statuses) for statuses in due.values()))
+        return sum(len(statuses) for statuses in due.values())
 
     async def _test_model_responsiveness(self, provider: str, model_id: str) -> bool:
-        """Test if a specific model is actually responsive"""
+        """Test if a specific model is actually responsive with a 1-token generation"""
+        model_key = f"{provider}/{model_id}"
+        start_time = time.time()
+        success = False
         try:
-            start_time = time.time()
-
-            if provider == 'lmstudio':
-                async with aiohttp.ClientSession() as session:
-                    payload = {
-                        "model": model_id,
-                        "messages": [{"role": "user", "content": "test"}],
-                        "max_tokens": 1,
-                        "temperature": 0
-                    }
-                    async with session.post(
-                        f"{self.providers[provider].base_url}/v1/chat/completions",
-                        json=payload,
-                        timeout=aiohttp.ClientTimeout(total=8)
-                    ) as response:
-                        if response.status == 200:
-                            response_time = time.time() - start_time
-                            await self._update_model_performance(f"{provider}/{model_id}", response_time, True)
-                            return True
-
-            elif provider == 'ollama':
-                async with aiohttp.ClientSession() as session:
-                    payload = {
-                        "model": model_id,
-                        "prompt": "test",
-                        "stream": False,
-                        "options": {"num_predict": 1}
-                    }
-                    async with session.post(
-                        f"{self.providers[provider].base_url}/api/generate",
-                        json=payload,
-                        timeout=aiohttp.ClientTimeout(total=8)
-                    ) as response:
-                        if response.status == 200:
-                            response_time = time.time() - start_time
-                            await self._update_model_performance(f"{provider}/{model_id}", response_time, True)
-                            return True
-
-            elif provider == 'vllm':
-                async with aiohttp.ClientSession() as session:
-                    payload = {
-                        "model": model_id,
-                        "messages": [{"role": "user", "content": "test"}],
-                        "max_tokens": 1,
-                        "temperature": 0
-                    }
-                    async with session.post(
-                        f"{self.providers[provider].base_url}/v1/chat/completions",
-                        json=payload,
-                        timeout=aiohttp.ClientTimeout(total=8)
-                    ) as response:
-                        if response.status == 200:
-                            response_time = time.time() - start_time
-                            await self._update_model_performance(f"{provider}/{model_id}", response_time, True)
-                            return True
-
-            return False
-
+            session = await self._get_session()
+            if provider == 'ollama':
+                url = f"{self.providers[provider].base_url}/api/generate"
+                payload = {
+                    "model": model_id,
+                    "prompt": "test",
+                    "stream": False,
+                    "options": {"num_predict": 1}
+                }
+            elif provider in ('lmstudio', 'vllm'):
+                url = f"{self.providers[provider].base_url}/v1/chat/completions"
+                payload = {
+                    "model": model_id,
+                    "messages": [{"role": "user", "content": "test"}],
+                    "max_tokens": 1,
+                    "temperature": 0
+                }
+            else:
+                return False
+            
+            async with session.post(url, json=payload, timeout=aiohttp.ClientTimeout(total=self.probe_timeout)) as response:
+                await response.read()
+                success = response.status == 200
         except Exception:
-            await self._update_model_performance(f"{provider}/{model_id}", 0, False)
-            return False
+            success = False
+        
+        response_time = time.time() - start_time
+        self.discovery_stats['probes'] += 1
+        self.discovery_stats['probe_seconds'] += response_time
+        await self._update_model_performance(model_key, response_time if success else 0, success)
+        
+        model_status = self.models.get(model_key)
+        if model_status:
+            model_status.is_responsive = success and model_status.is_loaded
+            if success:
+                model_status.consecutive_failures = 0
+                delay = self.probe_interval
+            else:
+                # Re-probe failing models sooner, backing off while they keep failing
+                self.discovery_stats['probe_failures'] += 1
+                model_status.consecutive_failures += 1
+                delay = min(self.probe_interval,
+                            self.failure_probe_interval * 2 ** (model_status.consecutive_failures - 1))
+            model_status.next_probe_at = time.monotonic() + delay
+        return success
 
     async def _update_model_performance(self, model_key: str, response_time: float, success: bool):
         """Update model performance statistics."""
@@ -365,8 +343,14 @@ class AdvancedModelManager:
     async def _start_monitoring(self):
         """Start continuous monitoring of model states"""
         self.monitoring_active = True
+        self.registry.subscribe(self._on_registry_change)
+        if not self._polling:
+            self._polling = True
+            self.registry.start(self.check_interval)
         self.monitor_task = asyncio.create_task(self._monitor_loop())
-        self.logger.info(f"Started continuous monitoring (interval: {self.check_interval}s)")
+        self.probe_task = asyncio.create_task(self._probe_loop())
+        self.logger.info(f"Started continuous monitoring (interval: {self.check_interval}s, "
+                         f"generation probes every {self.probe_interval}s)")
     
     async def _monitor_loop(self):
         """Continuous monitoring loop"""
@@ -376,9 +360,28 @@ class AdvancedModelManager:
                 await self._discover_model_states()
                 await self._cleanup_stale_models()
                 
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
                 self.logger.error(f"Monitoring error: {e}")
     
+    async def _probe_loop(self):
+        """Generation probes on their own schedule, separate from metadata discovery"""
+        while self.monitoring_active:
+            try:
+                now = time.monotonic()
+                pending = [model.next_probe_at - now for model in self.models.values() if model.is_loaded]
+                # Wake at least once per discovery interval to pick up newly loaded models
+                delay = min([self.check_interval] + pending)
+                await asyncio.sleep(max(0.0, delay))
+                await self._run_due_probes()
+                
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.error(f"Probe error: {e}")
+                await asyncio.sleep(self.check_interval)
+    
     async def _cleanup_stale_models(self):
         """Remove models that haven't been seen recently"""
         cutoff_time = datetime.now() - timedelta(minutes=5)
@@ -425,18 +428,18 @@ class AdvancedModelManager:
         try:
             if provider == 'ollama':
                 # Ollama can pull/load models
-                async with aiohttp.ClientSession() as session:
-                    payload = {"name": model_name}
-                    async with session.post(
-                        f"{provider_info.base_url}/api/pull",
-                        json=payload,
-                        timeout=aiohttp.ClientTimeout(total=300)  # Model loading can take a while
-                    ) as response:
-                        if response.status == 200:
-                            self.logger.info(f"Successfully triggered loading of {model_name}")
-                            # Re-check model states
-                            await self._discover_model_states()
-                            return True
+                session = await self._get_session()
+                payload = {"name": model_name}
+                async with session.post(
+                    f"{provider_info.base_url}/api/pull",
+                    json=payload,
+                    timeout=aiohttp.ClientTimeout(total=300)  # Model loading can take a while
+                ) as response:
+                    if response.status == 200:
+                        self.logger.info(f"Successfully triggered loading of {model_name}")
+                        # Re-check model states
+                        await self._discover_model_states(max_age=0)
+                        return True
             
             elif provider == 'lmstudio':
                 # LM Studio requires manual loading via GUI
@@ -457,6 +460,7 @@ class AdvancedModelManager:
             'providers': {},
             'active_models': len(active_models),
             'total_models': len(self.models),
+            'discovery': {'last_cycle': self.last_discovery, **self.discovery_stats},
             'models': {}
         }
         
@@ -478,6 +482,7 @@ class AdvancedModelManager:
                 'avg_response_time': model.average_response_time,
                 'response_count': model.response_count,
                 'error_count': model.error_count,
+                'consecutive_probe_failures': model.consecutive_failures,
                 'last_check': model.last_check.isoformat()
             }
         
@@ -486,52 +491,39 @@ class AdvancedModelManager:
     async def stop_monitoring(self):
         """Stop the monitoring system"""
         self.monitoring_active = False
+        for name in ('monitor_task', 'probe_task'):
+            task = getattr(self, name, None)
+            if task:
+                task.cancel()
         if hasattr(self, 'monitor_task') and self.monitor_task:
-            self.monitor_task.cancel()
             self.logger.info("Monitoring stopped")
+        await self.close()
     
     async def get_memory_usage(self) -> Dict[str, float]:
         """Get estimated memory usage of loaded models"""
         memory_usage = {}
         
-        # Check Ollama models and their sizes
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    f"{self.providers['ollama'].base_url}/api/tags",
-                    timeout=aiohttp.ClientTimeout(total=5)
-                ) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        for model in data.get('models', []):
-                            model_name = model['name']
-                            size_bytes = model.get('size', 0)
-                            size_gb = size_bytes / (1024**3)  # Convert to GB
-                            memory_usage[f"ollama/{model_name}"] = size_gb
-        except Exception as e:
-            self.logger.warning(f"Failed to get Ollama memory usage: {e}")
+        snapshot = await self.registry.snapshot(max_age=self.check_interval)
+        
+        # Ollama reports model sizes; measured footprints are more accurate still
+        for model in snapshot.models('ollama'):
+            memory_usage[f"ollama/{model.model_id}"] = self._estimate_model_size(
+                model.model_id, 'ollama', default=(model.size_bytes or 0) / (1024**3))  # Convert to GB
         
         # LM Studio - estimate based on loaded models (we can't get exact size via API)
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    f"{self.providers['lmstudio'].base_url}/v1/models",
-                    timeout=aiohttp.ClientTimeout(total=5)
-                ) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        for model in data.get('data', []):
-                            model_name = model['id']
-                            # Estimate based on model name patterns
-                            estimated_gb = self._estimate_model_size(model_name)
-                            memory_usage[f"lmstudio/{model_name}"] = estimated_gb
-        except Exception as e:
-            self.logger.warning(f"Failed to get LM Studio memory usage: {e}")
+        for model in snapshot.models('lmstudio'):
+            memory_usage[f"lmstudio/{model.model_id}"] = self._estimate_model_size(model.model_id, 'lmstudio')
         
         return memory_usage
     
-    def _estimate_model_size(self, model_name: str) -> float:
-        """Estimate model size based on name patterns"""
+    def _estimate_model_size(self, model_name: str, provider: str = 'lmstudio',
+                             default: Optional[float] = None) -> float:
+        """Measured footprint in GB if the model has been profiled, else an estimate from name patterns"""
+        measured = self.footprints.estimate_gb(provider, model_name)
+        if measured is not None:
+            return measured
+        if default:
+            return default
         model_name_lower = model_name.lower()
         
         # Size estimation based on common patterns
@@ -578,7 +570,7 @@ class AdvancedModelManager:
         
         for model_id, model_status in available_models.items():
             if model_status.is_responsive:
-                estimated_size = self._estimate_model_size(model_id)
+                estimated_size = self._estimate_model_size(model_status.model_id, model_status.provider)
 
                 # Check if this model would fit
                 current_usage = memory_status['total_usage_gb']
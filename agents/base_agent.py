@@ -3,20 +3,27 @@ Base Agent Class - Foundation for all AI agents with Persistent Intelligence
 """
 
 import asyncio
+import inspect
 import logging
 import sys
 import os
 from abc import ABC, abstractmethod
-from typing import Dict, List, Optional, Any
+from typing import AsyncIterator, Callable, Dict, List, Optional, Any
 import datetime
 from pathlib import Path
 
 # Add parent directory to path for imports
 sys.path.append(str(Path(__file__).parent.parent))
 
-from persistent_agent_intelligence import PersistentAgentIntelligence, ExperienceType
+from persistent_agent_intelligence import ExperienceType, get_shared_intelligence
+from core.llm_response_cache import LLMResponseCache
 
 class BaseAgent(ABC):
+    # Response cache shared by all agents in the process
+    _response_cache: Optional[LLMResponseCache] = None
+    # Listeners that receive the streamed chunks of every agent (e.g. the dashboard websocket)
+    _global_token_listeners: List[Callable[[Dict[str, Any]], Any]] = []
+    
     def __init__(self, agent_id: str, config: Dict, llm_manager, memory_manager, model_manager=None):
         self.agent_id = agent_id
         self.config = config
@@ -33,11 +40,40 @@ class BaseAgent(ABC):
         self.model = config.get('model', 'default')
         self.capabilities = config.get('capabilities', [])
         
-        # Persistent Intelligence Integration
-        self.intelligence = PersistentAgentIntelligence()
+        # Persistent Intelligence Integration (one instance and database connection shared by all agents)
+        intelligence_config = config.get('intelligence', {})
+        self.intelligence = get_shared_intelligence(
+            intelligence_config.get('directory'),
+            index_mode=intelligence_config.get('index_mode', 'memory')
+        )
         self.current_project_context = self._detect_project_context()
         self.task_start_time = None
         self.learning_enabled = config.get('learning_enabled', True)
+        
+        # Callbacks that receive streamed LLM chunks (e.g. dashboard websocket)
+        self.token_listeners: List[Callable[[Dict[str, Any]], Any]] = []
+        
+        # Prompt/response cache; "force" caches sampled (temperature > 0) calls too
+        cache_config = config.get('response_cache', {})
+        self.cache_mode = True if cache_config.get('force') else None
+        self.response_cache = self._get_response_cache(cache_config) if cache_config.get('enabled', True) else None
+    
+    def _get_response_cache(self, cache_config: Dict[str, Any]) -> LLMResponseCache:
+        """Get (or create) the process-wide response cache"""
+        if BaseAgent._response_cache is None:
+            BaseAgent._response_cache = LLMResponseCache(
+                max_entries=cache_config.get('max_entries', 512),
+                max_bytes=cache_config.get('max_bytes', 16 * 1024 * 1024),
+                ttl=cache_config.get('ttl', 3600),
+                similarity_threshold=cache_config.get('similarity_threshold', 0.97)
+            )
+        
+        # The semantic tier reuses the memory manager's batched embeddings
+        cache = BaseAgent._response_cache
+        embedding_service = getattr(self.memory_manager, 'embedding_service', None)
+        if cache.embed is None and cache_config.get('semantic', False) and embedding_service is not None:
+            cache.embed = embedding_service.embed
+        return cache
     
     def _detect_project_context(self) -> Dict[str, Any]:
         """Detect current project context for intelligent learning"""
@@ -162,11 +198,11 @@ class BaseAgent(ABC):
         self.task_start_time = datetime.datetime.now()
         
         # Get expertise summary for this agent
-        expertise = self.intelligence.get_agent_expertise_summary(self.role)
+        expertise = await self.intelligence.get_agent_expertise_summary_async(self.role)
         self.logger.info(f"Agent expertise level: {expertise['expertise_level']} ({expertise['experience_count']} experiences)")
         
         # Get suggested approach based on previous experience
-        suggestion = self.intelligence.suggest_approach(
+        suggestion = await self.intelligence.suggest_approach_async(
             agent_role=self.role,
             task_description=task_description,
             project_context=self.current_project_context
@@ -246,7 +282,7 @@ class BaseAgent(ABC):
             confidence = 0.8 if was_successful else 0.3
         
         # Record the experience
-        exp_id = self.intelligence.record_experience(
+        exp_id = await self.intelligence.record_experience_async(
             agent_role=self.role,
             experience_type=experience_type,
             context=task_description,
@@ -259,7 +295,7 @@ class BaseAgent(ABC):
         
         # Update success rates for any experiences that were used
         for exp_id_used in suggestion.get('experiences_used', []):
-            self.intelligence.update_experience_success(exp_id_used, was_successful)
+            await self.intelligence.update_experience_success_async(exp_id_used, was_successful)
         
         self.logger.debug(f"Recorded experience: {exp_id}")
     
@@ -313,7 +349,7 @@ class BaseAgent(ABC):
     
     async def get_learning_summary(self) -> Dict[str, Any]:
         """Get a summary of what this agent has learned"""
-        expertise = self.intelligence.get_agent_expertise_summary(self.role)
+        expertise = await self.intelligence.get_agent_expertise_summary_async(self.role)
         
         return {
             'agent_id': self.agent_id,
@@ -330,7 +366,7 @@ class BaseAgent(ABC):
     async def teach_agent(self, lesson: Dict[str, Any]):
         """Manually teach the agent a specific lesson/pattern"""
         
-        exp_id = self.intelligence.record_experience(
+        exp_id = await self.intelligence.record_experience_async(
             agent_role=self.role,
             experience_type=ExperienceType(lesson.get('type', 'solution_pattern')),
             context=lesson['context'],
@@ -444,35 +480,172 @@ class BaseAgent(ABC):
             'task_dependencies': task.get('dependencies', [])
         }
     
-    async def generate_llm_response(self, prompt: str, task_type: str = "general", **kwargs) -> str:
-        """Generate response using the best available LLM"""
-        try:
-            # Get the best model for this task
-            best_model = await self.get_best_model_for_task(task_type)
-            
-            # Use the best model for generation
-            response = await self.llm_manager.generate_response(
+    def add_token_listener(self, listener: Callable[[Dict[str, Any]], Any]):
+        """Receive streamed LLM chunks (sync or async callable) as they arrive"""
+        if listener not in self.token_listeners:
+            self.token_listeners.append(listener)
+    
+    def remove_token_listener(self, listener: Callable[[Dict[str, Any]], Any]):
+        """Stop forwarding streamed LLM chunks to a listener"""
+        if listener in self.token_listeners:
+            self.token_listeners.remove(listener)
+    
+    @classmethod
+    def add_global_token_listener(cls, listener: Callable[[Dict[str, Any]], Any]):
+        """Receive streamed LLM chunks from every agent in the process, including ones created later"""
+        if listener not in BaseAgent._global_token_listeners:
+            BaseAgent._global_token_listeners.append(listener)
+    
+    @classmethod
+    def remove_global_token_listener(cls, listener: Callable[[Dict[str, Any]], Any]):
+        if listener in BaseAgent._global_token_listeners:
+            BaseAgent._global_token_listeners.remove(listener)
+    
+    def _has_token_listeners(self) -> bool:
+        return bool(self.token_listeners or BaseAgent._global_token_listeners)
+    
+    async def _notify_token_listeners(self, event: Dict[str, Any], on_token=None):
+        """Deliver a stream event to the per-call callback and registered listeners"""
+        listeners = [on_token] if on_token else []
+        for listener in listeners + self.token_listeners + BaseAgent._global_token_listeners:
+            try:
+                result = listener(event)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                self.logger.debug(f"Token listener failed: {e}")
+    
+    async def generate_llm_response_stream(self, prompt: str, task_type: str = "general",
+                                           on_token=None, model: Optional[str] = None,
+                                           stream_info: Optional[Dict[str, Any]] = None,
+                                           **kwargs) -> AsyncIterator[str]:
+        """Stream the LLM response chunk by chunk, notifying token listeners"""
+        best_model = model or await self.get_best_model_for_task(task_type)
+        if stream_info is None:
+            stream_info = {}
+        
+        if hasattr(self.llm_manager, 'generate_response_stream'):
+            chunks = self.llm_manager.generate_response_stream(
                 agent_role=self.role,
                 prompt=prompt,
                 model=best_model,
+                stream_info=stream_info,
                 **kwargs
             )
+        else:
+            # Managers without streaming deliver the whole response as one chunk
+            chunks = self._single_chunk_response(prompt, best_model, stream_info, **kwargs)
+        
+        index = 0
+        async for chunk in chunks:
+            await self._notify_token_listeners({
+                "type": "llm_token",
+                "agent_id": self.agent_id,
+                "role": self.role,
+                "index": index,
+                "chunk": chunk
+            }, on_token)
+            index += 1
+            yield chunk
+        
+        await self._notify_token_listeners({
+            "type": "llm_done",
+            "agent_id": self.agent_id,
+            "role": self.role,
+            "chunks": index
+        }, on_token)
+        
+        # Log model usage for monitoring
+        if self.model_manager:
+            try:
+                await self.model_manager._record_model_usage(best_model, True, 0.5)  # Assume success
+            except Exception as e:
+                self.logger.debug(f"Failed to record model usage: {e}")
+    
+    async def _single_chunk_response(self, prompt: str, model: str, stream_info: Dict[str, Any],
+                                     **kwargs) -> AsyncIterator[str]:
+        response = await self.llm_manager.generate_response(
+            agent_role=self.role,
+            prompt=prompt,
+            model=model,
+            **kwargs
+        )
+        stream_info['success'] = response.get('success', True)
+        yield response.get('content', '')
+    
+    async def generate_llm_response(self, prompt: str, task_type: str = "general", **kwargs) -> str:
+        """Generate response using the best available LLM.
+        
+        Streams from the LLM manager when an ``on_token`` callback or token
+        listeners are attached (or ``stream=True``), returning the joined text.
+        Deterministic calls are served from the response cache; ``cache=True``
+        also caches sampled calls and ``cache=False`` skips the cache.
+        """
+        on_token = kwargs.pop('on_token', None)
+        stream = kwargs.pop('stream', bool(on_token) or self._has_token_listeners())
+        use_cache = kwargs.pop('cache', self.cache_mode)
+        cache = self.response_cache if use_cache is not False else None
+        try:
+            # Get the best model for this task
+            best_model = await self.get_best_model_for_task(task_type)
+            # Managers route by agent role, so the role is part of the cache key
+            cache_model = f"{self.role}/{best_model}"
+            
+            if cache is not None:
+                cached = await cache.get(self.agent_id, cache_model, prompt, kwargs, force=use_cache)
+                if cached is not None:
+                    if on_token or self._has_token_listeners():
+                        await self._notify_token_listeners({
+                            "type": "llm_token", "agent_id": self.agent_id, "role": self.role,
+                            "index": 0, "chunk": cached, "cached": True
+                        }, on_token)
+                        await self._notify_token_listeners({
+                            "type": "llm_done", "agent_id": self.agent_id, "role": self.role,
+                            "chunks": 1, "cached": True
+                        }, on_token)
+                    return cached
+            
+            if stream and hasattr(self.llm_manager, 'generate_response_stream'):
+                stream_info = {}
+                chunks = []
+                async for chunk in self.generate_llm_response_stream(prompt, task_type, on_token=on_token,
+                                                                     model=best_model, stream_info=stream_info,
+                                                                     **kwargs):
+                    chunks.append(chunk)
+                content = ''.join(chunks)
+                success = stream_info.get('success', True)
+            else:
+                # Use the best model for generation
+                response = await self.llm_manager.generate_response(
+                    agent_role=self.role,
+                    prompt=prompt,
+                    model=best_model,
+                    **kwargs
+                )
+                
+                # Log model usage for monitoring
+                if self.model_manager:
+                    try:
+                        await self.model_manager._record_model_usage(best_model, True, 0.5)  # Assume success
+                    except Exception as e:
+                        self.logger.debug(f"Failed to record model usage: {e}")
+                
+                content = response.get('content', '')
+                success = response.get('success', True)
             
-            # Log model usage for monitoring
-            if self.model_manager:
-                try:
-                    await self.model_manager._record_model_usage(best_model, True, 0.5)  # Assume success
-                except Exception as e:
-                    self.logger.debug(f"Failed to record model usage: {e}")
+            # Fallback text must not be served once the model is back
+            if cache is not None and success:
+                await cache.put(self.agent_id, cache_model, prompt, kwargs, content, force=use_cache)
             
-            return response.get('content', '')
+            return content
         except Exception as e:
             self.logger.error(f"LLM generation failed: {e}")
             
             # Try fallback model if available
             if self.model_manager and task_type != "fallback":
                 self.logger.warning("Trying fallback model...")
-                return await self.generate_llm_response(prompt, task_type="fallback", **kwargs)
+                return await self.generate_llm_response(prompt, task_type="fallback", on_token=on_token,
+                                                        stream=stream, cache=use_cache, **kwargs)
             
             raise e
     
@@ -499,5 +672,6 @@ class BaseAgent(ABC):
             'model': self.model,
             'capabilities': self.capabilities,
             'current_task': self.current_task.get('id') if self.current_task else None,
-            'memory_count': len(self.memories) if hasattr(self, 'memories') else 0
+            'memory_count': len(self.memories) if hasattr(self, 'memories') else 0,
+            'response_cache': self.response_cache.get_agent_stats(self.agent_id) if self.response_cache else None
         }
\ No newline at end of file
@@ -3,7 +3,7 @@ Orchestrator Agent - Coordinates tasks and manages workflow
 """
 
 from agents.base_agent import BaseAgent
-from core.file_coordinator import safe_write_file
+from core.file_coordinator import write_batch
 from typing import Dict, List
 import datetime
 import json
@@ -408,8 +408,6 @@ Project: {task.get('title', '')}
             
             # Write task breakdown document
             breakdown_file = f"agent_outputs/OrchestratorAgent/task_breakdown_{task_title}_{timestamp}.md"
-            if safe_write_file(breakdown_file, breakdown_doc, self.agent_id, priority=1):
-                self.logger.info(f"Task breakdown created: {breakdown_file}")
             
             # Create workflow JSON file for automation
             workflow_data = {
@@ -422,13 +420,22 @@ Project: {task.get('title', '')}
             }
             
             workflow_file = f"agent_outputs/OrchestratorAgent/workflow_{task_title}_{timestamp}.json"
-            if safe_write_file(workflow_file, json.dumps(workflow_data, indent=2), self.agent_id, priority=1):
-                self.logger.info(f"Workflow JSON created: {workflow_file}")
             
             # Create project timeline
             timeline_content = self.generate_timeline_content(task, response)
             timeline_file = f"agent_outputs/OrchestratorAgent/timeline_{task_title}_{timestamp}.md"
-            if safe_write_file(timeline_file, timeline_content, self.agent_id, priority=1):
+            
+            # Commit all planning files under one set of locks without blocking the loop
+            async with write_batch(self.agent_id, priority=1) as batch:
+                batch.write(breakdown_file, breakdown_doc)
+                batch.write(workflow_file, json.dumps(workflow_data, indent=2))
+                batch.write(timeline_file, timeline_content)
+            
+            if batch.results.get(breakdown_file):
+                self.logger.info(f"Task breakdown created: {breakdown_file}")
+            if batch.results.get(workflow_file):
+                self.logger.info(f"Workflow JSON created: {workflow_file}")
+            if batch.results.get(timeline_file):
                 self.logger.info(f"Timeline created: {timeline_file}")
             
         except Exception as e:
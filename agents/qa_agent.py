@@ -3,7 +3,7 @@ QA Agent - Handles quality assurance and testing tasks
 """
 
 from agents.base_agent import BaseAgent
-from core.file_coordinator import safe_write_file
+from core.file_coordinator import write_batch
 from typing import Dict
 import datetime
 
@@ -362,6 +362,8 @@ class QAAgent(BaseAgent):
         try:
             task_title = task.get('title', 'test').replace(' ', '_').lower()
             timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+            batch = write_batch(self.agent_id, priority=2)
+            created = {}
             
             # Create unit test file
             unit_test_content = self.extract_code_blocks(response, "unit")
@@ -372,8 +374,8 @@ class QAAgent(BaseAgent):
 
 {unit_test_content}
 """
-                if safe_write_file(unit_file, test_code, self.agent_id, priority=2):
-                    self.logger.info(f"Unit test file created: {unit_file}")
+                batch.write(unit_file, test_code)
+                created[unit_file] = f"Unit test file created: {unit_file}"
             
             # Create integration test file
             integration_test_content = self.extract_code_blocks(response, "integration")
@@ -384,8 +386,8 @@ class QAAgent(BaseAgent):
 
 {integration_test_content}
 """
-                if safe_write_file(integration_file, test_code, self.agent_id, priority=2):
-                    self.logger.info(f"Integration test file created: {integration_file}")
+                batch.write(integration_file, test_code)
+                created[integration_file] = f"Integration test file created: {integration_file}"
             
             # Create E2E test file
             e2e_test_content = self.extract_code_blocks(response, "e2e")
@@ -396,8 +398,8 @@ class QAAgent(BaseAgent):
 
 {e2e_test_content}
 """
-                if safe_write_file(e2e_file, test_code, self.agent_id, priority=2):
-                    self.logger.info(f"E2E test file created: {e2e_file}")
+                batch.write(e2e_file, test_code)
+                created[e2e_file] = f"E2E test file created: {e2e_file}"
             
             # Create test plan document
             test_plan_file = f"agent_outputs/QAAgent/test_plan_{task_title}_{timestamp}.md"
@@ -418,8 +420,14 @@ Task: {task.get('title', '')}
 
 ## Generated by QAAgent
 """
-            if safe_write_file(test_plan_file, plan_content, self.agent_id, priority=2):
-                self.logger.info(f"Test plan created: {test_plan_file}")
+            batch.write(test_plan_file, plan_content)
+            created[test_plan_file] = f"Test plan created: {test_plan_file}"
+            
+            # Commit all test files under one set of locks without blocking the loop
+            await batch.commit()
+            for file_path, message in created.items():
+                if batch.results.get(file_path):
+                    self.logger.info(message)
             
         except Exception as e:
             self.logger.error(f"Error creating test files: {e}")
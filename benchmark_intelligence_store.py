@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Benchmark the shared, batched intelligence store: agents on one event loop
+record experiences at a target rate (10k per minute by default) while looking
+up suggestions, and the script reports achieved throughput, call latency and
+event loop stalls. The previous connection-per-write pattern is measured on
+the same schema for comparison.
+
+Usage:
+    python benchmark_intelligence_store.py --rate 10000 --duration 30 --agents 8
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from persistent_agent_intelligence import ExperienceType, PersistentAgentIntelligence
+
+WORDS = [f"term{i}" for i in range(2000)] + [
+    "api", "database", "cache", "auth", "refactor", "test", "deploy", "query", "index", "schema"
+]
+PROJECT_CONTEXT = {"language": "python", "framework": "fastapi", "project_type": "web_api"}
+
+
+def make_context(rng: random.Random) -> str:
+    return " ".join(rng.choices(WORDS, k=10))
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+
+def connection_per_write(db_path: str, writes: int) -> float:
+    """The previous behaviour: connect, insert, commit and close for every experience"""
+    rng = random.Random(1)
+    start = time.perf_counter()
+    for i in range(writes):
+        conn = sqlite3.connect(db_path)
+        conn.execute("""
+            INSERT OR REPLACE INTO experiences
+            (id, agent_role, experience_type, context, solution, outcome,
+             confidence, project_context, timestamp, usage_count, success_rate, tags)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (f"legacy_{i}", "legacy", "workflow", make_context(rng), "solution", "outcome", 0.8,
+              json.dumps(PROJECT_CONTEXT), "2024-01-01T00:00:00", 0, 1.0, ""))
+        conn.commit()
+        conn.close()
+    return writes / (time.perf_counter() - start)
+
+
+def batched_writes(intelligence: PersistentAgentIntelligence, writes: int) -> float:
+    """Unpaced record_experience calls through the shared store, including the final commit"""
+    rng = random.Random(2)
+    start = time.perf_counter()
+    for i in range(writes):
+        intelligence.record_experience("batched", ExperienceType.WORKFLOW, make_context(rng), f"solution {i}",
+                                       "outcome", PROJECT_CONTEXT)
+    intelligence.store.flush()
+    return writes / (time.perf_counter() - start)
+
+
+async def monitor_loop_lag(stop: asyncio.Event, lags: list, interval: float = 0.01):
+    """Record how late the event loop wakes up a sleeping task"""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - started - interval)
+
+
+async def run_agent(intelligence: PersistentAgentIntelligence, agent_index: int, per_agent_rate: float,
+                    deadline: float, latencies: dict) -> int:
+    rng = random.Random(agent_index)
+    role = f"agent_{agent_index % 4}"
+    experience_types = list(ExperienceType)
+    interval = 1.0 / per_agent_rate
+    next_at = time.perf_counter()
+    recorded = 0
+
+    while time.perf_counter() < deadline:
+        context = make_context(rng)
+
+        started = time.perf_counter()
+        suggestion = await intelligence.suggest_approach_async(role, context, PROJECT_CONTEXT)
+        latencies["suggest"].append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await intelligence.record_experience_async(
+            agent_role=role,
+            experience_type=rng.choice(experience_types),
+            context=context,
+            solution=f"solution {agent_index}-{recorded}",
+            outcome="Success",
+            project_context=PROJECT_CONTEXT,
+            confidence=rng.random(),
+            tags={rng.choice(WORDS)}
+        )
+        latencies["record"].append(time.perf_counter() - started)
+
+        for experience_id in suggestion.get("experiences_used", [])[:2]:
+            started = time.perf_counter()
+            await intelligence.update_experience_success_async(experience_id, rng.random() < 0.8)
+            latencies["update"].append(time.perf_counter() - started)
+
+        recorded += 1
+        next_at += interval
+        delay = next_at - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+    return recorded
+
+
+async def run_load(intelligence: PersistentAgentIntelligence, args) -> None:
+    latencies = {"suggest": [], "record": [], "update": []}
+    lags: list = []
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(monitor_loop_lag(stop, lags))
+
+    per_agent_rate = args.rate / 60.0 / args.agents
+    start = time.perf_counter()
+    deadline = start + args.duration
+    counts = await asyncio.gather(*(
+        run_agent(intelligence, i, per_agent_rate, deadline, latencies) for i in range(args.agents)
+    ))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await monitor
+
+    flush_started = time.perf_counter()
+    await intelligence.flush_async()
+    flush_seconds = time.perf_counter() - flush_started
+
+    recorded = sum(counts)
+    with intelligence.store.read() as cursor:
+        stored = cursor.execute("SELECT COUNT(*) FROM experiences WHERE agent_role LIKE 'agent_%'").fetchone()[0]
+    stats = intelligence.store.get_stats()
+
+    print(f"Target: {args.rate} experiences/min with {args.agents} agents for {args.duration}s "
+          f"(index: {args.index_mode}, flush every {args.flush_ms}ms)")
+    print(f"  recorded:      {recorded} ({recorded / elapsed * 60:.0f}/min), {stored} distinct rows stored")
+    print(f"  batches:       {stats['batches']} for {stats['writes']} writes "
+          f"({stats['writes'] / max(1, stats['batches']):.1f} per commit), final flush {flush_seconds * 1000:.1f}ms")
+    for name, values in latencies.items():
+        if values:
+            print(f"  {name:<8} p50 {statistics.median(values) * 1000:7.2f}ms   "
+                  f"p99 {percentile(values, 0.99) * 1000:7.2f}ms   ({len(values)} calls)")
+    print(f"  loop lag      p99 {percentile(lags, 0.99) * 1000:7.2f}ms   max {max(lags, default=0) * 1000:.2f}ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Persistent agent intelligence store benchmark")
+    parser.add_argument("--rate", type=int, default=10000, help="Experiences recorded per minute")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds of sustained load")
+    parser.add_argument("--agents", type=int, default=8)
+    parser.add_argument("--flush-ms", type=float, default=50.0, help="Write batching interval")
+    parser.add_argument("--index-mode", choices=("memory", "fts5"), default="memory")
+    parser.add_argument("--max-writes", type=int, default=2000,
+                        help="Writes for the maximum throughput comparison (0 to skip)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        intelligence = PersistentAgentIntelligence(directory, index_mode=args.index_mode,
+                                                   flush_interval_ms=args.flush_ms)
+        try:
+            await run_load(intelligence, args)
+            if args.max_writes:
+                legacy_db = os.path.join(directory, "legacy.db")
+                with sqlite3.connect(legacy_db) as conn:
+                    intelligence._create_tables(conn.cursor())
+                legacy = connection_per_write(legacy_db, args.max_writes)
+                batched = batched_writes(intelligence, args.max_writes)
+                print(f"Maximum throughput over {args.max_writes} writes:")
+                print(f"  connection per write (previous): {legacy * 60:12.0f} experiences/min")
+                print(f"  shared batched store:            {batched * 60:12.0f} experiences/min  ({batched / legacy:.1f}x)")
+        finally:
+            intelligence.store.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Benchmark the BM25 keyword index against the old substring scan used by
+AdvancedMemoryManager.query_keyword.
+
+Usage:
+    python benchmark_keyword_index.py                 # 10k, 100k and 1M memories
+    python benchmark_keyword_index.py --sizes 10000   # custom sizes
+"""
+
+import argparse
+import random
+import sys
+import os
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from core.memory_keyword_index import KeywordIndex
+
+VOCABULARY = [
+    "agent", "task", "model", "frontend", "backend", "api", "database", "schema",
+    "react", "python", "deploy", "test", "coverage", "refactor", "cache", "latency",
+    "vram", "ollama", "vllm", "lmstudio", "prompt", "review", "architecture", "queue",
+    "memory", "index", "websocket", "dashboard", "workspace", "plugin", "error", "retry",
+]
+QUERIES = ["python api", "vram latency", "dashboard websocket error", "qdrant", "agent task review"]
+
+
+def make_corpus(size: int, seed: int = 42) -> dict:
+    rng = random.Random(seed)
+    rare_words = [f"term{i}" for i in range(5000)]
+    corpus = {}
+    for i in range(size):
+        words = rng.choices(VOCABULARY, k=rng.randint(8, 30)) + rng.choices(rare_words, k=3)
+        corpus[f"mem_{i}"] = {"content": " ".join(words), "agent_id": f"agent_{i % 5}"}
+    return corpus
+
+
+def scan_query(corpus: dict, query: str, limit: int = 5) -> list:
+    """The original query_keyword implementation"""
+    results = []
+    query_lower = query.lower()
+    for memory_item in corpus.values():
+        content_lower = memory_item["content"].lower()
+        if query_lower in content_lower:
+            score = content_lower.count(query_lower) / len(content_lower)
+            results.append((memory_item, score))
+    results.sort(key=lambda x: x[1], reverse=True)
+    return results[:limit]
+
+
+def time_queries(fn, repeats: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for query in QUERIES:
+            fn(query)
+    return (time.perf_counter() - start) * 1000 / (repeats * len(QUERIES))
+
+
+def run(size: int, repeats: int) -> None:
+    print(f"\n=== {size:,} memories ===")
+    corpus = make_corpus(size)
+
+    index = KeywordIndex()
+    start = time.perf_counter()
+    index.rebuild(corpus)
+    build_s = time.perf_counter() - start
+
+    payload = index.dumps()
+    start = time.perf_counter()
+    KeywordIndex().loads(payload)
+    load_s = time.perf_counter() - start
+
+    scan_ms = time_queries(lambda q: scan_query(corpus, q), max(1, repeats // 10))
+    index_ms = time_queries(lambda q: index.search(q), repeats)
+    rare_ms = time_queries(lambda q: index.search("term17 term4242"), repeats)
+
+    print(f"  index build:        {build_s:8.2f} s")
+    print(f"  index load (disk):  {load_s:8.2f} s  ({len(payload) / 1024 / 1024:.1f} MB)")
+    print(f"  substring scan:     {scan_ms:8.2f} ms/query")
+    print(f"  BM25 index:         {index_ms:8.2f} ms/query")
+    print(f"  BM25 (rare terms):  {rare_ms:8.2f} ms/query")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keyword index benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        run(size, args.repeats)
+
+
+if __name__ == "__main__":
+    main()
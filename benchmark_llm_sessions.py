@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark pooled provider sessions in RealLLMManager against the previous
+session-per-request behaviour, using a local stub server that mimics the
+Ollama and OpenAI-compatible generation endpoints.
+
+Usage:
+    python benchmark_llm_sessions.py --requests 2000 --concurrency 16
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import aiohttp
+from aiohttp import web
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from core.real_llm_manager import RealLLMManager
+
+
+async def start_stub_server(latency_ms: float) -> web.AppRunner:
+    async def ollama_generate(request):
+        await request.json()
+        await asyncio.sleep(latency_ms / 1000)
+        return web.json_response({"response": "ok", "done": True})
+
+    async def chat_completions(request):
+        await request.json()
+        await asyncio.sleep(latency_ms / 1000)
+        return web.json_response({"choices": [{"message": {"role": "assistant", "content": "ok"}}]})
+
+    app = web.Application()
+    app.router.add_post("/api/generate", ollama_generate)
+    app.router.add_post("/v1/chat/completions", chat_completions)
+
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    return runner
+
+
+async def session_per_request(base_url: str, prompt: str) -> None:
+    """The previous behaviour: a fresh ClientSession (and TCP connection) per call"""
+    payload = {"model": "stub", "prompt": prompt, "stream": False}
+    async with aiohttp.ClientSession() as session:
+        async with session.post(f"{base_url}/api/generate", json=payload) as response:
+            await response.json()
+
+
+async def run_load(call, total: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with semaphore:
+            await call(f"prompt {i}")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    return total / (time.perf_counter() - start)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="LLM provider session benchmark")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Simulated generation latency")
+    args = parser.parse_args()
+
+    runner = await start_stub_server(args.latency_ms)
+    port = runner.addresses[0][1]
+    base_url = f"http://127.0.0.1:{port}"
+
+    manager = RealLLMManager()
+    manager.config = {"providers": {"ollama": {
+        "base_url": base_url,
+        "max_connections": args.concurrency,
+        "max_concurrent_requests": args.concurrency
+    }}}
+    manager.active_providers = manager.config["providers"]
+
+    try:
+        before = await run_load(lambda p: session_per_request(base_url, p), args.requests, args.concurrency)
+        after = await run_load(lambda p: manager._generate_ollama_response("stub", p), args.requests, args.concurrency)
+    finally:
+        await manager.shutdown()
+        await runner.cleanup()
+
+    print(f"Requests: {args.requests}, concurrency: {args.concurrency}, stub latency: {args.latency_ms}ms")
+    print(f"  session per request: {before:10.1f} req/s")
+    print(f"  pooled sessions:     {after:10.1f} req/s  ({after / before:.2f}x)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
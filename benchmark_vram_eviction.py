@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Replay model request traces through the VRAM eviction policies in
+core/vram_eviction.py and compare the time spent reloading models.
+
+Traces are the JSONL logs written by VRAMManager(trace_path=...); without
+--trace a synthetic agent workload is generated: roles shift between phases,
+each with its own working set, and load times are not proportional to size
+(quantisation and disk speed differ), so size alone is a poor eviction key.
+
+Usage:
+    python benchmark_vram_eviction.py                          # synthetic trace
+    python benchmark_vram_eviction.py --capacity 6 --requests 50000
+    python benchmark_vram_eviction.py --trace logs/vram_trace.jsonl
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from core.vram_eviction import EVICTION_POLICIES, TraceRecord, load_trace, make_eviction_policy, simulate
+
+# model -> (size in GB, seconds to load)
+CATALOGUE = {
+    "ollama/llama3.2:1b": (1.2, 2.0),
+    "ollama/llama3.2:3b": (2.0, 3.5),
+    "ollama/phi3:mini": (2.3, 4.0),
+    "ollama/gemma2:2b": (1.6, 2.5),
+    "ollama/codellama:7b": (3.8, 9.0),
+    "ollama/deepseek-coder:6.7b": (3.9, 26.0),  # Unquantised weights on a slow disk
+    "ollama/mistral:7b": (4.1, 8.0),
+    "ollama/qwen2.5:7b": (4.3, 10.0),
+    "lmstudio/codellama-7b-instruct": (3.8, 12.0),
+    "lmstudio/gemma-2-9b-it": (5.4, 30.0),
+    "ollama/codellama:13b": (7.3, 45.0),
+    "vllm/microsoft/phi-2": (1.4, 15.0),  # vLLM start-up dominates
+}
+
+# role -> (share of requests, models in order of preference)
+ROLES = {
+    "architect": (0.15, ["ollama/codellama:13b", "lmstudio/gemma-2-9b-it", "ollama/qwen2.5:7b"]),
+    "developer": (0.40, ["ollama/deepseek-coder:6.7b", "ollama/codellama:7b", "lmstudio/codellama-7b-instruct"]),
+    "reviewer": (0.20, ["ollama/mistral:7b", "ollama/phi3:mini", "vllm/microsoft/phi-2"]),
+    "tester": (0.15, ["ollama/llama3.2:3b", "ollama/gemma2:2b", "ollama/llama3.2:1b"]),
+    "docs": (0.10, ["ollama/llama3.2:1b", "ollama/qwen2.5:7b", "ollama/gemma2:2b"]),
+}
+
+
+def synthetic_trace(requests: int, seed: int = 5, mean_gap: float = 2.0, phase_length: int = 2000,
+                    mean_task_requests: float = 6.0):
+    """
+    Agents run tasks of several requests to one model; role mixes shift between
+    phases and each role picks among its models with Zipf-like preference.
+    """
+    rng = random.Random(seed)
+    roles = list(ROLES)
+    trace, now = [], 0.0
+    while len(trace) < requests:
+        if len(trace) // phase_length != (len(trace) - 1) // phase_length or not trace:
+            # A new phase: one or two roles dominate for a while
+            focus = rng.sample(roles, 2)
+            weights = [ROLES[role][0] * (6.0 if role in focus else 1.0) for role in roles]
+        role = rng.choices(roles, weights)[0]
+        models = ROLES[role][1]
+        model = rng.choices(models, [1.0 / (rank + 1) ** 1.2 for rank in range(len(models))])[0]
+        for _ in range(1 + int(rng.expovariate(1.0 / mean_task_requests))):
+            now += rng.expovariate(1.0 / mean_gap)
+            trace.append(TraceRecord(now, model))
+    return trace[:requests]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="VRAM eviction policy simulator")
+    parser.add_argument("--trace", help="JSONL trace written by VRAMManager(trace_path=...)")
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--capacity", type=float, default=7.5, help="VRAM budget in GB")
+    parser.add_argument("--policies", nargs="+", default=list(EVICTION_POLICIES),
+                        help="The first one is the baseline (lru: the original behaviour)")
+    parser.add_argument("--seed", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.trace:
+        trace = load_trace(args.trace)
+        source = args.trace
+    else:
+        trace = synthetic_trace(args.requests, args.seed)
+        source = "synthetic agent workload"
+    sizes = {model: size for model, (size, _) in CATALOGUE.items()}
+
+    def load_seconds(model, size_gb):
+        return CATALOGUE[model][1] if model in CATALOGUE else None
+
+    print(f"Trace: {len(trace):,} requests from {source}, "
+          f"{len({record.model for record in trace})} models, budget {args.capacity:g} GB")
+    print(f"\n{'policy':10s} {'hit rate':>9s} {'loads':>7s} {'evictions':>10s} "
+          f"{'reload time':>12s} {'GB loaded':>10s} {'us/request':>11s}")
+
+    baseline = None
+    for name in args.policies:
+        policy = make_eviction_policy(name)
+        start = time.perf_counter()
+        result = simulate(trace, policy, args.capacity, sizes,
+                          None if args.trace else load_seconds)
+        elapsed = time.perf_counter() - start
+        if baseline is None:
+            baseline = result.reload_seconds
+        relative = f"  ({result.reload_seconds / baseline:.2f}x {args.policies[0]})" if baseline else ""
+        print(f"{name:10s} {result.hit_rate:9.1%} {result.misses - result.rejected:7,d} {result.evictions:10,d} "
+              f"{result.reload_seconds / 60:10.1f} m {result.loaded_gb:10,.0f} "
+              f"{elapsed / max(1, result.requests) * 1e6:11.1f}{relative}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Benchmark the single-pass WorkspaceScanner against the original
+WorkspaceAnalyzer, which walked the tree once per facet with os.walk, and the
+persistent WorkspaceIndex that repeat analyses go through.
+
+The synthetic workspace mimics a JavaScript/Python monorepo: most files live
+under node_modules and .git, the rest in a source tree with a .gitignore.
+
+Usage:
+    python benchmark_workspace_scan.py                    # 500k files
+    python benchmark_workspace_scan.py --files 50000 --workers 1 4 8
+    python benchmark_workspace_scan.py --root /tmp/ws     # reuse a tree
+    python benchmark_workspace_scan.py --files 100000 --workers 1
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.workspace_analyzer import WorkspaceAnalyzer
+from utils.workspace_index import WorkspaceIndex
+
+SOURCE_EXTENSIONS = [".py", ".js", ".ts", ".tsx", ".json", ".md", ".css", ".yml", ""]
+IGNORED_FRACTION = 0.7  # share of files under node_modules / .git / build output
+FILES_PER_DIR = 40
+
+
+def make_tree(root: str, total_files: int, seed: int = 7) -> None:
+    rng = random.Random(seed)
+    os.makedirs(root, exist_ok=True)
+    with open(os.path.join(root, "package.json"), "w") as f:
+        f.write('{"dependencies": {"react": "^18.0.0"}}')
+    with open(os.path.join(root, "requirements.txt"), "w") as f:
+        f.write("fastapi\naiohttp\n")
+    with open(os.path.join(root, ".gitignore"), "w") as f:
+        f.write("build/\n*.log\n")
+
+    ignored = int(total_files * IGNORED_FRACTION)
+    buckets = [
+        ("node_modules", int(ignored * 0.8), [".js", ".json", ".md", ".d.ts"]),
+        (".git/objects", int(ignored * 0.15), [""]),
+        ("build", ignored - int(ignored * 0.8) - int(ignored * 0.15), [".js", ".map"]),
+        ("src", total_files - ignored, SOURCE_EXTENSIONS),
+    ]
+
+    for top, count, extensions in buckets:
+        created = 0
+        directory = 0
+        while created < count:
+            depth = rng.randint(1, 4)
+            parts = [top] + [f"pkg{rng.randint(0, 30)}" for _ in range(depth - 1)] + [f"d{directory}"]
+            path = os.path.join(root, *parts)
+            os.makedirs(path, exist_ok=True)
+            for i in range(min(FILES_PER_DIR, count - created)):
+                with open(os.path.join(path, f"f{i}{rng.choice(extensions)}"), "w") as f:
+                    f.write("x" * rng.randint(0, 64))
+                created += 1
+            directory += 1
+
+
+def legacy_walks(workspace_path: str) -> None:
+    """The four os.walk passes the original analyze_workspace made"""
+    ignore = ['.git', 'node_modules', '__pycache__', '.venv']
+    for root, dirs, files in os.walk(workspace_path):  # _detect_project_type
+        if any(i in root for i in ignore):
+            continue
+        for file in files:
+            os.path.splitext(file)[1].lower()
+    for root, dirs, files in os.walk(workspace_path):  # _analyze_structure
+        for file in files:
+            os.path.splitext(file)[1].lower()
+            try:
+                os.path.getsize(os.path.join(root, file))
+            except OSError:
+                pass
+    for root, dirs, files in os.walk(workspace_path):  # _get_size_info
+        for file in files:
+            try:
+                os.path.getsize(os.path.join(root, file))
+            except OSError:
+                pass
+    for root, dirs, files in os.walk(workspace_path):  # _detect_languages
+        if any(i in root for i in ignore):
+            continue
+        for file in files:
+            os.path.splitext(file)[1].lower()
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Workspace scan benchmark")
+    parser.add_argument("--files", type=int, default=500_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--root", help="Existing or reusable workspace directory")
+    args = parser.parse_args()
+
+    root = args.root or tempfile.mkdtemp(prefix="ws_bench_")
+    if not os.path.exists(os.path.join(root, "package.json")):
+        print(f"Creating {args.files:,} files under {root} ...")
+        build_s, _ = timed(lambda: make_tree(root, args.files))
+        print(f"  created in {build_s:.1f}s")
+
+    try:
+        # Warm the dentry/inode cache so every variant sees the same state
+        legacy_walks(root)
+
+        legacy_s, _ = timed(lambda: legacy_walks(root))
+        compat_s, compat = timed(lambda: WorkspaceAnalyzer(prune_ignored=False, use_index=False).analyze_workspace(root))
+        print(f"\nWorkspace: {compat['structure']['total_files']:,} files, "
+              f"{compat['structure']['total_directories']:,} directories")
+        print(f"  legacy (4x os.walk):            {legacy_s:8.2f} s")
+        print(f"  single pass, no pruning:        {compat_s:8.2f} s  ({legacy_s / compat_s:.1f}x)")
+
+        for workers in args.workers:
+            analyzer = WorkspaceAnalyzer(max_workers=workers, use_index=False)
+            pruned_s, pruned = timed(lambda: analyzer.analyze_workspace(root))
+            print(f"  single pass, pruned, {workers:2d} worker(s): {pruned_s:8.2f} s  ({legacy_s / pruned_s:.1f}x, "
+                  f"{pruned['structure']['total_files']:,} files kept)")
+
+        # Persistent index: first build reads every kept file, repeats only stat
+        index_dir = tempfile.mkdtemp(prefix="ws_index_")
+        db_path = os.path.join(index_dir, "index.db")
+        try:
+            index = WorkspaceIndex(root, db_path=db_path)
+            build_s, _ = timed(index.refresh)
+            repeat_s, _ = timed(lambda: (index.refresh(), index.scan_result()))
+            index.close()
+            reopened = WorkspaceIndex(root, db_path=db_path)
+            reopen_s, _ = timed(lambda: (reopened.refresh(), reopened.scan_result()))
+            stats = reopened.get_stats()
+            reopened.close()
+            print(f"  index, first build (hashing):   {build_s:8.2f} s  ({stats['files']:,} files indexed)")
+            print(f"  index, repeat in process:       {repeat_s:8.2f} s  ({legacy_s / repeat_s:.1f}x)")
+            print(f"  index, reopened from disk:      {reopen_s:8.2f} s  ({legacy_s / reopen_s:.1f}x)")
+        finally:
+            shutil.rmtree(index_dir, ignore_errors=True)
+    finally:
+        if not args.root:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
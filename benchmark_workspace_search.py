@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Benchmark trigram-indexed WorkspaceSearch against the original
+search_in_files, which globbed the workspace and read, split and lowercased
+every matching file on each query.
+
+Usage:
+    python benchmark_workspace_search.py                   # 20k files
+    python benchmark_workspace_search.py --files 50000
+    python benchmark_workspace_search.py --root /tmp/src   # reuse a tree
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.workspace_index import WorkspaceIndex
+from utils.workspace_search import WorkspaceSearch
+
+VOCABULARY = [
+    "agent", "task", "model", "config", "request", "response", "session", "result",
+    "status", "manager", "memory", "cache", "index", "workspace", "provider", "error",
+    "queue", "token", "prompt", "stream", "logger", "handler", "event", "payload",
+]
+QUERIES = [
+    ("rare identifier", "handle_widget_4242", False),
+    ("mixed case", "SessionManager", False),
+    ("common word", "return", False),
+    ("regex, selective", r"def\s+handle_widget_\d+", True),
+    ("regex, broad", r"def\s+process_\w+_17\b", True),
+]
+FILES_PER_DIR = 50
+
+
+def make_file(rng: random.Random, number: int) -> str:
+    lines = ["import os", "import logging", "", f"logger = logging.getLogger('module_{number}')", ""]
+    for function in range(rng.randint(5, 15)):
+        a, b = rng.choice(VOCABULARY), rng.choice(VOCABULARY)
+        name = f"process_{a}_{rng.randint(0, 500)}"
+        lines.append(f"def {name}({a}, {b}=None):")
+        lines.append(f'    """Process the {a} for {b}"""')
+        for _ in range(rng.randint(2, 8)):
+            lines.append(f"    {a}_{b} = {b}.get('{rng.choice(VOCABULARY)}') if {b} else {a}")
+        if rng.random() < 0.3:
+            lines.append(f"    SessionManager.{a}({b})")
+        lines.append(f"    return {a}_{b}")
+        lines.append("")
+    if number % 5000 == 4242 % 5000:
+        lines.append("def handle_widget_4242():\n    pass")
+    return "\n".join(lines)
+
+
+def make_tree(root: str, total_files: int, seed: int = 11) -> None:
+    rng = random.Random(seed)
+    for number in range(total_files):
+        directory = os.path.join(root, "src", f"pkg{number // (FILES_PER_DIR * 20)}", f"mod{number // FILES_PER_DIR}")
+        if number % FILES_PER_DIR == 0:
+            os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, f"file_{number}.py"), "w") as f:
+            f.write(make_file(rng, number))
+
+
+def legacy_search(workspace_path: Path, query: str, file_pattern: str = "*.py") -> list:
+    """The original search_in_files, without the async file reads"""
+    results = []
+    for file_path in workspace_path.rglob(file_pattern):
+        if file_path.is_file():
+            try:
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    content = f.read()
+                lines = content.split('\n')
+                for line_num, line in enumerate(lines, 1):
+                    if query.lower() in line.lower():
+                        results.append({
+                            'file': str(file_path.relative_to(workspace_path)),
+                            'line': line_num,
+                            'content': line.strip(),
+                            'context': lines[max(0, line_num - 2):line_num + 2]
+                        })
+            except Exception:
+                continue
+    return results
+
+
+def timed(fn, repeats: int = 1):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        result = fn()
+    return (time.perf_counter() - start) / repeats, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Workspace search benchmark")
+    parser.add_argument("--files", type=int, default=20_000)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--root", help="Existing or reusable workspace directory")
+    args = parser.parse_args()
+
+    root = args.root or tempfile.mkdtemp(prefix="search_bench_")
+    if not os.path.exists(os.path.join(root, "src")):
+        print(f"Creating {args.files:,} files under {root} ...")
+        build_s, _ = timed(lambda: make_tree(root, args.files))
+        print(f"  created in {build_s:.1f}s")
+
+    index_dir = tempfile.mkdtemp(prefix="search_index_")
+    try:
+        index = WorkspaceIndex(root, db_path=os.path.join(index_dir, "index.db"))
+        refresh_s, _ = timed(index.refresh)
+        search = WorkspaceSearch(index)
+        build_s, _ = timed(search.build)
+        stats = search.get_stats()
+        print(f"\nWorkspace index refresh:  {refresh_s:8.2f} s")
+        print(f"Trigram index build:      {build_s:8.2f} s  ({stats['documents']:,} files, "
+              f"{stats['trigrams']:,} trigrams, {stats['postings']:,} postings)")
+
+        for label, query, regex in QUERIES:
+            indexed_s, indexed = timed(lambda: search.search(query, "*.py", regex=regex), args.repeats)
+            line = f"  {label:16s} indexed {indexed_s * 1000:8.1f} ms  ({len(indexed):,} hits)"
+            if not regex:
+                legacy_s, legacy = timed(lambda: legacy_search(Path(root), query))
+                assert len(legacy) == len(indexed), (label, len(legacy), len(indexed))
+                line += f"   legacy scan {legacy_s * 1000:8.1f} ms  ({legacy_s / indexed_s:.0f}x)"
+            print(line)
+
+        # One file edit is re-indexed before the next query
+        target = next(index.iter_files([".py"]))["path"]
+        marker = f"freshly_added_marker_{time.time_ns()}"
+        with open(os.path.join(root, target), "a") as f:
+            f.write(f"\ndef {marker}():\n    pass\n")
+        index.update_path(os.path.join(root, target))
+        update_s, hits = timed(lambda: search.search(marker))
+        print(f"  after live edit  indexed {update_s * 1000:8.1f} ms  ({len(hits)} hit)")
+    finally:
+        shutil.rmtree(index_dir, ignore_errors=True)
+        if not args.root:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -10,9 +10,15 @@ import json
 import logging
 import asyncio
 import time
+import importlib.util
 from typing import Dict, List, Any, Optional, Tuple
 from pathlib import Path
 
+from core.memory_journal import MemoryJournal
+from core.memory_keyword_index import KeywordIndex
+from core.memory_vector_index import VectorIndex, HAS_NUMPY
+from core.embedding_service import EmbeddingService
+
 logger = logging.getLogger(__name__)
 
 class AdvancedMemoryManager:
@@ -22,10 +28,26 @@ class AdvancedMemoryManager:
         self.config = config or {}
         self.memory_path = Path(self.config.get("memory_path", "data/memory"))
         self.vector_db = None
+        self.local_vector_index = None
+        self._vector_sync_task = None
         self.memory_cache = {}
         self.initialized = False
-        self.embedding_model = None
+        self.embedding_service = EmbeddingService(
+            model_name=self.config.get("embedding_model", "all-MiniLM-L6-v2"),
+            cache_path=self.memory_path / "embeddings.sqlite",
+            dim=self.config.get("embedding_dim", 384),
+            max_batch_size=self.config.get("embedding_batch_size", 32),
+            max_wait_ms=self.config.get("embedding_batch_wait_ms", 5.0),
+            lru_size=self.config.get("embedding_cache_size", 4096)
+        )
         self.memory_lock = asyncio.Lock()
+        self.journal = MemoryJournal(
+            self.memory_path,
+            compact_every=self.config.get("memory_compact_every", 1000),
+            fsync=self.config.get("memory_fsync", False)
+        )
+        self.keyword_index = KeywordIndex()
+        self.journal.add_sidecar("memories.index.json", self.keyword_index.capture)
     
     async def initialize(self) -> bool:
         """Initialize the memory manager"""
@@ -43,6 +65,10 @@ class AdvancedMemoryManager:
         # Load existing memories
         await self.load_memories()
         
+        # Fall back to the in-process vector index when Qdrant is unavailable
+        if not self.vector_db:
+            await self.initialize_local_vector_index()
+        
         self.initialized = True
         logger.info("Advanced Memory Manager initialized")
         return True
@@ -83,36 +109,120 @@ class AdvancedMemoryManager:
             logger.error(f"Error initializing vector database: {e}")
             self.vector_db = None
     
+    async def initialize_local_vector_index(self) -> None:
+        """Initialize the in-process NumPy vector index"""
+        if not self.config.get("local_vector_index", True):
+            return
+        if not HAS_NUMPY:
+            logger.info("NumPy not available, local vector index disabled")
+            return
+        # Hash-based fallback embeddings carry no meaning, so keyword search
+        # stays the better option without a real embedding model
+        if importlib.util.find_spec("sentence_transformers") is None:
+            logger.info("sentence-transformers not available, local vector index disabled")
+            return
+        
+        try:
+            index = VectorIndex(
+                self.memory_path,
+                dim=self.config.get("embedding_dim", 384),
+                compact_ratio=self.config.get("vector_compact_ratio", 0.25)
+            )
+            meta_payload = await asyncio.to_thread(self.journal.load_sidecar, index.meta_name)
+            await asyncio.to_thread(index.open, meta_payload)
+            self.local_vector_index = index
+            self.journal.add_sidecar(index.meta_name, index.capture, on_written=index.sidecar_written)
+            
+            # Embed anything the saved index does not cover in the background
+            self._vector_sync_task = asyncio.create_task(self._sync_local_vector_index())
+            logger.info(f"Local vector index initialized with {len(index)} vectors")
+            
+        except Exception as e:
+            logger.error(f"Error initializing local vector index: {e}")
+            self.local_vector_index = None
+    
+    async def _sync_local_vector_index(self) -> None:
+        """Reconcile the local vector index with the loaded memory cache"""
+        index = self.local_vector_index
+        try:
+            for memory_id in index.ids():
+                if not self._has_content(self.memory_cache.get(memory_id)):
+                    await asyncio.to_thread(index.delete, memory_id)
+            
+            stale_ids = [
+                memory_id for memory_id, memory_item in list(self.memory_cache.items())
+                if self._has_content(memory_item)
+                and (memory_id not in index or memory_id in self.journal.replayed_ids)
+            ]
+            # Submit in chunks so the embedding service can batch them
+            batch_size = self.embedding_service.max_batch_size
+            for start in range(0, len(stale_ids), batch_size):
+                await asyncio.gather(*(
+                    self.add_to_vector_db(memory_id, self.memory_cache[memory_id])
+                    for memory_id in stale_ids[start:start + batch_size]
+                    if self._has_content(self.memory_cache.get(memory_id))
+                ))
+            
+            if stale_ids:
+                logger.info(f"Embedded {len(stale_ids)} memories into the local vector index")
+        except Exception as e:
+            logger.error(f"Error syncing local vector index: {e}")
+    
+    @staticmethod
+    def _has_content(memory_item: Any) -> bool:
+        return isinstance(memory_item, dict) and isinstance(memory_item.get("content"), str)
+    
     async def load_memories(self) -> None:
-        """Load existing memories from disk"""
+        """Load the memory snapshot from disk and replay the journal tail"""
         try:
-            memory_file = self.memory_path / "memories.json"
-            if memory_file.exists():
-                with open(memory_file, "r") as f:
-                    self.memory_cache = json.load(f)
-                logger.info(f"Loaded {len(self.memory_cache)} memories from disk")
+            self.memory_cache = await asyncio.to_thread(self.journal.load)
+            logger.info(f"Loaded {len(self.memory_cache)} memories from disk")
         except Exception as e:
             logger.error(f"Error loading memories: {e}")
             self.memory_cache = {}
+        
+        await self.load_keyword_index()
+    
+    async def load_keyword_index(self) -> None:
+        """Load the persisted keyword index, rebuilding it only if it is stale"""
+        loaded = False
+        try:
+            payload = await asyncio.to_thread(self.journal.load_sidecar, "memories.index.json")
+            if payload is not None:
+                loaded = await asyncio.to_thread(self.keyword_index.loads, payload)
+        except Exception as e:
+            logger.warning(f"Could not load keyword index: {e}")
+        
+        if not loaded:
+            self.keyword_index.rebuild(self.memory_cache)
+            logger.info(f"Rebuilt keyword index for {len(self.keyword_index)} memories")
+            return
+        
+        # Bring the snapshot-time index up to date with the replayed journal tail
+        for memory_id in self.journal.replayed_ids:
+            self.keyword_index.index_item(memory_id, self.memory_cache.get(memory_id))
     
     async def save_memories(self) -> None:
-        """Save memories to disk"""
+        """Compact the journal into a full memories.json snapshot"""
         try:
-            memory_file = self.memory_path / "memories.json"
-            with open(memory_file, "w") as f:
-                json.dump(self.memory_cache, f)
+            await self.journal.compact(self.memory_cache)
             logger.info(f"Saved {len(self.memory_cache)} memories to disk")
         except Exception as e:
             logger.error(f"Error saving memories: {e}")
     
+    async def _commit_journal(self) -> None:
+        """Flush staged journal records and compact in the background when due"""
+        await self.journal.flush()
+        self.journal.schedule_compaction(self.memory_cache)
+    
     async def add_memory(self, memory_item: Dict[str, Any]) -> str:
         """Add a memory item to the shared memory"""
         if not self.initialized:
             logger.warning("Memory manager not initialized")
             return ""
         
-        async with self.memory_lock:
-            try:
+        try:
+            async with self.memory_lock:
                 # Generate memory ID if not provided
                 memory_id = memory_item.get("id", f"mem_{int(time.time() * 1000)}")
                 
@@ -120,32 +230,37 @@ class AdvancedMemoryManager:
                 if "timestamp" not in memory_item:
                     memory_item["timestamp"] = time.time()
                 
-                # Add to memory cache
+                # Add to memory cache and stage the journal record
                 self.memory_cache[memory_id] = memory_item
-                
-                # Add to vector database if available
-                if self.vector_db and "content" in memory_item:
-                    await self.add_to_vector_db(memory_id, memory_item)
-                
-                # Save memories periodically
-                # In a real implementation, you might want to do this less frequently
-                await self.save_memories()
-                
-                return memory_id
-                
-            except Exception as e:
-                logger.error(f"Error adding memory: {e}")
-                return ""
+                self.keyword_index.index_item(memory_id, memory_item)
+                self.journal.record_put(memory_id, memory_item)
+            
+            # Add to vector database if available
+            if (self.vector_db or self.local_vector_index is not None) and "content" in memory_item:
+                await self.add_to_vector_db(memory_id, memory_item)
+            
+            # Append to the journal outside the lock
+            await self._commit_journal()
+            
+            return memory_id
+            
+        except Exception as e:
+            logger.error(f"Error adding memory: {e}")
+            return ""
     
     async def add_to_vector_db(self, memory_id: str, memory_item: Dict[str, Any]) -> None:
         """Add a memory item to the vector database"""
-        if not self.vector_db:
+        if not self.vector_db and self.local_vector_index is None:
             return
         
         try:
             # Generate embedding
             embedding = await self.generate_embedding(memory_item["content"])
             
+            if not self.vector_db:
+                await asyncio.to_thread(self.local_vector_index.add, memory_id, embedding)
+                return
+            
             # Add to vector database
             from qdrant_client.http import models
             
@@ -164,25 +279,8 @@ class AdvancedMemoryManager:
             logger.error(f"Error adding to vector database: {e}")
     
     async def generate_embedding(self, text: str) -> List[float]:
-        """Generate embedding for text"""
-        # In a real implementation, you would use a proper embedding model
-        # For simplicity, we'll just use a mock implementation
-        
-        # Try to use sentence-transformers if available
-        try:
-            if not self.embedding_model:
-                from sentence_transformers import SentenceTransformer
-                self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
-            
-            embedding = self.embedding_model.encode(text).tolist()
-            return embedding
-            
-        except ImportError:
-            # Fallback to a simple mock embedding
-            import hashlib
-            hash_value = hashlib.md5(text.encode()).digest()
-            # Convert to a list of 384 float values between -1 and 1
-            return [(b / 128.0) - 1.0 for b in hash_value] + [0.0] * (384 - len(hash_value))
+        """Generate embedding for text via the batched, cached embedding service"""
+        return await self.embedding_service.embed(text)
     
     async def query_memory(self, query: str, context: Dict[str, Any] = None, limit: int = 5) -> List[Dict[str, Any]]:
         """Query the shared memory"""
@@ -195,6 +293,10 @@ class AdvancedMemoryManager:
             if self.vector_db:
                 return await self.query_vector_db(query, context, limit)
             
+            # Use the in-process vector index when no Qdrant server is configured
+            if self.local_vector_index is not None and len(self.local_vector_index):
+                return await self.query_local_vectors(query, context, limit)
+            
             # Otherwise, fall back to simple keyword search
             return await self.query_keyword(query, context, limit)
             
@@ -228,25 +330,39 @@ class AdvancedMemoryManager:
             logger.error(f"Error querying vector database: {e}")
             return []
     
+    async def query_local_vectors(self, query: str, context: Dict[str, Any] = None, limit: int = 5) -> List[Dict[str, Any]]:
+        """Query the in-process vector index"""
+        try:
+            query_embedding = await self.generate_embedding(query)
+            hits = await asyncio.to_thread(self.local_vector_index.search, query_embedding, limit)
+            
+            results = []
+            for memory_id, score in hits:
+                memory_item = self.memory_cache.get(memory_id)
+                if memory_item is None:
+                    continue
+                result = memory_item.copy()
+                result["score"] = score
+                results.append(result)
+            
+            return results
+            
+        except Exception as e:
+            logger.error(f"Error querying local vector index: {e}")
+            return await self.query_keyword(query, context, limit)
+    
     async def query_keyword(self, query: str, context: Dict[str, Any] = None, limit: int = 5) -> List[Dict[str, Any]]:
-        """Query using simple keyword matching"""
+        """Query using the BM25 keyword index"""
         results = []
-        query_lower = query.lower()
+        for memory_id, score in self.keyword_index.search(query, limit):
+            memory_item = self.memory_cache.get(memory_id)
+            if memory_item is None:
+                continue
+            result = memory_item.copy()
+            result["score"] = score
+            results.append(result)
         
-        # Simple keyword search
-        for memory_id, memory_item in self.memory_cache.items():
-            if "content" in memory_item:
-                content_lower = memory_item["content"].lower()
-                if query_lower in content_lower:
-                    # Calculate a simple score based on frequency
-                    score = content_lower.count(query_lower) / len(content_lower)
-                    result = memory_item.copy()
-                    result["score"] = score
-                    results.append(result)
-        
-        # Sort by score and limit results
-        results.sort(key=lambda x: x["score"], reverse=True)
-        return results[:limit]
+        return results
     
     async def get_memory(self, memory_id: str) -> Optional[Dict[str, Any]]:
         """Get a specific memory item"""
@@ -258,29 +374,31 @@ class AdvancedMemoryManager:
             logger.warning("Memory manager not initialized")
             return False
         
-        async with self.memory_lock:
-            if memory_id not in self.memory_cache:
-                logger.warning(f"Memory {memory_id} not found")
-                return False
-            
-            try:
+        try:
+            async with self.memory_lock:
+                if memory_id not in self.memory_cache:
+                    logger.warning(f"Memory {memory_id} not found")
+                    return False
+                
                 # Update memory item
                 memory_item = self.memory_cache[memory_id]
                 for key, value in updates.items():
                     memory_item[key] = value
-                
-                # Update vector database if content changed
-                if self.vector_db and "content" in updates:
-                    await self.add_to_vector_db(memory_id, memory_item)
-                
-                # Save memories
-                await self.save_memories()
-                
-                return True
-                
-            except Exception as e:
-                logger.error(f"Error updating memory: {e}")
-                return False
+                if "content" in updates:
+                    self.keyword_index.index_item(memory_id, memory_item)
+                self.journal.record_put(memory_id, memory_item)
+            
+            # Update vector database if content changed
+            if (self.vector_db or self.local_vector_index is not None) and "content" in updates:
+                await self.add_to_vector_db(memory_id, memory_item)
+            
+            await self._commit_journal()
+            
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error updating memory: {e}")
+            return False
     
     async def delete_memory(self, memory_id: str) -> bool:
         """Delete a memory item"""
@@ -288,30 +406,35 @@ class AdvancedMemoryManager:
             logger.warning("Memory manager not initialized")
             return False
         
-        async with self.memory_lock:
-            if memory_id not in self.memory_cache:
-                logger.warning(f"Memory {memory_id} not found")
-                return False
-            
-            try:
+        try:
+            async with self.memory_lock:
+                if memory_id not in self.memory_cache:
+                    logger.warning(f"Memory {memory_id} not found")
+                    return False
+                
                 # Remove from memory cache
                 del self.memory_cache[memory_id]
-                
-                # Remove from vector database
-                if self.vector_db:
-                    self.vector_db.delete(
-                        collection_name="agent_memory",
-                        points_selector=[memory_id]
-                    )
-                
-                # Save memories
-                await self.save_memories()
-                
-                return True
-                
-            except Exception as e:
-                logger.error(f"Error deleting memory: {e}")
-                return False
+                self.keyword_index.remove(memory_id)
+                self.journal.record_delete(memory_id)
+            
+            # Remove from vector database
+            if self.vector_db:
+                self.vector_db.delete(
+                    collection_name="agent_memory",
+                    points_selector=[memory_id]
+                )
+            elif self.local_vector_index is not None:
+                await asyncio.to_thread(self.local_vector_index.delete, memory_id)
+                if self.local_vector_index.needs_compaction():
+                    await asyncio.to_thread(self.local_vector_index.compact)
+            
+            await self._commit_journal()
+            
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error deleting memory: {e}")
+            return False
     
     async def get_agent_context(self, agent_id: str, task_context: Dict[str, Any] = None) -> Dict[str, Any]:
         """Get context for a specific agent"""
@@ -379,8 +502,8 @@ class AdvancedMemoryManager:
             memory_item["shared_with"].extend(target_agents)
             memory_item["shared_with"] = list(set(memory_item["shared_with"]))  # Remove duplicates
             
-            # Save memories
-            await self.save_memories()
+            self.journal.record_put(memory_id, memory_item)
+            await self._commit_journal()
             
             return True
             
@@ -396,6 +519,10 @@ class AdvancedMemoryManager:
                 "total_memories": len(self.memory_cache),
                 "memory_path": str(self.memory_path),
                 "vector_db_available": self.vector_db is not None,
+                "journal": self.journal.get_stats(),
+                "keyword_index": self.keyword_index.get_stats(),
+                "local_vector_index": self.local_vector_index.get_stats() if self.local_vector_index is not None else None,
+                "embeddings": self.embedding_service.get_metrics(),
                 "memory_usage_mb": self._get_memory_usage(),
                 "uptime_seconds": self._get_uptime()
             }
@@ -613,8 +740,20 @@ class AdvancedMemoryManager:
         """Shutdown the memory manager"""
         logger.info("Shutting down Advanced Memory Manager")
         
-        # Save memories
-        await self.save_memories()
+        # Flush the journal and write a final snapshot
+        try:
+            await self.journal.close(self.memory_cache)
+        except Exception as e:
+            logger.error(f"Error closing memory journal: {e}")
+        
+        if self._vector_sync_task and not self._vector_sync_task.done():
+            self._vector_sync_task.cancel()
+        
+        if self.local_vector_index is not None:
+            await asyncio.to_thread(self.local_vector_index.close)
+            self.local_vector_index = None
+        
+        await self.embedding_service.close()
         
         # Close vector database connection
         if hasattr(self, 'vector_db') and self.vector_db:
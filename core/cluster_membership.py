@@ -0,0 +1,519 @@
+"""
+Cluster Membership
+
+SWIM-style gossip membership for the agent cluster. Every protocol period a
+node pings one member (randomised round robin); without an ack it asks a few
+others to ping the member on its behalf, and if nobody gets through the
+member becomes *suspect*. A suspect member that hears about it refutes by
+raising its incarnation; otherwise it is declared *dead* once the suspicion
+timeout passes. Membership changes travel piggybacked on the pings and acks,
+each retransmitted a few times (proportional to log n), so there is no
+broadcast traffic. Each packet also carries the sender's current load, which
+keeps load reports fresh without separate heartbeats.
+
+Leadership is lease/term based: the leader re-announces its claim every
+third of a lease, and a new leader is only chosen (the alive member with the
+smallest id, in a higher term) once the current one is confirmed dead, has
+left, or let its lease lapse. Nodes joining later never displace a leader
+whose lease is valid.
+"""
+
+import json
+import math
+import time
+import random
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+ALIVE = "alive"
+SUSPECT = "suspect"
+DEAD = "dead"
+LEFT = "left"
+
+# Keep packets below a typical MTU; a single oversized update is still sent on its own
+MAX_PACKET_BYTES = 1400
+RETRANSMIT_MULTIPLIER = 4
+DEAD_RETENTION_SECONDS = 30.0
+
+
+@dataclass
+class Member:
+    node_id: str
+    host: str
+    port: int
+    incarnation: int = 0
+    status: str = ALIVE
+    meta: Dict[str, Any] = field(default_factory=dict)
+    load: Dict[str, Any] = field(default_factory=dict)
+    status_since: float = field(default_factory=time.monotonic)
+    last_heard: float = 0.0
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return (self.host, self.port)
+
+    def is_up(self) -> bool:
+        # Suspect members still count until they are confirmed dead
+        return self.status in (ALIVE, SUSPECT)
+
+
+class _GossipProtocol(asyncio.DatagramProtocol):
+    def __init__(self, membership: "GossipMembership"):
+        self.membership = membership
+
+    def datagram_received(self, data: bytes, addr):
+        self.membership._receive(data, addr)
+
+    def error_received(self, exc):
+        logger.debug(f"Gossip socket error: {exc}")
+
+
+class GossipMembership:
+    """Membership list, failure detector and leader lease for one node"""
+
+    def __init__(self, node_id: str, host: str = "127.0.0.1", port: int = 0,
+                 meta: Optional[Dict[str, Any]] = None, load_provider: Optional[Callable[[], Dict]] = None,
+                 protocol_period: float = 0.5, ping_timeout: float = 0.2, indirect_probes: int = 3,
+                 suspicion_timeout: float = 1.5, lease_duration: float = 4.0):
+        self.node_id = node_id
+        self.host = host
+        self.port = port
+        self.meta = dict(meta or {})
+        self.load_provider = load_provider
+        self.incarnation = 0
+
+        self.protocol_period = protocol_period
+        self.ping_timeout = ping_timeout
+        self.indirect_probes = indirect_probes
+        self.suspicion_timeout = suspicion_timeout
+        self.lease_duration = lease_duration
+
+        self.members: Dict[str, Member] = {}
+        self.term = 0
+        self.leader: Optional[str] = None
+        self.lease_deadline = 0.0
+        self._next_claim = 0.0
+        self._claim_after = 0.0  # Do not claim leadership before hearing from the cluster
+
+        self._updates: Dict[str, List[Any]] = {}  # key -> [update, transmissions]
+        self._acks: Dict[int, Callable[[Dict], None]] = {}
+        self._seq = 0
+        self._probe_order: List[str] = []
+        self._transport: Optional[asyncio.DatagramTransport] = None
+        self._loop_task: Optional[asyncio.Task] = None
+        self._listeners: List[Callable[[str, Optional[Member]], Any]] = []
+        self._rng = random.Random()
+
+        self.stats = {
+            "packets_sent": 0, "packets_received": 0, "bytes_sent": 0, "pings": 0, "indirect_pings": 0,
+            "suspicions": 0, "refutations": 0, "deaths": 0, "elections": 0
+        }
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        self._transport, _ = await loop.create_datagram_endpoint(
+            lambda: _GossipProtocol(self), local_addr=(self.host, self.port)
+        )
+        self.port = self._transport.get_extra_info("sockname")[1]
+        self._claim_after = time.monotonic() + 2 * self.protocol_period
+        self._loop_task = asyncio.create_task(self._protocol_loop())
+        logger.info(f"Gossip membership for {self.node_id} on {self.host}:{self.port}")
+
+    async def stop(self, leave: bool = True):
+        """Stop gossiping; with ``leave`` tell a few members first so the others need not detect it"""
+        if leave and self._transport is not None:
+            self.incarnation += 1
+            self._enqueue(self._self_update(LEFT))
+            for member in self._sample(self._up_members(), self.indirect_probes):
+                self._send(member.address, "gossip")
+        if self._loop_task is not None:
+            self._loop_task.cancel()
+            try:
+                await self._loop_task
+            except asyncio.CancelledError:
+                pass
+            self._loop_task = None
+        if self._transport is not None:
+            self._transport.close()
+            self._transport = None
+
+    def join(self, seeds: Iterable[Tuple[str, int]]):
+        """Contact seed nodes; they reply with their full membership list"""
+        for host, port in seeds:
+            if (host, port) != (self.host, self.port):
+                self._send((host, port), "sync")
+        self._claim_after = time.monotonic() + 2 * self.protocol_period
+
+    def subscribe(self, callback: Callable[[str, Optional[Member]], Any]):
+        """Call ``callback(kind, member)`` on alive/suspect/dead/left/update/load/leader events"""
+        if callback not in self._listeners:
+            self._listeners.append(callback)
+
+    def unsubscribe(self, callback: Callable[[str, Optional[Member]], Any]):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def update_meta(self, **meta):
+        """Change what this node advertises (e.g. its agents) and gossip it"""
+        self.meta.update(meta)
+        self.incarnation += 1
+        self._enqueue(self._self_update(ALIVE))
+
+    # ------------------------------------------------------------------
+    # Views
+    # ------------------------------------------------------------------
+
+    def _up_members(self) -> List[Member]:
+        return [member for member in self.members.values() if member.is_up()]
+
+    def alive_members(self) -> List[Member]:
+        return self._up_members()
+
+    @property
+    def is_leader(self) -> bool:
+        return self.leader == self.node_id
+
+    def get_stats(self) -> Dict[str, Any]:
+        counts: Dict[str, int] = {}
+        for member in self.members.values():
+            counts[member.status] = counts.get(member.status, 0) + 1
+        return {**self.stats, "members": counts, "term": self.term, "leader": self.leader,
+                "incarnation": self.incarnation, "pending_updates": len(self._updates)}
+
+    # ------------------------------------------------------------------
+    # Failure detection
+    # ------------------------------------------------------------------
+
+    async def _protocol_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            try:
+                target = self._next_probe_target()
+                if target is not None:
+                    await self._probe(target)
+                self._expire_suspects()
+                self._check_lease()
+                self._reap()
+            except Exception as e:
+                logger.error(f"Gossip protocol error: {e}")
+            await asyncio.sleep(max(0.0, self.protocol_period - (loop.time() - started)))
+
+    def _next_probe_target(self) -> Optional[Member]:
+        while True:
+            if not self._probe_order:
+                self._probe_order = [member.node_id for member in self._up_members()]
+                self._rng.shuffle(self._probe_order)
+                if not self._probe_order:
+                    return None
+            member = self.members.get(self._probe_order.pop())
+            if member is not None and member.is_up():
+                return member
+
+    async def _probe(self, member: Member):
+        loop = asyncio.get_running_loop()
+        acked = loop.create_future()
+        seq = self._expect_ack(lambda message: acked.done() or acked.set_result(True))
+        try:
+            self.stats["pings"] += 1
+            self._send(member.address, "ping", seq=seq)
+            try:
+                await asyncio.wait_for(asyncio.shield(acked), self.ping_timeout)
+                return
+            except asyncio.TimeoutError:
+                pass
+
+            # No direct answer: ask others to try, in case only our path to it is broken
+            helpers = self._sample([other for other in self._up_members() if other.node_id != member.node_id],
+                                   self.indirect_probes)
+            for helper in helpers:
+                self.stats["indirect_pings"] += 1
+                self._send(helper.address, "ping_req", seq=seq, target=[member.host, member.port])
+            try:
+                await asyncio.wait_for(asyncio.shield(acked),
+                                       max(self.ping_timeout, self.protocol_period - self.ping_timeout))
+                return
+            except asyncio.TimeoutError:
+                self._suspect(member)
+        finally:
+            self._acks.pop(seq, None)
+
+    def _suspect(self, member: Member):
+        if member.status != ALIVE:
+            return
+        member.status = SUSPECT
+        member.status_since = time.monotonic()
+        self.stats["suspicions"] += 1
+        logger.info(f"Member {member.node_id} is suspect")
+        self._enqueue({"k": SUSPECT, "id": member.node_id, "inc": member.incarnation})
+        self._push(member.node_id)
+        self._notify(SUSPECT, member)
+
+    def _expire_suspects(self):
+        now = time.monotonic()
+        for member in list(self.members.values()):
+            if member.status == SUSPECT and now - member.status_since >= self.suspicion_timeout:
+                self._declare(member, DEAD)
+                self._enqueue({"k": DEAD, "id": member.node_id, "inc": member.incarnation})
+                self._push(member.node_id)
+
+    def _push(self, node_id: str):
+        """Send news about a member straight to a few others instead of waiting for the next pings"""
+        update = self._updates.get(node_id)
+        if update is None:
+            return
+        for other in self._sample([m for m in self._up_members() if m.node_id != node_id], self.indirect_probes):
+            self._send(other.address, "gossip", updates=[update[0]])
+        update[1] += 1
+
+    def _declare(self, member: Member, status: str):
+        member.status = status
+        member.status_since = time.monotonic()
+        if status == DEAD:
+            self.stats["deaths"] += 1
+            logger.warning(f"Member {member.node_id} confirmed dead")
+        else:
+            logger.info(f"Member {member.node_id} left")
+        self._notify(status, member)
+
+    def _reap(self):
+        # Dead entries linger so stale gossip cannot resurrect them at an old incarnation
+        now = time.monotonic()
+        for node_id, member in list(self.members.items()):
+            if member.status in (DEAD, LEFT) and now - member.status_since > DEAD_RETENTION_SECONDS:
+                del self.members[node_id]
+
+    # ------------------------------------------------------------------
+    # Leadership
+    # ------------------------------------------------------------------
+
+    def _check_lease(self):
+        now = time.monotonic()
+        if self.leader == self.node_id:
+            if now >= self._next_claim:
+                self._claim(self.term)
+            return
+
+        leader = self.members.get(self.leader) if self.leader else None
+        leader_gone = leader is None or not leader.is_up() or now > self.lease_deadline
+        if not leader_gone or now < self._claim_after:
+            return
+        # Everyone agrees on the candidate once their views converge; only the candidate acts
+        candidates = [self.node_id] + [member.node_id for member in self.members.values() if member.status == ALIVE]
+        if min(candidates) == self.node_id:
+            self.stats["elections"] += 1
+            self._claim(self.term + 1)
+
+    def _claim(self, term: int):
+        now = time.monotonic()
+        changed = self.leader != self.node_id or term != self.term
+        self.term, self.leader = term, self.node_id
+        self.lease_deadline = now + self.lease_duration
+        self._next_claim = now + self.lease_duration / 3
+        self._enqueue({"k": "leader", "term": term, "id": self.node_id})
+        if changed:
+            logger.info(f"{self.node_id} is cluster leader for term {term}")
+            self._notify("leader", None)
+
+    def _apply_leader(self, term: int, leader_id: Optional[str], renew: bool):
+        if not leader_id:
+            return
+        leader = self.members.get(leader_id)
+        if leader_id != self.node_id and (leader is None or not leader.is_up()):
+            return  # Stale claim of a member we know is gone
+        now = time.monotonic()
+        if term > self.term or (term == self.term and (self.leader is None or leader_id < self.leader)):
+            changed = leader_id != self.leader
+            self.term, self.leader = term, leader_id
+            self.lease_deadline = now + self.lease_duration
+            if changed:
+                logger.info(f"Cluster leader is {leader_id} (term {term})")
+                self._notify("leader", leader)
+        elif renew and term == self.term and leader_id == self.leader:
+            self.lease_deadline = now + self.lease_duration
+
+    # ------------------------------------------------------------------
+    # Dissemination
+    # ------------------------------------------------------------------
+
+    def _self_update(self, kind: str = ALIVE) -> Dict[str, Any]:
+        return {"k": kind, "id": self.node_id, "inc": self.incarnation, "host": self.host, "port": self.port,
+                "meta": self.meta}
+
+    def _enqueue(self, update: Dict[str, Any]):
+        # A newer update about the same member (or the leader) replaces the pending one
+        key = "leader" if update["k"] == "leader" else update["id"]
+        self._updates[key] = [update, 0]
+
+    def _retransmit_limit(self) -> int:
+        return RETRANSMIT_MULTIPLIER * max(1, math.ceil(math.log10(len(self.members) + 2)))
+
+    def _take_updates(self, budget: int) -> List[Dict[str, Any]]:
+        chosen, used = [], 0
+        limit = self._retransmit_limit()
+        for key, entry in sorted(self._updates.items(), key=lambda item: item[1][1]):
+            size = len(json.dumps(entry[0]))
+            if chosen and used + size > budget:
+                break
+            chosen.append(entry[0])
+            used += size
+            entry[1] += 1
+            if entry[1] >= limit:
+                del self._updates[key]
+        return chosen
+
+    def _expect_ack(self, callback: Callable[[Dict], None]) -> int:
+        self._seq += 1
+        self._acks[self._seq] = callback
+        return self._seq
+
+    def _send(self, address: Tuple[str, int], kind: str, updates: Optional[List[Dict]] = None, **fields):
+        if self._transport is None:
+            return
+        message = {"t": kind, "from": self.node_id, "me": self._self_update(),
+                   "ldr": [self.term, self.leader], **fields}
+        if self.load_provider is not None:
+            try:
+                message["load"] = self.load_provider()
+            except Exception as e:
+                logger.debug(f"Load report failed: {e}")
+        header = len(json.dumps(message, default=str))
+        message["updates"] = updates if updates is not None else self._take_updates(MAX_PACKET_BYTES - header)
+        data = json.dumps(message, default=str).encode()
+        self._transport.sendto(data, address)
+        self.stats["packets_sent"] += 1
+        self.stats["bytes_sent"] += len(data)
+
+    def _receive(self, data: bytes, addr):
+        try:
+            message = json.loads(data)
+        except ValueError:
+            return
+        self.stats["packets_received"] += 1
+
+        # What the sender says about itself counts as first-hand news
+        me = message.get("me")
+        if me:
+            if me.get("host") in ("0.0.0.0", "", None):
+                # Bound to all interfaces: the packet's source is the address to use
+                me = {**me, "host": addr[0]}
+            self._apply_update(me)
+            sender = self.members.get(me["id"])
+            if sender is not None and sender.status == DEAD:
+                # Declared dead but still talking (e.g. it was paused): tell it, so it can refute
+                self._send(addr, "gossip", updates=[{"k": DEAD, "id": sender.node_id, "inc": sender.incarnation}])
+            elif sender is not None:
+                sender.last_heard = time.monotonic()
+                if "load" in message and sender.is_up():
+                    sender.load = message["load"] or {}
+                    self._notify("load", sender)
+        for update in message.get("updates", []):
+            self._apply_update(update)
+        term, leader_id = (message.get("ldr") or [0, None])[:2]
+        self._apply_leader(term, leader_id, renew=leader_id == message.get("from"))
+
+        kind = message.get("t")
+        if kind == "ping":
+            self._send(addr, "ack", seq=message.get("seq"))
+        elif kind == "ack":
+            callback = self._acks.get(message.get("seq"))
+            if callback is not None:
+                callback(message)
+        elif kind == "ping_req":
+            # Probe the target for the requester and relay its ack
+            requester, requester_seq = addr, message.get("seq")
+            seq = self._expect_ack(lambda reply: self._send(requester, "ack", seq=requester_seq))
+            self._send(tuple(message["target"]), "ping", seq=seq)
+            asyncio.get_running_loop().call_later(self.protocol_period, self._acks.pop, seq, None)
+        elif kind == "sync":
+            # A joining node: send the whole membership list, a packet's worth at a time
+            known = [self._member_update(member) for member in self.members.values()]
+            if self.leader:
+                known.append({"k": "leader", "term": self.term, "id": self.leader})
+            batch, used = [], 0
+            for update in known:
+                size = len(json.dumps(update, default=str))
+                if batch and used + size > MAX_PACKET_BYTES // 2:
+                    self._send(addr, "sync_ack", updates=batch)
+                    batch, used = [], 0
+                batch.append(update)
+                used += size
+            self._send(addr, "sync_ack", updates=batch)
+
+    @staticmethod
+    def _member_update(member: Member) -> Dict[str, Any]:
+        return {"k": member.status, "id": member.node_id, "inc": member.incarnation, "host": member.host,
+                "port": member.port, "meta": member.meta}
+
+    def _apply_update(self, update: Dict[str, Any]):
+        kind = update.get("k")
+        if kind == "leader":
+            self._apply_leader(update.get("term", 0), update.get("id"), renew=True)
+            return
+        node_id, incarnation = update.get("id"), update.get("inc", 0)
+        if not node_id:
+            return
+
+        if node_id == self.node_id:
+            if kind in (SUSPECT, DEAD) and incarnation >= self.incarnation:
+                # Refute: we are alive, at a newer incarnation than the rumour
+                self.incarnation = incarnation + 1
+                self.stats["refutations"] += 1
+                self._enqueue(self._self_update(ALIVE))
+            return
+
+        member = self.members.get(node_id)
+        if kind == ALIVE:
+            if member is None:
+                member = Member(node_id, update["host"], update["port"], incarnation, ALIVE, update.get("meta") or {})
+                self.members[node_id] = member
+                self._enqueue(self._member_update(member))
+                logger.info(f"Member {node_id} joined at {member.host}:{member.port}")
+                self._notify(ALIVE, member)
+            elif incarnation > member.incarnation:
+                revived = member.status != ALIVE
+                meta_changed = (update.get("meta") or {}) != member.meta
+                member.incarnation = incarnation
+                member.host, member.port = update.get("host", member.host), update.get("port", member.port)
+                member.meta = update.get("meta") or member.meta
+                if revived:
+                    member.status = ALIVE
+                    member.status_since = time.monotonic()
+                self._enqueue(self._member_update(member))
+                if revived:
+                    self._notify(ALIVE, member)
+                elif meta_changed:
+                    self._notify("update", member)
+        elif member is None:
+            return
+        elif kind == SUSPECT:
+            if (member.status == ALIVE and incarnation >= member.incarnation) or \
+                    (member.status == SUSPECT and incarnation > member.incarnation):
+                member.incarnation = incarnation
+                member.status = SUSPECT
+                member.status_since = time.monotonic()
+                self._enqueue(dict(update))
+                self._notify(SUSPECT, member)
+        elif kind in (DEAD, LEFT):
+            if member.is_up() and incarnation >= member.incarnation:
+                member.incarnation = incarnation
+                self._enqueue(dict(update))
+                self._declare(member, kind)
+
+    def _notify(self, kind: str, member: Optional[Member]):
+        for callback in list(self._listeners):
+            try:
+                callback(kind, member)
+            except Exception as e:
+                logger.error(f"Membership listener failed: {e}")
+
+    def _sample(self, members: List[Member], count: int) -> List[Member]:
+        return self._rng.sample(members, min(count, len(members)))
@@ -3,16 +3,85 @@ Distributed Agent Manager - Enables agent execution across multiple nodes
 """
 
 import asyncio
+import inspect
 import json
 import logging
+import random
+import time
+import uuid
 import aiohttp
-from typing import Dict, List, Optional, Set
+from aiohttp import web
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Set
 from datetime import datetime
 import hashlib
 import socket
 
+try:
+    import psutil
+    HAS_PSUTIL = True
+except ImportError:
+    HAS_PSUTIL = False
+
+from core.cluster_membership import DEAD, LEFT, SUSPECT, GossipMembership, Member
+from core.model_registry import get_model_registry
+from core.vram_eviction import DEFAULT_LOAD_SECONDS_PER_GB, DEFAULT_MODEL_SIZE_GB
+
+# Assumed task duration on a node that has not reported a latency yet
+DEFAULT_TASK_SECONDS = 5.0
+LATENCY_SMOOTHING = 0.2
+ROUTING_STRATEGIES = ('least_completion_time', 'power_of_two')
+# Task streams send a keepalive line this often, so a silent peer is detected within rpc_idle_timeout
+STREAM_KEEPALIVE_SECONDS = 1.0
+MAX_IDEMPOTENT_EXECUTIONS = 1024
+
+
+class ClusterRPCError(Exception):
+    """A task could not run on a node (unreachable, timed out, agent missing); another node may succeed"""
+
+
+@dataclass
+class _Execution:
+    """A task running on this node for a remote caller, shared by requests with the same idempotency key"""
+    task: Optional[asyncio.Task] = None
+    partials: List[Dict] = field(default_factory=list)
+    watchers: List[asyncio.Queue] = field(default_factory=list)
+    finished_at: Optional[float] = None
+
+
+class _PartialRelay:
+    """Forwards partial results of one attempt at a time to the caller's callback"""
+    
+    def __init__(self, callback: Optional[Callable[[Dict], Any]]):
+        self.callback = callback
+        self.leader: Optional[str] = None
+    
+    def for_node(self, node_id: str) -> Optional[Callable[[Dict], Any]]:
+        if self.callback is None:
+            return None
+        
+        async def forward(event: Dict):
+            if self.leader is None:
+                self.leader = node_id
+            if self.leader == node_id:
+                await self._emit({**event, 'node_id': node_id})
+        return forward
+    
+    async def drop(self, node_id: str):
+        """The leading attempt failed; the next one to stream starts over"""
+        if self.callback is not None and self.leader == node_id:
+            self.leader = None
+            await self._emit({'type': 'restart', 'node_id': node_id})
+    
+    async def _emit(self, event: Dict):
+        result = self.callback(event)
+        if inspect.isawaitable(result):
+            await result
+
+
 class DistributedAgentManager:
-    def __init__(self, config: Dict):
+    def __init__(self, config: Dict, vram_manager=None, agent_manager=None):
         self.config = config
         self.logger = logging.getLogger("DistributedAgentManager")
         
@@ -21,13 +90,62 @@ class DistributedAgentManager:
         self.nodes: Dict[str, Dict] = {}
         self.local_agents: Set[str] = set()
         
-        # Load balancing
+        # Load balancing: tasks in flight per node, and what this node advertises about itself
         self.task_distribution = {}
         self.node_health = {}
+        self.vram_manager = vram_manager  # Source of warm models and free VRAM; the model registry otherwise
+        self.in_flight = 0
+        self.max_concurrency = config.get('max_concurrency', 1)
+        self.latency_ewma: Optional[float] = None
+        self.node_latency: Dict[str, float] = {}  # Round trips to remote nodes as seen from here
+        self.routing_strategy = config.get('routing_strategy', 'least_completion_time')
+        if self.routing_strategy not in ROUTING_STRATEGIES:
+            raise ValueError(f"Unknown routing strategy {self.routing_strategy!r}; expected one of {ROUTING_STRATEGIES}")
+        self._rng = random.Random()
+        
+        # Execution: tasks run on the local agent manager's agents
+        self.agent_manager = agent_manager
+        
+        # RPC between nodes: a pooled session per peer, deadlines, hedging and retries
+        self.task_timeout = config.get('task_timeout', 600)
+        self.rpc_connect_timeout = config.get('rpc_connect_timeout', 2.0)
+        self.rpc_idle_timeout = config.get('rpc_idle_timeout', 5.0)
+        self.rpc_connections_per_peer = config.get('rpc_connections_per_peer', 4)
+        self.hedge_enabled = config.get('hedge_tasks', False)
+        self.hedge_after = config.get('hedge_after')  # None: twice the first node's expected completion time
+        self.max_attempts = config.get('max_attempts', 3)
+        self.failure_cooldown = config.get('failure_cooldown', 10)
+        self.idempotency_ttl = config.get('idempotency_ttl', 600)
+        self.node_failures: Dict[str, float] = {}
+        self._peer_sessions: Dict[str, aiohttp.ClientSession] = {}
+        self._executions: "OrderedDict[str, _Execution]" = OrderedDict()
+        self.rpc_stats = {'attempts': 0, 'retries': 0, 'hedges': 0, 'failures': 0, 'duplicates': 0, 'cancelled': 0}
         
         # Communication
+        self.communication_host = config.get('communication_host', 'localhost')
         self.communication_port = config.get('communication_port', 8900)
         self.discovery_port = config.get('discovery_port', 8901)
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._runner = None
+        self._background_tasks: List[asyncio.Task] = []
+        self._node_attempts: Dict[str, Set[asyncio.Task]] = {}
+        
+        # Membership and failure detection: SWIM gossip, which also carries load reports and the leader lease
+        self.membership = GossipMembership(
+            self.node_id,
+            host=config.get('gossip_host', self.communication_host),
+            port=config.get('gossip_port', 8902),
+            meta={'communication_port': self.communication_port, 'agents': []},
+            load_provider=self.get_load_report,
+            protocol_period=config.get('gossip_interval', 0.5),
+            suspicion_timeout=config.get('suspicion_timeout', 1.5),
+            lease_duration=config.get('lease_duration', 4.0)
+        )
+        self.membership.subscribe(self._on_membership_event)
+        self.join_timeout = config.get('join_timeout', 2.0)
+        # Backstop for nodes only known over HTTP (no gossip port)
+        self.node_timeout = config.get('node_timeout', 120)
+        self.health_check_interval = config.get('health_check_interval', 60)
         
         # Clustering
         self.cluster_name = config.get('cluster_name', 'ultimate-copilot-cluster')
@@ -44,12 +162,26 @@ class DistributedAgentManager:
         """Initialize distributed agent manager"""
         self.logger.info(f"🌐 Initializing Distributed Agent Manager (Node: {self.node_id})...")
         
+        # Advertise the agents the local agent manager runs
+        for agent_id in getattr(self.agent_manager, 'agents', None) or {}:
+            await self.register_local_agent(agent_id)
+        
         # Start communication server
         await self.start_communication_server()
         
         # Start node discovery
         await self.start_node_discovery()
         
+        # Contact configured peers directly ("host:port"), e.g. where UDP broadcast does not reach
+        for peer in self.config.get('seed_nodes', []):
+            host, _, port = peer.rpartition(':')
+            await self.join_peer(host, int(port))
+        gossip_seeds = []
+        for peer in self.config.get('gossip_seeds', []):
+            host, _, port = peer.rpartition(':')
+            gossip_seeds.append((host, int(port)))
+        self.membership.join(gossip_seeds)
+        
         # Join cluster
         await self.join_cluster()
         
@@ -57,8 +189,6 @@ class DistributedAgentManager:
     
     async def start_communication_server(self):
         """Start communication server for inter-node communication"""
-        from aiohttp import web
-        
         app = web.Application()
         
         # Routes for inter-node communication
@@ -68,12 +198,17 @@ class DistributedAgentManager:
         app.router.add_post('/api/heartbeat', self.handle_heartbeat)
         app.router.add_get('/api/agents', self.handle_agents_request)
         
+        app.router.add_post('/api/task/stream', self.handle_remote_task_stream)
+        app.router.add_post('/api/task/cancel', self.handle_cancel_request)
+        app.router.add_post('/api/departure', self.handle_departure)
+        
         # Start server
         runner = web.AppRunner(app)
         await runner.setup()
         
-        site = web.TCPSite(runner, 'localhost', self.communication_port)
+        site = web.TCPSite(runner, self.communication_host, self.communication_port)
         await site.start()
+        self._runner = runner
         
         self.logger.info(f"Communication server started on port {self.communication_port}")
     
@@ -84,6 +219,10 @@ class DistributedAgentManager:
         
         # Start periodic discovery broadcast
         asyncio.create_task(self.discovery_broadcast())
+        
+        # Gossip membership finds the rest of the cluster from any node and detects failures in seconds
+        await self.membership.start()
+        self._background_tasks.append(asyncio.create_task(self.monitor_cluster_health()))
     
     async def discovery_server(self):
         """UDP server for node discovery"""
@@ -114,14 +253,7 @@ class DistributedAgentManager:
         
         while True:
             try:
-                message = {
-                    'type': 'discovery',
-                    'cluster': self.cluster_name,
-                    'node_id': self.node_id,
-                    'communication_port': self.communication_port,
-                    'agents': list(self.local_agents),
-                    'timestamp': datetime.now().isoformat()
-                }
+                message = {'type': 'discovery', 'cluster': self.cluster_name, **self.build_announcement()}
                 
                 data = json.dumps(message).encode()
                 sock.sendto(data, ('<broadcast>', self.discovery_port))
@@ -137,168 +269,632 @@ class DistributedAgentManager:
         node_id = message.get('node_id')
         
         if node_id != self.node_id:  # Ignore own messages
-            node_info = {
-                'node_id': node_id,
-                'address': addr[0],
-                'communication_port': message.get('communication_port'),
-                'agents': message.get('agents', []),
-                'last_seen': datetime.now().isoformat(),
-                'status': 'active'
-            }
-            
-            self.nodes[node_id] = node_info
-            self.logger.info(f"Discovered node: {node_id} at {addr[0]}")
+            is_new = node_id not in self.nodes
+            self.update_node(message, addr[0])
+            if is_new:
+                self.logger.info(f"Discovered node: {node_id} at {addr[0]}")
+    
+    def build_announcement(self) -> Dict[str, Any]:
+        """What this node tells the others in discovery, join and heartbeat messages"""
+        return {
+            'node_id': self.node_id,
+            'communication_port': self.communication_port,
+            'gossip_port': self.membership.port,
+            'agents': list(self.local_agents),
+            'load': self.get_load_report(),
+            'timestamp': datetime.now().isoformat()
+        }
+    
+    def get_load_report(self) -> Dict[str, Any]:
+        """Warm models, free memory, queue depth and latency of this node"""
+        loaded_models: List[str] = []
+        free_vram_gb = None
+        if self.vram_manager is not None:
+            loaded_models = list(self.vram_manager.loaded_models)
+            free_vram_gb = max(0.0, self.vram_manager.max_vram_gb - self.vram_manager.current_vram_usage)
+        else:
+            snapshot = get_model_registry().current()
+            if snapshot is not None:
+                loaded_models = [model.key for model in snapshot.models(loaded_only=True)]
+        
+        free_ram_gb = None
+        if HAS_PSUTIL:
+            free_ram_gb = psutil.virtual_memory().available / (1024**3)
+        
+        return {
+            'loaded_models': loaded_models,
+            'free_vram_gb': free_vram_gb,
+            'free_ram_gb': free_ram_gb,
+            'in_flight': self.in_flight,
+            'max_concurrency': self.max_concurrency,
+            'latency_ewma': self.latency_ewma
+        }
+    
+    def update_node(self, message: Dict, address: str):
+        """Record a node's announcement (discovery, join or heartbeat)"""
+        node_id = message.get('node_id')
+        if not node_id or node_id == self.node_id:
+            return
+        node_info = self.nodes.setdefault(node_id, {'node_id': node_id})
+        node_info['address'] = message.get('address') or node_info.get('address') or address
+        for key in ('communication_port', 'agents', 'load'):
+            if key in message:
+                node_info[key] = message[key]
+        node_info['last_seen'] = datetime.now().isoformat()
+        node_info['status'] = 'active'
+        
+        # Nodes found over HTTP or UDP discovery join the gossip membership too
+        gossip_port = message.get('gossip_port')
+        if gossip_port and node_id not in self.membership.members:
+            self.membership.join([(node_info['address'], gossip_port)])
+    
+    def _on_membership_event(self, kind: str, member: Optional[Member]):
+        """Keep the node table and coordinator in step with gossip membership"""
+        if kind == 'leader':
+            self._adopt_leader()
+            return
+        if kind in (DEAD, LEFT):
+            asyncio.create_task(self.handle_node_failure(member.node_id, kind))
+            return
+        if kind == SUSPECT:
+            if member.node_id in self.nodes:
+                self.nodes[member.node_id]['status'] = 'suspect'
+            return
+        # alive, update (new metadata) and load (every packet from the member)
+        self.update_node({
+            'node_id': member.node_id,
+            'communication_port': member.meta.get('communication_port'),
+            'agents': member.meta.get('agents', []),
+            'load': member.load
+        }, member.host)
+        if kind != 'load':
+            self.node_failures.pop(member.node_id, None)
+    
+    async def handle_node_failure(self, node_id: str, reason: str = DEAD):
+        """A node is gone: forget it and move its tasks elsewhere right away"""
+        if self.nodes.pop(node_id, None) is None and node_id not in self.task_distribution:
+            return
+        self.logger.warning(f"Node {node_id} {'left the cluster' if reason == LEFT else 'is dead'}")
+        self.node_failures.pop(node_id, None)
+        session = self._peer_sessions.pop(node_id, None)
+        if session is not None and not session.closed:
+            await session.close()
+        await self.redistribute_tasks(node_id)
+    
+    async def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10))
+        return self._session
+    
+    async def join_peer(self, address: str, port: int) -> bool:
+        """Announce this node to a peer and record the peer's own announcement"""
+        try:
+            session = await self._get_session()
+            async with session.post(f"http://{address}:{port}/api/join", json=self.build_announcement()) as response:
+                if response.status != 200:
+                    return False
+                reply = await response.json()
+        except Exception as e:
+            self.logger.warning(f"Could not join peer {address}:{port}: {e}")
+            return False
+        
+        announcement = reply.get('node')
+        if announcement:
+            self.update_node(announcement, address)
+            self.logger.info(f"Joined node {announcement.get('node_id')} at {address}:{port}")
+        return True
     
     async def join_cluster(self):
         """Join the cluster and elect coordinator"""
-        await asyncio.sleep(5)  # Wait for initial discovery
-        
-        if not self.nodes:
-            # First node becomes coordinator
-            self.is_coordinator = True
-            self.coordinator_node = self.node_id
-            self.logger.info(f"🎯 Node {self.node_id} elected as cluster coordinator")
-        else:
-            # Find coordinator or elect new one
-            await self.elect_coordinator()
+        # Wait for gossip to reveal the current leader, or for this node to claim leadership
+        deadline = time.monotonic() + self.join_timeout
+        while self.membership.leader is None and time.monotonic() < deadline:
+            await asyncio.sleep(self.membership.protocol_period / 2)
+        await self.elect_coordinator()
     
     async def elect_coordinator(self):
         """Elect cluster coordinator"""
-        # Simple election: node with smallest ID becomes coordinator
-        all_nodes = [self.node_id] + list(self.nodes.keys())
-        coordinator = min(all_nodes)
-        
-        if coordinator == self.node_id:
-            self.is_coordinator = True
-            self.coordinator_node = self.node_id
-            self.logger.info(f"🎯 Node {self.node_id} elected as cluster coordinator")
+        # The membership layer runs a term/lease election; a leader keeps the role until it
+        # dies, leaves or lets its lease lapse, so new nodes with smaller ids do not take over
+        self._adopt_leader()
+    
+    def _adopt_leader(self):
+        coordinator = self.membership.leader
+        if coordinator is None or coordinator == self.coordinator_node:
+            return
+        self.coordinator_node = coordinator
+        self.is_coordinator = coordinator == self.node_id
+        if self.is_coordinator:
+            self.logger.info(f"🎯 Node {self.node_id} elected as cluster coordinator (term {self.membership.term})")
         else:
-            self.coordinator_node = coordinator
-            self.logger.info(f"📡 Node {coordinator} is cluster coordinator")
+            self.logger.info(f"📡 Node {coordinator} is cluster coordinator (term {self.membership.term})")
     
     async def register_local_agent(self, agent_id: str):
         """Register an agent as running on this node"""
         self.local_agents.add(agent_id)
+        self.membership.update_meta(agents=sorted(self.local_agents))
         self.logger.info(f"📝 Registered local agent: {agent_id}")
     
     async def unregister_local_agent(self, agent_id: str):
         """Unregister a local agent"""
         self.local_agents.discard(agent_id)
+        self.membership.update_meta(agents=sorted(self.local_agents))
         self.logger.info(f"🗑️ Unregistered local agent: {agent_id}")
     
-    async def execute_distributed_task(self, task: Dict) -> Dict:
-        """Execute task on optimal node"""
-        # Determine best node for task
-        target_node = await self.select_optimal_node(task)
+    async def execute_distributed_task(self, task: Dict, on_partial: Optional[Callable[[Dict], Any]] = None) -> Dict:
+        """
+        Execute task on optimal node.
         
-        if target_node == self.node_id:
-            # Execute locally
-            return await self.execute_local_task(task)
-        else:
-            # Execute remotely
-            return await self.execute_remote_task(task, target_node)
+        A node that cannot run the task (unreachable, timed out, agent
+        missing) hands it to the next ranked node straight away; a slow first
+        node gets a hedged copy on the second one after hedge_after seconds
+        when the task asks for it with ``'hedge': True`` (or hedge_tasks is
+        set for the cluster). All attempts share one idempotency key, so no
+        node runs the task twice.
+        Partial results stream to ``on_partial`` from one attempt at a time;
+        a ``restart`` event means the streaming attempt failed and another
+        took over.
+        """
+        task = dict(task)
+        task.setdefault('idempotency_key', uuid.uuid4().hex)
+        ranked = await self._rank_candidates(task)
+        max_attempts = min(len(ranked), max(1, self.max_attempts))
+        hedge = bool(task.get('hedge', self.hedge_enabled)) and max_attempts > 1
+        relay = _PartialRelay(on_partial)
+        attempts: Dict[asyncio.Task, str] = {}
+        errors: List[str] = []
+        launched = 0
+        
+        def launch():
+            nonlocal launched
+            node_id = ranked[launched]['node_id']
+            launched += 1
+            self.rpc_stats['attempts'] += 1
+            # Tasks in flight count towards the node's queue until its next load report
+            self.task_distribution.setdefault(node_id, []).append(task)
+            attempt = asyncio.create_task(self._attempt(task, node_id, relay.for_node(node_id)))
+            # redistribute_tasks cancels the attempts on a node that dies
+            in_flight = self._node_attempts.setdefault(node_id, set())
+            in_flight.add(attempt)
+            attempt.add_done_callback(in_flight.discard)
+            attempts[attempt] = node_id
+        
+        loop = asyncio.get_running_loop()
+        launch()
+        hedge_at = loop.time() + self._hedge_delay(ranked[0])
+        try:
+            while attempts:
+                timeout = max(0.0, hedge_at - loop.time()) if hedge and launched < max_attempts else None
+                done, _ = await asyncio.wait(attempts, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # The first node is slow: race a copy on the next one
+                    hedge = False
+                    self.rpc_stats['hedges'] += 1
+                    self.logger.info(f"Hedging task {task['idempotency_key'][:8]} on {ranked[launched]['node_id']}")
+                    launch()
+                    continue
+                
+                for finished in done:
+                    node_id = attempts.pop(finished)
+                    try:
+                        if finished.cancelled():
+                            raise ClusterRPCError(f"node {node_id} failed during the task")
+                        result = finished.result()
+                    except ClusterRPCError as e:
+                        errors.append(f"{node_id}: {e}")
+                        self._record_failure(node_id, e)
+                        await relay.drop(node_id)
+                        if launched < max_attempts:
+                            self.rpc_stats['retries'] += 1
+                            launch()
+                        continue
+                    
+                    # First answer wins; the other copy is cancelled below
+                    for other_node in attempts.values():
+                        if other_node != self.node_id:
+                            asyncio.create_task(self._cancel_remote(other_node, task['idempotency_key']))
+                    result['hedged'] = launched > 1
+                    return result
+        finally:
+            for pending in attempts:
+                pending.cancel()
+        
+        self.logger.error(f"Task {task['idempotency_key'][:8]} failed on every node: {'; '.join(errors)}")
+        return {
+            'success': False,
+            'error': 'No node could execute the task',
+            'attempts': errors,
+            'node_id': self.node_id,
+            'timestamp': datetime.now().isoformat()
+        }
+    
+    async def _attempt(self, task: Dict, node_id: str, on_partial: Optional[Callable[[Dict], Any]]) -> Dict:
+        try:
+            if node_id == self.node_id:
+                # Execute locally
+                return await self.execute_local_task(task, on_partial)
+            else:
+                # Execute remotely
+                return await self.execute_remote_task(task, node_id, on_partial)
+        finally:
+            assigned = self.task_distribution.get(node_id, [])
+            if task in assigned:
+                assigned.remove(task)
+    
+    def _hedge_delay(self, candidate: Dict) -> float:
+        if self.hedge_after is not None:
+            return self.hedge_after
+        return max(1.0, 2 * candidate['expected_seconds'])
+    
+    def _record_failure(self, node_id: str, error: Exception):
+        self.rpc_stats['failures'] += 1
+        self.logger.warning(f"Task attempt on {node_id} failed: {error}")
     
     async def select_optimal_node(self, task: Dict) -> str:
-        """Select optimal node for task execution"""
+        """
+        Select optimal node for task execution.
+        
+        Among the nodes running the required agent, pick the least expected
+        completion time: queued work, the node's latency and, on a cold node,
+        the model load. With routing_strategy 'power_of_two' two random
+        candidates are compared instead (only warm ones when a warm node is
+        best), so stale load reports do not herd every task onto the same node.
+        """
+        return (await self._rank_candidates(task))[0]['node_id']
+    
+    async def _rank_candidates(self, task: Dict) -> List[Dict[str, Any]]:
+        """Candidate nodes best first: the choice described in select_optimal_node, then the rest"""
         required_agent = task.get('agent', 'orchestrator')
+        model = self._task_model(task)
         
         # Find nodes with the required agent
         candidate_nodes = []
         
         # Check local node
         if required_agent in self.local_agents:
-            candidate_nodes.append({
-                'node_id': self.node_id,
-                'load': len(self.task_distribution.get(self.node_id, [])),
-                'local': True
-            })
+            candidate_nodes.append(self._describe_candidate(self.node_id, model))
         
         # Check remote nodes
         for node_id, node_info in self.nodes.items():
             if required_agent in node_info.get('agents', []):
-                candidate_nodes.append({
-                    'node_id': node_id,
-                    'load': len(self.task_distribution.get(node_id, [])),
-                    'local': False
-                })
+                candidate_nodes.append(self._describe_candidate(node_id, model))
         
         if not candidate_nodes:
             # No specific agent found, use any available node
-            candidate_nodes = [{'node_id': self.node_id, 'load': 0, 'local': True}]
+            candidate_nodes = [self._describe_candidate(self.node_id, model)]
             for node_id in self.nodes.keys():
-                candidate_nodes.append({
-                    'node_id': node_id,
-                    'load': len(self.task_distribution.get(node_id, [])),
-                    'local': False
-                })
+                candidate_nodes.append(self._describe_candidate(node_id, model))
         
-        # Select node with lowest load, prefer local
-        best_node = min(candidate_nodes, key=lambda x: (x['load'], not x['local']))
+        # Nodes that failed a task recently are only tried once the others have been
+        now = time.monotonic()
+        healthy = [candidate for candidate in candidate_nodes
+                   if now - self.node_failures.get(candidate['node_id'], float('-inf')) >= self.failure_cooldown
+                   and self.nodes.get(candidate['node_id'], {}).get('status') != 'suspect']
+        failing = [candidate for candidate in candidate_nodes if candidate not in healthy]
+        pool = healthy or failing
         
-        return best_node['node_id']
+        # Model affinity is in the expected completion time: a cold node pays for the load, so a
+        # warm node wins unless it is badly backed up. Affinity only narrows the power-of-two
+        # sample: when a warm node is the best choice, two cold nodes are never compared
+        if self.routing_strategy == 'power_of_two' and len(pool) > 2:
+            if min(pool, key=self._routing_key)['warm']:
+                pool = [candidate for candidate in pool if candidate['warm']]
+            if len(pool) > 2:
+                pool = self._rng.sample(pool, 2)
+        
+        best_node = min(pool, key=self._routing_key)
+        self.logger.debug(f"Routing {required_agent} task ({model or 'any model'}) to {best_node['node_id']}: "
+                          f"expected {best_node['expected_seconds']:.1f}s, warm={best_node['warm']}")
+        
+        rest = sorted((candidate for candidate in healthy if candidate is not best_node), key=self._routing_key)
+        rest += sorted((candidate for candidate in failing if candidate is not best_node), key=self._routing_key)
+        return [best_node] + rest
     
-    async def execute_local_task(self, task: Dict) -> Dict:
-        """Execute task locally"""
-        # This would integrate with the local agent manager
-        # For now, return a placeholder result
+    @staticmethod
+    def _routing_key(candidate: Dict):
+        # Lowest expected completion time, prefer local
+        return (candidate['expected_seconds'], not candidate['local'])
+    
+    @staticmethod
+    def _task_model(task: Dict) -> Optional[str]:
+        """Model a task asks for, if any"""
+        if task.get('model'):
+            return task['model']
+        preferred = task.get('preferred_models') or []
+        return preferred[0] if preferred else None
+    
+    @staticmethod
+    def _is_model_loaded(model: str, loaded_models: List[str]) -> bool:
+        # Tasks may name "provider/model" or just the model
+        return any(loaded == model or loaded.partition('/')[2] == model for loaded in loaded_models)
+    
+    def _describe_candidate(self, node_id: str, model: Optional[str]) -> Dict[str, Any]:
+        """Expected completion time of a task with ``model`` on one node"""
+        local = node_id == self.node_id
+        report = self.get_load_report() if local else self.nodes[node_id].get('load', {})
+        
+        # Queue: the node's own count, or what we have sent it since its last report if that is more
+        dispatched = len(self.task_distribution.get(node_id, []))
+        queued = max(report.get('in_flight') or 0, dispatched)
+        slots = max(1, report.get('max_concurrency') or 1)
+        # Remote nodes: the round trip we measured includes the network; their own figure otherwise
+        latency = (None if local else self.node_latency.get(node_id)) or report.get('latency_ewma') or DEFAULT_TASK_SECONDS
+        expected_seconds = (queued / slots + 1) * latency
+        
+        warm = model is None or self._is_model_loaded(model, report.get('loaded_models', []))
+        if not warm:
+            size_gb = self._model_size_gb(model)
+            load_seconds = size_gb * DEFAULT_LOAD_SECONDS_PER_GB
+            free_vram_gb = report.get('free_vram_gb')
+            if free_vram_gb is not None and free_vram_gb < size_gb:
+                # Something warm has to go first, and will likely be reloaded later
+                load_seconds *= 2
+            expected_seconds += load_seconds
         
         return {
-            'success': True,
+            'node_id': node_id,
+            'local': local,
+            'warm': warm,
+            'load': queued,
+            'expected_seconds': expected_seconds
+        }
+    
+    def _model_size_gb(self, model: str) -> float:
+        if self.vram_manager is not None:
+            return self.vram_manager.estimate_model_size(model)
+        return DEFAULT_MODEL_SIZE_GB
+    
+    def _record_latency(self, node_id: str, seconds: float):
+        """Fold one task duration into the EWMA for a node (this node's own service time for node_id == self)"""
+        if node_id == self.node_id:
+            previous = self.latency_ewma
+            self.latency_ewma = seconds if previous is None else previous + LATENCY_SMOOTHING * (seconds - previous)
+        else:
+            previous = self.node_latency.get(node_id)
+            self.node_latency[node_id] = seconds if previous is None else previous + LATENCY_SMOOTHING * (seconds - previous)
+    
+    async def execute_local_task(self, task: Dict, on_partial: Optional[Callable[[Dict], Any]] = None) -> Dict:
+        """Execute task locally"""
+        self.in_flight += 1
+        started = time.perf_counter()
+        try:
+            return await self._run_local_task(task, on_partial)
+        finally:
+            self.in_flight -= 1
+            self._record_latency(self.node_id, time.perf_counter() - started)
+    
+    async def _run_local_task(self, task: Dict, on_partial: Optional[Callable[[Dict], Any]] = None) -> Dict:
+        """Run a task on the local agent manager's agent; streamed LLM chunks go to ``on_partial``"""
+        agent_id = task.get('agent', 'orchestrator')
+        agents = getattr(self.agent_manager, 'agents', None) or {}
+        agent = agents.get(agent_id)
+        if agent is None:
+            raise ClusterRPCError(f"Agent {agent_id!r} is not running on node {self.node_id}")
+        
+        streaming = on_partial is not None and hasattr(agent, 'add_token_listener')
+        if streaming:
+            agent.add_token_listener(on_partial)
+        try:
+            execute = getattr(agent, 'execute_intelligent_task', None) or agent.execute_task
+            result = await execute(task)
+            success = result.get('success', True) if isinstance(result, dict) else True
+            error = None
+        except Exception as e:
+            # The agent ran and failed: that is the task's outcome, not a reason to try another node
+            self.logger.error(f"Agent {agent_id} failed task: {e}")
+            result, success, error = None, False, str(e)
+        finally:
+            if streaming:
+                agent.remove_token_listener(on_partial)
+        
+        response = {
+            'success': success,
             'node_id': self.node_id,
             'execution_type': 'local',
-            'result': 'Task executed locally',
+            'result': result,
             'timestamp': datetime.now().isoformat()
         }
+        if error:
+            response['error'] = error
+        return response
+    
+    def _get_peer_session(self, node_id: str) -> aiohttp.ClientSession:
+        """Pooled keep-alive session for one peer"""
+        session = self._peer_sessions.get(node_id)
+        if session is None or session.closed:
+            session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.rpc_connections_per_peer),
+                timeout=aiohttp.ClientTimeout(total=self.task_timeout, connect=self.rpc_connect_timeout,
+                                              sock_read=self.rpc_idle_timeout)
+            )
+            self._peer_sessions[node_id] = session
+        return session
     
-    async def execute_remote_task(self, task: Dict, target_node: str) -> Dict:
-        """Execute task on remote node"""
+    async def execute_remote_task(self, task: Dict, target_node: str,
+                                  on_partial: Optional[Callable[[Dict], Any]] = None) -> Dict:
+        """Execute task on remote node, streaming its partial results; raises ClusterRPCError if it cannot"""
         if target_node not in self.nodes:
-            raise Exception(f"Target node {target_node} not available")
+            raise ClusterRPCError(f"Target node {target_node} not available")
         
         node_info = self.nodes[target_node]
-        url = f"http://{node_info['address']}:{node_info['communication_port']}/api/task"
+        url = f"http://{node_info['address']}:{node_info['communication_port']}/api/task/stream"
         
+        started = time.perf_counter()
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, json=task) as response:
-                    if response.status == 200:
-                        result = await response.json()
-                        result['execution_type'] = 'remote'
-                        result['target_node'] = target_node
-                        return result
-                    else:
-                        raise Exception(f"Remote execution failed: {response.status}")
-                        
+            session = self._get_peer_session(target_node)
+            async with session.post(url, json=task) as response:
+                if response.status != 200:
+                    self.node_failures[target_node] = time.monotonic()
+                    raise ClusterRPCError(f"Remote execution failed: HTTP {response.status}")
+                
+                # One JSON message per line; lines can exceed the reader's readline limit
+                buffer = b''
+                async for chunk in response.content.iter_any():
+                    buffer += chunk
+                    while b'\n' in buffer:
+                        line, buffer = buffer.split(b'\n', 1)
+                        if not line.strip():
+                            continue
+                        message = json.loads(line)
+                        kind = message.get('type')
+                        if kind == 'partial' and on_partial is not None:
+                            outcome = on_partial(message['event'])
+                            if inspect.isawaitable(outcome):
+                                await outcome
+                        elif kind == 'error':
+                            raise ClusterRPCError(message.get('error', 'remote error'))
+                        elif kind == 'result':
+                            result = message['result']
+                            self._record_latency(target_node, time.perf_counter() - started)
+                            result['execution_type'] = 'remote'
+                            result['target_node'] = target_node
+                            return result
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            # Rank the node last until gossip sees it again or the cooldown passes
+            self.node_failures[target_node] = time.monotonic()
+            raise ClusterRPCError(f"{type(e).__name__}: {e}") from e
+        
+        self.node_failures[target_node] = time.monotonic()
+        raise ClusterRPCError("stream ended without a result")
+    
+    async def _cancel_remote(self, node_id: str, idempotency_key: str):
+        """Stop a losing hedged copy"""
+        node_info = self.nodes.get(node_id)
+        if node_info is None:
+            return
+        url = f"http://{node_info['address']}:{node_info['communication_port']}/api/task/cancel"
+        try:
+            async with self._get_peer_session(node_id).post(url, json={'idempotency_key': idempotency_key}):
+                pass
         except Exception as e:
-            self.logger.error(f"Remote task execution failed: {e}")
-            # Fallback to local execution
-            return await self.execute_local_task(task)
+            self.logger.debug(f"Could not cancel task on {node_id}: {e}")
+    
+    def _start_execution(self, task: Dict) -> _Execution:
+        """Run a remote caller's task once per idempotency key"""
+        key = task.get('idempotency_key')
+        execution = self._executions.get(key) if key else None
+        if execution is not None:
+            self.rpc_stats['duplicates'] += 1
+            return execution
+        
+        execution = _Execution()
+        
+        def publish(event: Dict):
+            execution.partials.append(event)
+            for queue in execution.watchers:
+                queue.put_nowait(event)
+        
+        def finished(_):
+            execution.finished_at = time.monotonic()
+            for queue in execution.watchers:
+                queue.put_nowait(None)
+        
+        execution.task = asyncio.create_task(self.execute_local_task(task, publish))
+        execution.task.add_done_callback(finished)
+        if key:
+            self._executions[key] = execution
+            self._expire_executions()
+        return execution
+    
+    def _expire_executions(self):
+        now = time.monotonic()
+        for key, execution in list(self._executions.items()):
+            expired = execution.finished_at is not None and now - execution.finished_at > self.idempotency_ttl
+            if expired or (len(self._executions) > MAX_IDEMPOTENT_EXECUTIONS and execution.finished_at is not None):
+                del self._executions[key]
+    
+    @staticmethod
+    def _execution_outcome(execution: _Execution) -> Dict:
+        """Final stream message for a finished execution"""
+        if execution.task.cancelled():
+            return {'type': 'error', 'error': 'cancelled'}
+        error = execution.task.exception()
+        if isinstance(error, ClusterRPCError):
+            return {'type': 'error', 'error': str(error)}
+        if error is not None:
+            return {'type': 'result', 'result': {'success': False, 'error': str(error)}}
+        return {'type': 'result', 'result': execution.task.result()}
     
     async def handle_remote_task(self, request):
         """Handle remote task execution request"""
         try:
             task = await request.json()
-            result = await self.execute_local_task(task)
-            
-            return aiohttp.web.json_response(result)
-            
         except Exception as e:
-            return aiohttp.web.json_response(
-                {'success': False, 'error': str(e)}, 
-                status=500
-            )
+            return web.json_response({'success': False, 'error': str(e)}, status=400)
+        
+        execution = self._start_execution(task)
+        await asyncio.wait([execution.task])
+        outcome = self._execution_outcome(execution)
+        if outcome['type'] == 'error':
+            return web.json_response({'success': False, 'error': outcome['error']}, status=503)
+        return web.json_response(outcome['result'])
+    
+    async def handle_remote_task_stream(self, request):
+        """Run a task for a remote node, streaming partial results and keepalives as JSON lines"""
+        try:
+            task = await request.json()
+        except Exception as e:
+            return web.json_response({'success': False, 'error': str(e)}, status=400)
+        
+        execution = self._start_execution(task)
+        queue: asyncio.Queue = asyncio.Queue()
+        # A retry with the same key replays what was streamed so far
+        for event in execution.partials:
+            queue.put_nowait(event)
+        if execution.task.done():
+            queue.put_nowait(None)
+        execution.watchers.append(queue)
+        
+        response = web.StreamResponse(headers={'Content-Type': 'application/x-ndjson'})
+        await response.prepare(request)
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=STREAM_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    await self._write_line(response, {'type': 'keepalive'})
+                    continue
+                if event is None:
+                    break
+                await self._write_line(response, {'type': 'partial', 'event': event})
+            await self._write_line(response, self._execution_outcome(execution))
+            await response.write_eof()
+        except ConnectionError:
+            # The caller went away (a hedge it lost, or a crash); the task keeps its idempotency entry
+            self.logger.debug(f"Caller of task {str(task.get('idempotency_key'))[:8]} disconnected")
+        finally:
+            execution.watchers.remove(queue)
+        return response
+    
+    @staticmethod
+    async def _write_line(response, message: Dict):
+        await response.write(json.dumps(message, default=str).encode() + b'\n')
+    
+    async def handle_cancel_request(self, request):
+        """Cancel a task a caller no longer needs (it lost a hedge)"""
+        try:
+            key = (await request.json()).get('idempotency_key')
+        except Exception as e:
+            return web.json_response({'success': False, 'error': str(e)}, status=400)
+        
+        execution = self._executions.get(key)
+        if execution is not None and not execution.task.done():
+            execution.task.cancel()
+            self.rpc_stats['cancelled'] += 1
+            return web.json_response({'success': True, 'cancelled': True})
+        return web.json_response({'success': True, 'cancelled': False})
     
     async def handle_status_request(self, request):
         """Handle status request from other nodes"""
         status = {
             'node_id': self.node_id,
             'agents': list(self.local_agents),
-            'load': len(self.task_distribution.get(self.node_id, [])),
+            'load': self.get_load_report(),
             'is_coordinator': self.is_coordinator,
             'timestamp': datetime.now().isoformat()
         }
         
-        return aiohttp.web.json_response(status)
+        return web.json_response(status)
     
     async def handle_join_request(self, request):
         """Handle join request from new node"""
@@ -307,18 +903,14 @@ class DistributedAgentManager:
             node_id = node_info.get('node_id')
             
             if node_id and node_id != self.node_id:
-                self.nodes[node_id] = {
-                    **node_info,
-                    'last_seen': datetime.now().isoformat(),
-                    'status': 'active'
-                }
-                
+                self.update_node(node_info, request.remote)
                 self.logger.info(f"Node {node_id} joined cluster")
             
-            return aiohttp.web.json_response({'success': True})
+            # Reply with our own announcement so the joining node learns about us too
+            return web.json_response({'success': True, 'node': self.build_announcement()})
             
         except Exception as e:
-            return aiohttp.web.json_response(
+            return web.json_response(
                 {'success': False, 'error': str(e)}, 
                 status=400
             )
@@ -329,18 +921,28 @@ class DistributedAgentManager:
             heartbeat = await request.json()
             node_id = heartbeat.get('node_id')
             
-            if node_id in self.nodes:
-                self.nodes[node_id]['last_seen'] = datetime.now().isoformat()
-                self.nodes[node_id]['status'] = 'active'
+            if node_id in self.nodes or heartbeat.get('communication_port'):
+                self.update_node(heartbeat, request.remote)
             
-            return aiohttp.web.json_response({'success': True})
+            return web.json_response({'success': True, 'node': self.build_announcement()})
             
         except Exception as e:
-            return aiohttp.web.json_response(
+            return web.json_response(
                 {'success': False, 'error': str(e)}, 
                 status=400
             )
     
+    async def handle_departure(self, request):
+        """Handle a node leaving the cluster"""
+        try:
+            message = await request.json()
+        except Exception as e:
+            return web.json_response({'success': False, 'error': str(e)}, status=400)
+        node_id = message.get('node_id')
+        if node_id and node_id != self.node_id:
+            await self.handle_node_failure(node_id, LEFT)
+        return web.json_response({'success': True})
+    
     async def handle_agents_request(self, request):
         """Handle request for available agents"""
         agents_info = {}
@@ -352,58 +954,48 @@ class DistributedAgentManager:
         for node_id, node_info in self.nodes.items():
             agents_info[node_id] = node_info.get('agents', [])
         
-        return aiohttp.web.json_response(agents_info)
+        return web.json_response(agents_info)
     
     async def monitor_cluster_health(self):
         """Monitor cluster health and handle node failures"""
+        # Gossip detects failures of its members within seconds; this sweep covers nodes
+        # that only ever talked to us over HTTP
         while True:
             try:
                 current_time = datetime.now()
                 failed_nodes = []
                 
                 for node_id, node_info in self.nodes.items():
+                    if node_id in self.membership.members:
+                        continue
                     last_seen = datetime.fromisoformat(node_info.get('last_seen', ''))
                     
-                    if (current_time - last_seen).seconds > 120:  # 2 minutes timeout
+                    if (current_time - last_seen).total_seconds() > self.node_timeout:
                         failed_nodes.append(node_id)
                         self.logger.warning(f"Node {node_id} appears to be offline")
                 
-                # Remove failed nodes
+                # Remove failed nodes and redistribute their tasks
                 for node_id in failed_nodes:
-                    del self.nodes[node_id]
-                    
-                    # Redistribute tasks if necessary
-                    if node_id in self.task_distribution:
-                        await self.redistribute_tasks(node_id)
+                    await self.handle_node_failure(node_id)
                 
-                # Re-elect coordinator if needed
-                if self.coordinator_node in failed_nodes:
-                    await self.elect_coordinator()
-                
-                await asyncio.sleep(60)  # Check every minute
+                await asyncio.sleep(self.health_check_interval)
                 
             except Exception as e:
                 self.logger.error(f"Cluster health monitoring error: {e}")
-                await asyncio.sleep(60)
+                await asyncio.sleep(self.health_check_interval)
     
     async def redistribute_tasks(self, failed_node: str):
         """Redistribute tasks from failed node"""
-        if failed_node not in self.task_distribution:
-            return
-        
-        failed_tasks = self.task_distribution[failed_node]
-        del self.task_distribution[failed_node]
+        failed_tasks = self.task_distribution.pop(failed_node, [])
         
-        # Redistribute to other nodes
-        for task in failed_tasks:
-            optimal_node = await self.select_optimal_node(task)
-            
-            if optimal_node not in self.task_distribution:
-                self.task_distribution[optimal_node] = []
-            
-            self.task_distribution[optimal_node].append(task)
+        # Cancelling the attempts makes execute_distributed_task retry them on the next ranked node
+        # now, instead of when the connection to the dead node times out
+        attempts = self._node_attempts.pop(failed_node, set())
+        for attempt in attempts:
+            attempt.cancel()
         
-        self.logger.info(f"Redistributed {len(failed_tasks)} tasks from failed node {failed_node}")
+        if failed_tasks:
+            self.logger.info(f"Redistributed {len(failed_tasks)} tasks from failed node {failed_node}")
     
     def get_cluster_status(self) -> Dict:
         """Get cluster status"""
@@ -414,11 +1006,15 @@ class DistributedAgentManager:
             'cluster_name': self.cluster_name,
             'total_nodes': len(self.nodes) + 1,  # +1 for self
             'local_agents': list(self.local_agents),
+            'load': self.get_load_report(),
+            'rpc': dict(self.rpc_stats),
+            'membership': self.membership.get_stats(),
             'nodes': {
                 node_id: {
                     'agents': node_info.get('agents', []),
                     'status': node_info.get('status', 'unknown'),
-                    'last_seen': node_info.get('last_seen')
+                    'last_seen': node_info.get('last_seen'),
+                    'load': node_info.get('load', {})
                 }
                 for node_id, node_info in self.nodes.items()
             }
@@ -429,10 +1025,22 @@ class DistributedAgentManager:
         self.logger.info("🛑 Stopping Distributed Agent Manager...")
         
         # Notify other nodes of departure
+        await self.membership.stop(leave=True)
         await self.broadcast_departure()
         
         # Stop services
-        # (Server cleanup would be handled by the framework)
+        for task in self._background_tasks:
+            task.cancel()
+        self._background_tasks.clear()
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        for session in self._peer_sessions.values():
+            if not session.closed:
+                await session.close()
+        self._peer_sessions.clear()
     
     async def shutdown(self):
         """Shutdown distributed agent manager"""
@@ -453,8 +1061,9 @@ class DistributedAgentManager:
             try:
                 url = f"http://{node_info['address']}:{node_info['communication_port']}/api/departure"
                 
-                async with aiohttp.ClientSession() as session:
-                    await session.post(url, json=departure_message)
+                session = await self._get_session()
+                async with session.post(url, json=departure_message):
+                    pass
                     
             except Exception as e:
                 self.logger.debug(f"Failed to notify node {node_id} of departure: {e}")
\ No newline at end of file
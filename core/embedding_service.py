@@ -0,0 +1,257 @@
+"""
+Embedding Service
+
+Batched, cached text embedding for the Advanced Memory Manager. Concurrent
+requests are coalesced into micro-batches and encoded in a worker thread so
+the event loop stays free. Results are cached by content hash in an
+in-memory LRU and an on-disk SQLite store, so repeated texts are never
+re-embedded.
+"""
+
+import time
+import array
+import sqlite3
+import hashlib
+import logging
+import asyncio
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional, Tuple
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def fallback_embedding(text: str, dim: int = 384) -> List[float]:
+    """Deterministic placeholder embedding used when no model is installed"""
+    hash_value = hashlib.md5(text.encode()).digest()
+    # Convert to a list of float values between -1 and 1
+    return [(b / 128.0) - 1.0 for b in hash_value] + [0.0] * (dim - len(hash_value))
+
+
+class EmbeddingService:
+    """Micro-batching embedding pipeline with LRU and disk caches"""
+
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2", cache_path: Optional[Path] = None,
+                 dim: int = 384, max_batch_size: int = 32, max_wait_ms: float = 5.0,
+                 lru_size: int = 4096):
+        self.model_name = model_name
+        self.cache_path = Path(cache_path) if cache_path else None
+        self.dim = dim
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.lru_size = lru_size
+
+        self.model = None
+        self.model_available: Optional[bool] = None
+        self._lru: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._batcher_task: Optional[asyncio.Task] = None
+        # A single worker keeps the encoder and SQLite connection on one thread
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embedding")
+        self._db: Optional[sqlite3.Connection] = None
+
+        self.metrics = {
+            "requests": 0,
+            "lru_hits": 0,
+            "disk_hits": 0,
+            "coalesced": 0,
+            "encoded": 0,
+            "batches": 0,
+            "max_batch_size": 0,
+            "queued": 0,
+            "total_queue_wait_s": 0.0,
+            "max_queue_wait_s": 0.0,
+        }
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    async def embed(self, text: str) -> List[float]:
+        """Embed a single text, batching it with other concurrent requests"""
+        self.metrics["requests"] += 1
+        key = content_hash(text)
+
+        cached = self._lru.get(key)
+        if cached is not None:
+            self._lru.move_to_end(key)
+            self.metrics["lru_hits"] += 1
+            return cached
+
+        # Identical texts already queued share one encode
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.metrics["coalesced"] += 1
+            return await asyncio.shield(pending)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._inflight[key] = future
+        self._ensure_batcher()
+        await self._queue.put((key, text, future, time.monotonic()))
+        return await asyncio.shield(future)
+
+    async def embed_many(self, texts: List[str]) -> List[List[float]]:
+        return await asyncio.gather(*(self.embed(text) for text in texts))
+
+    async def close(self) -> None:
+        if self._batcher_task and not self._batcher_task.done():
+            self._batcher_task.cancel()
+            try:
+                await self._batcher_task
+            except asyncio.CancelledError:
+                pass
+        for future in self._inflight.values():
+            if not future.done():
+                future.cancel()
+        self._inflight.clear()
+        self._batcher_task = None
+        self._queue = None
+        if self._db is not None:
+            await asyncio.get_running_loop().run_in_executor(self._executor, self._db.close)
+            self._db = None
+
+    def get_metrics(self) -> Dict[str, Any]:
+        metrics = dict(self.metrics)
+        requests = metrics["requests"] or 1
+        batches = metrics["batches"] or 1
+        hits = metrics["lru_hits"] + metrics["disk_hits"] + metrics["coalesced"]
+        metrics["hit_rate"] = hits / requests
+        metrics["avg_batch_size"] = metrics["encoded"] / batches
+        metrics["avg_queue_wait_ms"] = metrics["total_queue_wait_s"] * 1000 / (metrics["queued"] or 1)
+        metrics["max_queue_wait_ms"] = metrics.pop("max_queue_wait_s") * 1000
+        metrics.pop("total_queue_wait_s")
+        metrics["lru_entries"] = len(self._lru)
+        metrics["queue_depth"] = self._queue.qsize() if self._queue else 0
+        metrics["model_available"] = self.model_available
+        return metrics
+
+    # ------------------------------------------------------------------
+    # Batching
+    # ------------------------------------------------------------------
+
+    def _ensure_batcher(self) -> None:
+        if (self._batcher_task is None or self._batcher_task.done()
+                or self._batcher_task.get_loop() is not asyncio.get_running_loop()):
+            self._queue = asyncio.Queue()
+            self._batcher_task = asyncio.create_task(self._run_batcher())
+
+    async def _run_batcher(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            now = time.monotonic()
+            waits = [now - enqueued for _, _, _, enqueued in batch]
+            self.metrics["queued"] += len(waits)
+            self.metrics["total_queue_wait_s"] += sum(waits)
+            self.metrics["max_queue_wait_s"] = max(self.metrics["max_queue_wait_s"], max(waits))
+
+            items = [(key, text) for key, text, _, _ in batch]
+            try:
+                vectors, disk_hits = await loop.run_in_executor(self._executor, self._process_batch, items)
+                self.metrics["disk_hits"] += disk_hits
+                for (key, _, future, _), vector in zip(batch, vectors):
+                    self._remember(key, vector)
+                    if not future.done():
+                        future.set_result(vector)
+            except Exception as e:
+                logger.error(f"Error embedding batch: {e}")
+                for _, _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            finally:
+                for key, _, _, _ in batch:
+                    self._inflight.pop(key, None)
+
+    def _remember(self, key: str, vector: List[float]) -> None:
+        self._lru[key] = vector
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    # ------------------------------------------------------------------
+    # Worker thread
+    # ------------------------------------------------------------------
+
+    def _process_batch(self, items: List[Tuple[str, str]]) -> Tuple[List[List[float]], int]:
+        """Resolve a batch from the disk cache and encode the misses"""
+        cached = self._disk_get([key for key, _ in items])
+        missing = [(key, text) for key, text in items if key not in cached]
+
+        if missing:
+            encoded = self._encode([text for _, text in missing])
+            new_entries = dict(zip((key for key, _ in missing), encoded))
+            self._disk_put(new_entries)
+            cached.update(new_entries)
+            self.metrics["encoded"] += len(missing)
+            self.metrics["batches"] += 1
+            self.metrics["max_batch_size"] = max(self.metrics["max_batch_size"], len(missing))
+
+        return [cached[key] for key, _ in items], len(items) - len(missing)
+
+    def _encode(self, texts: List[str]) -> List[List[float]]:
+        if self.model_available is None:
+            try:
+                from sentence_transformers import SentenceTransformer
+                self.model = SentenceTransformer(self.model_name)
+                self.model_available = True
+            except ImportError:
+                logger.warning("sentence-transformers not available, using fallback embeddings")
+                self.model_available = False
+
+        if not self.model_available:
+            return [fallback_embedding(text, self.dim) for text in texts]
+
+        return [vector.tolist() for vector in self.model.encode(texts)]
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        if self.cache_path is None:
+            return None
+        if self._db is None:
+            self._db = sqlite3.connect(str(self.cache_path), check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings "
+                "(hash TEXT, model TEXT, vector BLOB, PRIMARY KEY (hash, model))"
+            )
+        return self._db
+
+    def _disk_get(self, keys: List[str]) -> Dict[str, List[float]]:
+        db = self._connect()
+        if db is None or not keys:
+            return {}
+
+        placeholders = ",".join("?" * len(keys))
+        rows = db.execute(
+            f"SELECT hash, vector FROM embeddings WHERE model = ? AND hash IN ({placeholders})",
+            [self.model_name, *keys]
+        ).fetchall()
+        return {key: array.array("f", blob).tolist() for key, blob in rows}
+
+    def _disk_put(self, entries: Dict[str, List[float]]) -> None:
+        db = self._connect()
+        # Placeholder vectors would poison the cache once a real model is installed
+        if db is None or not entries or not self.model_available:
+            return
+
+        db.executemany(
+            "INSERT OR REPLACE INTO embeddings (hash, model, vector) VALUES (?, ?, ?)",
+            [(key, self.model_name, array.array("f", vector).tobytes()) for key, vector in entries.items()]
+        )
+        db.commit()
@@ -103,7 +103,9 @@ class EnhancedSystemManager:
         self.agent_manager = EnhancedAgentManager(self.config)
         self.memory_manager = AdvancedMemoryManager()
         self.plugin_manager = PluginManager()
-        self.distributed_manager = DistributedAgentManager(self.config)
+        # Remote nodes run tasks on this node's agents and see its warm models
+        self.distributed_manager = DistributedAgentManager(self.config, vram_manager=self.agent_manager.vram_manager,
+                                                           agent_manager=self.agent_manager)
         self.editor_manager = EditorSelectionManager(self.config, self.void_integration)
 
         await self.llm_manager.initialize()
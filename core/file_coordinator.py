@@ -5,23 +5,17 @@ queuing, and collaborative coordination.
 """
 
 import os
-import time
-import threading
-import json
 from pathlib import Path
-from typing import Dict, Set, Optional, Any, List
-from contextlib import contextmanager
+from typing import Dict, Optional, Any
+from contextlib import contextmanager, asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from datetime import datetime, timedelta
+from datetime import datetime
+import time
 import asyncio
 import logging
 
-# Windows-compatible file locking (fcntl not available on Windows)
-try:
-    import fcntl
-    HAS_FCNTL = True
-except ImportError:
-    HAS_FCNTL = False
+from core.lease_manager import LeaseManager
 
 @dataclass
 class FileOperation:
@@ -37,154 +31,86 @@ class FileOperation:
         if self.timestamp is None:
             self.timestamp = datetime.now()
 
+class WriteBatch:
+    """
+    Collects writes from one agent and commits them under a single set of locks.
+    
+    Usage:
+        async with coordinator.batch(agent_id) as batch:
+            batch.write("docs/plan.md", plan)
+            batch.write("docs/plan.json", data)
+        batch.results  # {file_path: success}
+    """
+    
+    def __init__(self, coordinator: "FileCoordinator", agent_id: str, priority: int = 1,
+                 encoding: str = "utf-8", timeout: Optional[float] = None):
+        self.coordinator = coordinator
+        self.agent_id = agent_id
+        self.priority = priority
+        self.encoding = encoding
+        self.timeout = timeout
+        self.writes: Dict[str, str] = {}
+        self.results: Dict[str, bool] = {}
+    
+    def write(self, file_path: str, content: str):
+        """Stage a write; a later write to the same path replaces it"""
+        self.writes[str(file_path)] = content
+    
+    async def commit(self) -> Dict[str, bool]:
+        """Lock every staged path, write them in one worker job, then unlock"""
+        writes, self.writes = self.writes, {}
+        if writes:
+            self.results.update(await self.coordinator._commit_writes(
+                writes, self.agent_id, self.encoding, self.priority, self.timeout
+            ))
+        return self.results
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            await self.commit()
+        return False
+
 class FileCoordinator:
     """
     Advanced file coordination system that prevents conflicts between agents.
     Features:
-    - File locking with timeouts
+    - In-memory read/write leases with timeouts
     - Operation queuing and prioritization
     - Conflict detection and resolution
     - Collaborative editing support
     - Deadlock prevention
+    - Optional fcntl locking across processes
     """
     
-    def __init__(self, workspace_root: str):
+    def __init__(self, workspace_root: str, cross_process: bool = False):
         self.workspace_root = Path(workspace_root)
-        self.locks: Dict[str, threading.Lock] = {}
-        self.active_operations: Dict[str, FileOperation] = {}
-        self.operation_queue: List[FileOperation] = []
-        self.file_versions: Dict[str, int] = {}
-        self.coordination_lock = threading.Lock()
+        self.file_versions: Dict[str, int] = {}  # Keyed by _lock_key
         self.max_lock_timeout = 30  # seconds
-        self.queue_check_interval = 0.1  # seconds
         
-        # Create coordination directory
+        # Coordination directory only holds flock files in cross-process mode
         self.coordination_dir = self.workspace_root / ".file_coordination"
-        self.coordination_dir.mkdir(exist_ok=True)
+        self.leases = LeaseManager(
+            lease_timeout=self.max_lock_timeout * 2,
+            cross_process=cross_process,
+            lock_dir=self.coordination_dir
+        )
+        
+        # File I/O for the async API runs off the event loop
+        self._io_executor: Optional[ThreadPoolExecutor] = None
         
         # Setup logging
         self.logger = logging.getLogger("FileCoordinator")
     
-    def _get_lock_file(self, file_path: str) -> Path:
-        """Get the lock file path for a given file"""
-        normalized_path = str(Path(file_path)).replace(os.sep, "_").replace(":", "")
-        return self.coordination_dir / f"{normalized_path}.lock"
-    
-    def _get_queue_file(self, file_path: str) -> Path:
-        """Get the queue file path for a given file"""
-        normalized_path = str(Path(file_path)).replace(os.sep, "_").replace(":", "")
-        return self.coordination_dir / f"{normalized_path}.queue"
+    def _lock_key(self, file_path: str) -> str:
+        """Canonical path used to key locks"""
+        return str(Path(file_path).resolve())
     
     def _is_file_locked(self, file_path: str) -> bool:
         """Check if a file is currently locked"""
-        lock_file = self._get_lock_file(file_path)
-        if not lock_file.exists():
-            return False
-        
-        try:
-            # Check if lock is stale (older than max timeout)
-            lock_time = datetime.fromtimestamp(lock_file.stat().st_mtime)
-            if datetime.now() - lock_time > timedelta(seconds=self.max_lock_timeout * 2):
-                lock_file.unlink()  # Remove stale lock
-                return False
-            return True
-        except:
-            return False
-    
-    def _create_lock(self, file_path: str, agent_id: str) -> bool:
-        """Create a lock for a file"""
-        lock_file = self._get_lock_file(file_path)
-        try:
-            if lock_file.exists():
-                return False
-            
-            lock_data = {
-                "agent_id": agent_id,
-                "timestamp": datetime.now().isoformat(),
-                "file_path": file_path
-            }
-            
-            with open(lock_file, 'w') as f:
-                json.dump(lock_data, f)
-            
-            return True
-        except:
-            return False
-    
-    def _remove_lock(self, file_path: str, agent_id: str) -> bool:
-        """Remove a lock for a file"""
-        lock_file = self._get_lock_file(file_path)
-        try:
-            if not lock_file.exists():
-                return True
-            
-            # Verify ownership
-            with open(lock_file, 'r') as f:
-                lock_data = json.load(f)
-            
-            if lock_data.get("agent_id") == agent_id:
-                lock_file.unlink()
-                return True
-            
-            return False
-        except:
-            return False
-    
-    def _add_to_queue(self, operation: FileOperation):
-        """Add an operation to the queue"""
-        queue_file = self._get_queue_file(operation.file_path)
-        
-        try:
-            # Load existing queue
-            queue_data = []
-            if queue_file.exists():
-                with open(queue_file, 'r') as f:
-                    queue_data = json.load(f)
-              # Add new operation
-            op_data = {
-                "agent_id": operation.agent_id,
-                "operation_type": operation.operation_type,
-                "priority": operation.priority,
-                "timestamp": operation.timestamp.isoformat() if operation.timestamp else datetime.now().isoformat(),
-                "content": operation.content
-            }
-            queue_data.append(op_data)
-            
-            # Sort by priority and timestamp
-            queue_data.sort(key=lambda x: (-x["priority"], x["timestamp"]))
-            
-            # Save queue
-            with open(queue_file, 'w') as f:
-                json.dump(queue_data, f, indent=2)
-                
-        except Exception as e:
-            self.logger.error(f"Failed to add to queue: {e}")
-    
-    def _get_next_operation(self, file_path: str) -> Optional[Dict]:
-        """Get the next operation from the queue"""
-        queue_file = self._get_queue_file(file_path)
-        
-        try:
-            if not queue_file.exists():
-                return None
-            
-            with open(queue_file, 'r') as f:
-                queue_data = json.load(f)
-            
-            if not queue_data:
-                return None
-              # Get highest priority operation
-            next_op = queue_data.pop(0)
-            
-            # Update queue file
-            with open(queue_file, 'w') as f:
-                json.dump(queue_data, f, indent=2)
-            
-            return next_op
-            
-        except Exception as e:
-            self.logger.error(f"Failed to get next operation: {e}")
-            return None
+        return self.leases.is_locked(file_path)
     
     @contextmanager
     def acquire_file_lock(self, file_path: str, agent_id: str, operation_type: str = "write", 
@@ -195,57 +121,24 @@ class FileCoordinator:
         Args:
             file_path: Path to the file to lock
             agent_id: ID of the agent requesting the lock
-            operation_type: Type of operation (read, write, create, delete)
+            operation_type: Type of operation (read, write, create, delete);
+                reads share the lock with other reads
             timeout: Maximum time to wait for lock (default: max_lock_timeout)
             priority: Priority of the operation (higher = more important)
         """
         if timeout is None:
             timeout = self.max_lock_timeout
         
-        file_path = str(Path(file_path).resolve())
-        lock_acquired = False
-        start_time = time.time()
+        file_path = self._lock_key(file_path)
+        shared = operation_type == "read"
         
+        lease = self.leases.acquire(file_path, agent_id, shared=shared, priority=priority, timeout=timeout)
+        self.logger.debug(f"Agent {agent_id} acquired {operation_type} lock for {file_path}")
         try:
-            # Try to acquire lock immediately
-            if not self._is_file_locked(file_path):
-                if self._create_lock(file_path, agent_id):
-                    lock_acquired = True
-                    self.logger.info(f"Agent {agent_id} acquired lock for {file_path}")
-                    yield
-                    return
-            
-            # If immediate lock failed, add to queue and wait
-            operation = FileOperation(
-                agent_id=agent_id,
-                file_path=file_path,
-                operation_type=operation_type,
-                priority=priority
-            )
-            
-            self._add_to_queue(operation)
-            self.logger.info(f"Agent {agent_id} queued for {file_path} (priority: {priority})")
-            
-            # Wait for our turn
-            while time.time() - start_time < timeout:
-                if not self._is_file_locked(file_path):
-                    next_op = self._get_next_operation(file_path)
-                    if next_op and next_op["agent_id"] == agent_id:
-                        if self._create_lock(file_path, agent_id):
-                            lock_acquired = True
-                            self.logger.info(f"Agent {agent_id} acquired queued lock for {file_path}")
-                            yield
-                            return
-                
-                time.sleep(self.queue_check_interval)
-            
-            # Timeout reached
-            raise TimeoutError(f"Could not acquire lock for {file_path} within {timeout} seconds")
-            
+            yield
         finally:
-            if lock_acquired:
-                self._remove_lock(file_path, agent_id)
-                self.logger.info(f"Agent {agent_id} released lock for {file_path}")
+            self.leases.release(lease)
+            self.logger.debug(f"Agent {agent_id} released lock for {file_path}")
     
     def safe_write_file(self, file_path: str, content: str, agent_id: str, 
                        encoding: str = "utf-8", priority: int = 1) -> bool:
@@ -268,13 +161,14 @@ class FileCoordinator:
             
             with self.acquire_file_lock(str(full_path), agent_id, "write", priority=priority):
                 # Check if file changed while waiting
-                current_version = self.file_versions.get(str(full_path), 0)
+                version_key = self._lock_key(str(full_path))
+                current_version = self.file_versions.get(version_key, 0)
                 
                 with open(full_path, 'w', encoding=encoding) as f:
                     f.write(content)
                 
                 # Update version
-                self.file_versions[str(full_path)] = current_version + 1
+                self.file_versions[version_key] = current_version + 1
                 
                 self.logger.info(f"Agent {agent_id} successfully wrote to {file_path}")
                 return True
@@ -301,13 +195,10 @@ class FileCoordinator:
             if not full_path.exists():
                 return None
             
-            # Reads don't need exclusive locks but should respect write locks
-            if self._is_file_locked(str(full_path)):
-                # Wait briefly for write to complete
-                time.sleep(0.1)
-            
-            with open(full_path, 'r', encoding=encoding) as f:
-                content = f.read()
+            # Reads share the lock with other reads but wait for writers
+            with self.acquire_file_lock(str(full_path), agent_id, "read"):
+                with open(full_path, 'r', encoding=encoding) as f:
+                    content = f.read()
             
             self.logger.debug(f"Agent {agent_id} read from {file_path}")
             return content
@@ -316,6 +207,120 @@ class FileCoordinator:
             self.logger.error(f"Failed to read file {file_path}: {e}")
             return None
     
+    # ------------------------------------------------------------------
+    # Async API
+    # ------------------------------------------------------------------
+    
+    async def _run_io(self, func, *args):
+        if self._io_executor is None:
+            self._io_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="file-io")
+        return await asyncio.get_running_loop().run_in_executor(self._io_executor, func, *args)
+    
+    @asynccontextmanager
+    async def lock(self, file_path: str, agent_id: str = "anonymous", operation_type: str = "write",
+                   timeout: Optional[float] = None, priority: int = 1):
+        """
+        Async context manager for file locks; waiting never blocks the event loop
+        
+        Args:
+            file_path: Path to the file to lock
+            agent_id: ID of the agent requesting the lock
+            operation_type: Type of operation (read, write, create, delete);
+                reads share the lock with other reads
+            timeout: Maximum time to wait for lock (default: max_lock_timeout)
+            priority: Priority of the operation (higher = more important)
+        """
+        if timeout is None:
+            timeout = self.max_lock_timeout
+        
+        file_path = self._lock_key(file_path)
+        lease = await self.leases.acquire_async(
+            file_path, agent_id, shared=operation_type == "read", priority=priority, timeout=timeout
+        )
+        self.logger.debug(f"Agent {agent_id} acquired {operation_type} lock for {file_path}")
+        try:
+            yield
+        finally:
+            self.leases.release(lease)
+            self.logger.debug(f"Agent {agent_id} released lock for {file_path}")
+    
+    async def async_write(self, file_path: str, content: str, agent_id: str,
+                          encoding: str = "utf-8", priority: int = 1) -> bool:
+        """Async counterpart of safe_write_file"""
+        results = await self._commit_writes({str(file_path): content}, agent_id, encoding, priority)
+        return results[str(file_path)]
+    
+    async def async_read(self, file_path: str, agent_id: str,
+                         encoding: str = "utf-8") -> Optional[str]:
+        """Async counterpart of safe_read_file"""
+        try:
+            full_path = Path(file_path)
+            async with self.lock(str(full_path), agent_id, "read"):
+                content = await self._run_io(self._read_file, full_path, encoding)
+            
+            if content is not None:
+                self.logger.debug(f"Agent {agent_id} read from {file_path}")
+            return content
+            
+        except Exception as e:
+            self.logger.error(f"Failed to read file {file_path}: {e}")
+            return None
+    
+    def batch(self, agent_id: str, priority: int = 1, encoding: str = "utf-8",
+              timeout: Optional[float] = None) -> WriteBatch:
+        """Group several writes from one agent into a single locked commit"""
+        return WriteBatch(self, agent_id, priority, encoding, timeout)
+    
+    async def _commit_writes(self, writes: Dict[str, str], agent_id: str, encoding: str = "utf-8",
+                             priority: int = 1, timeout: Optional[float] = None) -> Dict[str, bool]:
+        """Lock all paths (in sorted order to avoid deadlocks), write, release"""
+        if timeout is None:
+            timeout = self.max_lock_timeout
+        deadline = time.monotonic() + timeout
+        
+        lock_keys = sorted({self._lock_key(file_path) for file_path in writes})
+        leases = []
+        try:
+            for lock_key in lock_keys:
+                leases.append(await self.leases.acquire_async(
+                    lock_key, agent_id, priority=priority, timeout=max(deadline - time.monotonic(), 0)
+                ))
+            
+            results = await self._run_io(self._write_files, writes, encoding)
+            for file_path, written in results.items():
+                if written:
+                    version_key = self._lock_key(file_path)
+                    self.file_versions[version_key] = self.file_versions.get(version_key, 0) + 1
+                    self.logger.info(f"Agent {agent_id} successfully wrote to {file_path}")
+            return results
+            
+        except Exception as e:
+            self.logger.error(f"Failed to write {', '.join(writes)}: {e}")
+            return {file_path: False for file_path in writes}
+        finally:
+            for lease in leases:
+                self.leases.release(lease)
+    
+    def _write_files(self, writes: Dict[str, str], encoding: str) -> Dict[str, bool]:
+        results = {}
+        for file_path, content in writes.items():
+            try:
+                full_path = Path(file_path)
+                full_path.parent.mkdir(parents=True, exist_ok=True)
+                with open(full_path, 'w', encoding=encoding) as f:
+                    f.write(content)
+                results[file_path] = True
+            except Exception as e:
+                self.logger.error(f"Failed to write file {file_path}: {e}")
+                results[file_path] = False
+        return results
+    
+    def _read_file(self, full_path: Path, encoding: str) -> Optional[str]:
+        if not full_path.exists():
+            return None
+        with open(full_path, 'r', encoding=encoding) as f:
+            return f.read()
+    
     def check_file_conflicts(self, file_path: str) -> Dict[str, Any]:
         """
         Check for potential conflicts on a file
@@ -323,7 +328,7 @@ class FileCoordinator:
         Returns:
             Dictionary with conflict information
         """
-        file_path = str(Path(file_path).resolve())
+        file_path = self._lock_key(file_path)
         
         return {
             "is_locked": self._is_file_locked(file_path),
@@ -334,26 +339,16 @@ class FileCoordinator:
     
     def _get_lock_info(self, file_path: str) -> Optional[Dict]:
         """Get information about the current lock"""
-        lock_file = self._get_lock_file(file_path)
-        try:
-            if lock_file.exists():
-                with open(lock_file, 'r') as f:
-                    return json.load(f)
-        except:
-            pass
-        return None
+        holders = self.leases.holders(file_path)
+        if not holders:
+            return None
+        info = holders[-1].to_dict()
+        info["holders"] = [lease.owner for lease in holders]
+        return info
     
     def _get_queue_length(self, file_path: str) -> int:
         """Get the number of operations queued for a file"""
-        queue_file = self._get_queue_file(file_path)
-        try:
-            if queue_file.exists():
-                with open(queue_file, 'r') as f:
-                    queue_data = json.load(f)
-                return len(queue_data)
-        except:
-            pass
-        return 0
+        return self.leases.queue_length(file_path)
     
     def force_unlock(self, file_path: str, admin_agent_id: str = "admin") -> bool:
         """
@@ -367,9 +362,7 @@ class FileCoordinator:
             True if successful
         """
         try:
-            lock_file = self._get_lock_file(file_path)
-            if lock_file.exists():
-                lock_file.unlink()
+            self.leases.force_release(self._lock_key(file_path))
             
             self.logger.warning(f"Admin {admin_agent_id} force-unlocked {file_path}")
             return True
@@ -380,37 +373,28 @@ class FileCoordinator:
     
     def get_coordination_stats(self) -> Dict[str, Any]:
         """Get statistics about file coordination"""
-        lock_files = list(self.coordination_dir.glob("*.lock"))
-        queue_files = list(self.coordination_dir.glob("*.queue"))
-        
-        total_queued = 0
-        for queue_file in queue_files:
-            try:
-                with open(queue_file, 'r') as f:
-                    queue_data = json.load(f)
-                total_queued += len(queue_data)
-            except:
-                pass
+        lease_stats = self.leases.get_stats()
         
         return {
-            "active_locks": len(lock_files),
-            "total_queued_operations": total_queued,
+            "active_locks": lease_stats["active_leases"],
+            "total_queued_operations": lease_stats["queued"],
             "tracked_files": len(self.file_versions),
-            "coordination_dir": str(self.coordination_dir)
+            "coordination_dir": str(self.coordination_dir),
+            "lease_stats": lease_stats
         }
 
 
 # Global coordinator instance
 _coordinator = None
 
-def get_file_coordinator(workspace_root: Optional[str] = None) -> FileCoordinator:
+def get_file_coordinator(workspace_root: Optional[str] = None, cross_process: bool = False) -> FileCoordinator:
     """Get the global file coordinator instance"""
     global _coordinator
     
     if _coordinator is None:
         if workspace_root is None:
             workspace_root = os.getcwd()
-        _coordinator = FileCoordinator(workspace_root)
+        _coordinator = FileCoordinator(workspace_root, cross_process=cross_process)
     
     return _coordinator
 
@@ -430,3 +414,18 @@ def file_lock(file_path: str, agent_id: str, **kwargs):
     coordinator = get_file_coordinator()
     with coordinator.acquire_file_lock(file_path, agent_id, **kwargs):
         yield
+
+async def async_write_file(file_path: str, content: str, agent_id: str, **kwargs) -> bool:
+    """Convenience function for async file writing"""
+    coordinator = get_file_coordinator()
+    return await coordinator.async_write(file_path, content, agent_id, **kwargs)
+
+async def async_read_file(file_path: str, agent_id: str, **kwargs) -> Optional[str]:
+    """Convenience function for async file reading"""
+    coordinator = get_file_coordinator()
+    return await coordinator.async_read(file_path, agent_id, **kwargs)
+
+def write_batch(agent_id: str, **kwargs) -> WriteBatch:
+    """Convenience function for batching an agent's writes into one locked commit"""
+    coordinator = get_file_coordinator()
+    return coordinator.batch(agent_id, **kwargs)
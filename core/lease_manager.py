@@ -0,0 +1,459 @@
+"""
+Lease Manager
+
+In-memory read/write leases used by the FileCoordinator. Each path has a
+holder table and a priority heap of waiters; releases hand the lease
+directly to the next waiter(s) and wake them, so nobody polls and nothing
+touches the disk. Threads wait on an event and coroutines on a future, and
+both kinds of waiter share the same queues.
+
+With ``cross_process=True`` a granted lease is additionally backed by an
+``fcntl.flock`` on a per-path lock file so separate processes exclude each
+other too.
+"""
+
+import os
+import time
+import heapq
+import asyncio
+import logging
+import itertools
+import threading
+from contextlib import contextmanager, asynccontextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+# Windows-compatible file locking (fcntl not available on Windows)
+try:
+    import fcntl
+    HAS_FCNTL = True
+except ImportError:
+    HAS_FCNTL = False
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Lease:
+    """A granted lease on a path"""
+    path: str
+    owner: str
+    shared: bool
+    token: int
+    acquired_at: float
+    expires_at: float
+    lock_fd: Optional[int] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "agent_id": self.owner,
+            "file_path": self.path,
+            "mode": "shared" if self.shared else "exclusive",
+            "held_for": time.monotonic() - self.acquired_at,
+        }
+
+
+@dataclass(order=True)
+class _Waiter:
+    sort_key: tuple
+    owner: str = field(compare=False)
+    shared: bool = field(compare=False)
+    token: int = field(compare=False)
+    wake: Optional[Callable[[], None]] = field(default=None, compare=False)
+    lease: Optional[Lease] = field(default=None, compare=False)
+    cancelled: bool = field(default=False, compare=False)
+
+
+class _PathState:
+    __slots__ = ("exclusive", "shared", "queue", "waiting")
+
+    def __init__(self):
+        self.exclusive: Optional[Lease] = None
+        self.shared: Dict[int, Lease] = {}
+        self.queue: List[_Waiter] = []
+        self.waiting = 0
+
+    def idle(self) -> bool:
+        return self.exclusive is None and not self.shared and not self.waiting
+
+
+class LeaseManager:
+    """Fair, priority-ordered read/write leases with thread and asyncio waits.
+
+    Higher ``priority`` values are served first and equal priorities are
+    served in arrival order. New requests never overtake queued waiters.
+    Leases that outlive ``lease_timeout`` are reclaimed for the next waiter.
+    """
+
+    def __init__(self, lease_timeout: float = 60.0, cross_process: bool = False,
+                 lock_dir: Optional[Path] = None):
+        self.lease_timeout = lease_timeout
+        self.cross_process = cross_process and HAS_FCNTL
+        if cross_process and not HAS_FCNTL:
+            logger.warning("fcntl not available, leases are process-local only")
+        self.lock_dir = Path(lock_dir) if lock_dir else None
+        if self.cross_process:
+            if self.lock_dir is None:
+                raise ValueError("lock_dir is required for cross-process leases")
+            self.lock_dir.mkdir(parents=True, exist_ok=True)
+
+        self._mutex = threading.Lock()
+        self._paths: Dict[str, _PathState] = {}
+        # Reclaimed leases whose file locks still have to be dropped outside the mutex
+        self._expired: List[Lease] = []
+        self._tokens = itertools.count(1)
+        self.stats = {
+            "acquired": 0,
+            "immediate": 0,
+            "waited": 0,
+            "timeouts": 0,
+            "expired": 0,
+            "total_wait_s": 0.0,
+            "max_wait_s": 0.0,
+        }
+
+    # ------------------------------------------------------------------
+    # Grant logic (called with the mutex held)
+    # ------------------------------------------------------------------
+
+    def _new_lease(self, path: str, owner: str, shared: bool, token: int) -> Lease:
+        now = time.monotonic()
+        return Lease(path, owner, shared, token, now, now + self.lease_timeout)
+
+    def _install(self, state: _PathState, lease: Lease) -> None:
+        if lease.shared:
+            state.shared[lease.token] = lease
+        else:
+            state.exclusive = lease
+
+    def _grant_waiters(self, state: _PathState, path: str) -> None:
+        """Hand the lease to queued waiters in priority order"""
+        queue = state.queue
+        while queue:
+            waiter = queue[0]
+            if waiter.cancelled:
+                heapq.heappop(queue)
+                continue
+            if state.exclusive is not None or (not waiter.shared and state.shared):
+                break
+
+            heapq.heappop(queue)
+            state.waiting -= 1
+            waiter.lease = self._new_lease(path, waiter.owner, waiter.shared, waiter.token)
+            self._install(state, waiter.lease)
+            if waiter.wake is not None:
+                waiter.wake()
+            if not waiter.shared:
+                break
+
+    def _reap_expired(self, state: _PathState, path: str) -> None:
+        now = time.monotonic()
+        expired = [lease for lease in state.shared.values() if lease.expires_at <= now]
+        if state.exclusive is not None and state.exclusive.expires_at <= now:
+            expired.append(state.exclusive)
+        for lease in expired:
+            logger.warning(f"Lease on {path} held by {lease.owner} expired, reclaiming")
+            self.stats["expired"] += 1
+            self._drop(state, lease)
+            self._expired.append(lease)
+        if expired:
+            self._grant_waiters(state, path)
+
+    def _drop(self, state: _PathState, lease: Lease) -> bool:
+        if lease.shared:
+            return state.shared.pop(lease.token, None) is not None
+        if state.exclusive is not None and state.exclusive.token == lease.token:
+            state.exclusive = None
+            return True
+        return False
+
+    def _next_expiry(self, state: _PathState) -> float:
+        expiries = [lease.expires_at for lease in state.shared.values()]
+        if state.exclusive is not None:
+            expiries.append(state.exclusive.expires_at)
+        return min(expiries) if expiries else float("inf")
+
+    def _try_acquire(self, path: str, owner: str, shared: bool, priority: int,
+                     wake: Optional[Callable[[], None]]):
+        """Grant immediately or enqueue; returns ``(lease, waiter)``"""
+        state = self._paths.get(path)
+        if state is None:
+            state = self._paths[path] = _PathState()
+        self._reap_expired(state, path)
+
+        token = next(self._tokens)
+        compatible = state.exclusive is None and (shared or not state.shared)
+        if compatible and not state.waiting:
+            lease = self._new_lease(path, owner, shared, token)
+            self._install(state, lease)
+            return lease, None
+
+        waiter = _Waiter((-priority, token), owner, shared, token, wake)
+        heapq.heappush(state.queue, waiter)
+        state.waiting += 1
+        return None, waiter
+
+    def _cancel(self, path: str, waiter: _Waiter) -> Optional[Lease]:
+        """Withdraw a waiter; returns its lease if it was granted meanwhile"""
+        if waiter.lease is not None:
+            return waiter.lease
+        waiter.cancelled = True
+        state = self._paths.get(path)
+        if state is not None:
+            state.waiting -= 1
+            # A cancelled head may have been blocking compatible waiters behind it
+            self._grant_waiters(state, path)
+            self._forget_if_idle(path, state)
+        return None
+
+    def _forget_if_idle(self, path: str, state: _PathState) -> None:
+        if state.idle():
+            state.queue.clear()
+            self._paths.pop(path, None)
+
+    def _record_wait(self, started: float, waited: bool) -> None:
+        wait = time.monotonic() - started
+        self.stats["acquired"] += 1
+        self.stats["waited" if waited else "immediate"] += 1
+        self.stats["total_wait_s"] += wait
+        self.stats["max_wait_s"] = max(self.stats["max_wait_s"], wait)
+
+    # ------------------------------------------------------------------
+    # Thread API
+    # ------------------------------------------------------------------
+
+    def acquire(self, path: str, owner: str, shared: bool = False, priority: int = 1,
+                timeout: Optional[float] = None) -> Lease:
+        """Block until the lease is granted; raises TimeoutError"""
+        started = time.monotonic()
+        deadline = started + timeout if timeout is not None else float("inf")
+        event = threading.Event()
+
+        try:
+            with self._mutex:
+                lease, waiter = self._try_acquire(path, owner, shared, priority, event.set)
+
+            while lease is None:
+                with self._mutex:
+                    if waiter.lease is None:
+                        state = self._paths.get(path)
+                        if state is not None:
+                            self._reap_expired(state, path)
+                    if waiter.lease is not None:
+                        lease = waiter.lease
+                        break
+
+                    now = time.monotonic()
+                    if now >= deadline:
+                        self._cancel(path, waiter)
+                        self.stats["timeouts"] += 1
+                        raise TimeoutError(f"Could not acquire lease for {path} within {timeout} seconds")
+                    wait = min(deadline, self._next_expiry(self._paths[path])) - now
+
+                self._unlock_expired()
+                event.wait(max(wait, 0.001))
+                event.clear()
+        finally:
+            self._unlock_expired()
+
+        self._record_wait(started, waiter is not None)
+        if self.cross_process:
+            try:
+                self._lock_file(lease, deadline)
+            except BaseException:
+                self.release(lease)
+                raise
+        return lease
+
+    def release(self, lease: Lease) -> bool:
+        """Release a lease and wake the next waiter(s)"""
+        self._unlock_file(lease)
+        with self._mutex:
+            state = self._paths.get(lease.path)
+            if state is None or not self._drop(state, lease):
+                return False
+            self._grant_waiters(state, lease.path)
+            self._forget_if_idle(lease.path, state)
+            return True
+
+    @contextmanager
+    def lease(self, path: str, owner: str, shared: bool = False, priority: int = 1,
+              timeout: Optional[float] = None):
+        granted = self.acquire(path, owner, shared, priority, timeout)
+        try:
+            yield granted
+        finally:
+            self.release(granted)
+
+    # ------------------------------------------------------------------
+    # Asyncio API
+    # ------------------------------------------------------------------
+
+    async def acquire_async(self, path: str, owner: str, shared: bool = False, priority: int = 1,
+                            timeout: Optional[float] = None) -> Lease:
+        """Await the lease without blocking the event loop; raises TimeoutError"""
+        loop = asyncio.get_running_loop()
+        started = time.monotonic()
+        deadline = started + timeout if timeout is not None else float("inf")
+        wakeup = asyncio.Event()
+
+        def wake():
+            # Grants can come from any thread
+            loop.call_soon_threadsafe(wakeup.set)
+
+        try:
+            with self._mutex:
+                lease, waiter = self._try_acquire(path, owner, shared, priority, wake)
+
+            while lease is None:
+                with self._mutex:
+                    if waiter.lease is None:
+                        state = self._paths.get(path)
+                        if state is not None:
+                            self._reap_expired(state, path)
+                    if waiter.lease is not None:
+                        lease = waiter.lease
+                        break
+
+                    now = time.monotonic()
+                    if now >= deadline:
+                        self._cancel(path, waiter)
+                        self.stats["timeouts"] += 1
+                        raise TimeoutError(f"Could not acquire lease for {path} within {timeout} seconds")
+                    wait = min(deadline, self._next_expiry(self._paths[path])) - now
+
+                self._unlock_expired()
+                try:
+                    await asyncio.wait_for(wakeup.wait(), max(wait, 0.001))
+                except asyncio.TimeoutError:
+                    pass
+                wakeup.clear()
+        except asyncio.CancelledError:
+            with self._mutex:
+                granted = self._cancel(path, waiter)
+            if granted is not None:
+                self.release(granted)
+            raise
+        finally:
+            self._unlock_expired()
+
+        self._record_wait(started, waiter is not None)
+        if self.cross_process:
+            try:
+                await loop.run_in_executor(None, self._lock_file, lease, deadline)
+            except BaseException:
+                self.release(lease)
+                raise
+        return lease
+
+    @asynccontextmanager
+    async def lease_async(self, path: str, owner: str, shared: bool = False, priority: int = 1,
+                          timeout: Optional[float] = None):
+        granted = await self.acquire_async(path, owner, shared, priority, timeout)
+        try:
+            yield granted
+        finally:
+            self.release(granted)
+
+    # ------------------------------------------------------------------
+    # Cross-process locking
+    # ------------------------------------------------------------------
+
+    def _lock_path(self, path: str) -> Path:
+        normalized_path = str(Path(path)).replace(os.sep, "_").replace(":", "")
+        return self.lock_dir / f"{normalized_path}.lock"
+
+    def _lock_file(self, lease: Lease, deadline: float) -> None:
+        """Back an in-process lease with an flock shared with other processes"""
+        fd = os.open(self._lock_path(lease.path), os.O_RDWR | os.O_CREAT, 0o644)
+        mode = (fcntl.LOCK_SH if lease.shared else fcntl.LOCK_EX) | fcntl.LOCK_NB
+        delay = 0.005
+        while True:
+            try:
+                fcntl.flock(fd, mode)
+                lease.lock_fd = fd
+                return
+            except BlockingIOError:
+                if time.monotonic() + delay > deadline:
+                    os.close(fd)
+                    raise TimeoutError(f"{lease.path} is locked by another process")
+                time.sleep(delay)
+                delay = min(delay * 2, 0.1)
+
+    def _unlock_expired(self) -> None:
+        """Drop the file locks of leases reclaimed by _reap_expired"""
+        with self._mutex:
+            expired, self._expired = self._expired, []
+        for lease in expired:
+            self._unlock_file(lease)
+
+    def _unlock_file(self, lease: Lease) -> None:
+        # The holder and the waiter that reclaimed its expired lease may both get here
+        with self._mutex:
+            fd, lease.lock_fd = lease.lock_fd, None
+        if fd is not None:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            finally:
+                os.close(fd)
+
+    # ------------------------------------------------------------------
+    # Introspection
+    # ------------------------------------------------------------------
+
+    def is_locked(self, path: str) -> bool:
+        with self._mutex:
+            state = self._paths.get(path)
+            return state is not None and (state.exclusive is not None or bool(state.shared))
+
+    def is_write_locked(self, path: str) -> bool:
+        with self._mutex:
+            state = self._paths.get(path)
+            return state is not None and state.exclusive is not None
+
+    def holders(self, path: str) -> List[Lease]:
+        with self._mutex:
+            state = self._paths.get(path)
+            if state is None:
+                return []
+            leases = list(state.shared.values())
+            if state.exclusive is not None:
+                leases.append(state.exclusive)
+            return leases
+
+    def queue_length(self, path: str) -> int:
+        with self._mutex:
+            state = self._paths.get(path)
+            return state.waiting if state is not None else 0
+
+    def force_release(self, path: str) -> int:
+        """Drop every lease on a path (emergency use only)"""
+        with self._mutex:
+            state = self._paths.get(path)
+            if state is None:
+                return 0
+            leases = list(state.shared.values())
+            if state.exclusive is not None:
+                leases.append(state.exclusive)
+            for lease in leases:
+                self._drop(state, lease)
+            self._grant_waiters(state, path)
+            self._forget_if_idle(path, state)
+        for lease in leases:
+            self._unlock_file(lease)
+        return len(leases)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._mutex:
+            active = sum(
+                (state.exclusive is not None) + len(state.shared) for state in self._paths.values()
+            )
+            queued = sum(state.waiting for state in self._paths.values())
+        stats = dict(self.stats)
+        stats["avg_wait_ms"] = stats.pop("total_wait_s") * 1000 / (stats["acquired"] or 1)
+        stats["max_wait_ms"] = stats.pop("max_wait_s") * 1000
+        stats["active_leases"] = active
+        stats["queued"] = queued
+        stats["cross_process"] = self.cross_process
+        return stats
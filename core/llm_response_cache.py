@@ -0,0 +1,239 @@
+"""
+LLM Response Cache
+
+Prompt/response cache for agent LLM calls. Responses are keyed by model,
+whitespace-normalized prompt and sampling parameters, expire after a TTL
+and are evicted least-recently-used once the entry or byte budget is
+exceeded. An optional semantic tier matches near-identical prompts by
+embedding similarity within the same model and sampling parameters.
+
+Sampled generations (temperature > 0) are not deterministic, so they bypass
+the cache unless the caller forces it.
+"""
+
+import re
+import json
+import math
+import time
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    np = None
+    HAS_NUMPY = False
+
+logger = logging.getLogger(__name__)
+
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+# Parameters that change what the model generates
+SAMPLING_PARAMS = ("temperature", "top_p", "top_k", "max_tokens", "stop", "seed")
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Collapse whitespace so formatting-only differences share an entry"""
+    return WHITESPACE_PATTERN.sub(" ", prompt).strip()
+
+
+class LLMResponseCache:
+    """Exact-match LRU cache with an optional embedding-similarity tier"""
+
+    def __init__(self, max_entries: int = 512, max_bytes: int = 16 * 1024 * 1024,
+                 ttl: float = 3600.0, default_temperature: float = 0.7,
+                 embed: Optional[Callable[[str], Awaitable[List[float]]]] = None,
+                 similarity_threshold: float = 0.97):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        # Temperature assumed when a call does not set one (the LLM managers' default)
+        self.default_temperature = default_temperature
+        self.embed = embed
+        self.similarity_threshold = similarity_threshold
+
+        # key -> {"content", "scope", "created", "size", "vector"}
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        # scope -> keys with a vector, for the semantic tier
+        self._scopes: Dict[str, Dict[str, Any]] = {}
+        self._bytes = 0
+        self.agent_stats: Dict[str, Dict[str, int]] = {}
+        self.evictions = 0
+        self.expirations = 0
+
+    # ------------------------------------------------------------------
+    # Keys
+    # ------------------------------------------------------------------
+
+    def _sampling(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        sampling = {name: params[name] for name in SAMPLING_PARAMS if params.get(name) is not None}
+        sampling.setdefault("temperature", self.default_temperature)
+        return sampling
+
+    def _scope(self, model: str, params: Dict[str, Any]) -> str:
+        return json.dumps([model, self._sampling(params)], sort_keys=True, default=str)
+
+    def make_key(self, model: str, prompt: str, params: Dict[str, Any]) -> Tuple[str, str]:
+        """Return ``(key, scope)`` for a request"""
+        scope = self._scope(model, params)
+        key = hashlib.sha256(f"{scope}\x00{normalize_prompt(prompt)}".encode("utf-8")).hexdigest()
+        return key, scope
+
+    def should_cache(self, params: Dict[str, Any], force: Optional[bool] = None) -> bool:
+        """Deterministic requests are cached; sampled ones only when forced"""
+        if force is not None:
+            return force
+        return (self._sampling(params)["temperature"] or 0) <= 0
+
+    # ------------------------------------------------------------------
+    # Lookup
+    # ------------------------------------------------------------------
+
+    async def get(self, agent_id: str, model: str, prompt: str, params: Dict[str, Any],
+                  force: Optional[bool] = None) -> Optional[str]:
+        """Return a cached response, or None on a miss or bypass"""
+        stats = self._agent(agent_id)
+        if not self.should_cache(params, force):
+            stats["bypassed"] += 1
+            return None
+
+        key, scope = self.make_key(model, prompt, params)
+        entry = self._lookup(key)
+        if entry is not None:
+            stats["hits"] += 1
+            return entry["content"]
+
+        if self.embed is not None:
+            entry = await self._semantic_lookup(scope, prompt)
+            if entry is not None:
+                stats["semantic_hits"] += 1
+                return entry["content"]
+
+        stats["misses"] += 1
+        return None
+
+    def _lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry["created"] > self.ttl:
+            self._remove(key)
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    async def _semantic_lookup(self, scope: str, prompt: str) -> Optional[Dict[str, Any]]:
+        scoped = self._scopes.get(scope)
+        if not scoped:
+            return None
+
+        try:
+            query = self._normalize_vector(await self.embed(normalize_prompt(prompt)))
+        except Exception as e:
+            logger.debug(f"Semantic cache lookup failed: {e}")
+            return None
+
+        best_key, best_score = None, self.similarity_threshold
+        keys = list(scoped)
+        if HAS_NUMPY:
+            scores = np.asarray([scoped[key] for key in keys], dtype=np.float32) @ np.asarray(query, dtype=np.float32)
+            index = int(np.argmax(scores))
+            if scores[index] >= best_score:
+                best_key = keys[index]
+        else:
+            for key in keys:
+                score = sum(a * b for a, b in zip(scoped[key], query))
+                if score >= best_score:
+                    best_key, best_score = key, score
+
+        return self._lookup(best_key) if best_key else None
+
+    # ------------------------------------------------------------------
+    # Storage
+    # ------------------------------------------------------------------
+
+    async def put(self, agent_id: str, model: str, prompt: str, params: Dict[str, Any],
+                  content: str, force: Optional[bool] = None) -> None:
+        """Store a successful response"""
+        if not content or not self.should_cache(params, force):
+            return
+
+        key, scope = self.make_key(model, prompt, params)
+        vector = None
+        if self.embed is not None:
+            try:
+                vector = self._normalize_vector(await self.embed(normalize_prompt(prompt)))
+            except Exception as e:
+                logger.debug(f"Could not embed prompt for semantic cache: {e}")
+
+        self._remove(key)
+        size = len(content.encode("utf-8"))
+        self._entries[key] = {
+            "content": content,
+            "scope": scope,
+            "created": time.monotonic(),
+            "size": size,
+        }
+        self._bytes += size
+        if vector is not None:
+            self._scopes.setdefault(scope, {})[key] = vector
+        self._agent(agent_id)["stores"] += 1
+        self._evict()
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._bytes -= entry["size"]
+        scoped = self._scopes.get(entry["scope"])
+        if scoped is not None:
+            scoped.pop(key, None)
+            if not scoped:
+                del self._scopes[entry["scope"]]
+
+    def _evict(self) -> None:
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._scopes.clear()
+        self._bytes = 0
+
+    @staticmethod
+    def _normalize_vector(vector: List[float]) -> List[float]:
+        norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+        return [value / norm for value in vector]
+
+    # ------------------------------------------------------------------
+    # Stats
+    # ------------------------------------------------------------------
+
+    def _agent(self, agent_id: str) -> Dict[str, int]:
+        stats = self.agent_stats.get(agent_id)
+        if stats is None:
+            stats = {"hits": 0, "semantic_hits": 0, "misses": 0, "bypassed": 0, "stores": 0}
+            self.agent_stats[agent_id] = stats
+        return stats
+
+    def get_agent_stats(self, agent_id: str) -> Dict[str, Any]:
+        stats = dict(self._agent(agent_id))
+        hits = stats["hits"] + stats["semantic_hits"]
+        lookups = hits + stats["misses"]
+        stats["hit_rate"] = hits / lookups if lookups else 0.0
+        return stats
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "semantic_tier": self.embed is not None,
+            "agents": {agent_id: self.get_agent_stats(agent_id) for agent_id in self.agent_stats},
+        }
@@ -0,0 +1,78 @@
+"""
+LLM Streaming
+
+Incremental parsers for the streaming formats spoken by local model servers:
+Ollama's newline-delimited JSON and the OpenAI-compatible server-sent events
+used by vLLM and LM Studio. Both yield text chunks as soon as they arrive so
+callers can forward tokens without buffering the whole completion.
+"""
+
+import json
+import logging
+from typing import Any, AsyncIterator, Dict
+
+logger = logging.getLogger(__name__)
+
+
+def build_openai_stream_payload(model: str, prompt: str, **kwargs) -> Dict[str, Any]:
+    """Chat completion payload with streaming enabled"""
+    return {
+        "model": model,
+        "messages": [{"role": "user", "content": prompt}],
+        "temperature": kwargs.get('temperature', 0.7),
+        "top_p": kwargs.get('top_p', 0.9),
+        "max_tokens": kwargs.get('max_tokens', 2048),
+        "stream": True
+    }
+
+
+async def iter_ollama_stream(response) -> AsyncIterator[str]:
+    """Yield text chunks from an Ollama ``/api/generate`` NDJSON stream"""
+    async for line in response.content:
+        line = line.strip()
+        if not line:
+            continue
+
+        try:
+            data = json.loads(line)
+        except json.JSONDecodeError:
+            logger.debug(f"Skipping malformed Ollama stream line: {line[:80]!r}")
+            continue
+
+        if data.get("error"):
+            raise Exception(f"Ollama stream error: {data['error']}")
+
+        chunk = data.get("response")
+        if chunk:
+            yield chunk
+        if data.get("done"):
+            break
+
+
+async def iter_openai_sse(response) -> AsyncIterator[str]:
+    """Yield text chunks from an OpenAI-compatible ``stream=True`` SSE response"""
+    async for raw_line in response.content:
+        line = raw_line.decode("utf-8", errors="replace").strip()
+        # Blank lines separate events; comments and other fields are ignored
+        if not line.startswith("data:"):
+            continue
+
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            break
+
+        try:
+            event = json.loads(data)
+        except json.JSONDecodeError:
+            logger.debug(f"Skipping malformed SSE event: {data[:80]!r}")
+            continue
+
+        if event.get("error"):
+            raise Exception(f"Stream error: {event['error']}")
+
+        choices = event.get("choices") or []
+        if not choices:
+            continue
+        chunk = (choices[0].get("delta") or {}).get("content")
+        if chunk:
+            yield chunk
@@ -0,0 +1,256 @@
+"""
+Memory Journal
+
+Append-only write-ahead log for the Advanced Memory Manager. Every
+add/update/delete is recorded as one JSON line in ``memories.log`` and the
+log is periodically compacted into the ``memories.json`` snapshot, so a
+mutation costs O(1) disk I/O instead of rewriting the whole memory store.
+"""
+
+import os
+import json
+import logging
+import asyncio
+from typing import Callable, Dict, Iterable, List, Any, Optional, Set, Tuple
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Builds a sidecar payload; returned on the event loop, called in a worker thread
+SidecarWriter = Callable[[], str]
+
+
+def dumps_entries(entries: Iterable[Tuple[str, Any]]) -> str:
+    """Encode ``entries`` as a JSON object, one value at a time.
+
+    A single ``json.dumps`` of a large mapping holds the GIL until it is done,
+    so running it in a worker thread would still stall the event loop. Encoding
+    entry by entry lets the loop run between entries.
+    """
+    return "{" + ", ".join(f"{json.dumps(key)}: {json.dumps(value)}" for key, value in entries) + "}"
+
+
+class MemoryJournal:
+    """Append-only mutation log with snapshot compaction.
+
+    Records are staged in memory with :meth:`record_put` / :meth:`record_delete`
+    (no I/O, safe to call while holding ``memory_lock``) and written to disk by
+    :meth:`flush`, which batches every staged record into a single append.
+    Each record carries the full item, so replaying a record that is already
+    reflected in the snapshot is harmless.
+    """
+
+    def __init__(self, memory_path: Path, snapshot_name: str = "memories.json",
+                 log_name: str = "memories.log", compact_every: int = 1000,
+                 fsync: bool = False):
+        self.memory_path = Path(memory_path)
+        self.snapshot_file = self.memory_path / snapshot_name
+        self.log_file = self.memory_path / log_name
+        self.compact_every = compact_every
+        self.fsync = fsync
+
+        self._pending: List[str] = []
+        self._io_lock = asyncio.Lock()
+        self._log_records = 0
+        self._compaction_task: Optional[asyncio.Task] = None
+        self._sidecars: List[Tuple[Path, Callable[[], SidecarWriter]]] = []
+        self._sidecar_callbacks: Dict[Path, Callable[[], None]] = {}
+        self.replayed_ids: Set[str] = set()
+
+        self.stats = {
+            "records_written": 0,
+            "flushes": 0,
+            "compactions": 0,
+            "replayed_records": 0,
+            "corrupt_records": 0,
+        }
+
+    # ------------------------------------------------------------------
+    # Recovery
+    # ------------------------------------------------------------------
+
+    def load(self) -> Dict[str, Any]:
+        """Load the snapshot and replay the log tail on top of it"""
+        state: Dict[str, Any] = {}
+        if self.snapshot_file.exists():
+            with open(self.snapshot_file, "r", encoding="utf-8") as f:
+                state = json.load(f)
+
+        self._log_records = 0
+        self.replayed_ids = set()
+        if self.log_file.exists():
+            with open(self.log_file, "r", encoding="utf-8") as f:
+                for line_number, line in enumerate(f, 1):
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A torn write can only affect the tail of the log
+                        self.stats["corrupt_records"] += 1
+                        logger.warning(f"Ignoring corrupt memory log record at line {line_number}")
+                        continue
+                    self._apply(state, record)
+                    self.replayed_ids.add(record.get("id"))
+                    self._log_records += 1
+
+        self.stats["replayed_records"] = self._log_records
+        if self._log_records:
+            logger.info(f"Replayed {self._log_records} memory log records")
+        return state
+
+    @staticmethod
+    def _apply(state: Dict[str, Any], record: Dict[str, Any]) -> None:
+        """Apply a single log record to a state dict"""
+        op = record.get("op")
+        memory_id = record.get("id")
+        if op == "put":
+            state[memory_id] = record.get("item")
+        elif op == "delete":
+            state.pop(memory_id, None)
+
+    # ------------------------------------------------------------------
+    # Sidecar files
+    # ------------------------------------------------------------------
+
+    def add_sidecar(self, name: str, capture: Callable[[], SidecarWriter],
+                    on_written: Optional[Callable[[], None]] = None) -> None:
+        """Persist derived data (e.g. search indexes) alongside each snapshot.
+
+        ``capture`` is called on the event loop at the same point the snapshot
+        state is captured, so the sidecar always matches the snapshot. It
+        should only copy what it needs and return a function that builds the
+        payload; that function runs in a worker thread. ``on_written`` runs in
+        a worker thread once the sidecar is on disk, e.g. to delete files only
+        the previous sidecar referred to.
+        """
+        path = self.memory_path / name
+        self._sidecars = [(p, c) for p, c in self._sidecars if p != path]
+        self._sidecars.append((path, capture))
+        if on_written is not None:
+            self._sidecar_callbacks[path] = on_written
+        else:
+            self._sidecar_callbacks.pop(path, None)
+
+    def load_sidecar(self, name: str) -> Optional[str]:
+        """Return a sidecar payload if it was written with the current snapshot"""
+        sidecar_file = self.memory_path / name
+        if not sidecar_file.exists() or not self.snapshot_file.exists():
+            return None
+
+        with open(sidecar_file, "r", encoding="utf-8") as f:
+            header = json.loads(f.readline() or "{}")
+            if header.get("snapshot") != self._snapshot_stamp():
+                logger.info(f"Sidecar {name} is stale, ignoring it")
+                return None
+            return f.read()
+
+    def _snapshot_stamp(self) -> Dict[str, int]:
+        stat = self.snapshot_file.stat()
+        return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    # ------------------------------------------------------------------
+    # Staging and flushing
+    # ------------------------------------------------------------------
+
+    def record_put(self, memory_id: str, memory_item: Dict[str, Any]) -> None:
+        """Stage a full-item write for ``memory_id``"""
+        self._pending.append(json.dumps({"op": "put", "id": memory_id, "item": memory_item}))
+
+    def record_delete(self, memory_id: str) -> None:
+        """Stage a delete for ``memory_id``"""
+        self._pending.append(json.dumps({"op": "delete", "id": memory_id}))
+
+    async def flush(self) -> None:
+        """Append all staged records to the log in one write"""
+        async with self._io_lock:
+            await self._flush_locked()
+
+    async def _flush_locked(self) -> None:
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        await asyncio.to_thread(self._append, batch)
+        self._log_records += len(batch)
+        self.stats["records_written"] += len(batch)
+        self.stats["flushes"] += 1
+
+    def _append(self, lines: List[str]) -> None:
+        with open(self.log_file, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+            if self.fsync:
+                f.flush()
+                os.fsync(f.fileno())
+
+    # ------------------------------------------------------------------
+    # Compaction
+    # ------------------------------------------------------------------
+
+    def needs_compaction(self) -> bool:
+        return self.compact_every > 0 and self._log_records >= self.compact_every
+
+    def schedule_compaction(self, state: Dict[str, Any]) -> None:
+        """Start a background compaction if the log is long enough"""
+        if not self.needs_compaction():
+            return
+        if self._compaction_task and not self._compaction_task.done():
+            return
+        self._compaction_task = asyncio.create_task(self.compact(state))
+
+    async def compact(self, state: Dict[str, Any]) -> None:
+        """Write ``state`` as the new snapshot and truncate the log.
+
+        ``state`` is captured on the event loop right after the log is
+        flushed, so it reflects at least every record written so far; the
+        serialization runs in a worker thread. Records staged afterwards land
+        in the fresh log and are replayed on top of the snapshot, which is safe
+        because records are idempotent.
+        """
+        async with self._io_lock:
+            try:
+                await self._flush_locked()
+                entries = list(state.items())
+                sidecars = [(path, capture()) for path, capture in self._sidecars]
+                await asyncio.to_thread(self._write_snapshot, entries, sidecars)
+                for path, _ in sidecars:
+                    callback = self._sidecar_callbacks.get(path)
+                    if callback is not None:
+                        await asyncio.to_thread(callback)
+                self._log_records = 0
+                self.stats["compactions"] += 1
+                logger.info(f"Compacted memory log into snapshot ({len(state)} entries)")
+            except Exception as e:
+                logger.error(f"Error compacting memory log: {e}")
+
+    def _write_snapshot(self, entries: List[Tuple[str, Any]],
+                        sidecars: List[Tuple[Path, SidecarWriter]]) -> None:
+        self._write_atomic(self.snapshot_file, dumps_entries(entries))
+        header = json.dumps({"snapshot": self._snapshot_stamp()})
+        for path, write in sidecars:
+            self._write_atomic(path, header + "\n" + write())
+        # Only truncate once the snapshot is durable; a crash in between just
+        # replays already-applied records.
+        with open(self.log_file, "w", encoding="utf-8"):
+            pass
+
+    @staticmethod
+    def _write_atomic(path: Path, payload: str) -> None:
+        tmp_file = path.with_suffix(path.suffix + ".tmp")
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, path)
+
+    async def close(self, state: Dict[str, Any]) -> None:
+        """Wait for background compaction and write a final snapshot"""
+        if self._compaction_task and not self._compaction_task.done():
+            await self._compaction_task
+        await self.compact(state)
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self.stats)
+        stats["pending_records"] = len(self._pending)
+        stats["log_records"] = self._log_records
+        return stats
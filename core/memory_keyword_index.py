@@ -0,0 +1,167 @@
+"""
+Memory Keyword Index
+
+Tokenized inverted index with BM25 scoring used by the Advanced Memory
+Manager's keyword search fallback. Queries only touch the postings of the
+query terms, so latency grows with the number of matches instead of the
+number of stored memories.
+"""
+
+import re
+import json
+import math
+import heapq
+from typing import Callable, Dict, List, Any, Tuple
+
+from core.memory_journal import dumps_entries
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9_]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase alphanumeric tokens"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class KeywordIndex:
+    """Inverted index over memory contents with BM25 ranking"""
+
+    FORMAT_VERSION = 1
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.doc_terms: Dict[str, Dict[str, int]] = {}
+        self.doc_len: Dict[str, int] = {}
+        self.total_len = 0
+
+    def __len__(self) -> int:
+        return len(self.doc_len)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self.doc_len
+
+    def add(self, doc_id: str, text: str) -> None:
+        """Index (or re-index) a document"""
+        if doc_id in self.doc_len:
+            self.remove(doc_id)
+
+        tokens = tokenize(text)
+        term_counts: Dict[str, int] = {}
+        for token in tokens:
+            term_counts[token] = term_counts.get(token, 0) + 1
+
+        for term, tf in term_counts.items():
+            self.postings.setdefault(term, {})[doc_id] = tf
+
+        self.doc_terms[doc_id] = term_counts
+        self.doc_len[doc_id] = len(tokens)
+        self.total_len += len(tokens)
+
+    def remove(self, doc_id: str) -> None:
+        """Drop a document from the index"""
+        term_counts = self.doc_terms.pop(doc_id, None)
+        if term_counts is None:
+            return
+
+        for term in term_counts:
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            posting.pop(doc_id, None)
+            if not posting:
+                del self.postings[term]
+
+        self.total_len -= self.doc_len.pop(doc_id, 0)
+
+    def index_item(self, memory_id: str, memory_item: Any) -> None:
+        """Index a memory cache entry, skipping entries without text content"""
+        if isinstance(memory_item, dict) and isinstance(memory_item.get("content"), str):
+            self.add(memory_id, memory_item["content"])
+        else:
+            self.remove(memory_id)
+
+    def rebuild(self, memory_cache: Dict[str, Any]) -> None:
+        """Rebuild the index from a full memory cache"""
+        self.postings.clear()
+        self.doc_terms.clear()
+        self.doc_len.clear()
+        self.total_len = 0
+        for memory_id, memory_item in memory_cache.items():
+            self.index_item(memory_id, memory_item)
+
+    def search(self, query: str, limit: int = 5) -> List[Tuple[str, float]]:
+        """Return ``(doc_id, score)`` pairs for the best BM25 matches"""
+        doc_count = len(self.doc_len)
+        if not doc_count:
+            return []
+
+        avg_len = self.total_len / doc_count if self.total_len else 1.0
+        base_norm = self.k1 * (1 - self.b)
+        len_norm = self.k1 * self.b / avg_len
+        doc_len = self.doc_len
+        scores: Dict[str, float] = {}
+
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+
+            df = len(posting)
+            weight = math.log(1 + (doc_count - df + 0.5) / (df + 0.5)) * (self.k1 + 1)
+            for doc_id, tf in posting.items():
+                norm = base_norm + len_norm * doc_len[doc_id]
+                scores[doc_id] = scores.get(doc_id, 0.0) + weight * tf / (tf + norm)
+
+        return heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def dumps(self) -> str:
+        """Serialize the index; postings are rebuilt from per-document terms"""
+        return self.capture()()
+
+    def capture(self) -> Callable[[], str]:
+        """Copy the document table now and return a function that serializes it.
+
+        Term counts are replaced, never modified, when a document is re-indexed,
+        so the copy stays consistent while the index keeps changing.
+        """
+        docs = list(self.doc_terms.items())
+        return lambda: f'{{"version": {self.FORMAT_VERSION}, "docs": {dumps_entries(docs)}}}'
+
+    def loads(self, payload: str) -> bool:
+        """Replace the index contents from :meth:`dumps` output.
+
+        Returns False (leaving the index untouched) for unknown formats.
+        """
+        data = json.loads(payload)
+        if data.get("version") != self.FORMAT_VERSION:
+            return False
+
+        postings: Dict[str, Dict[str, int]] = {}
+        doc_len: Dict[str, int] = {}
+        total_len = 0
+        doc_terms = data.get("docs", {})
+        for doc_id, term_counts in doc_terms.items():
+            for term, tf in term_counts.items():
+                postings.setdefault(term, {})[doc_id] = tf
+            length = sum(term_counts.values())
+            doc_len[doc_id] = length
+            total_len += length
+
+        self.postings = postings
+        self.doc_terms = doc_terms
+        self.doc_len = doc_len
+        self.total_len = total_len
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "documents": len(self.doc_len),
+            "terms": len(self.postings),
+            "avg_doc_length": self.total_len / len(self.doc_len) if self.doc_len else 0.0,
+        }
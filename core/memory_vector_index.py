@@ -0,0 +1,279 @@
+"""
+Memory Vector Index
+
+In-process cosine-similarity index used by the Advanced Memory Manager when
+no Qdrant server is available. Vectors live in a memory-mapped float32
+matrix on disk; deletes are tombstoned and reclaimed by periodic compaction.
+"""
+
+import json
+import logging
+import threading
+from typing import Callable, Dict, List, Any, Optional, Sequence, Tuple
+from pathlib import Path
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    np = None
+    HAS_NUMPY = False
+
+logger = logging.getLogger(__name__)
+
+
+class VectorIndex:
+    """Memory-mapped float32 vector store with batched cosine top-k search.
+
+    Rows are L2-normalized on insert so cosine similarity is a plain matrix
+    product. All public methods are thread-safe so callers can run them via
+    ``asyncio.to_thread`` without blocking the event loop.
+    """
+
+    FORMAT_VERSION = 1
+
+    def __init__(self, memory_path: Path, dim: int = 384, name: str = "memories.vectors",
+                 initial_capacity: int = 1024, compact_ratio: float = 0.25,
+                 compact_min_tombstones: int = 256):
+        if not HAS_NUMPY:
+            raise ImportError("numpy is required for the local vector index")
+
+        self.memory_path = Path(memory_path)
+        self.dim = dim
+        self.name = name
+        self.initial_capacity = initial_capacity
+        self.compact_ratio = compact_ratio
+        self.compact_min_tombstones = compact_min_tombstones
+
+        self._lock = threading.RLock()
+        self._generation = 0
+        # Generation named by the last dumps(), and by the last sidecar known to be on disk
+        self._dumped_generation: Optional[int] = None
+        self._persisted_generation: Optional[int] = None
+        self._matrix = None
+        self._capacity = 0
+        self._count = 0
+        self._alive = np.zeros(0, dtype=bool)
+        self._row_ids: List[Optional[str]] = []
+        self._rows: Dict[str, int] = {}
+
+    # ------------------------------------------------------------------
+    # Storage
+    # ------------------------------------------------------------------
+
+    def _data_file(self, generation: int) -> Path:
+        return self.memory_path / f"{self.name}.{generation}.f32"
+
+    @property
+    def meta_name(self) -> str:
+        return f"{self.name}.json"
+
+    def _open(self, generation: int, capacity: int) -> None:
+        """Open (and grow if needed) the memory-mapped matrix for a generation"""
+        data_file = self._data_file(generation)
+        size = capacity * self.dim * 4
+        with open(data_file, "ab") as f:
+            if f.tell() < size:
+                f.truncate(size)
+
+        if self._matrix is not None:
+            self._matrix.flush()
+        self._matrix = np.memmap(data_file, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+        self._capacity = capacity
+        self._generation = generation
+
+        alive = np.zeros(capacity, dtype=bool)
+        alive[:len(self._alive)] = self._alive[:capacity]
+        self._alive = alive
+
+    def open(self, meta_payload: Optional[str] = None) -> None:
+        """Open the index, restoring the row map from a saved payload if given"""
+        with self._lock:
+            meta = json.loads(meta_payload) if meta_payload else None
+            if meta and meta.get("version") == self.FORMAT_VERSION and meta.get("dim") == self.dim:
+                row_ids = meta.get("ids", [])
+                generation = meta.get("generation", 0)
+                if self._data_file(generation).exists():
+                    self._row_ids = row_ids
+                    self._count = len(row_ids)
+                    self._rows = {memory_id: row for row, memory_id in enumerate(row_ids) if memory_id is not None}
+                    self._alive = np.array([memory_id is not None for memory_id in row_ids], dtype=bool)
+                    self._open(generation, max(self.initial_capacity, self._count))
+                    self._persisted_generation = generation
+                    self._remove_stale_files()
+                    return
+
+            # No usable metadata: start a fresh generation
+            self._row_ids = []
+            self._rows = {}
+            self._count = 0
+            self._alive = np.zeros(0, dtype=bool)
+            self._open(self._next_generation(), self.initial_capacity)
+            self._remove_stale_files()
+
+    def _next_generation(self) -> int:
+        generations = [self._generation]
+        for data_file in self.memory_path.glob(f"{self.name}.*.f32"):
+            try:
+                generations.append(int(data_file.suffixes[-2].lstrip(".")))
+            except (ValueError, IndexError):
+                continue
+        return max(generations) + 1
+
+    def _remove_stale_files(self) -> None:
+        keep = {self._data_file(self._generation)}
+        if self._persisted_generation is not None:
+            keep.add(self._data_file(self._persisted_generation))
+        for data_file in self.memory_path.glob(f"{self.name}.*.f32"):
+            if data_file not in keep:
+                try:
+                    data_file.unlink()
+                except OSError as e:
+                    logger.debug(f"Could not remove stale vector file {data_file}: {e}")
+
+    def dumps(self) -> str:
+        """Serialize the row map; the vectors themselves stay in the data file"""
+        return self.capture()()
+
+    def capture(self) -> Callable[[], str]:
+        """Copy the row map now and return a function that serializes it"""
+        with self._lock:
+            self._dumped_generation = self._generation
+            meta = {
+                "version": self.FORMAT_VERSION,
+                "dim": self.dim,
+                "generation": self._generation,
+                "ids": self._row_ids[:self._count],
+            }
+        return lambda: json.dumps(meta)
+
+    def sidecar_written(self) -> None:
+        """The payload of the last capture() is on disk: earlier generations are no longer needed"""
+        with self._lock:
+            if self._dumped_generation is None:
+                return
+            self._persisted_generation = self._dumped_generation
+            self._remove_stale_files()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._matrix is not None:
+                self._matrix.flush()
+                self._matrix = None
+
+    # ------------------------------------------------------------------
+    # Mutations
+    # ------------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, memory_id: str) -> bool:
+        return memory_id in self._rows
+
+    def ids(self) -> List[str]:
+        with self._lock:
+            return list(self._rows)
+
+    def add(self, memory_id: str, vector: Sequence[float]) -> None:
+        """Insert or replace the vector for ``memory_id``"""
+        row_vector = np.asarray(vector, dtype=np.float32).reshape(-1)
+        if row_vector.shape[0] != self.dim:
+            raise ValueError(f"Expected a {self.dim}-dimensional vector, got {row_vector.shape[0]}")
+        norm = float(np.linalg.norm(row_vector))
+        if norm > 0:
+            row_vector = row_vector / norm
+
+        with self._lock:
+            row = self._rows.get(memory_id)
+            if row is None:
+                if self._count >= self._capacity:
+                    self._open(self._generation, self._capacity * 2)
+                row = self._count
+                self._count += 1
+                self._row_ids.append(memory_id)
+                self._rows[memory_id] = row
+            self._matrix[row] = row_vector
+            self._alive[row] = True
+
+    def delete(self, memory_id: str) -> bool:
+        """Tombstone the row for ``memory_id``"""
+        with self._lock:
+            row = self._rows.pop(memory_id, None)
+            if row is None:
+                return False
+            self._row_ids[row] = None
+            self._alive[row] = False
+            return True
+
+    # ------------------------------------------------------------------
+    # Search
+    # ------------------------------------------------------------------
+
+    def search(self, query: Sequence[float], limit: int = 5) -> List[Tuple[str, float]]:
+        return self.search_batch([query], limit)[0]
+
+    def search_batch(self, queries: Sequence[Sequence[float]], limit: int = 5) -> List[List[Tuple[str, float]]]:
+        """Cosine top-k for a batch of query vectors"""
+        query_matrix = np.asarray(queries, dtype=np.float32).reshape(-1, self.dim)
+        norms = np.linalg.norm(query_matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        query_matrix = query_matrix / norms
+
+        with self._lock:
+            count = self._count
+            if not self._rows or limit <= 0:
+                return [[] for _ in range(len(query_matrix))]
+
+            scores = query_matrix @ self._matrix[:count].T
+            scores[:, ~self._alive[:count]] = -np.inf
+            k = min(limit, len(self._rows))
+
+            results = []
+            for query_scores in scores:
+                top = np.argpartition(-query_scores, k - 1)[:k]
+                top = top[np.argsort(-query_scores[top])]
+                results.append([(self._row_ids[row], float(query_scores[row])) for row in top])
+            return results
+
+    # ------------------------------------------------------------------
+    # Compaction
+    # ------------------------------------------------------------------
+
+    def tombstones(self) -> int:
+        return self._count - len(self._rows)
+
+    def needs_compaction(self) -> bool:
+        dead = self.tombstones()
+        return dead >= self.compact_min_tombstones and dead >= self._count * self.compact_ratio
+
+    def compact(self) -> None:
+        """Rewrite live rows into a new generation file and drop tombstones"""
+        with self._lock:
+            live_rows = np.flatnonzero(self._alive[:self._count])
+            live_ids = [self._row_ids[row] for row in live_rows]
+            vectors = np.array(self._matrix[live_rows])
+
+            old_matrix = self._matrix
+            self._matrix = None
+            self._alive = np.zeros(0, dtype=bool)
+            self._open(self._next_generation(), max(self.initial_capacity, len(live_ids)))
+            self._matrix[:len(live_ids)] = vectors
+            self._alive[:len(live_ids)] = True
+            self._row_ids = live_ids
+            self._rows = {memory_id: row for row, memory_id in enumerate(live_ids)}
+            self._count = len(live_ids)
+            del old_matrix
+            # Keep the generation the saved sidecar names until a new one is written
+            self._remove_stale_files()
+
+            logger.info(f"Compacted vector index to {self._count} rows (generation {self._generation})")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "vectors": len(self._rows),
+            "tombstones": self.tombstones(),
+            "capacity": self._capacity,
+            "dim": self.dim,
+            "generation": self._generation,
+        }
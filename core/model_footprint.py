@@ -0,0 +1,370 @@
+"""
+Model Footprint Profiler
+
+Learns how much memory each model really takes instead of guessing from its
+name. Footprints are keyed by (provider, model, quantization, context length)
+and come from two places:
+
+- ``measure_load()`` reads a memory sensor before and after a load and records
+  the delta (loads must not overlap; callers hold the registry's load_lock).
+- ``observe_registry()`` records the resident size Ollama reports in /api/ps
+  (``size_vram``) whenever the model registry sees a model load. Managers
+  sharing a profiler call ``attach_registry()``/``detach_registry()`` so it
+  stays subscribed exactly as long as one of them is alive.
+
+Sensors, best first: pynvml, nvidia-smi, then the resident set size of the
+provider processes (CPU-only machines). ``FakeSensor`` stands in for tests.
+Footprints persist to a JSON file and feed ``VRAMManager.can_load_model`` and
+the memory-aware managers' VRAM estimates.
+"""
+
+import os
+import re
+import json
+import time
+import asyncio
+import logging
+import subprocess
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, asdict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+try:
+    import pynvml
+    HAS_PYNVML = True
+except ImportError:
+    HAS_PYNVML = False
+
+try:
+    import psutil
+    HAS_PSUTIL = True
+except ImportError:
+    HAS_PSUTIL = False
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORE_PATH = os.path.join("data", "model_footprints.json")
+# Smaller deltas are noise, or a load that did not allocate anything (already resident)
+MIN_FOOTPRINT_MB = 64.0
+FOOTPRINT_SMOOTHING = 0.3
+PROVIDER_PROCESS_NAMES = ("ollama", "llama-server", "lm studio", "lms", "vllm")
+
+_QUANTIZATION = re.compile(
+    r"(?<![a-z0-9])(i?q\d(?:_[a-z0-9]+)*|fp16|f16|bf16|fp32|f32|fp8|int8|int4|awq|gptq|exl2)(?![a-z0-9])",
+    re.IGNORECASE
+)
+
+
+def parse_quantization(model_id: str) -> str:
+    """Quantization named in a model id ("llama3:8b-instruct-q4_K_M" -> "q4_k_m"), or "default" """
+    match = _QUANTIZATION.search(model_id)
+    return match.group(1).lower() if match else "default"
+
+
+@dataclass(frozen=True)
+class FootprintKey:
+    provider: str
+    model: str
+    quantization: str = "default"
+    context_length: int = 0  # 0: the provider's default
+
+    @classmethod
+    def for_model(cls, provider: str, model: str, quantization: Optional[str] = None,
+                  context_length: int = 0) -> "FootprintKey":
+        return cls(provider, model, quantization or parse_quantization(model), context_length or 0)
+
+
+@dataclass
+class Footprint:
+    """Measured memory use of one model configuration"""
+    mb: float  # Moving average
+    peak_mb: float
+    samples: int = 1
+    source: str = ""
+    updated_at: float = 0.0
+
+
+# ----------------------------------------------------------------------
+# Sensors
+# ----------------------------------------------------------------------
+
+class MemorySensor(ABC):
+    """Reports memory in use, in MB"""
+
+    name = "base"
+
+    @abstractmethod
+    def read_mb(self) -> Optional[float]:
+        """Memory in use now, or None if it cannot be read"""
+        pass
+
+
+class PynvmlSensor(MemorySensor):
+    name = "pynvml"
+
+    def __init__(self):
+        pynvml.nvmlInit()
+        self.handles = [pynvml.nvmlDeviceGetHandleByIndex(i) for i in range(pynvml.nvmlDeviceGetCount())]
+
+    def read_mb(self) -> Optional[float]:
+        return sum(pynvml.nvmlDeviceGetMemoryInfo(handle).used for handle in self.handles) / (1024 * 1024)
+
+
+class NvidiaSmiSensor(MemorySensor):
+    name = "nvidia-smi"
+
+    def read_mb(self) -> Optional[float]:
+        try:
+            result = subprocess.run(
+                ["nvidia-smi", "--query-gpu=memory.used", "--format=csv,noheader,nounits"],
+                capture_output=True, text=True, timeout=5
+            )
+        except (subprocess.TimeoutExpired, FileNotFoundError, OSError):
+            return None
+        if result.returncode != 0:
+            return None
+        return sum(float(line) for line in result.stdout.split() if line.strip())
+
+
+class ProcessRSSSensor(MemorySensor):
+    """Resident memory of the model servers, or of this process if none are running"""
+
+    name = "rss"
+
+    def __init__(self, process_names: Tuple[str, ...] = PROVIDER_PROCESS_NAMES):
+        self.process_names = tuple(name.lower() for name in process_names)
+
+    def read_mb(self) -> Optional[float]:
+        if not HAS_PSUTIL:
+            return None
+        total = 0
+        for process in psutil.process_iter(["name", "memory_info"]):
+            name = (process.info.get("name") or "").lower()
+            memory = process.info.get("memory_info")
+            if memory is not None and any(wanted in name for wanted in self.process_names):
+                total += memory.rss
+        if not total:
+            total = psutil.Process().memory_info().rss
+        return total / (1024 * 1024)
+
+
+class FakeSensor(MemorySensor):
+    """Scripted readings for tests: allocate()/free() move the reported usage"""
+
+    name = "fake"
+
+    def __init__(self, used_mb: float = 0.0):
+        self.used_mb = used_mb
+        self.reads = 0
+
+    def allocate(self, mb: float) -> None:
+        self.used_mb += mb
+
+    def free(self, mb: float) -> None:
+        self.used_mb = max(0.0, self.used_mb - mb)
+
+    def read_mb(self) -> Optional[float]:
+        self.reads += 1
+        return self.used_mb
+
+
+def detect_sensor() -> MemorySensor:
+    """The most precise sensor available here"""
+    if HAS_PYNVML:
+        try:
+            return PynvmlSensor()
+        except Exception as e:
+            logger.debug(f"pynvml unavailable: {e}")
+    nvidia_smi = NvidiaSmiSensor()
+    if nvidia_smi.read_mb() is not None:
+        return nvidia_smi
+    return ProcessRSSSensor()
+
+
+# ----------------------------------------------------------------------
+# Profiler
+# ----------------------------------------------------------------------
+
+class ModelFootprintProfiler:
+    """Measured, persisted memory footprints per model configuration"""
+
+    def __init__(self, store_path: Optional[str] = DEFAULT_STORE_PATH, sensor: Optional[MemorySensor] = None,
+                 settle_seconds: float = 0.5, settle_samples: int = 3):
+        self.store_path = store_path
+        self._sensor = sensor
+        # Allocations can trail the load call (e.g. KV cache); keep the largest of a few readings
+        self.settle_seconds = settle_seconds
+        self.settle_samples = max(1, settle_samples)
+        self.footprints: Dict[FootprintKey, Footprint] = {}
+        self._lock = threading.Lock()
+        self._registry_users: Dict[Any, int] = {}
+        self._load()
+
+    @property
+    def sensor(self) -> MemorySensor:
+        if self._sensor is None:
+            self._sensor = detect_sensor()
+            logger.info(f"Model footprints measured with {self._sensor.name}")
+        return self._sensor
+
+    # Persistence
+
+    def _load(self) -> None:
+        if not self.store_path or not os.path.exists(self.store_path):
+            return
+        try:
+            with open(self.store_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            for entry in data.get("footprints", []):
+                key = FootprintKey(entry["provider"], entry["model"], entry.get("quantization", "default"),
+                                   int(entry.get("context_length", 0)))
+                self.footprints[key] = Footprint(entry["mb"], entry.get("peak_mb", entry["mb"]),
+                                                 entry.get("samples", 1), entry.get("source", ""),
+                                                 entry.get("updated_at", 0.0))
+        except Exception as e:
+            logger.warning(f"Could not read model footprints from {self.store_path}: {e}")
+
+    def _save(self) -> None:
+        if not self.store_path:
+            return
+        entries = [{**asdict(key), **asdict(footprint)} for key, footprint in self.footprints.items()]
+        try:
+            directory = os.path.dirname(self.store_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            temp_path = f"{self.store_path}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": 1, "footprints": entries}, f, indent=2)
+            os.replace(temp_path, self.store_path)
+        except OSError as e:
+            logger.warning(f"Could not save model footprints to {self.store_path}: {e}")
+
+    # Recording
+
+    def record(self, key: FootprintKey, mb: float, source: str = "") -> Optional[Footprint]:
+        """Add one measurement; deltas below MIN_FOOTPRINT_MB are ignored"""
+        if mb is None or mb < MIN_FOOTPRINT_MB:
+            return None
+        with self._lock:
+            footprint = self.footprints.get(key)
+            if footprint is None:
+                footprint = self.footprints[key] = Footprint(mb, mb, 0, source)
+            else:
+                footprint.mb += FOOTPRINT_SMOOTHING * (mb - footprint.mb)
+                footprint.peak_mb = max(footprint.peak_mb, mb)
+            footprint.samples += 1
+            footprint.source = source or footprint.source
+            footprint.updated_at = time.time()
+            self._save()
+        logger.info(f"Footprint {key.provider}/{key.model} [{key.quantization}, ctx {key.context_length or 'default'}]: "
+                    f"{mb:.0f}MB ({source or 'measured'}, {footprint.samples} samples)")
+        return footprint
+
+    async def _read(self) -> Optional[float]:
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(None, self.sensor.read_mb)
+        except Exception as e:
+            logger.debug(f"Memory sensor failed: {e}")
+            return None
+
+    async def measure_load(self, key: FootprintKey, load: Callable[[], Awaitable[Any]]) -> Tuple[Any, Optional[float]]:
+        """Run ``load()`` between two sensor readings; returns its result and the recorded delta"""
+        before = await self._read()
+        result = await load()
+        if before is None or result is False:
+            return result, None
+
+        after = None
+        for sample in range(self.settle_samples):
+            if sample:
+                if after is None or after - before < MIN_FOOTPRINT_MB:
+                    break  # Nothing was allocated, e.g. the model was already resident
+                await asyncio.sleep(self.settle_seconds / self.settle_samples)
+            reading = await self._read()
+            if reading is not None and (after is None or reading > after):
+                after = reading
+        if after is None:
+            return result, None
+        delta = after - before
+        footprint = self.record(key, delta, self.sensor.name)
+        return result, delta if footprint is not None else None
+
+    def attach_registry(self, registry) -> None:
+        """Subscribe observe_registry to ``registry``; each call needs a matching detach_registry()"""
+        with self._lock:
+            users = self._registry_users.get(registry, 0)
+            self._registry_users[registry] = users + 1
+            if not users:
+                registry.subscribe(self.observe_registry)
+
+    def detach_registry(self, registry) -> None:
+        """Unsubscribe from ``registry`` once its last attached user detaches"""
+        with self._lock:
+            users = self._registry_users.get(registry, 0)
+            if users > 1:
+                self._registry_users[registry] = users - 1
+            elif users == 1:
+                del self._registry_users[registry]
+                registry.unsubscribe(self.observe_registry)
+
+    def observe_registry(self, snapshot, events) -> None:
+        """Model registry subscriber: record resident sizes providers report for newly loaded models"""
+        for event in events:
+            if event.kind != "model_loaded" or event.model_id is None:
+                continue
+            state = snapshot.providers.get(event.provider)
+            model = next((m for m in state.models if m.model_id == event.model_id), None) if state else None
+            size_vram = model.metadata.get("size_vram") if model is not None else None
+            if size_vram:
+                self.record(FootprintKey.for_model(event.provider, event.model_id), size_vram / (1024 * 1024),
+                            f"{event.provider} /api/ps")
+
+    # Reading
+
+    def get(self, key: FootprintKey) -> Optional[Footprint]:
+        return self.footprints.get(key)
+
+    def estimate_mb(self, provider: str, model: str, quantization: Optional[str] = None,
+                    context_length: int = 0) -> Optional[float]:
+        """
+        Smoothed measured footprint for this configuration; failing that, the
+        nearest measured context length of the same model and quantization.
+        None when the model has never been measured. The smoothed value, not
+        the peak, so one reading skewed by another allocation does not stick.
+        """
+        key = FootprintKey.for_model(provider, model, quantization, context_length)
+        footprint = self.footprints.get(key)
+        if footprint is None:
+            related = [(abs(other.context_length - key.context_length), other.context_length, found)
+                       for other, found in self.footprints.items()
+                       if (other.provider, other.model, other.quantization) ==
+                       (key.provider, key.model, key.quantization)]
+            if not related:
+                return None
+            footprint = min(related, key=lambda item: (item[0], -item[1]))[2]
+        return footprint.mb
+
+    def estimate_gb(self, provider: str, model: str, quantization: Optional[str] = None,
+                    context_length: int = 0) -> Optional[float]:
+        mb = self.estimate_mb(provider, model, quantization, context_length)
+        return mb / 1024 if mb is not None else None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "sensor": self._sensor.name if self._sensor else None,
+            "footprints": len(self.footprints),
+            "store_path": self.store_path,
+        }
+
+
+_profiler: Optional[ModelFootprintProfiler] = None
+
+
+def get_footprint_profiler() -> ModelFootprintProfiler:
+    """The process-wide profiler shared by the model managers"""
+    global _profiler
+    if _profiler is None:
+        _profiler = ModelFootprintProfiler()
+    return _profiler
@@ -0,0 +1,404 @@
+"""
+Model Registry
+
+One in-process view of which models the local providers (LM Studio, Ollama,
+vLLM) serve. The model managers used to poll every provider themselves; they
+now read snapshots from this registry, so provider traffic depends on the
+number of providers and the poll interval, not on how many managers run.
+
+- ``snapshot(max_age)`` returns the cached snapshot when it is fresh enough
+  and otherwise refreshes it. Concurrent refreshes are merged into one.
+- ``start()`` / ``stop()`` reference-count a single background poller.
+- ``subscribe(callback)`` delivers ``callback(snapshot, events)`` after every
+  refresh that changed something (providers going on/offline, models added,
+  removed, loaded or unloaded).
+- ``load_lock`` serialises load/unload decisions between managers.
+
+Liveness only uses metadata endpoints (``/v1/models``, ``/api/tags``,
+``/api/ps``); nothing here sends generations.
+"""
+
+import time
+import json
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROVIDERS = {
+    'lmstudio': 'http://localhost:1234',
+    'ollama': 'http://127.0.0.1:11434',
+    'vllm': 'http://localhost:8000',
+}
+DEFAULT_POLL_INTERVAL = 15.0
+DEFAULT_REQUEST_TIMEOUT = 5.0
+
+
+@dataclass(frozen=True)
+class RegisteredModel:
+    """A model one provider reports"""
+    provider: str
+    model_id: str
+    # Resident and serving; Ollama also reports installed models that are not
+    loaded: bool
+    size_bytes: Optional[int] = None
+    # The provider's raw listing entry
+    metadata: Dict[str, Any] = field(default_factory=dict, compare=False, hash=False)
+
+    @property
+    def key(self) -> str:
+        return f"{self.provider}/{self.model_id}"
+
+
+@dataclass(frozen=True)
+class ProviderSnapshot:
+    """One provider's state as of one refresh"""
+    name: str
+    base_url: str
+    online: bool
+    models: Tuple[RegisteredModel, ...] = ()
+    error: Optional[str] = None
+    duration_seconds: float = 0.0
+    requests: int = 0
+    bytes: int = 0
+
+    @property
+    def loaded_models(self) -> List[RegisteredModel]:
+        return [model for model in self.models if model.loaded]
+
+
+@dataclass(frozen=True)
+class RegistrySnapshot:
+    """Immutable view of every provider; replaced, never mutated"""
+    version: int
+    taken_at: float  # time.monotonic()
+    timestamp: float  # time.time()
+    providers: Dict[str, ProviderSnapshot] = field(default_factory=dict)
+    duration_seconds: float = 0.0
+
+    @property
+    def requests(self) -> int:
+        return sum(provider.requests for provider in self.providers.values())
+
+    @property
+    def bytes(self) -> int:
+        return sum(provider.bytes for provider in self.providers.values())
+
+    def age(self) -> float:
+        return time.monotonic() - self.taken_at
+
+    def is_online(self, provider: str) -> bool:
+        state = self.providers.get(provider)
+        return state is not None and state.online
+
+    def models(self, provider: Optional[str] = None, loaded_only: bool = False) -> List[RegisteredModel]:
+        providers = [self.providers[provider]] if provider in self.providers else (
+            [] if provider else list(self.providers.values()))
+        return [model for state in providers for model in state.models if model.loaded or not loaded_only]
+
+    def get(self, key: str) -> Optional[RegisteredModel]:
+        provider, _, model_id = key.partition('/')
+        for model in self.models(provider):
+            if model.model_id == model_id:
+                return model
+        return None
+
+
+@dataclass(frozen=True)
+class RegistryEvent:
+    """A change between two consecutive snapshots"""
+    kind: str  # provider_online, provider_offline, model_added, model_removed, model_loaded, model_unloaded
+    provider: str
+    model_id: Optional[str] = None
+
+
+def diff_snapshots(old: RegistrySnapshot, new: RegistrySnapshot) -> List[RegistryEvent]:
+    """Events that turn ``old`` into ``new``"""
+    events = []
+    for name in sorted(set(old.providers) | set(new.providers)):
+        before = old.providers.get(name)
+        after = new.providers.get(name)
+        was_online = before is not None and before.online
+        is_online = after is not None and after.online
+        if is_online != was_online:
+            events.append(RegistryEvent('provider_online' if is_online else 'provider_offline', name))
+
+        old_models = {model.model_id: model for model in (before.models if before else ())}
+        new_models = {model.model_id: model for model in (after.models if after else ())}
+        for model_id in sorted(set(old_models) | set(new_models)):
+            previous, current = old_models.get(model_id), new_models.get(model_id)
+            if previous is None:
+                events.append(RegistryEvent('model_added', name, model_id))
+                if current.loaded:
+                    events.append(RegistryEvent('model_loaded', name, model_id))
+            elif current is None:
+                if previous.loaded:
+                    events.append(RegistryEvent('model_unloaded', name, model_id))
+                events.append(RegistryEvent('model_removed', name, model_id))
+            elif previous.loaded != current.loaded:
+                events.append(RegistryEvent('model_loaded' if current.loaded else 'model_unloaded', name, model_id))
+    return events
+
+
+class ModelRegistry:
+    """Shared, polled, cached view of local model providers"""
+
+    def __init__(self, providers: Optional[Dict[str, str]] = None,
+                 poll_interval: float = DEFAULT_POLL_INTERVAL,
+                 request_timeout: float = DEFAULT_REQUEST_TIMEOUT):
+        self.providers = dict(providers or DEFAULT_PROVIDERS)
+        self.poll_interval = poll_interval
+        self.request_timeout = request_timeout
+
+        self._snapshot = RegistrySnapshot(version=0, taken_at=float('-inf'), timestamp=0.0)
+        self._subscribers: List[Callable] = []
+        self._refreshing: Optional[asyncio.Future] = None
+        self._poller: Optional[asyncio.Task] = None
+        self._users = 0
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop = None
+        self._load_lock: Optional[asyncio.Lock] = None
+        self._load_lock_loop = None
+
+        self.stats = {
+            'refreshes': 0, 'requests': 0, 'bytes': 0, 'cache_hits': 0,
+            'coalesced': 0, 'events': 0, 'subscriber_errors': 0,
+        }
+
+    # ------------------------------------------------------------------
+    # Shared resources
+    # ------------------------------------------------------------------
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        """HTTP session shared by the registry and its consumers' own requests"""
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            self._session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit_per_host=4))
+            self._session_loop = loop
+        return self._session
+
+    @property
+    def load_lock(self) -> asyncio.Lock:
+        """Held by a manager while it decides what to load or unload"""
+        loop = asyncio.get_running_loop()
+        if self._load_lock is None or self._load_lock_loop is not loop:
+            self._load_lock = asyncio.Lock()
+            self._load_lock_loop = loop
+        return self._load_lock
+
+    async def close(self) -> None:
+        if self._poller is not None:
+            self._poller.cancel()
+            self._poller = None
+        self._users = 0
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def current(self) -> RegistrySnapshot:
+        """The latest snapshot, however old (version 0 before the first refresh)"""
+        return self._snapshot
+
+    async def snapshot(self, max_age: Optional[float] = None) -> RegistrySnapshot:
+        """A snapshot no older than ``max_age`` seconds (default: the poll interval)"""
+        max_age = self.poll_interval if max_age is None else max_age
+        if self._snapshot.version and self._snapshot.age() <= max_age:
+            self.stats['cache_hits'] += 1
+            return self._snapshot
+        return await self.refresh()
+
+    async def refresh(self) -> RegistrySnapshot:
+        """Poll every provider once; callers arriving meanwhile share the result"""
+        loop = asyncio.get_running_loop()
+        pending = self._refreshing
+        if pending is not None and not pending.done() and pending.get_loop() is loop:
+            self.stats['coalesced'] += 1
+            return await asyncio.shield(pending)
+        self._refreshing = loop.create_task(self._refresh())
+        return await asyncio.shield(self._refreshing)
+
+    # ------------------------------------------------------------------
+    # Subscriptions and polling
+    # ------------------------------------------------------------------
+
+    def subscribe(self, callback: Callable) -> None:
+        """Call ``callback(snapshot, events)`` after each refresh that changed something"""
+        if callback not in self._subscribers:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable) -> None:
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def start(self, poll_interval: Optional[float] = None) -> None:
+        """Register a consumer of background polling; the fastest requested interval wins"""
+        if poll_interval:
+            self.poll_interval = min(self.poll_interval, poll_interval) if self._users else poll_interval
+        self._users += 1
+        if self._poller is None or self._poller.done():
+            self._poller = asyncio.get_running_loop().create_task(self._poll_loop())
+
+    async def stop(self) -> None:
+        """Release one consumer; polling stops with the last one"""
+        self._users = max(0, self._users - 1)
+        if self._users == 0 and self._poller is not None:
+            self._poller.cancel()
+            self._poller = None
+
+    async def _poll_loop(self) -> None:
+        while True:
+            try:
+                # On-demand refreshes by consumers count towards the interval
+                delay = self.poll_interval - self._snapshot.age()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                    continue
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Model registry poll failed: {e}")
+                await asyncio.sleep(self.poll_interval)
+
+    # ------------------------------------------------------------------
+    # Polling
+    # ------------------------------------------------------------------
+
+    async def _refresh(self) -> RegistrySnapshot:
+        started = time.perf_counter()
+        names = list(self.providers)
+        states = await asyncio.gather(*(self._check_provider(name) for name in names))
+        previous = self._snapshot
+        snapshot = RegistrySnapshot(
+            version=previous.version + 1,
+            taken_at=time.monotonic(),
+            timestamp=time.time(),
+            providers=dict(zip(names, states)),
+            duration_seconds=time.perf_counter() - started
+        )
+        self._snapshot = snapshot
+        self.stats['refreshes'] += 1
+        self.stats['requests'] += snapshot.requests
+        self.stats['bytes'] += snapshot.bytes
+
+        events = diff_snapshots(previous, snapshot)
+        if events:
+            self.stats['events'] += len(events)
+            self._publish(snapshot, events)
+        return snapshot
+
+    def _publish(self, snapshot: RegistrySnapshot, events: List[RegistryEvent]) -> None:
+        for callback in list(self._subscribers):
+            try:
+                result = callback(snapshot, events)
+                if asyncio.iscoroutine(result):
+                    asyncio.get_running_loop().create_task(result)
+            except Exception as e:
+                self.stats['subscriber_errors'] += 1
+                logger.error(f"Model registry subscriber failed: {e}")
+
+    async def _check_provider(self, name: str) -> ProviderSnapshot:
+        base_url = self.providers[name]
+        cost = {'requests': 0, 'bytes': 0}
+        started = time.perf_counter()
+        models: Tuple[RegisteredModel, ...] = ()
+        error = None
+        try:
+            if name == 'ollama':
+                listed = await self._list_ollama(base_url, cost)
+            else:
+                listed = await self._list_openai(name, base_url, cost)
+            if listed is None:
+                error = "metadata endpoint unavailable"
+            else:
+                models = tuple(listed)
+        except Exception as e:
+            listed = None
+            error = str(e) or type(e).__name__
+        return ProviderSnapshot(
+            name=name,
+            base_url=base_url,
+            online=listed is not None,
+            models=models,
+            error=error,
+            duration_seconds=time.perf_counter() - started,
+            requests=cost['requests'],
+            bytes=cost['bytes']
+        )
+
+    async def _get_json(self, url: str, cost: Dict[str, int]) -> Optional[Any]:
+        session = await self.get_session()
+        cost['requests'] += 1
+        async with session.get(url, timeout=aiohttp.ClientTimeout(total=self.request_timeout)) as response:
+            body = await response.read()
+            cost['bytes'] += len(body)
+            if response.status != 200:
+                return None
+            return json.loads(body)
+
+    async def _list_openai(self, name: str, base_url: str, cost: Dict[str, int]) -> Optional[List[RegisteredModel]]:
+        """LM Studio and vLLM list the models they are serving at /v1/models"""
+        data = await self._get_json(f"{base_url}/v1/models", cost)
+        if data is None:
+            return None
+        return [RegisteredModel(name, entry['id'], True, metadata=entry)
+                for entry in data.get('data', []) if entry.get('id')]
+
+    async def _list_ollama(self, base_url: str, cost: Dict[str, int]) -> Optional[List[RegisteredModel]]:
+        """Installed models from /api/tags, resident ones from /api/ps"""
+        tags, ps = await asyncio.gather(
+            self._get_json(f"{base_url}/api/tags", cost),
+            self._get_json(f"{base_url}/api/ps", cost),
+            return_exceptions=True
+        )
+        if isinstance(tags, BaseException):
+            raise tags
+        if tags is None:
+            return None
+        installed = {entry['name']: entry for entry in tags.get('models', []) if entry.get('name')}
+        if isinstance(ps, dict):
+            resident = {entry['name']: entry for entry in ps.get('models', []) if entry.get('name')}
+        else:
+            # Servers without /api/ps load on demand; treat installed models as loadable
+            resident = dict(installed)
+
+        models = []
+        for model_name in list(installed) + [n for n in resident if n not in installed]:
+            entry = installed.get(model_name) or resident[model_name]
+            models.append(RegisteredModel(
+                'ollama', model_name, model_name in resident,
+                size_bytes=entry.get('size'),
+                metadata={**entry, **({'size_vram': resident[model_name].get('size_vram')}
+                                      if model_name in resident else {})}
+            ))
+        return models
+
+    def get_stats(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        return {
+            **self.stats,
+            'version': snapshot.version,
+            'age_seconds': snapshot.age() if snapshot.version else None,
+            'providers_online': [name for name, state in snapshot.providers.items() if state.online],
+            'subscribers': len(self._subscribers),
+            'polling': self._poller is not None and not self._poller.done(),
+        }
+
+
+_registry: Optional[ModelRegistry] = None
+
+
+def get_model_registry() -> ModelRegistry:
+    """The process-wide registry shared by every model manager"""
+    global _registry
+    if _registry is None:
+        _registry = ModelRegistry()
+    return _registry
@@ -5,26 +5,142 @@ Supports Ollama, LM Studio, and vLLM with intelligent model routing
 
 import asyncio
 import aiohttp
+import itertools
 import json
 import logging
+import time
 import yaml
-from typing import Dict, Any, List, Optional
+from typing import AsyncIterator, Awaitable, Callable, Dict, Any, List, Optional
 from pathlib import Path
 
+from core.llm_streaming import build_openai_stream_payload, iter_ollama_stream, iter_openai_sse
+
 try:
     from openai import OpenAI
     OPENAI_AVAILABLE = True
 except ImportError:
     OPENAI_AVAILABLE = False
 
+class VLLMDispatcher:
+    """Priority dispatcher that fans agent requests out to a shared vLLM instance.
+    
+    Requests wait in a bounded priority queue (callers block when it is full)
+    and a fixed pool of workers keeps up to ``max_in_flight`` requests running
+    against vLLM so its continuous batching keeps the GPU busy.
+    """
+    
+    def __init__(self, send: Callable[..., Awaitable[Dict[str, Any]]],
+                 max_in_flight: int = 4, max_queue_size: int = 64):
+        self.logger = logging.getLogger("VLLMDispatcher")
+        self._send = send
+        self.max_in_flight = max_in_flight
+        self._queue = asyncio.PriorityQueue(maxsize=max_queue_size)
+        self._sequence = itertools.count()
+        self._workers: List[asyncio.Task] = []
+        self.in_flight = 0
+        self.stats = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "rejected": 0,
+            "total_wait_s": 0.0
+        }
+    
+    def start(self):
+        """Start the worker pool"""
+        if not self._workers:
+            self._workers = [asyncio.create_task(self._worker()) for _ in range(self.max_in_flight)]
+    
+    async def submit(self, priority: int, model: str, prompt: str,
+                     queue_timeout: Optional[float] = None, **kwargs) -> Dict[str, Any]:
+        """Queue a request (lower priority value runs first) and wait for its result"""
+        future = asyncio.get_running_loop().create_future()
+        item = (priority, next(self._sequence), time.monotonic(), model, prompt, kwargs, future)
+        
+        try:
+            await asyncio.wait_for(self._queue.put(item), queue_timeout)
+        except asyncio.TimeoutError:
+            self.stats["rejected"] += 1
+            raise RuntimeError(f"vLLM request queue full ({self._queue.qsize()} waiting)")
+        
+        self.stats["submitted"] += 1
+        return await future
+    
+    async def _worker(self):
+        while True:
+            _, _, enqueued, model, prompt, kwargs, future = await self._queue.get()
+            try:
+                if future.done():
+                    continue
+                self.stats["total_wait_s"] += time.monotonic() - enqueued
+                self.in_flight += 1
+                try:
+                    result = await self._send(model, prompt, **kwargs)
+                finally:
+                    self.in_flight -= 1
+                if not future.done():
+                    future.set_result(result)
+                self.stats["completed"] += 1
+            except asyncio.CancelledError:
+                if not future.done():
+                    future.cancel()
+                raise
+            except Exception as e:
+                self.stats["failed"] += 1
+                if not future.done():
+                    future.set_exception(e)
+            finally:
+                self._queue.task_done()
+    
+    async def stop(self):
+        """Stop the workers and cancel anything still queued"""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        
+        while not self._queue.empty():
+            *_, future = self._queue.get_nowait()
+            if not future.done():
+                future.cancel()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        started = self.stats["completed"] + self.stats["failed"]
+        return {
+            **self.stats,
+            "queued": self._queue.qsize(),
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "avg_wait_ms": self.stats["total_wait_s"] * 1000 / started if started else 0.0
+        }
+
 class RealLLMManager:
     """Real LLM Manager that connects to actual local models with optimized single-instance sharing"""
     
-    # Class-level connection pool for sharing single vLLM instance
-    _vllm_session = None
+    # Connection pool defaults, overridable per provider in models_config.yaml
+    DEFAULT_POOL_SETTINGS = {
+        "max_connections": 8,
+        "max_concurrent_requests": 4,
+        "request_timeout": 120,
+        "connect_timeout": 10,
+        "keepalive_timeout": 60,
+        "max_queue_size": 64,
+        "queue_timeout": 30
+    }
+    
+    # Shared vLLM requests are dispatched in this order (lower runs first)
+    ROLE_PRIORITIES = {
+        "orchestrator": 0,
+        "architect": 1,
+        "backend_dev": 2,
+        "frontend_dev": 2,
+        "qa_analyst": 3
+    }
+    DEFAULT_ROLE_PRIORITY = 5
+    
+    # Class-level dispatcher for sharing single vLLM instance
     _vllm_model_name = None
-    _request_queue = asyncio.Queue()
-    _processing_requests = False
+    _vllm_dispatcher: Optional[VLLMDispatcher] = None
     
     def __init__(self, config_path: str = "config/models_config.yaml"):
         self.logger = logging.getLogger("RealLLM")
@@ -32,7 +148,11 @@ class RealLLMManager:
         self.config = {}
         self.active_providers = {}
         self.agent_model_map = {}
-        self._session = None
+        
+        # One long-lived keep-alive session and concurrency limit per provider
+        self._provider_sessions: Dict[str, aiohttp.ClientSession] = {}
+        self._provider_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._owns_vllm_dispatcher = False
         
         # OpenAI clients for different providers
         self.lmstudio_client = None
@@ -42,9 +162,6 @@ class RealLLMManager:
         """Initialize the real LLM manager with single-instance optimization"""
         self.logger.info("Initializing Real LLM Manager for 8GB VRAM optimization...")
         
-        # Create shared session for all requests
-        self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=30))
-        
         # Load configuration
         await self._load_config()
         
@@ -57,10 +174,16 @@ class RealLLMManager:
         # Set up agent model assignments with single vLLM sharing
         await self._setup_agent_assignments_optimized()
         
-        # Start request processing queue for vLLM
-        if not RealLLMManager._processing_requests and "vllm" in self.active_providers:
-            RealLLMManager._processing_requests = True
-            asyncio.create_task(self._process_vllm_requests())
+        # Start the shared vLLM dispatcher
+        if RealLLMManager._vllm_dispatcher is None and "vllm" in self.active_providers:
+            settings = self._get_pool_settings("vllm")
+            RealLLMManager._vllm_dispatcher = VLLMDispatcher(
+                self._send_vllm_request,
+                max_in_flight=settings["max_concurrent_requests"],
+                max_queue_size=settings["max_queue_size"]
+            )
+            RealLLMManager._vllm_dispatcher.start()
+            self._owns_vllm_dispatcher = True
         
         self.logger.info("Real LLM Manager initialized with 8GB VRAM optimization")
         
@@ -94,17 +217,63 @@ class RealLLMManager:
         """Test if a provider is available"""
         try:
             timeout = aiohttp.ClientTimeout(total=5)
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                if provider == "ollama":
-                    async with session.get(f"{base_url}/api/tags") as response:
-                        return response.status == 200
-                elif provider in ["vllm", "lmstudio"]:
-                    async with session.get(f"{base_url}/v1/models") as response:
-                        return response.status == 200
+            if provider == "ollama":
+                url = f"{base_url}/api/tags"
+            elif provider in ["vllm", "lmstudio"]:
+                url = f"{base_url}/v1/models"
+            else:
                 return False
+            
+            session = self._get_provider_session(provider)
+            async with session.get(url, timeout=timeout) as response:
+                return response.status == 200
         except Exception:
             return False
     
+    def _get_pool_settings(self, provider: str) -> Dict[str, Any]:
+        """Get connection pool settings for a provider"""
+        provider_config = self.config.get('providers', {}).get(provider, {})
+        return {
+            key: provider_config.get(key, default)
+            for key, default in self.DEFAULT_POOL_SETTINGS.items()
+        }
+    
+    def _get_provider_session(self, provider: str) -> aiohttp.ClientSession:
+        """Get (or lazily create) the pooled keep-alive session for a provider"""
+        session = self._provider_sessions.get(provider)
+        if session is None or session.closed:
+            settings = self._get_pool_settings(provider)
+            connector = aiohttp.TCPConnector(
+                limit=settings["max_connections"],
+                limit_per_host=settings["max_connections"],
+                keepalive_timeout=settings["keepalive_timeout"],
+                ttl_dns_cache=300
+            )
+            session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(
+                    total=settings["request_timeout"],
+                    sock_connect=settings["connect_timeout"]
+                )
+            )
+            self._provider_sessions[provider] = session
+        return session
+    
+    def _get_provider_semaphore(self, provider: str) -> asyncio.Semaphore:
+        """Get the in-flight request limit for a provider"""
+        semaphore = self._provider_semaphores.get(provider)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self._get_pool_settings(provider)["max_concurrent_requests"])
+            self._provider_semaphores[provider] = semaphore
+        return semaphore
+    
+    def _provider_for_url(self, base_url: str) -> str:
+        """Map a base URL back to its configured provider name"""
+        for provider_name, provider_config in self.active_providers.items():
+            if provider_config.get('base_url') == base_url:
+                return provider_name
+        return "openai_compatible"
+    
     async def _setup_agent_assignments(self):
         """Set up agent-to-model assignments"""
         assignments = self.config.get('agent_assignments', {})
@@ -148,28 +317,28 @@ class RealLLMManager:
         
         # Fallback to individual assignments if vLLM not available
         await self._setup_agent_assignments()
-      async def _process_vllm_requests(self):
-        """Process vLLM requests in queue to avoid overwhelming single instance"""
-        while True:
-            try:
-                if not self._request_queue.empty():
-                    request_data = await self._request_queue.get()
-                    
-                    # Process the request - using fallback for now
-                    result = await self._generate_fallback_response(request_data['prompt'])
-                    
-                    # Set result in the future
-                    request_data['future'].set_result(result)
-                    
-                    # Small delay to prevent overwhelming
-                    await asyncio.sleep(0.1)
-                else:
-                    # Wait for new requests
-                    await asyncio.sleep(0.5)
-                    
-            except Exception as e:
-                self.logger.error(f"Error processing vLLM request queue: {e}")
-                await asyncio.sleep(1)
+    
+    async def _submit_vllm_request(self, agent_role: str, model: str, prompt: str, **kwargs) -> Dict[str, Any]:
+        """Queue a request for the shared vLLM instance, prioritized by agent role"""
+        priority = kwargs.pop('priority', None)
+        dispatcher = RealLLMManager._vllm_dispatcher
+        if dispatcher is None:
+            return await self._send_vllm_request(model, prompt, **kwargs)
+        
+        if priority is None:
+            priority = self.ROLE_PRIORITIES.get(agent_role, self.DEFAULT_ROLE_PRIORITY)
+        
+        return await dispatcher.submit(
+            priority, model, prompt,
+            queue_timeout=self._get_pool_settings("vllm")["queue_timeout"],
+            **kwargs
+        )
+    
+    async def _send_vllm_request(self, model: str, prompt: str, **kwargs) -> Dict[str, Any]:
+        """Send a single request to the shared vLLM instance"""
+        return await self._generate_openai_compatible_response(
+            self.active_providers['vllm']['base_url'], model, prompt, **kwargs
+        )
     
     async def generate_response(self, agent_role: str, prompt: str, **kwargs) -> Dict[str, Any]:
         """Generate response using appropriate model for agent role"""
@@ -187,16 +356,96 @@ class RealLLMManager:
             elif provider == "lmstudio":
                 return await self._generate_lmstudio_response_openai(model_name, prompt, **kwargs)
             elif provider == "vllm":
-                return await self._generate_openai_compatible_response(
-                    self.active_providers['vllm']['base_url'], model_name, prompt, **kwargs
-                )
+                return await self._submit_vllm_request(agent_role, model_name, prompt, **kwargs)
             else:
                 return await self._generate_fallback_response(prompt)
                 
         except Exception as e:
             self.logger.error(f"Error generating response with {model}: {e}")
             return await self._generate_fallback_response(prompt)
-    
+
+    async def generate_response_stream(self, agent_role: str, prompt: str,
+                                       stream_info: Optional[Dict[str, Any]] = None, **kwargs) -> AsyncIterator[str]:
+        """Stream response text chunks as the model produces them.
+        
+        If ``stream_info`` is given it is filled with the model, provider and
+        success flag that generate_response would have returned.
+        """
+        # Models are routed by agent role, as in generate_response
+        kwargs.pop('model', None)
+        kwargs.pop('priority', None)
+        if stream_info is None:
+            stream_info = {}
+
+        model = self.agent_model_map.get(agent_role)
+        provider, model_name = model.split('/', 1) if model else ("fallback", None)
+
+        if provider == "ollama":
+            stream = self._stream_ollama_response(model_name, prompt, **kwargs)
+        elif provider in ("lmstudio", "vllm"):
+            stream = self._stream_openai_compatible_response(provider, model_name, prompt, **kwargs)
+        else:
+            stream = None
+
+        started = False
+        if stream is not None:
+            stream_info.update({"model": model_name, "provider": provider, "success": True})
+            try:
+                async for chunk in stream:
+                    started = True
+                    yield chunk
+                return
+            except Exception as e:
+                self.logger.error(f"Error streaming response with {model}: {e}")
+                stream_info["success"] = False
+                # Chunks already delivered cannot be retracted
+                if started:
+                    return
+            finally:
+                await stream.aclose()
+
+        fallback = await self._generate_fallback_response(prompt)
+        stream_info.update({key: fallback[key] for key in ("model", "provider", "success")})
+        yield fallback["content"]
+
+    async def _stream_ollama_response(self, model: str, prompt: str, **kwargs) -> AsyncIterator[str]:
+        """Stream response chunks from Ollama's NDJSON generate endpoint"""
+        base_url = self.active_providers['ollama']['base_url']
+
+        payload = {
+            "model": model,
+            "prompt": prompt,
+            "stream": True,
+            "options": {
+                "temperature": kwargs.get('temperature', 0.7),
+                "top_p": kwargs.get('top_p', 0.9),
+                "max_tokens": kwargs.get('max_tokens', 2048)
+            }
+        }
+
+        session = self._get_provider_session("ollama")
+        async with self._get_provider_semaphore("ollama"):
+            async with session.post(f"{base_url}/api/generate", json=payload) as response:
+                if response.status != 200:
+                    raise Exception(f"Ollama API error: {response.status}")
+                async for chunk in iter_ollama_stream(response):
+                    yield chunk
+
+    async def _stream_openai_compatible_response(self, provider: str, model: str, prompt: str, **kwargs) -> AsyncIterator[str]:
+        """Stream response chunks from an OpenAI-compatible SSE endpoint (vLLM, LM Studio)"""
+        base_url = self.active_providers[provider]['base_url']
+        payload = build_openai_stream_payload(model, prompt, **kwargs)
+
+        # Streams hold their slot until the last token, so they share the
+        # provider limit rather than the vLLM priority queue
+        session = self._get_provider_session(provider)
+        async with self._get_provider_semaphore(provider):
+            async with session.post(f"{base_url}/v1/chat/completions", json=payload) as response:
+                if response.status != 200:
+                    raise Exception(f"API error: {response.status}")
+                async for chunk in iter_openai_sse(response):
+                    yield chunk
+
     async def _generate_ollama_response(self, model: str, prompt: str, **kwargs) -> Dict[str, Any]:
         """Generate response using Ollama"""
         base_url = self.active_providers['ollama']['base_url']
@@ -212,7 +461,8 @@ class RealLLMManager:
             }
         }
         
-        async with aiohttp.ClientSession() as session:
+        session = self._get_provider_session("ollama")
+        async with self._get_provider_semaphore("ollama"):
             async with session.post(f"{base_url}/api/generate", json=payload) as response:
                 if response.status == 200:
                     data = await response.json()
@@ -236,7 +486,9 @@ class RealLLMManager:
             "max_tokens": kwargs.get('max_tokens', 2048)
         }
         
-        async with aiohttp.ClientSession() as session:
+        provider = self._provider_for_url(base_url)
+        session = self._get_provider_session(provider)
+        async with self._get_provider_semaphore(provider):
             async with session.post(f"{base_url}/v1/chat/completions", json=payload) as response:
                 if response.status == 200:
                     data = await response.json()
@@ -355,6 +607,20 @@ Make a clear, decisive recommendation.
     
     async def shutdown(self):
         """Clean shutdown"""
+        if self._owns_vllm_dispatcher and RealLLMManager._vllm_dispatcher is not None:
+            await RealLLMManager._vllm_dispatcher.stop()
+            RealLLMManager._vllm_dispatcher = None
+            self._owns_vllm_dispatcher = False
+        
+        for provider, session in list(self._provider_sessions.items()):
+            try:
+                if not session.closed:
+                    await session.close()
+            except Exception as e:
+                self.logger.warning(f"Error closing {provider} session: {e}")
+        self._provider_sessions.clear()
+        self._provider_semaphores.clear()
+        
         self.logger.info("🧊 Real LLM Manager shutdown complete")
     
     async def _setup_openai_clients(self):
@@ -362,7 +628,8 @@ Make a clear, decisive recommendation.
         if not OPENAI_AVAILABLE:
             self.logger.warning("OpenAI library not available - some providers may not work")
             return
-              # Set up LM Studio client
+        
+        # Set up LM Studio client
         if "lmstudio" in self.active_providers and OPENAI_AVAILABLE:
             try:
                 self.lmstudio_client = OpenAI(
@@ -384,14 +651,15 @@ Make a clear, decisive recommendation.
                 self.logger.info("Ollama OpenAI client initialized")
             except Exception as e:
                 self.logger.error(f"Failed to initialize Ollama client: {e}")
-      async def _generate_lmstudio_response_openai(self, model: str, prompt: str, **kwargs) -> Dict[str, Any]:
+    
+    async def _generate_lmstudio_response_openai(self, model: str, prompt: str, **kwargs) -> Dict[str, Any]:
         """Generate response using LM Studio with OpenAI client"""
         if not OPENAI_AVAILABLE:
             return await self._generate_fallback_response(prompt)
         
         try:
-            # Create LM Studio client
-            client = OpenAI(
+            # Reuse the client created in _setup_openai_clients
+            client = self.lmstudio_client or OpenAI(
                 base_url="http://localhost:1234/v1",
                 api_key="not-needed"
             )
@@ -5,103 +5,65 @@ Detects which local models are actually available and working
 """
 
 import asyncio
-import aiohttp
 import json
 import logging
 from typing import Dict, List, Optional, Set
 from datetime import datetime, timedelta
 
+from core.model_registry import ModelRegistry, get_model_registry
+
 logger = logging.getLogger(__name__)
 
 class RealTimeModelDetector:
     """Detects available models in real-time"""
     
-    def __init__(self):
-        self.endpoints = {
-            "ollama": {
-                "base_url": "http://127.0.0.1:11434",
-                "models_endpoint": "/api/tags",
-                "health_endpoint": "/api/version"
-            },
-            "vllm": {
-                "base_url": "http://localhost:8000",
-                "models_endpoint": "/v1/models",
-                "health_endpoint": "/health"
-            },
-            "lm_studio": {
-                "base_url": "http://localhost:1234", 
-                "models_endpoint": "/v1/models",
-                "health_endpoint": "/v1/models"
-            }
-        }
+    # Detector provider names -> model registry provider names
+    REGISTRY_PROVIDERS = {
+        "ollama": "ollama",
+        "vllm": "vllm",
+        "lm_studio": "lmstudio"
+    }
+    
+    def __init__(self, registry: Optional[ModelRegistry] = None):
+        self.registry = registry or get_model_registry()
         self.available_models = {}
         self.last_check = None
         self.check_interval = 30  # seconds
         
     async def detect_available_models(self, force_refresh: bool = False) -> Dict[str, List[str]]:
         """Detect which models are actually available right now"""
-        current_time = datetime.now()
-        
-        # Use cache if recent
-        if (not force_refresh and self.last_check and 
-            (current_time - self.last_check).seconds < self.check_interval):
-            return self.available_models
+        # The registry serves a cached snapshot when it is recent enough
+        snapshot = await self.registry.snapshot(max_age=0 if force_refresh else self.check_interval)
         
         self.available_models = {}
+        for provider, registry_name in self.REGISTRY_PROVIDERS.items():
+            state = snapshot.providers.get(registry_name)
+            if state is None or not state.online:
+                logger.debug(f"❌ {provider}: {state.error if state else 'not configured'}")
+                continue
+            models = self._extract_model_names(provider, [model.model_id for model in state.models])
+            if models:
+                self.available_models[provider] = models
+                logger.info(f"✅ {provider}: {len(models)} models available")
+            else:
+                logger.debug(f"⚠️ {provider}: No models available")
         
-        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=3)) as session:
-            for provider, config in self.endpoints.items():
-                try:
-                    models = await self._check_provider_models(session, provider, config)
-                    if models:
-                        self.available_models[provider] = models
-                        logger.info(f"✅ {provider}: {len(models)} models available")
-                    else:
-                        logger.debug(f"⚠️ {provider}: No models available")
-                except Exception as e:
-                    logger.debug(f"❌ {provider}: {str(e)}")
-        
-        self.last_check = current_time
+        self.last_check = datetime.fromtimestamp(snapshot.timestamp)
         return self.available_models
     
-    async def _check_provider_models(self, session: aiohttp.ClientSession, 
-                                   provider: str, config: Dict) -> List[str]:
-        """Check what models a specific provider has available"""
-        try:
-            # First check if provider is alive
-            health_url = f"{config['base_url']}{config['health_endpoint']}"
-            async with session.get(health_url) as response:
-                if response.status != 200:
-                    return []
-            
-            # Get available models
-            models_url = f"{config['base_url']}{config['models_endpoint']}"
-            async with session.get(models_url) as response:
-                if response.status != 200:
-                    return []
-                
-                data = await response.json()
-                return self._extract_model_names(provider, data)
-                
-        except Exception as e:
-            logger.debug(f"Error checking {provider}: {e}")
-            return []
-    
-    def _extract_model_names(self, provider: str, data: Dict) -> List[str]:
-        """Extract model names from provider response"""
+    def _extract_model_names(self, provider: str, names: List[str]) -> List[str]:
+        """Normalise model names reported by a provider"""
         models = []
         
         if provider == "ollama":
-            # Ollama format: {"models": [{"name": "llama3:latest"}, ...]}
-            for model in data.get("models", []):
-                name = model.get("name", "").split(":")[0]  # Remove version tags
+            # Ollama names carry version tags: "llama3:latest"
+            for name in names:
+                name = name.split(":")[0]  # Remove version tags
                 if name:
                     models.append(name)
         
         elif provider in ["vllm", "lm_studio"]:
-            # OpenAI format: {"data": [{"id": "model-name"}, ...]}
-            for model in data.get("data", []):
-                name = model.get("id", "")
+            for name in names:
                 if name and not name.startswith("gpt-"):  # Filter out placeholder names
                     models.append(name)
         
@@ -0,0 +1,411 @@
+"""
+VRAM Eviction Policies
+
+Decide which loaded models to unload when another one does not fit. Every
+policy reads the same measurements from ``ModelUsageTracker``: each model's
+size, its measured load time (moving average, estimated from size until a
+load has been timed) and its recent request rate (exponentially decayed).
+
+- ``LRUPolicy``: least recently used first, the original behaviour.
+- ``GreedyDualSizePolicy``: GreedyDual-Size-Frequency. A model's credit is
+  ``inflation + frequency * load_seconds / size_gb``; the lowest credit goes
+  first and evicting raises the inflation, so idle models age out.
+- ``KnapsackPolicy``: treats the loaded set as a knapsack and picks the set of
+  evictions that frees enough VRAM at the lowest expected reload cost,
+  ``P(requested before the next eviction) * load_seconds``, solved exactly by
+  dynamic programming over 0.1 GB units. The horizon is the observed mean
+  time between evictions.
+
+``simulate()`` replays a request trace (see ``load_trace``) through a policy
+so policies can be compared offline; benchmark_vram_eviction.py drives it.
+"""
+
+import json
+import math
+import time
+import logging
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HALF_LIFE = 600.0  # seconds
+DEFAULT_HORIZON = 600.0  # seconds, until the interval between evictions has been observed
+# Until a load has been timed; roughly disk read plus weight upload
+DEFAULT_LOAD_SECONDS_PER_GB = 2.5
+DEFAULT_MODEL_SIZE_GB = 4.0
+LOAD_TIME_SMOOTHING = 0.3
+KNAPSACK_UNIT_GB = 0.1
+
+
+@dataclass
+class ModelUsage:
+    """What the tracker knows about one model"""
+    model_id: str
+    size_gb: float = DEFAULT_MODEL_SIZE_GB
+    load_seconds: Optional[float] = None  # Moving average of measured loads
+    loads: int = 0
+    frequency: float = 0.0  # Exponentially decayed request count
+    frequency_at: float = 0.0
+    last_used: float = float('-inf')
+
+
+class ModelUsageTracker:
+    """Request rates and load costs per model"""
+
+    def __init__(self, half_life: float = DEFAULT_HALF_LIFE, horizon: float = DEFAULT_HORIZON,
+                 load_seconds_per_gb: float = DEFAULT_LOAD_SECONDS_PER_GB):
+        self.half_life = half_life
+        self.horizon = horizon
+        self.load_seconds_per_gb = load_seconds_per_gb
+        self.models: Dict[str, ModelUsage] = {}
+
+    def _usage(self, model_id: str, size_gb: Optional[float] = None) -> ModelUsage:
+        usage = self.models.get(model_id)
+        if usage is None:
+            usage = self.models[model_id] = ModelUsage(model_id)
+        if size_gb:
+            usage.size_gb = size_gb
+        return usage
+
+    def _decay(self, usage: ModelUsage, now: float) -> float:
+        elapsed = now - usage.frequency_at
+        if elapsed > 0:
+            usage.frequency *= 0.5 ** (elapsed / self.half_life)
+            usage.frequency_at = now
+        return usage.frequency
+
+    def record_request(self, model_id: str, size_gb: Optional[float] = None, now: Optional[float] = None) -> None:
+        now = time.monotonic() if now is None else now
+        usage = self._usage(model_id, size_gb)
+        self._decay(usage, now)
+        usage.frequency += 1.0
+        usage.last_used = now
+
+    def record_load(self, model_id: str, size_gb: Optional[float], seconds: float) -> None:
+        usage = self._usage(model_id, size_gb)
+        usage.loads += 1
+        if usage.load_seconds is None:
+            usage.load_seconds = seconds
+        else:
+            usage.load_seconds += LOAD_TIME_SMOOTHING * (seconds - usage.load_seconds)
+
+    def frequency(self, model_id: str, now: float) -> float:
+        usage = self.models.get(model_id)
+        return self._decay(usage, now) if usage else 0.0
+
+    def request_rate(self, model_id: str, now: float) -> float:
+        """Requests per second, from the decayed count"""
+        return self.frequency(model_id, now) * math.log(2) / self.half_life
+
+    def load_seconds(self, model_id: str, size_gb: Optional[float] = None) -> float:
+        usage = self.models.get(model_id)
+        if usage is not None and usage.load_seconds is not None:
+            return usage.load_seconds
+        if size_gb is None:
+            size_gb = usage.size_gb if usage else DEFAULT_MODEL_SIZE_GB
+        return size_gb * self.load_seconds_per_gb
+
+    def reload_cost(self, model_id: str, now: float, size_gb: Optional[float] = None,
+                    horizon: Optional[float] = None) -> float:
+        """Expected seconds spent reloading the model if it is evicted now"""
+        horizon = self.horizon if horizon is None else horizon
+        probability = 1.0 - math.exp(-self.request_rate(model_id, now) * horizon)
+        return probability * self.load_seconds(model_id, size_gb)
+
+    def last_used(self, model_id: str) -> float:
+        usage = self.models.get(model_id)
+        return usage.last_used if usage else float('-inf')
+
+
+class EvictionPolicy(ABC):
+    """Chooses which loaded models to unload to make room"""
+
+    name = "base"
+
+    def __init__(self, tracker: Optional[ModelUsageTracker] = None):
+        self.tracker = tracker or ModelUsageTracker()
+
+    def on_request(self, model_id: str, size_gb: Optional[float] = None, now: Optional[float] = None) -> None:
+        self.tracker.record_request(model_id, size_gb, now)
+
+    def on_load(self, model_id: str, size_gb: Optional[float], seconds: Optional[float],
+                now: Optional[float] = None) -> None:
+        """A model finished loading; ``seconds`` is None when the load was not timed"""
+        if seconds is not None:
+            self.tracker.record_load(model_id, size_gb, seconds)
+
+    def on_unload(self, model_id: str) -> None:
+        pass
+
+    def choose_evictions(self, loaded: Dict[str, float], needed_gb: float,
+                         now: Optional[float] = None) -> Optional[List[str]]:
+        """
+        Models to unload so at least ``needed_gb`` is freed, or None if unloading
+        everything in ``loaded`` (model id -> size in GB) would not be enough.
+        """
+        if needed_gb <= 0:
+            return []
+        if sum(loaded.values()) < needed_gb:
+            return None
+        now = time.monotonic() if now is None else now
+        evictions, freed = [], 0.0
+        for model_id in self._eviction_order(loaded, now):
+            if freed >= needed_gb:
+                break
+            evictions.append(model_id)
+            freed += loaded[model_id]
+        return evictions
+
+    @abstractmethod
+    def _eviction_order(self, loaded: Dict[str, float], now: float) -> List[str]:
+        """Loaded model ids, first to evict first"""
+        pass
+
+
+class LRUPolicy(EvictionPolicy):
+    """Least recently used first"""
+
+    name = "lru"
+
+    def _eviction_order(self, loaded: Dict[str, float], now: float) -> List[str]:
+        return sorted(loaded, key=self.tracker.last_used)
+
+
+class GreedyDualSizePolicy(EvictionPolicy):
+    """GreedyDual-Size-Frequency with measured load time as the cost"""
+
+    name = "gdsf"
+
+    def __init__(self, tracker: Optional[ModelUsageTracker] = None):
+        super().__init__(tracker)
+        self.inflation = 0.0
+        self.credit: Dict[str, float] = {}
+
+    def _refresh_credit(self, model_id: str, size_gb: Optional[float], now: Optional[float]) -> None:
+        now = time.monotonic() if now is None else now
+        usage = self.tracker.models.get(model_id)
+        size_gb = size_gb or (usage.size_gb if usage else DEFAULT_MODEL_SIZE_GB)
+        frequency = max(self.tracker.frequency(model_id, now), 1.0)
+        self.credit[model_id] = self.inflation + frequency * self.tracker.load_seconds(model_id, size_gb) / size_gb
+
+    def on_request(self, model_id: str, size_gb: Optional[float] = None, now: Optional[float] = None) -> None:
+        super().on_request(model_id, size_gb, now)
+        self._refresh_credit(model_id, size_gb, now)
+
+    def on_load(self, model_id: str, size_gb: Optional[float], seconds: Optional[float],
+                now: Optional[float] = None) -> None:
+        super().on_load(model_id, size_gb, seconds, now)
+        self._refresh_credit(model_id, size_gb, now)
+
+    def on_unload(self, model_id: str) -> None:
+        credit = self.credit.pop(model_id, None)
+        if credit is not None and credit > self.inflation:
+            self.inflation = credit
+
+    def _eviction_order(self, loaded: Dict[str, float], now: float) -> List[str]:
+        # Models loaded behind our back (e.g. seen via the registry) have no credit yet
+        return sorted(loaded, key=lambda model_id: (self.credit.get(model_id, self.inflation),
+                                                    self.tracker.last_used(model_id)))
+
+
+class KnapsackPolicy(EvictionPolicy):
+    """Minimum expected reload cost eviction set, solved exactly"""
+
+    name = "knapsack"
+
+    def __init__(self, tracker: Optional[ModelUsageTracker] = None):
+        super().__init__(tracker)
+        # Moving average of the time between eviction decisions
+        self.eviction_interval: Optional[float] = None
+        self._last_eviction: Optional[float] = None
+
+    def _horizon(self, now: float) -> float:
+        if self._last_eviction is not None and now > self._last_eviction:
+            interval = now - self._last_eviction
+            if self.eviction_interval is None:
+                self.eviction_interval = interval
+            else:
+                self.eviction_interval += LOAD_TIME_SMOOTHING * (interval - self.eviction_interval)
+        self._last_eviction = now
+        return self.eviction_interval or self.tracker.horizon
+
+    def choose_evictions(self, loaded: Dict[str, float], needed_gb: float,
+                         now: Optional[float] = None) -> Optional[List[str]]:
+        if needed_gb <= 0:
+            return []
+        if sum(loaded.values()) < needed_gb:
+            return None
+        now = time.monotonic() if now is None else now
+        horizon = self._horizon(now)
+
+        # Sizes round down and the target up, so a plan never frees less than asked
+        target = max(1, math.ceil(needed_gb / KNAPSACK_UNIT_GB - 1e-9))
+        items = []
+        for model_id, size_gb in loaded.items():
+            units = min(target, int(size_gb / KNAPSACK_UNIT_GB + 1e-9))
+            if units <= 0:
+                continue
+            # Among equally cheap plans, evict less and the least recently used
+            cost = self.tracker.reload_cost(model_id, now, size_gb, horizon) + 1e-9 * units
+            items.append((model_id, units, cost))
+
+        # tables[i][j]: cheapest cost freeing at least j units (capped at target) with the first i items
+        tables = [[0.0] + [math.inf] * target]
+        for model_id, units, cost in items:
+            before = tables[-1]
+            after = before[:]
+            for freed in range(target + 1):
+                if before[freed] + cost < after[min(target, freed + units)]:
+                    after[min(target, freed + units)] = before[freed] + cost
+            tables.append(after)
+        if tables[-1][target] == math.inf:
+            # Rounding lost the last fraction of a unit; fall back to the cost order
+            return super().choose_evictions(loaded, needed_gb, now)
+
+        evictions, freed = [], target
+        for index in range(len(items) - 1, -1, -1):
+            if freed == 0:
+                break
+            before, after = tables[index], tables[index + 1]
+            if after[freed] == before[freed]:
+                continue  # Not needed for this optimum
+            model_id, units, cost = items[index]
+            freed = next(origin for origin in range(freed + 1)
+                         if min(target, origin + units) == freed and before[origin] + cost == after[freed])
+            evictions.append(model_id)
+        evictions.sort(key=self.tracker.last_used)
+        return evictions
+
+    def _eviction_order(self, loaded: Dict[str, float], now: float) -> List[str]:
+        # Cheapest expected reload first, over the horizon choose_evictions just updated
+        horizon = self.eviction_interval or self.tracker.horizon
+        return sorted(loaded, key=lambda model_id: (self.tracker.reload_cost(model_id, now, loaded[model_id], horizon),
+                                                    self.tracker.last_used(model_id)))
+
+
+EVICTION_POLICIES = {
+    LRUPolicy.name: LRUPolicy,
+    GreedyDualSizePolicy.name: GreedyDualSizePolicy,
+    KnapsackPolicy.name: KnapsackPolicy,
+}
+
+
+def make_eviction_policy(name: str, tracker: Optional[ModelUsageTracker] = None) -> EvictionPolicy:
+    try:
+        return EVICTION_POLICIES[name](tracker)
+    except KeyError:
+        raise ValueError(f"Unknown eviction policy {name!r}; choose from {sorted(EVICTION_POLICIES)}")
+
+
+# ----------------------------------------------------------------------
+# Trace replay
+# ----------------------------------------------------------------------
+
+@dataclass
+class TraceRecord:
+    """One model request; size and load time are optional hints"""
+    ts: float
+    model: str
+    size_gb: Optional[float] = None
+    load_seconds: Optional[float] = None
+
+
+@dataclass
+class SimulationResult:
+    policy: str
+    requests: int = 0
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    rejected: int = 0  # Larger than the whole budget
+    reload_seconds: float = 0.0
+    loaded_gb: float = 0.0
+    evicted: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.requests if self.requests else 0.0
+
+
+def load_trace(path: str) -> List[TraceRecord]:
+    """
+    Read a JSONL trace as written by ``VRAMManager(trace_path=...)``.
+
+    ``{"event": "request", "ts", "model", "size_gb"}`` lines become records;
+    ``{"event": "load", "model", "load_seconds"}`` lines attach measured load
+    times to that model's requests. Lines without "event" count as requests.
+    """
+    records: List[TraceRecord] = []
+    load_times: Dict[str, float] = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            event = entry.get('event', 'request')
+            if event == 'load' and entry.get('load_seconds') is not None:
+                load_times[entry['model']] = float(entry['load_seconds'])
+            elif event == 'request' and entry.get('model'):
+                records.append(TraceRecord(float(entry.get('ts', entry.get('timestamp', 0.0))), entry['model'],
+                                           entry.get('size_gb'), entry.get('load_seconds')))
+    for record in records:
+        if record.load_seconds is None:
+            record.load_seconds = load_times.get(record.model)
+    records.sort(key=lambda record: record.ts)
+    return records
+
+
+def simulate(trace: Iterable[TraceRecord], policy: EvictionPolicy, capacity_gb: float,
+             sizes: Optional[Dict[str, float]] = None,
+             load_seconds: Optional[Callable[[str, float], float]] = None) -> SimulationResult:
+    """
+    Replay ``trace`` against a VRAM budget managed by ``policy``.
+
+    Sizes come from the record, then ``sizes``, then the default. The true cost
+    of a load is ``load_seconds(model, size_gb)`` when given and not None, else
+    the record's load time, else the tracker's size-based estimate; the policy
+    only learns it by observing loads, as it would live.
+    """
+    sizes = sizes or {}
+    result = SimulationResult(policy.name)
+    loaded: Dict[str, float] = {}
+    used = 0.0
+    for record in trace:
+        result.requests += 1
+        size_gb = record.size_gb or sizes.get(record.model, DEFAULT_MODEL_SIZE_GB)
+        if record.model in loaded:
+            result.hits += 1
+            policy.on_request(record.model, size_gb, record.ts)
+            continue
+
+        result.misses += 1
+        if size_gb > capacity_gb:
+            result.rejected += 1
+            continue
+        needed = used + size_gb - capacity_gb
+        if needed > 1e-9:
+            evictions = policy.choose_evictions(dict(loaded), needed, record.ts) or []
+            for model_id in evictions:
+                used -= loaded.pop(model_id)
+                policy.on_unload(model_id)
+                result.evictions += 1
+                result.evicted[model_id] = result.evicted.get(model_id, 0) + 1
+
+        cost = load_seconds(record.model, size_gb) if load_seconds is not None else None
+        if cost is None:
+            cost = record.load_seconds
+        if cost is None:
+            cost = policy.tracker.load_seconds(record.model, size_gb)
+        loaded[record.model] = size_gb
+        used += size_gb
+        result.reload_seconds += cost
+        result.loaded_gb += size_gb
+        policy.on_load(record.model, size_gb, cost, record.ts)
+        policy.on_request(record.model, size_gb, record.ts)
+    return result
@@ -5,25 +5,44 @@ This module provides intelligent model management for systems with limited VRAM,
 ensuring optimal performance while preventing memory exhaustion.
 """
 
+import json
+import time
 import asyncio
 import logging
 import psutil
 import subprocess
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
 from datetime import datetime, timedelta
 
+from core.model_registry import ModelRegistry, RegistryEvent, RegistrySnapshot, get_model_registry
+from core.vram_eviction import EvictionPolicy, make_eviction_policy
+from core.model_footprint import FootprintKey, ModelFootprintProfiler, get_footprint_profiler
+
 logger = logging.getLogger(__name__)
 
+# Loads that return this fast (e.g. already resident) say nothing about reload cost
+MIN_MEASURED_LOAD_SECONDS = 0.05
+
 class VRAMManager:
     """Manages VRAM usage and model loading for 8GB systems"""
     
-    def __init__(self, max_vram_gb: float = 7.5):
+    def __init__(self, max_vram_gb: float = 7.5, registry: Optional[ModelRegistry] = None,
+                 eviction_policy: Union[str, EvictionPolicy] = "knapsack", trace_path: Optional[str] = None,
+                 footprints: Optional[ModelFootprintProfiler] = None,
+                 loader: Optional[Callable[[str], Awaitable[bool]]] = None):
         self.max_vram_gb = max_vram_gb
         self.current_vram_usage = 0.0
         self.loaded_models = {}
         self.model_vram_usage = {}
         self.last_activity = {}
         self.unload_timeout = 600  # 10 minutes
+        
+        # Picks evictions from measured load times, request rates and sizes (see core/vram_eviction.py)
+        if isinstance(eviction_policy, str):
+            eviction_policy = make_eviction_policy(eviction_policy)
+        self.eviction_policy = eviction_policy
+        # Optional JSONL log of requests and loads, replayable by benchmark_vram_eviction.py
+        self.trace_path = trace_path
           # Model size estimates (in GB) - Updated for latest models
         self.model_sizes = {
             # Ollama models (latest)
@@ -80,12 +99,65 @@ class VRAMManager:
             "vllm/microsoft/phi-2": 1.4,
         }
         
+        # Measured footprints override the size table below (see core/model_footprint.py)
+        self.footprints = footprints or get_footprint_profiler()
+        # Provider call that really loads a model; without one, loads are bookkeeping only
+        # and neither their memory nor their duration is measured
+        self.loader = loader
+        
+        # Follow what the providers actually have loaded, as seen by the shared registry;
+        # the profiler subscribes first so provider-reported sizes are recorded before we sync
+        self.registry = registry or get_model_registry()
+        self.footprints.attach_registry(self.registry)
+        self.registry.subscribe(self.sync_with_registry)
+        if self.registry.current().version:
+            self.sync_with_registry(self.registry.current())
+        
         # Start cleanup task
-        asyncio.create_task(self.cleanup_unused_models())
+        self._cleanup_task = asyncio.create_task(self.cleanup_unused_models())
+    
+    def close(self):
+        """Stop the cleanup task and stop receiving registry updates"""
+        self._cleanup_task.cancel()
+        self.registry.unsubscribe(self.sync_with_registry)
+        self.footprints.detach_registry(self.registry)
+    
+    def sync_with_registry(self, snapshot: RegistrySnapshot, events: Optional[List[RegistryEvent]] = None):
+        """Reconcile loaded_models with the models online providers report as loaded"""
+        reported = {model.key: model for model in snapshot.models(loaded_only=True)}
+        gone_offline = {event.provider for event in events or () if event.kind == 'provider_offline'}
+        
+        for model_id, model_info in list(self.loaded_models.items()):
+            provider = model_info['provider']
+            if model_id not in reported and (snapshot.is_online(provider) or provider in gone_offline):
+                del self.loaded_models[model_id]
+                self.last_activity.pop(model_id, None)
+                logger.info(f"Provider no longer reports {model_id} as loaded")
+        
+        for model_id, model in reported.items():
+            if model_id not in self.loaded_models:
+                size_gb = self.estimate_model_size(model_id,
+                                                   default=model.size_bytes / (1024**3) if model.size_bytes else 4.0)
+                self.loaded_models[model_id] = {
+                    'loaded_at': datetime.now(),
+                    'provider': model.provider,
+                    'size_gb': size_gb
+                }
+                self.last_activity.setdefault(model_id, datetime.now())
+        
+        self.current_vram_usage = sum(model_info['size_gb'] for model_info in self.loaded_models.values())
+    
+    def estimate_model_size(self, model_id: str, context_length: int = 0, default: float = 4.0) -> float:
+        """VRAM a model needs in GB: measured if it has been profiled, else the size table"""
+        provider, _, model = model_id.partition('/')
+        measured = self.footprints.estimate_gb(provider, model, context_length=context_length)
+        if measured is not None:
+            return measured
+        return self.model_sizes.get(model_id, default)
     
-    async def can_load_model(self, model_id: str) -> bool:
+    async def can_load_model(self, model_id: str, context_length: int = 0) -> bool:
         """Check if model can be loaded without exceeding VRAM limit"""
-        model_size = self.model_sizes.get(model_id, 4.0)  # Default 4GB if unknown
+        model_size = self.estimate_model_size(model_id, context_length)  # Default 4GB if unknown
         
         if model_id in self.loaded_models:
             return True  # Already loaded
@@ -113,28 +185,33 @@ class VRAMManager:
         # If no preferred model can be loaded, try to free space
         logger.warning("⚠️ No preferred model can be loaded, attempting to free VRAM...")
         
-        # Unload least recently used models
-        await self.free_vram_for_model(model_preferences[0])
-        
-        # Try again
+        # Make room for the first preference that fits at all, evicting at the lowest reload cost
         for model_id in model_preferences:
-            if await self.can_load_model(model_id):
-                if await self.load_model(model_id):
-                    logger.info(f"Loaded model after cleanup: {model_id}")
-                    return model_id
+            if self.estimate_model_size(model_id) > self.max_vram_gb:
+                continue
+            await self.free_vram_for_model(model_id)
+            if await self.can_load_model(model_id) and await self.load_model(model_id):
+                logger.info(f"Loaded model after cleanup: {model_id}")
+                return model_id
         
-        # Fallback to smallest loaded model
+        # Fallback to the loaded model agents have been using most
         if self.loaded_models:
-            smallest_model = min(self.loaded_models.keys(), 
-                                key=lambda x: self.model_sizes.get(x, 4.0))
-            logger.warning(f"⚠️ Falling back to smallest loaded model: {smallest_model}")
-            return smallest_model
+            now = time.monotonic()
+            busiest_model = max(self.loaded_models.keys(),
+                                key=lambda x: self.eviction_policy.tracker.request_rate(x, now))
+            logger.warning(f"⚠️ Falling back to loaded model: {busiest_model}")
+            return busiest_model
         
         logger.error("❌ No models available - VRAM management failed")
         return None
     
     async def load_model(self, model_id: str) -> bool:
         """Load a model if VRAM allows"""
+        # Load decisions are serialised across every manager sharing the registry
+        async with self.registry.load_lock:
+            return await self._load_model(model_id)
+    
+    async def _load_model(self, model_id: str) -> bool:
         try:
             if model_id in self.loaded_models:
                 await self.update_model_activity(model_id)
@@ -144,18 +221,41 @@ class VRAMManager:
                 logger.warning(f"⚠️ Cannot load {model_id} - insufficient VRAM")
                 return False
             
-            # Simulate model loading (in real implementation, this would call the actual model API)
-            model_size = self.model_sizes.get(model_id, 4.0)
+            model_size = self.estimate_model_size(model_id)
             
             # Check if we need to free space for large models
             if model_size > 5.0:  # Large model threshold
                 await self.ensure_single_large_model(model_id)
             
+            load_seconds = None
+            if self.loader is not None:
+                timing = {}
+                
+                async def load():
+                    started = time.perf_counter()
+                    loaded = await self.loader(model_id)
+                    timing['seconds'] = time.perf_counter() - started
+                    return loaded
+                
+                # Record what the load really allocated; the load_lock keeps other loads out of the window
+                provider, _, model = model_id.partition('/')
+                loaded, measured_mb = await self.footprints.measure_load(FootprintKey.for_model(provider, model), load)
+                if loaded is False:
+                    logger.warning(f"⚠️ Provider failed to load {model_id}")
+                    return False
+                if measured_mb is not None:
+                    model_size = self.estimate_model_size(model_id)
+                if timing['seconds'] >= MIN_MEASURED_LOAD_SECONDS:
+                    load_seconds = timing['seconds']
+            
             self.loaded_models[model_id] = {
                 'loaded_at': datetime.now(),
                 'provider': model_id.split('/')[0],
                 'size_gb': model_size
             }
+            self.eviction_policy.on_load(model_id, model_size, load_seconds)
+            self._record_trace({'event': 'load', 'model': model_id, 'size_gb': model_size,
+                                'load_seconds': load_seconds})
             
             self.current_vram_usage += model_size
             await self.update_model_activity(model_id)
@@ -182,6 +282,7 @@ class VRAMManager:
             
             if model_id in self.last_activity:
                 del self.last_activity[model_id]
+            self.eviction_policy.on_unload(model_id)
             
             logger.info(f"Unloaded model {model_id} ({model_size}GB), remaining VRAM: {self.current_vram_usage:.1f}GB")
             return True
@@ -192,7 +293,7 @@ class VRAMManager:
     
     async def ensure_single_large_model(self, new_model_id: str):
         """Ensure only one large model (>5GB) is loaded at a time"""
-        new_model_size = self.model_sizes.get(new_model_id, 4.0)
+        new_model_size = self.estimate_model_size(new_model_id)
         
         if new_model_size <= 5.0:
             return  # Not a large model
@@ -207,35 +308,54 @@ class VRAMManager:
             await self.unload_model(model_id)
             logger.info(f"Unloaded large model {model_id} to make room for {new_model_id}")
     
+    def plan_evictions(self, needed_gb: float, exclude: Optional[set] = None) -> Optional[List[str]]:
+        """Loaded models whose unloading frees needed_gb at the lowest expected reload cost"""
+        exclude = exclude or set()
+        candidates = {
+            model_id: model_info['size_gb'] for model_id, model_info in self.loaded_models.items()
+            if model_id not in exclude
+        }
+        return self.eviction_policy.choose_evictions(candidates, needed_gb, time.monotonic())
+    
     async def free_vram_for_model(self, target_model_id: str):
         """Free VRAM to make space for a target model"""
-        target_size = self.model_sizes.get(target_model_id, 4.0)
+        target_size = self.estimate_model_size(target_model_id)
         needed_space = target_size - (self.max_vram_gb - self.current_vram_usage)
         
         if needed_space <= 0:
             return  # Already enough space
         
-        # Sort models by last activity (oldest first)
-        models_by_activity = sorted(
-            self.last_activity.items(),
-            key=lambda x: x[1]
-        )
+        evictions = self.plan_evictions(needed_space, exclude={target_model_id})
+        if evictions is None:
+            logger.warning(f"⚠️ Cannot free {needed_space:.1f}GB for {target_model_id}")
+            return
         
         freed_space = 0
-        for model_id, _ in models_by_activity:
-            if freed_space >= needed_space:
-                break
-            
-            if model_id in self.loaded_models:
-                model_size = self.loaded_models[model_id]['size_gb']
-                await self.unload_model(model_id)
-                freed_space += model_size
+        for model_id in evictions:
+            model_size = self.loaded_models[model_id]['size_gb']
+            await self.unload_model(model_id)
+            freed_space += model_size
         
-        logger.info(f"Freed {freed_space:.1f}GB VRAM for {target_model_id}")
+        logger.info(f"Freed {freed_space:.1f}GB VRAM for {target_model_id} "
+                    f"({self.eviction_policy.name}: {', '.join(evictions)})")
     
     async def update_model_activity(self, model_id: str):
         """Update last activity time for a model"""
         self.last_activity[model_id] = datetime.now()
+        size_gb = self.loaded_models.get(model_id, {}).get('size_gb') or self.estimate_model_size(model_id)
+        self.eviction_policy.on_request(model_id, size_gb)
+        self._record_trace({'event': 'request', 'model': model_id, 'size_gb': size_gb})
+    
+    def _record_trace(self, entry: Dict[str, Any]):
+        """Append one event to the trace log, if enabled"""
+        if not self.trace_path:
+            return
+        try:
+            with open(self.trace_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps({'ts': time.time(), **entry}) + '\n')
+        except OSError as e:
+            logger.warning(f"Could not write VRAM trace: {e}")
+            self.trace_path = None
     
     async def cleanup_unused_models(self):
         """Periodically unload unused models"""
@@ -430,7 +550,7 @@ class ModelRotationManager:
             if preferred_model not in current_models:
                 if await self.vram_manager.can_load_model(preferred_model):
                     # Unload least important model first
-                    await self._unload_least_important_model(task_type)
+                    await self._unload_least_important_model(task_type, preferred_model)
                     
                     if await self.vram_manager.load_model(preferred_model):
                         self.last_rotation = datetime.now()
@@ -444,16 +564,24 @@ class ModelRotationManager:
         
         return None
     
-    async def _unload_least_important_model(self, current_task_type: str):
-        """Unload the least important model for current task"""
+    async def _unload_least_important_model(self, current_task_type: str, incoming_model: Optional[str] = None):
+        """Unload the models that are cheapest to lose, keeping those relevant to the current task"""
         # Priority: keep models relevant to current task
         task_relevant_models = self._get_task_relevant_models(current_task_type)
+        protected = {
+            model_id for model_id in self.vram_manager.loaded_models
+            if model_id in task_relevant_models or self.vram_manager.is_essential_model(model_id)
+        }
+        
+        # Room for the incoming model, or at least one model's worth
+        needed_gb = 0.0
+        if incoming_model:
+            available_gb = self.vram_manager.max_vram_gb - self.vram_manager.current_vram_usage
+            needed_gb = self.vram_manager.estimate_model_size(incoming_model) - available_gb
+        evictions = self.vram_manager.plan_evictions(max(needed_gb, 1e-6), exclude=protected)
         
-        for model_id in self.vram_manager.loaded_models.keys():
-            if (model_id not in task_relevant_models and 
-                not self.vram_manager.is_essential_model(model_id)):
-                await self.vram_manager.unload_model(model_id)
-                break
+        for model_id in evictions or []:
+            await self.vram_manager.unload_model(model_id)
     
     def _get_task_relevant_models(self, task_type: str) -> List[str]:
         """Get models that are relevant for the current task type"""
@@ -8,9 +8,11 @@ import aiohttp
 import json
 import logging
 import yaml
-from typing import Dict, Any, List, Optional
+from typing import AsyncIterator, Dict, Any, List, Optional
 from pathlib import Path
 
+from core.llm_streaming import build_openai_stream_payload, iter_ollama_stream, iter_openai_sse
+
 try:
     from openai import OpenAI
     OPENAI_AVAILABLE = True
@@ -20,6 +22,25 @@ except ImportError:
 class WorkingLLMManager:
     """Working LLM Manager that connects to actual local models"""
     
+    # Map descriptive role names to config keys
+    ROLE_MAPPING = {
+        'System Architect': 'architect',
+        'Architect Agent': 'architect', 
+        'architect': 'architect',
+        'Backend Developer': 'backend_dev',
+        'Backend Agent': 'backend_dev',
+        'backend': 'backend_dev',
+        'Frontend Developer': 'frontend_dev', 
+        'Frontend Agent': 'frontend_dev',
+        'frontend': 'frontend_dev',
+        'QA Analyst': 'qa_analyst',
+        'QA Agent': 'qa_analyst',
+        'qa': 'qa_analyst',
+        'Project Orchestrator': 'orchestrator',
+        'Orchestrator Agent': 'orchestrator',
+        'orchestrator': 'orchestrator'
+    }
+    
     def __init__(self, config_path: str = "config/models_config.yaml"):
         self.logger = logging.getLogger("WorkingLLM")
         self.config_path = Path(config_path)
@@ -115,27 +136,8 @@ class WorkingLLMManager:
     async def generate_response(self, agent_role: str, prompt: str, **kwargs) -> Dict[str, Any]:
         """Generate response using appropriate model for agent role"""
         
-        # Map descriptive role names to config keys
-        role_mapping = {
-            'System Architect': 'architect',
-            'Architect Agent': 'architect', 
-            'architect': 'architect',
-            'Backend Developer': 'backend_dev',
-            'Backend Agent': 'backend_dev',
-            'backend': 'backend_dev',
-            'Frontend Developer': 'frontend_dev', 
-            'Frontend Agent': 'frontend_dev',
-            'frontend': 'frontend_dev',
-            'QA Analyst': 'qa_analyst',
-            'QA Agent': 'qa_analyst',
-            'qa': 'qa_analyst',
-            'Project Orchestrator': 'orchestrator',
-            'Orchestrator Agent': 'orchestrator',
-            'orchestrator': 'orchestrator'
-        }
-        
         # Get the config key for this role
-        config_key = role_mapping.get(agent_role, agent_role)
+        config_key = self.ROLE_MAPPING.get(agent_role, agent_role)
         
         # Get model for agent role
         model = self.agent_model_map.get(config_key)
@@ -157,6 +159,72 @@ class WorkingLLMManager:
             self.logger.error(f"Error generating response with {model}: {e}")
             return await self._generate_fallback_response(prompt)
 
+    async def generate_response_stream(self, agent_role: str, prompt: str,
+                                       stream_info: Optional[Dict[str, Any]] = None, **kwargs) -> AsyncIterator[str]:
+        """Stream response text chunks as the model produces them.
+
+        If ``stream_info`` is given it is filled with the model, provider and
+        success flag that generate_response would have returned.
+        """
+        config_key = self.ROLE_MAPPING.get(agent_role, agent_role)
+        model = self.agent_model_map.get(config_key)
+        if stream_info is None:
+            stream_info = {}
+
+        started = False
+        if model:
+            provider, model_name = model.split('/', 1)
+            try:
+                if provider == "lmstudio":
+                    base_url = self.active_providers.get('lmstudio', {}).get('base_url', "http://localhost:1234")
+                    payload = build_openai_stream_payload(
+                        model_name, prompt,
+                        temperature=kwargs.get('temperature', 0.3),
+                        top_p=kwargs.get('top_p', 0.9),
+                        max_tokens=min(kwargs.get('max_tokens', 512), 1024)
+                    )
+                    url, parse = f"{base_url}/v1/chat/completions", iter_openai_sse
+                elif provider == "ollama":
+                    base_url = self.active_providers['ollama']['base_url']
+                    payload = {
+                        "model": model_name,
+                        "prompt": prompt,
+                        "stream": True,
+                        "options": {
+                            "temperature": kwargs.get('temperature', 0.7),
+                            "num_predict": kwargs.get('max_tokens', 2048)
+                        }
+                    }
+                    url, parse = f"{base_url}/api/generate", iter_ollama_stream
+                else:
+                    url = None
+
+                if url:
+                    stream_info.update({"model": model_name, "provider": provider, "success": True})
+                    # Bound the wait for the first byte, not the whole generation
+                    timeout = aiohttp.ClientTimeout(total=None, sock_connect=10, sock_read=30)
+                    async with aiohttp.ClientSession(timeout=timeout) as session:
+                        async with session.post(url, json=payload) as response:
+                            if response.status != 200:
+                                raise Exception(f"{provider} API error: {response.status}")
+                            async for chunk in parse(response):
+                                started = True
+                                yield chunk
+                    return
+
+            except Exception as e:
+                self.logger.error(f"Error streaming response with {model}: {e}")
+                stream_info["success"] = False
+                # Chunks already delivered cannot be retracted
+                if started:
+                    return
+        else:
+            self.logger.warning(f"No model found for role '{agent_role}' (mapped to '{config_key}')")
+
+        fallback = await self._generate_fallback_response(prompt)
+        stream_info.update({key: fallback[key] for key in ("model", "provider", "success")})
+        yield fallback["content"]
+
     async def _generate_lmstudio_response(self, model: str, prompt: str, **kwargs) -> Dict[str, Any]:
         """Generate response using LM Studio with OpenAI client"""
         if not OPENAI_AVAILABLE:
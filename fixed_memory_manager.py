@@ -13,6 +13,9 @@ from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 from dataclasses import dataclass, field
 
+from core.model_registry import ModelRegistry, RegistryEvent, RegistrySnapshot, RegisteredModel, get_model_registry
+from core.model_footprint import ModelFootprintProfiler, get_footprint_profiler
+
 @dataclass
 class ModelInfo:
     """Information about a model"""
@@ -27,15 +30,22 @@ class ModelInfo:
 class MemoryAwareModelManager:
     """Model manager that respects VRAM limitations and detects loaded models"""
     
-    def __init__(self, max_vram_mb: int = 7000):
+    def __init__(self, max_vram_mb: int = 7000, registry: Optional[ModelRegistry] = None,
+                 footprints: Optional[ModelFootprintProfiler] = None):
         self.logger = logging.getLogger("MemoryAwareModelManager")
+        self.registry = registry or get_model_registry()
+        # Measured footprints replace the name-based VRAM guesses once a model has been seen loaded
+        self.footprints = footprints or get_footprint_profiler()
+        self.registry.subscribe(self.footprints.observe_registry)
         self.max_vram_mb = max_vram_mb
         self.current_vram_usage = 0
         
         # Model tracking
         self.available_models: Dict[str, ModelInfo] = {}
         self.loaded_models: List[str] = []
-          # Provider configs
+        self._offline_providers = set()
+        
+        # Provider configs
         self.providers = {
             'lmstudio': {
                 'base_url': 'http://localhost:1234',
@@ -72,184 +82,73 @@ class MemoryAwareModelManager:
         status = await self.get_memory_status()
         self.logger.info(f"Current VRAM usage: {status['current_usage_mb']}MB / {status['max_vram_mb']}MB")
     
-    async def _discover_and_check_models(self):
+    async def _discover_and_check_models(self, max_age: Optional[float] = None):
         """Discover models and check which are actually loaded"""
         self.logger.info("Discovering models and checking load status...")
         
-        # Check LM Studio
-        await self._check_lmstudio_models()
-        
-        # Check Ollama
-        await self._check_ollama_models()
-        
-        # Check vLLM
-        await self._check_vllm_models()
+        # Providers' listings from the shared registry replace a test generation per model
+        snapshot = await self.registry.snapshot(max_age=max_age)
+        self._apply_snapshot(snapshot)
+        self.registry.subscribe(self._on_registry_change)
     
-    async def _check_lmstudio_models(self):
-        """Check LM Studio models and detect loaded ones"""
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    f"{self.providers['lmstudio']['base_url']}/v1/models",
-                    timeout=aiohttp.ClientTimeout(total=5)
-                ) as resp:
-                    if resp.status == 200:
-                        data = await resp.json()
-                        loaded_count = 0
-                        
-                        for model in data.get('data', []):
-                            model_id = model.get('id', '')
-                            model_key = f"lmstudio:{model_id}"
-                            
-                            # Test if model is actually loaded
-                            is_loaded = await self._test_model_responsiveness(model_id, 'lmstudio')
-                            
-                            model_info = ModelInfo(
-                                provider='lmstudio',
-                                model_id=model_id,
-                                estimated_vram_mb=self._estimate_vram_from_name(model_id),
-                                is_loaded=is_loaded,
-                                last_used=datetime.now() if is_loaded else datetime.min
-                            )
-                            
-                            self.available_models[model_key] = model_info
-                            
-                            if is_loaded:
-                                self.loaded_models.append(model_key)
-                                loaded_count += 1
-                        
-                        self.logger.info(f"LM Studio: {len(data.get('data', []))} models available, {loaded_count} loaded")
-                        
-        except Exception as e:
-            self.logger.warning(f"LM Studio check failed: {e}")
-    
-    async def _check_ollama_models(self):
-        """Check Ollama models and detect loaded ones"""
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    f"{self.providers['ollama']['base_url']}/api/tags",
-                    timeout=aiohttp.ClientTimeout(total=5)
-                ) as resp:
-                    if resp.status == 200:
-                        data = await resp.json()
-                        loaded_count = 0
-                        
-                        for model in data.get('models', []):
-                            model_name = model.get('name', '')
-                            size_mb = model.get('size', 0) // (1024 * 1024)
-                            model_key = f"ollama:{model_name}"
-                            
-                            # Test if model is loaded and responsive
-                            is_loaded = await self._test_model_responsiveness(model_name, 'ollama')
-                            
-                            model_info = ModelInfo(
-                                provider='ollama',
-                                model_id=model_name,
-                                estimated_vram_mb=max(size_mb, self._estimate_vram_from_name(model_name)),
-                                is_loaded=is_loaded,
-                                last_used=datetime.now() if is_loaded else datetime.min
-                            )
-                            
-                            self.available_models[model_key] = model_info
-                            
-                            if is_loaded:
-                                self.loaded_models.append(model_key)
-                                loaded_count += 1
-                        
-                        self.logger.info(f"Ollama: {len(data.get('models', []))} models available, {loaded_count} loaded")
-                        
-        except Exception as e:
-            self.logger.warning(f"Ollama check failed: {e}")
-    
-    async def _check_vllm_models(self):
-        """Check vLLM models and detect loaded ones"""
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    f"{self.providers['vllm']['base_url']}/v1/models",
-                    timeout=aiohttp.ClientTimeout(total=5)
-                ) as resp:
-                    if resp.status == 200:
-                        data = await resp.json()
-                        loaded_count = 0
-                        
-                        for model in data.get('data', []):
-                            model_id = model.get('id', '')
-                            model_key = f"vllm:{model_id}"
-                            
-                            # Test if model is actually loaded and responsive
-                            is_loaded = await self._test_model_responsiveness(model_id, 'vllm')
-                            
-                            model_info = ModelInfo(
-                                provider='vllm',
-                                model_id=model_id,
-                                estimated_vram_mb=self._estimate_vram_from_name(model_id),
-                                is_loaded=is_loaded,
-                                last_used=datetime.now() if is_loaded else datetime.min                            )
-                            
-                            self.available_models[model_key] = model_info
-                            
-                            if is_loaded:
-                                self.loaded_models.append(model_key)
-                                loaded_count += 1
-                        
-                        self.logger.info(f"vLLM: {len(data.get('data', []))} models available, {loaded_count} loaded")
-                        
-        except Exception as e:
-            self.logger.warning(f"vLLM check failed: {e}")
+    def _on_registry_change(self, snapshot: RegistrySnapshot, events: List[RegistryEvent]):
+        """Registry subscriber: keep load status in step with every other manager's view"""
+        self._apply_snapshot(snapshot)
     
-    async def _test_model_responsiveness(self, model_id: str, provider: str) -> bool:
-        """Test if a model is actually loaded and responsive"""
-        try:
-            if provider == 'lmstudio':
-                async with aiohttp.ClientSession() as session:
-                    payload = {
-                        "model": model_id,
-                        "messages": [{"role": "user", "content": "test"}],
-                        "max_tokens": 1,
-                        "temperature": 0
-                    }
-                    async with session.post(
-                        f"{self.providers['lmstudio']['base_url']}/v1/chat/completions",
-                        json=payload,
-                        timeout=aiohttp.ClientTimeout(total=3)
-                    ) as resp:
-                        return resp.status == 200
+    def _apply_snapshot(self, snapshot: RegistrySnapshot):
+        """Update available and loaded models from a registry snapshot"""
+        labels = {'lmstudio': 'LM Studio', 'ollama': 'Ollama', 'vllm': 'vLLM'}
+        for provider in self.providers:
+            state = snapshot.providers.get(provider)
+            label = labels.get(provider, provider)
+            if state is None or not state.online:
+                # Warn once per outage, not on every snapshot
+                if provider not in self._offline_providers:
+                    self.logger.warning(f"{label} not available: {state.error if state else 'not in registry'}")
+                self._offline_providers.add(provider)
+                listed = {}
+            else:
+                self._offline_providers.discard(provider)
+                listed = {model.model_id: model for model in state.models}
             
-            elif provider == 'ollama':
-                async with aiohttp.ClientSession() as session:
-                    payload = {
-                        "model": model_id,
-                        "prompt": "test",
-                        "stream": False
-                    }
-                    async with session.post(
-                        f"{self.providers['ollama']['base_url']}/api/generate",
-                        json=payload,
-                        timeout=aiohttp.ClientTimeout(total=3)
-                    ) as resp:
-                        return resp.status == 200
-                        
-            elif provider == 'vllm':
-                async with aiohttp.ClientSession() as session:
-                    payload = {
-                        "model": model_id,
-                        "messages": [{"role": "user", "content": "test"}],
-                        "max_tokens": 1,
-                        "temperature": 0
-                    }
-                    async with session.post(
-                        f"{self.providers['vllm']['base_url']}/v1/chat/completions",
-                        json=payload,
-                        timeout=aiohttp.ClientTimeout(total=3)
-                    ) as resp:
-                        return resp.status == 200
-                        
-        except Exception:
-            return False
+            for model_id, model in listed.items():
+                model_key = f"{provider}:{model_id}"
+                model_info = self.available_models.get(model_key)
+                if model_info is None:
+                    model_info = ModelInfo(
+                        provider=provider,
+                        model_id=model_id,
+                        last_used=datetime.now() if model.loaded else datetime.min
+                    )
+                    self.available_models[model_key] = model_info
+                model_info.estimated_vram_mb = self._estimate_vram(provider, model)
+                if model.loaded and not model_info.is_loaded:
+                    model_info.last_used = datetime.now()
+                model_info.is_loaded = model.loaded
+            
+            # Models the provider no longer lists are not loaded
+            for model_info in self.available_models.values():
+                if model_info.provider == provider and model_info.model_id not in listed:
+                    model_info.is_loaded = False
+            
+            if listed:
+                loaded_count = sum(1 for model in listed.values() if model.loaded)
+                self.logger.info(f"{label}: {len(listed)} models available, {loaded_count} loaded")
         
-        return False
+        # Keep the order models were loaded in; newly loaded ones go last
+        loaded = {key for key, model_info in self.available_models.items() if model_info.is_loaded}
+        self.loaded_models = [key for key in self.loaded_models if key in loaded] + sorted(loaded - set(self.loaded_models))
+        self.current_vram_usage = sum(self.available_models[key].estimated_vram_mb for key in self.loaded_models)
+    
+    def _estimate_vram(self, provider: str, model: RegisteredModel) -> int:
+        """Measured footprint if the model has been profiled, else a guess from its name and file size"""
+        measured_mb = self.footprints.estimate_mb(provider, model.model_id)
+        if measured_mb is not None:
+            return int(measured_mb)
+        estimated_vram_mb = self._estimate_vram_from_name(model.model_id)
+        if model.size_bytes:
+            estimated_vram_mb = max(model.size_bytes // (1024 * 1024), estimated_vram_mb)
+        return estimated_vram_mb
     
     def _estimate_vram_from_name(self, model_name: str) -> int:
         """Estimate VRAM usage from model name"""
@@ -307,10 +206,9 @@ class MemoryAwareModelManager:
         candidates.sort(key=lambda x: x[2], reverse=True)
         best_key, best_model, score = candidates[0]
         
-        # Try to load the best model if we have VRAM space
-        if await self._can_load_model(best_model):
-            success = await self._load_model(best_key)
-            if success:
+        # Try to load the best model if we have VRAM space; one manager decides at a time
+        async with self.registry.load_lock:
+            if await self._can_load_model(best_model) and await self._load_model(best_key):
                 return best_key
         
         # Return best loaded model as fallback
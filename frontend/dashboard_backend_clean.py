@@ -20,7 +20,7 @@ import json
 sys.path.append(str(Path(__file__).parent.parent))
 
 try:
-    from fastapi import FastAPI, HTTPException
+    from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
     from fastapi.middleware.cors import CORSMiddleware
     from pydantic import BaseModel
     import uvicorn
@@ -30,6 +30,7 @@ except ImportError as e:
     print(f"FastAPI/Pydantic import failed: {e}")
     WEB_AVAILABLE = False
     FastAPI = HTTPException = CORSMiddleware = BaseModel = uvicorn = None
+    WebSocket = WebSocketDisconnect = None
 
 # Try to import additional components
 try:
@@ -43,6 +44,13 @@ except ImportError:
         AGENT_MANAGER_AVAILABLE = False
         EnhancedAgentManager = None
 
+try:
+    from agents.base_agent import BaseAgent
+    BASE_AGENT_AVAILABLE = True
+except ImportError:
+    BASE_AGENT_AVAILABLE = False
+    BaseAgent = None
+
 try:
     from utils.workspace_analyzer import WorkspaceAnalyzer
     WORKSPACE_ANALYZER_AVAILABLE = True
@@ -207,6 +215,11 @@ class CleanDashboardBackend:
             """Get recent system logs"""
             return await self.get_system_logs()
 
+        @self.app.websocket("/ws")
+        async def websocket_endpoint(websocket: WebSocket):
+            """Real-time updates, including streamed agent LLM tokens"""
+            await self.handle_websocket(websocket)
+
         # Workspace endpoints
         @self.app.post("/workspace/analyze")
         async def analyze_workspace(request: dict):
@@ -326,7 +339,14 @@ class CleanDashboardBackend:
                 self.add_log("agents", "Enhanced Agent Manager initialized successfully")
             else:
                 self.agent_manager_available = False
-                self.add_log("agents", "Agent Manager not available", "warning")            # Initialize model manager
+                self.add_log("agents", "Agent Manager not available", "warning")
+
+            # Stream LLM tokens of every agent in this process to /ws
+            if BASE_AGENT_AVAILABLE and BaseAgent is not None:
+                BaseAgent.add_global_token_listener(self.broadcast_llm_event)
+                self.add_log("agents", "Forwarding agent LLM streams to dashboard websockets")
+
+            # Initialize model manager
             if MODEL_MANAGER_AVAILABLE and IntelligentModelManager is not None:
                 self.model_manager = IntelligentModelManager()
                 await self.model_manager.initialize()
@@ -639,7 +659,10 @@ class CleanDashboardBackend:
             
             if WORKSPACE_ANALYZER_AVAILABLE and WorkspaceAnalyzer is not None:
                 analyzer = WorkspaceAnalyzer()
-                analysis = analyzer.analyze_workspace(workspace_path)
+                # Repeat analyses reuse the persistent workspace index; keep the loop free meanwhile
+                analysis = await asyncio.get_event_loop().run_in_executor(
+                    None, analyzer.analyze_workspace, workspace_path
+                )
                 return {
                     "status": "success",
                     "workspace_path": workspace_path,
@@ -996,6 +1019,35 @@ class CleanDashboardBackend:
             self.logger.error(f"Error getting system logs: {e}")
             return {"status": "error", "message": str(e)}
 
+    # Real-time methods
+    async def handle_websocket(self, websocket):
+        """Keep a dashboard websocket registered until the client disconnects"""
+        await websocket.accept()
+        self.active_websockets.add(websocket)
+        try:
+            await websocket.send_json({"type": "connected", "timestamp": datetime.now().isoformat()})
+            while True:
+                # Clients only listen; reading detects disconnects
+                await websocket.receive_text()
+        except Exception as e:
+            if WebSocketDisconnect is None or not isinstance(e, WebSocketDisconnect):
+                self.logger.debug(f"WebSocket closed: {e}")
+        finally:
+            self.active_websockets.discard(websocket)
+
+    async def broadcast(self, message: Dict[str, Any]):
+        """Send a message to every connected dashboard websocket"""
+        for websocket in list(self.active_websockets):
+            try:
+                await websocket.send_json(message)
+            except Exception:
+                self.active_websockets.discard(websocket)
+
+    async def broadcast_llm_event(self, event: Dict[str, Any]):
+        """Token listener that forwards streamed agent output to the dashboard"""
+        if self.active_websockets:
+            await self.broadcast(event)
+
     async def start_server(self, host="127.0.0.1", port=8001):
         """Start the FastAPI server using uvicorn"""
         if WEB_AVAILABLE and self.app is not None and uvicorn is not None:
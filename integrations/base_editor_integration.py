@@ -17,27 +17,51 @@ from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 from abc import ABC, abstractmethod
 
+from utils.workspace_index import get_workspace_index
+from utils.file_event_pipeline import FileEventPipeline
+
+def apply_index_event(index, event):
+    """Keep the persistent workspace index current from a watchdog event"""
+    try:
+        if event.event_type == 'moved':
+            index.move_path(event.src_path, event.dest_path)
+        elif event.event_type == 'deleted':
+            index.remove_path(event.src_path)
+        elif event.event_type in ('created', 'modified'):
+            index.update_path(event.src_path)
+    except Exception as e:
+        logging.getLogger("WorkspaceIndex").warning(f"Could not apply {event.event_type} event to index: {e}")
+
+def queue_file_event(pipeline, event):
+    """Hand a watchdog file event to the debouncing pipeline; directories are skipped"""
+    if event.is_directory:
+        return
+    if event.event_type == 'moved':
+        pipeline.submit_move(event.src_path, event.dest_path)
+    elif event.event_type in ('created', 'modified', 'deleted'):
+        pipeline.submit(event.event_type, event.src_path)
+
 class EditorFileHandler(FileSystemEventHandler):
     """File system event handler for editor workspace changes"""
     
     def __init__(self, editor_integration):
         self.editor = editor_integration
     
-    def on_modified(self, event):
-        if not event.is_directory:
-            asyncio.create_task(self.editor.handle_file_changed(event.src_path))
-    
-    def on_created(self, event):
-        if not event.is_directory:
-            asyncio.create_task(self.editor.handle_file_created(event.src_path))
-    
-    def on_deleted(self, event):
-        if not event.is_directory:
-            asyncio.create_task(self.editor.handle_file_deleted(event.src_path))
+    def on_any_event(self, event):
+        # Runs on the observer thread: update the index now, defer everything else to the loop
+        apply_index_event(self.editor.workspace_index, event)
+        queue_file_event(self.editor.file_events, event)
 
 class BaseEditorIntegration(ABC):
     """Base class providing identical capabilities for all supported editors"""
     
+    # Handler run once per settled watcher change, by change type
+    file_change_handlers = {
+        'created': 'handle_file_created',
+        'modified': 'handle_file_changed',
+        'deleted': 'handle_file_deleted'
+    }
+    
     def __init__(self, workspace_path: str, config: Dict):
         self.workspace_path = Path(workspace_path)
         self.config = config
@@ -69,6 +93,17 @@ class BaseEditorIntegration(ABC):
         self.file_observer = None
         self.file_handler = EditorFileHandler(self)
         
+        # Watcher events are debounced per path and delivered to the loop in batches
+        self.file_events = FileEventPipeline(
+            self.handle_file_batch,
+            debounce=config.get('file_event_debounce', 0.25),
+            max_delay=config.get('file_event_max_delay', 2.0),
+            max_pending=config.get('file_event_max_pending', 10000)
+        )
+        
+        # Persistent file index, kept live by the file watcher
+        self.workspace_index = get_workspace_index(str(self.workspace_path))
+        
         # Workspace state tracking (identical for all editors)
         self.workspace_state = {
             'open_files': {},
@@ -206,6 +241,7 @@ class BaseEditorIntegration(ABC):
     async def start_file_watching(self):
         """Start file system watching for workspace changes"""
         if self.workspace_path.exists():
+            self.file_events.start()
             self.file_observer = Observer()
             self.file_observer.schedule(
                 self.file_handler,
@@ -213,6 +249,7 @@ class BaseEditorIntegration(ABC):
                 recursive=True
             )
             self.file_observer.start()
+            self.workspace_index.set_watching(True)
             self.logger.info("File watching started")
     
     async def analyze_workspace(self):
@@ -260,12 +297,6 @@ class BaseEditorIntegration(ABC):
             if self.ai_assistance_enabled:
                 await self.trigger_ai_analysis(file_path, 'file_changed')
             
-            # Notify connected clients
-            await self.broadcast_to_clients({
-                'type': 'file_changed',
-                'file': relative_path
-            })
-            
         except Exception as e:
             self.logger.error(f"Error handling file change: {e}")
     
@@ -280,11 +311,6 @@ class BaseEditorIntegration(ABC):
                 'timestamp': asyncio.get_event_loop().time()
             })
             
-            await self.broadcast_to_clients({
-                'type': 'file_created',
-                'file': relative_path
-            })
-            
         except Exception as e:
             self.logger.error(f"Error handling file creation: {e}")
     
@@ -299,14 +325,34 @@ class BaseEditorIntegration(ABC):
                 'timestamp': asyncio.get_event_loop().time()
             })
             
-            await self.broadcast_to_clients({
-                'type': 'file_deleted',
-                'file': relative_path
-            })
-            
         except Exception as e:
             self.logger.error(f"Error handling file deletion: {e}")
     
+    async def handle_file_batch(self, batch):
+        """Run the per-change handlers for one window of settled watcher changes"""
+        changes = []
+        for change in batch.changes:
+            handler = getattr(self, self.file_change_handlers[change.event_type])
+            try:
+                await handler(change.path)
+            except Exception as e:
+                self.logger.error(f"Error handling {change.event_type} change for {change.path}: {e}")
+            changes.append({
+                'type': change.event_type,
+                'file': os.path.relpath(change.path, self.workspace_path)
+            })
+        
+        # One notification per window instead of one per file
+        await self.notify_file_changes({
+            'changes': changes,
+            'overflow': batch.overflow,
+            'dropped': batch.dropped
+        })
+    
+    async def notify_file_changes(self, data: Dict):
+        """Notify connected clients of a batch of file changes"""
+        await self.broadcast_to_clients({'type': 'file_changes', **data})
+    
     # AI assistance methods (identical for all editors)
     async def handle_ai_request(self, data: Dict):
         """Handle general AI assistance requests"""
@@ -618,6 +664,8 @@ class BaseEditorIntegration(ABC):
             if self.file_observer:
                 self.file_observer.stop()
                 self.file_observer.join()
+                self.workspace_index.set_watching(False)
+            await self.file_events.stop()
             
             if self.websocket_server:
                 self.websocket_server.close()
@@ -5,6 +5,7 @@ Inherits all capabilities from BaseEditorIntegration ensuring feature parity wit
 """
 
 import os
+import re
 import json
 import asyncio
 import logging
@@ -14,11 +15,21 @@ from pathlib import Path
 from typing import Dict, List, Optional, Any
 import websockets
 import aiofiles
+from watchdog.observers import Observer
 from .base_editor_integration import BaseEditorIntegration
+from utils.file_content_cache import FileContentCache
+from utils.workspace_search import WorkspaceSearch
 
 class VSCodeInsidersIntegration(BaseEditorIntegration):
     """Integration with VS Code Insiders - Full feature parity with Void Editor"""
     
+    # handle_file_changed receives extension messages here, not watcher paths
+    file_change_handlers = {
+        'created': 'handle_file_created',
+        'modified': 'handle_file_modified',
+        'deleted': 'handle_file_deleted'
+    }
+    
     def __init__(self, workspace_path: str, config: Dict):
         # Initialize with full capabilities from base class
         super().__init__(workspace_path, config)
@@ -34,6 +45,14 @@ class VSCodeInsidersIntegration(BaseEditorIntegration):
         
         # Additional initialization for legacy compatibility
         self.vscode_insiders_path = self.insiders_path
+        
+        # File text is loaded on demand into a bounded cache; workspace state keeps metadata only
+        self.content_cache = FileContentCache(
+            max_bytes=int(config.get('content_cache_mb', 64) * 1024 * 1024),
+            use_mmap=config.get('content_cache_mmap', True)
+        )
+        # Trigram index for search_in_files, fed by workspace index changes
+        self.workspace_search = WorkspaceSearch(self.workspace_index, self.content_cache)
     
     @property
     def editor_name(self) -> str:
@@ -334,72 +353,9 @@ class VSCodeInsidersIntegration(BaseEditorIntegration):
     
     def setup_file_watcher(self):
         """Setup file system watcher for workspace changes"""
-        class WorkspaceFileHandler(FileSystemEventHandler):
-            def __init__(self, integration):
-                self.integration = integration
-            
-            def on_modified(self, event):
-                if not event.is_directory:
-                    # Use threading to safely schedule async task
-                    try:
-                        import threading
-                        import asyncio
-                        def run_async():
-                            try:
-                                loop = asyncio.new_event_loop()
-                                asyncio.set_event_loop(loop)
-                                loop.run_until_complete(self.integration.handle_file_modified(event.src_path))
-                                loop.close()
-                            except Exception as e:
-                                print(f"Error in file watcher: {e}")
-                        
-                        thread = threading.Thread(target=run_async)
-                        thread.daemon = True
-                        thread.start()
-                    except Exception as e:
-                        print(f"Error setting up file watcher task: {e}")
-            
-            def on_created(self, event):
-                if not event.is_directory:
-                    try:
-                        import threading
-                        import asyncio
-                        def run_async():
-                            try:
-                                loop = asyncio.new_event_loop()
-                                asyncio.set_event_loop(loop)
-                                loop.run_until_complete(self.integration.handle_file_created(event.src_path))
-                                loop.close()
-                            except Exception as e:
-                                print(f"Error in file watcher: {e}")
-                        
-                        thread = threading.Thread(target=run_async)
-                        thread.daemon = True
-                        thread.start()
-                    except Exception as e:
-                        print(f"Error setting up file watcher task: {e}")
-            
-            def on_deleted(self, event):
-                if not event.is_directory:
-                    try:
-                        import threading
-                        import asyncio
-                        def run_async():
-                            try:
-                                loop = asyncio.new_event_loop()
-                                asyncio.set_event_loop(loop)
-                                loop.run_until_complete(self.integration.handle_file_deleted(event.src_path))
-                                loop.close()
-                            except Exception as e:
-                                print(f"Error in file watcher: {e}")
-                        
-                        thread = threading.Thread(target=run_async)
-                        thread.daemon = True
-                        thread.start()
-                    except Exception as e:
-                        print(f"Error setting up file watcher task: {e}")
-        
-        self.file_handler = WorkspaceFileHandler(self)
+        # Events reach handle_file_modified/created/deleted through the debounced
+        # pipeline on this loop, once per settled change
+        self.file_events.start()
         self.file_observer = Observer()
         self.file_observer.schedule(
             self.file_handler, 
@@ -407,6 +363,7 @@ class VSCodeInsidersIntegration(BaseEditorIntegration):
             recursive=True
         )
         self.file_observer.start()
+        self.workspace_index.set_watching(True)
         
         self.logger.info(f"File watcher started for: {self.workspace_path}")
     
@@ -414,51 +371,39 @@ class VSCodeInsidersIntegration(BaseEditorIntegration):
         """Scan workspace for initial state"""
         self.logger.info("🔍 Scanning workspace...")
         
-        # Find all code files
+        # Metadata only: the index only re-reads what changed since the last scan,
+        # and file text is loaded on demand through the content cache
         code_extensions = {'.py', '.js', '.ts', '.jsx', '.tsx', '.java', '.cpp', '.c', '.h', '.cs', '.go', '.rs', '.php', '.rb'}
         
-        for file_path in self.workspace_path.rglob('*'):
-            if file_path.is_file() and file_path.suffix in code_extensions:
-                relative_path = file_path.relative_to(self.workspace_path)
-                
-                # Read file content
-                try:
-                    async with aiofiles.open(file_path, 'r', encoding='utf-8') as f:
-                        content = await f.read()
-                    
-                    self.workspace_state['open_files'][str(relative_path)] = {
-                        'content': content,
-                        'language': self.detect_language(file_path.suffix),
-                        'size': len(content),
-                        'last_modified': file_path.stat().st_mtime
-                    }
-                except Exception as e:
-                    self.logger.warning(f"Could not read file {file_path}: {e}")
+        try:
+            changes = await asyncio.get_event_loop().run_in_executor(None, self.workspace_index.refresh)
+            self.logger.info(f"Workspace index refreshed: {changes}")
+        except Exception as e:
+            self.logger.error(f"Workspace index refresh failed: {e}")
+            return
+        
+        code_files = sum(1 for _ in self.workspace_index.iter_files(code_extensions))
+        self.workspace_state['code_files'] = code_files
         
         # Get git status if available
         await self.update_git_status()
         
-        self.logger.info(f"Workspace scan complete: {len(self.workspace_state['open_files'])} files found")
+        self.logger.info(f"Workspace scan complete: {code_files} files found")
     
     async def read_file(self, file_path: str) -> Optional[str]:
         """Read file content from workspace"""
         try:
             full_path = self.workspace_path / file_path
             
-            if not full_path.exists():
+            content = await asyncio.get_event_loop().run_in_executor(
+                None, self.content_cache.get, str(full_path)
+            )
+            if content is None:
                 return None
             
-            async with aiofiles.open(full_path, 'r', encoding='utf-8') as f:
-                content = await f.read()
-            
             # Update workspace state
             relative_path = str(Path(file_path))
-            self.workspace_state['open_files'][relative_path] = {
-                'content': content,
-                'language': self.detect_language(full_path.suffix),
-                'size': len(content),
-                'last_modified': full_path.stat().st_mtime
-            }
+            self._track_open_file(relative_path, full_path, content)
             
             return content
             
@@ -485,15 +430,11 @@ class VSCodeInsidersIntegration(BaseEditorIntegration):
             # Write new content
             async with aiofiles.open(full_path, 'w', encoding='utf-8') as f:
                 await f.write(content)
+            self.content_cache.put(str(full_path), content)
             
             # Update workspace state
             relative_path = str(Path(file_path))
-            self.workspace_state['open_files'][relative_path] = {
-                'content': content,
-                'language': self.detect_language(full_path.suffix),
-                'size': len(content),
-                'last_modified': full_path.stat().st_mtime
-            }
+            self._track_open_file(relative_path, full_path, content)
             
             # Notify VS Code extension
             await self.notify_extension('file_updated', {
@@ -527,6 +468,7 @@ class VSCodeInsidersIntegration(BaseEditorIntegration):
                 return False
             
             full_path.unlink()
+            self.content_cache.invalidate(str(full_path))
             
             # Remove from workspace state
             relative_path = str(Path(file_path))
@@ -559,8 +501,9 @@ class VSCodeInsidersIntegration(BaseEditorIntegration):
                 
                 if include_content:
                     try:
-                        async with aiofiles.open(file_path, 'r', encoding='utf-8') as f:
-                            file_info['content'] = await f.read()
+                        file_info['content'] = await asyncio.get_event_loop().run_in_executor(
+                            None, self.content_cache.get, str(file_path)
+                        )
                     except:
                         file_info['content'] = None
                 
@@ -568,29 +511,21 @@ class VSCodeInsidersIntegration(BaseEditorIntegration):
         
         return files
     
-    async def search_in_files(self, query: str, file_pattern: str = "*.py") -> List[Dict]:
-        """Search for text in workspace files"""
-        results = []
-        
-        for file_path in self.workspace_path.rglob(file_pattern):
-            if file_path.is_file():
-                try:
-                    async with aiofiles.open(file_path, 'r', encoding='utf-8') as f:
-                        content = await f.read()
-                    
-                    lines = content.split('\n')
-                    for line_num, line in enumerate(lines, 1):
-                        if query.lower() in line.lower():
-                            results.append({
-                                'file': str(file_path.relative_to(self.workspace_path)),
-                                'line': line_num,
-                                'content': line.strip(),
-                                'context': lines[max(0, line_num-2):line_num+2]
-                            })
-                except:
-                    continue
-        
-        return results
+    async def search_in_files(self, query: str, file_pattern: str = "*.py", regex: bool = False,
+                              case_sensitive: bool = False, max_results: Optional[int] = None) -> List[Dict]:
+        """Search for text (or a regex with ``regex=True``) in workspace files"""
+        try:
+            return await asyncio.get_event_loop().run_in_executor(
+                None,
+                lambda: self.workspace_search.search(
+                    query, file_pattern, regex=regex, case_sensitive=case_sensitive, max_results=max_results
+                )
+            )
+        except re.error as e:
+            self.logger.warning(f"Invalid search pattern {query!r}: {e}")
+        except Exception as e:
+            self.logger.error(f"Search failed: {e}")
+        return []
     
     async def get_git_status(self) -> Dict:
         """Get git status of workspace"""
@@ -671,6 +606,10 @@ class VSCodeInsidersIntegration(BaseEditorIntegration):
         # Remove disconnected clients
         self.connected_clients -= disconnected
     
+    async def notify_file_changes(self, data: Dict):
+        """Notify the extension of a batch of watcher changes"""
+        await self.notify_extension('file_changes', data)
+    
     async def handle_file_opened(self, data):
         """Handle file opened event from VS Code"""
         file_path = data.get('file_path')
@@ -720,9 +659,11 @@ class VSCodeInsidersIntegration(BaseEditorIntegration):
     async def handle_file_modified(self, file_path: str):
         """Handle file modified event from file watcher"""
         relative_path = str(Path(file_path).relative_to(self.workspace_path))
-        content = await self.read_file(relative_path)
         
-        if content is not None:
+        # Cached text is revalidated on the next read; only refresh tracked metadata here
+        if Path(file_path).exists():
+            if relative_path in self.workspace_state['open_files']:
+                self._track_open_file(relative_path, Path(file_path))
             self.workspace_state['recent_changes'].append({
                 'type': 'modified',
                 'file': relative_path,
@@ -732,7 +673,6 @@ class VSCodeInsidersIntegration(BaseEditorIntegration):
     async def handle_file_created(self, file_path: str):
         """Handle file created event from file watcher"""
         relative_path = str(Path(file_path).relative_to(self.workspace_path))
-        content = await self.read_file(relative_path)
         
         self.workspace_state['recent_changes'].append({
             'type': 'created',
@@ -746,6 +686,7 @@ class VSCodeInsidersIntegration(BaseEditorIntegration):
         
         # Remove from workspace state
         self.workspace_state['open_files'].pop(relative_path, None)
+        self.content_cache.invalidate(file_path)
         
         self.workspace_state['recent_changes'].append({
             'type': 'deleted',
@@ -753,9 +694,20 @@ class VSCodeInsidersIntegration(BaseEditorIntegration):
             'timestamp': asyncio.get_event_loop().time()
         })
     
+    def _track_open_file(self, relative_path: str, full_path: Path, content: Optional[str] = None):
+        """Record metadata for a file the editor or an agent touched; text stays in the content cache"""
+        stat = full_path.stat()
+        self.workspace_state['open_files'][relative_path] = {
+            'language': self.detect_language(full_path.suffix),
+            'size': len(content) if content is not None else stat.st_size,
+            'last_modified': stat.st_mtime
+        }
+    
     def get_workspace_state(self) -> Dict:
         """Get current workspace state"""
-        return self.workspace_state.copy()
+        state = self.workspace_state.copy()
+        state['content_cache'] = self.content_cache.get_stats()
+        return state
     
     async def stop(self):
         """Stop VS Code integration"""
@@ -764,6 +716,8 @@ class VSCodeInsidersIntegration(BaseEditorIntegration):
         if self.file_observer:
             self.file_observer.stop()
             self.file_observer.join()
+            self.workspace_index.set_watching(False)
+        await self.file_events.stop()
         
         if self.websocket_server:
             self.websocket_server.close()
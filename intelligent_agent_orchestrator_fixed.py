@@ -17,6 +17,8 @@ import os
 import threading
 from pathlib import Path
 
+from core.dag_scheduler import DAGScheduler
+
 class WorkflowType(Enum):
     DEVELOPMENT = "development"
     RESEARCH = "research"
@@ -73,7 +75,7 @@ class IntelligentAgentOrchestrator:
     with autonomous model allocation and persistent learning
     """
     
-    def __init__(self, output_dir: str = "orchestrator_outputs"):
+    def __init__(self, output_dir: str = "orchestrator_outputs", max_concurrent_tasks: Optional[int] = None):
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(exist_ok=True)
         
@@ -89,6 +91,10 @@ class IntelligentAgentOrchestrator:
         self.agent_pool: Dict[str, Any] = {}
         self.workflow_templates: Dict[str, Workflow] = {}
         
+        # Task concurrency limit; None sizes adaptive runs from model capacity
+        # and leaves parallel runs unbounded
+        self.max_concurrent_tasks = max_concurrent_tasks
+        
         # Setup logging
         self.logger = logging.getLogger("IntelligentOrchestrator")
         self.logger.setLevel(logging.INFO)
@@ -332,153 +338,64 @@ class IntelligentAgentOrchestrator:
                 del self.active_workflows[workflow.workflow_id]
     
     async def _execute_sequential(self, workflow: Workflow) -> List[ExecutionResult]:
-        """Execute workflow tasks sequentially"""
-        results = []
-        
-        # Sort tasks by dependencies and priority
-        sorted_tasks = self._topological_sort(workflow.tasks)
-        
-        for task in sorted_tasks:
-            result = await self._execute_task(task, workflow.global_context)
-            results.append(result)
-            
-            # Update global context with task results
-            if result.success and result.output:
-                workflow.global_context[f"{task.task_id}_result"] = result.output
-        
-        return results
+        """Execute workflow tasks one at a time in dependency and priority order"""
+        return await self._run_dag(workflow, max_concurrency=1)
     
     async def _execute_parallel(self, workflow: Workflow) -> List[ExecutionResult]:
         """Execute workflow tasks in parallel where possible"""
-        results = []
-        completed_tasks = set()
-        
-        while len(completed_tasks) < len(workflow.tasks):
-            # Find tasks that can be executed (dependencies satisfied)
-            ready_tasks = [
-                task for task in workflow.tasks
-                if task.task_id not in completed_tasks
-                and all(dep in completed_tasks for dep in task.dependencies)
-            ]
-            
-            if not ready_tasks:
-                break
-            
-            # Execute ready tasks in parallel
-            task_futures = [
-                self._execute_task(task, workflow.global_context)
-                for task in ready_tasks
-            ]
-            
-            batch_results = await asyncio.gather(*task_futures, return_exceptions=True)
-            
-            for i, result in enumerate(batch_results):
-                if isinstance(result, Exception):
-                    self.logger.error(f"Task {ready_tasks[i].task_id} failed: {result}")
-                    # Create error result
-                    result = ExecutionResult(
-                        task_id=ready_tasks[i].task_id,
-                        agent_id="unknown",
-                        model_used="none",
-                        start_time=datetime.now(),
-                        end_time=datetime.now(),
-                        success=False,
-                        error=str(result)
-                    )
-                
-                results.append(result)
-                completed_tasks.add(result.task_id)
-                
-                # Update global context
-                if result.success and result.output:
-                    workflow.global_context[f"{result.task_id}_result"] = result.output
-        
-        return results
+        # Each task starts as soon as its own dependencies finish, not when its wave does
+        return await self._run_dag(workflow, max_concurrency=self.max_concurrent_tasks)
     
     async def _execute_adaptive(self, workflow: Workflow) -> List[ExecutionResult]:
         """Execute workflow with adaptive scheduling based on resource availability"""
-        results = []
-        completed_tasks = set()
-        running_tasks = {}
+        capacity = await self._task_capacity()
+        self.logger.info(f"Running {len(workflow.tasks)} tasks with up to {capacity} in flight")
+        return await self._run_dag(workflow, max_concurrency=capacity)
+    
+    async def _run_dag(self, workflow: Workflow, max_concurrency: Optional[int]) -> List[ExecutionResult]:
+        """Run the workflow's task graph, dispatching each task the moment it becomes ready"""
+        # Raises WorkflowGraphError for cycles and unknown dependencies before anything runs
+        scheduler = DAGScheduler(workflow.tasks)
         
-        while len(completed_tasks) < len(workflow.tasks) or running_tasks:
-            # Find tasks that can be executed
-            ready_tasks = [
-                task for task in workflow.tasks
-                if task.task_id not in completed_tasks
-                and task.task_id not in running_tasks
-                and all(dep in completed_tasks for dep in task.dependencies)
-            ]
-            
-            # Check system resources
-            if self.unified_intelligence:
-                try:
-                    system_status = await self.unified_intelligence.get_system_status()
-                    available_slots = max(1, 3 - len(running_tasks))  # Max 3 concurrent tasks
-                except:
-                    available_slots = max(1, 2 - len(running_tasks))  # Conservative fallback
-            else:
-                available_slots = max(1, 2 - len(running_tasks))
-            
-            # Start new tasks based on priority and resource availability
-            ready_tasks.sort(key=lambda t: t.priority, reverse=True)
-            
-            for task in ready_tasks[:available_slots]:
-                task_future = asyncio.create_task(
-                    self._execute_task(task, workflow.global_context)
-                )
-                running_tasks[task.task_id] = task_future
-                self.logger.info(f"Started task: {task.task_id}")
-            
-            # Check for completed tasks
-            if running_tasks:
-                done, pending = await asyncio.wait(
-                    running_tasks.values(),
-                    timeout=1.0,
-                    return_when=asyncio.FIRST_COMPLETED
+        async def execute(task: WorkflowTask) -> ExecutionResult:
+            try:
+                return await self._execute_task(task, workflow.global_context)
+            except Exception as e:
+                self.logger.error(f"Task {task.task_id} failed: {e}")
+                return ExecutionResult(
+                    task_id=task.task_id,
+                    agent_id="unknown",
+                    model_used="none",
+                    start_time=datetime.now(),
+                    end_time=datetime.now(),
+                    success=False,
+                    error=str(e)
                 )
-                
-                for future in done:
-                    # Find which task completed
-                    completed_task_id = None
-                    for task_id, task_future in running_tasks.items():
-                        if task_future == future:
-                            completed_task_id = task_id
-                            break
-                    
-                    if completed_task_id:
-                        try:
-                            result = await future
-                            results.append(result)
-                            completed_tasks.add(completed_task_id)
-                            
-                            # Update global context
-                            if result.success and result.output:
-                                workflow.global_context[f"{result.task_id}_result"] = result.output
-                            
-                            self.logger.info(f"Completed task: {completed_task_id}")
-                            
-                        except Exception as e:
-                            self.logger.error(f"Task {completed_task_id} failed: {e}")
-                            result = ExecutionResult(
-                                task_id=completed_task_id,
-                                agent_id="unknown",
-                                model_used="none",
-                                start_time=datetime.now(),
-                                end_time=datetime.now(),
-                                success=False,
-                                error=str(e)
-                            )
-                            results.append(result)
-                            completed_tasks.add(completed_task_id)
-                        
-                        del running_tasks[completed_task_id]
-            
-            # Brief pause to prevent busy waiting
-            await asyncio.sleep(0.1)
         
+        def on_complete(task: WorkflowTask, result: ExecutionResult):
+            # Dependents see the output in the global context when they start
+            if result.success and result.output:
+                workflow.global_context[f"{task.task_id}_result"] = result.output
+        
+        results = await scheduler.run(execute, max_concurrency=max_concurrency, on_complete=on_complete)
+        self.logger.debug(f"Workflow {workflow.workflow_id} scheduling stats: {scheduler.stats}")
         return results
     
+    async def _task_capacity(self) -> int:
+        """Concurrent task slots the model backends can serve"""
+        if self.max_concurrent_tasks:
+            return self.max_concurrent_tasks
+        
+        # Sum the concurrency limits of providers that actually serve models
+        if self.memory_manager and getattr(self.memory_manager, 'available_models', None):
+            providers = getattr(self.memory_manager, 'providers', {})
+            in_use = {model.provider for model in self.memory_manager.available_models.values()}
+            capacity = sum(providers.get(provider, {}).get('max_concurrent', 1) for provider in in_use)
+            if capacity:
+                return capacity
+        
+        return 3 if self.unified_intelligence else 2
+    
     async def _execute_task(self, task: WorkflowTask, global_context: Dict) -> ExecutionResult:
         """Execute a single task"""
         start_time = datetime.now()
@@ -576,34 +493,8 @@ class IntelligentAgentOrchestrator:
         return None
     
     def _topological_sort(self, tasks: List[WorkflowTask]) -> List[WorkflowTask]:
-        """Sort tasks topologically based on dependencies"""
-        # Simple implementation - can be enhanced
-        sorted_tasks = []
-        remaining_tasks = tasks.copy()
-        
-        while remaining_tasks:
-            # Find tasks with no unmet dependencies
-            ready_tasks = [
-                task for task in remaining_tasks
-                if all(
-                    dep in [t.task_id for t in sorted_tasks]
-                    for dep in task.dependencies
-                )
-            ]
-            
-            if not ready_tasks:
-                # Circular dependency or missing dependency
-                ready_tasks = [remaining_tasks[0]]  # Take first task to break deadlock
-            
-            # Sort by priority
-            ready_tasks.sort(key=lambda t: t.priority, reverse=True)
-            
-            # Add highest priority task
-            task = ready_tasks[0]
-            sorted_tasks.append(task)
-            remaining_tasks.remove(task)
-        
-        return sorted_tasks
+        """Sort tasks topologically based on dependencies, highest priority first among ready tasks"""
+        return DAGScheduler(tasks).topological_order()
     
     async def _start_background_tasks(self):
         """Start background maintenance tasks"""
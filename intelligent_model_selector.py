@@ -5,23 +5,25 @@ Dynamically discovers models from LM Studio and Ollama, then intelligently selec
 """
 
 import asyncio
-import aiohttp
 import json
 import logging
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 import re
 
+from core.model_registry import ModelRegistry, get_model_registry
+
 class IntelligentModelSelector:
     """Intelligently discovers and selects optimal models for tasks"""
     
-    def __init__(self):
+    def __init__(self, registry: Optional[ModelRegistry] = None):
         self.logger = logging.getLogger("ModelSelector")
+        self.registry = registry or get_model_registry()
         self.available_models = {}
         self.model_capabilities = {}
         self.performance_metrics = {}
         
-    async def discover_all_models(self) -> Dict[str, List[Dict]]:
+    async def discover_all_models(self, max_age: Optional[float] = None) -> Dict[str, List[Dict]]:
         """Discover all available models from all providers"""
         self.logger.info("🔍 Discovering available models...")
         
@@ -30,37 +32,17 @@ class IntelligentModelSelector:
             'ollama': []
         }
         
-        # Discover LM Studio models
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get("http://localhost:1234/v1/models", timeout=5) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        models = data.get('data', [])
-                        discovered['lmstudio'] = models
-                        self.logger.info(f"✅ LM Studio: {len(models)} models available")
-                        for model in models:
-                            self.logger.info(f"  📦 {model.get('id', 'unknown')}")
-                    else:
-                        self.logger.warning("⚠️ LM Studio not available")
-        except Exception as e:
-            self.logger.warning(f"⚠️ LM Studio connection failed: {e}")
-        
-        # Discover Ollama models
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get("http://127.0.0.1:11434/api/tags", timeout=5) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        models = data.get('models', [])
-                        discovered['ollama'] = models
-                        self.logger.info(f"✅ Ollama: {len(models)} models available")
-                        for model in models:
-                            self.logger.info(f"  📦 {model.get('name', 'unknown')}")
-                    else:
-                        self.logger.warning("⚠️ Ollama not available")
-        except Exception as e:
-            self.logger.warning(f"⚠️ Ollama connection failed: {e}")
+        # Listings come from the shared registry, which polls each provider once per interval
+        snapshot = await self.registry.snapshot(max_age=max_age)
+        for provider, label in (('lmstudio', 'LM Studio'), ('ollama', 'Ollama')):
+            if not snapshot.is_online(provider):
+                self.logger.warning(f"⚠️ {label} not available")
+                continue
+            models = [dict(model.metadata) for model in snapshot.models(provider)]
+            discovered[provider] = models
+            self.logger.info(f"✅ {label}: {len(models)} models available")
+            for model in models:
+                self.logger.info(f"  📦 {model.get('id') or model.get('name', 'unknown')}")
         
         self.available_models = discovered
         await self._analyze_model_capabilities()
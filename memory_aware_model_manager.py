@@ -13,6 +13,9 @@ from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 from dataclasses import dataclass, field
 
+from core.model_registry import ModelRegistry, RegistryEvent, RegistrySnapshot, RegisteredModel, get_model_registry
+from core.model_footprint import ModelFootprintProfiler, get_footprint_profiler
+
 @dataclass
 class ModelInfo:
     """Information about a model"""
@@ -27,8 +30,14 @@ class ModelInfo:
 class MemoryAwareModelManager:
     """Model manager that respects VRAM limitations"""
     
-    def __init__(self, max_vram_mb: int = 7000):  # Conservative 7GB limit for 8GB cards
+    def __init__(self, max_vram_mb: int = 7000,  # Conservative 7GB limit for 8GB cards
+                 registry: Optional[ModelRegistry] = None,
+                 footprints: Optional[ModelFootprintProfiler] = None):
         self.logger = logging.getLogger("MemoryAwareModelManager")
+        self.registry = registry or get_model_registry()
+        # Measured footprints replace the name-based VRAM guesses once a model has been seen loaded
+        self.footprints = footprints or get_footprint_profiler()
+        self.footprints.attach_registry(self.registry)
         self.max_vram_mb = max_vram_mb
         self.current_vram_usage = 0
         
@@ -36,6 +45,7 @@ class MemoryAwareModelManager:
         self.available_models: Dict[str, ModelInfo] = {}
         self.loaded_models: List[str] = []
         self.model_queue: List[str] = []  # Priority queue for loading
+        self._offline_providers = set()
         
         # Provider configs
         self.providers = {
@@ -46,7 +56,8 @@ class MemoryAwareModelManager:
                 'max_concurrent': 5  # Allow current setup
             },
             'ollama': {
-                'base_url': 'http://127.0.0.1:11434',                'can_unload': True,  # Ollama can unload models
+                'base_url': 'http://127.0.0.1:11434',
+                'can_unload': True,  # Ollama can unload models
                 'can_load': True,    # Ollama can load models
                 'max_concurrent': 3   # Allow multiple models
             }
@@ -66,120 +77,79 @@ class MemoryAwareModelManager:
         await self._load_initial_model()
         
         self.logger.info(f"Ready - {len(self.available_models)} models available, {len(self.loaded_models)} loaded")
-      async def _discover_available_models(self):
+    
+    async def _discover_available_models(self, max_age: Optional[float] = None):
         """Discover models and detect which are already loaded"""
         self.logger.info("Discovering available models and checking load status...")
         
-        # Check LM Studio - detect already loaded models
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(f"{self.providers['lmstudio']['base_url']}/v1/models") as resp:
-                    if resp.status == 200:
-                        data = await resp.json()
-                        loaded_count = 0
-                        for model in data.get('data', []):
-                            model_id = model.get('id', '')
-                            model_key = f"lmstudio:{model_id}"
-                            
-                            # Test if model is actually loaded by making a quick request
-                            is_loaded = await self._test_model_loaded(model_id, 'lmstudio')
-                            
-                            model_info = ModelInfo(
-                                provider='lmstudio',
-                                model_id=model_id,
-                                estimated_vram_mb=self._estimate_vram_from_name(model_id),
-                                is_loaded=is_loaded
-                            )
-                            
-                            self.available_models[model_key] = model_info
-                            
-                            if is_loaded:
-                                self.loaded_models.append(model_key)
-                                self.current_vram_usage += model_info.estimated_vram_mb
-                                loaded_count += 1
-                        
-                        self.logger.info(f"Found {len(data.get('data', []))} LM Studio models ({loaded_count} loaded)")
-        except Exception as e:
-            self.logger.warning(f"LM Studio not available: {e}")
-        
-        # Check Ollama - detect loaded models  
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(f"{self.providers['ollama']['base_url']}/api/tags") as resp:
-                    if resp.status == 200:
-                        data = await resp.json()
-                        loaded_count = 0
-                        for model in data.get('models', []):
-                            model_name = model.get('name', '')
-                            size_mb = model.get('size', 0) // (1024 * 1024)  # Convert to MB
-                            model_key = f"ollama:{model_name}"
-                            
-                            # Ollama models listed in /api/tags are typically loaded
-                            is_loaded = await self._test_model_loaded(model_name, 'ollama')
-                            
-                            model_info = ModelInfo(
-                                provider='ollama',
-                                model_id=model_name,
-                                estimated_vram_mb=max(size_mb, self._estimate_vram_from_name(model_name)),
-                                is_loaded=is_loaded
-                            )
-                            
-                            self.available_models[model_key] = model_info
-                            
-                            if is_loaded:
-                                self.loaded_models.append(model_key)
-                                self.current_vram_usage += model_info.estimated_vram_mb
-                                loaded_count += 1
-                        
-                        self.logger.info(f"Found {len(data.get('models', []))} Ollama models ({loaded_count} loaded)")
-        except Exception as e:
-            self.logger.warning(f"Ollama not available: {e}")
+        # Load status comes from the providers' listings in the shared registry
+        snapshot = await self.registry.snapshot(max_age=max_age)
+        self._apply_snapshot(snapshot)
+        self.registry.subscribe(self._on_registry_change)
     
-    async def _test_model_loaded(self, model_id: str, provider: str) -> bool:
-        """Test if a model is actually loaded and responsive"""
-        try:
-            if provider == 'lmstudio':
-                # Test with a simple completion request
-                async with aiohttp.ClientSession() as session:
-                    payload = {
-                        "model": model_id,
-                        "messages": [{"role": "user", "content": "Hi"}],
-                        "max_tokens": 1,
-                        "temperature": 0
-                    }
-                    async with session.post(
-                        f"{self.providers['lmstudio']['base_url']}/v1/chat/completions",
-                        json=payload,
-                        timeout=aiohttp.ClientTimeout(total=5)
-                    ) as resp:
-                        return resp.status == 200
-                        
-            elif provider == 'ollama':
-                # Test with Ollama generate endpoint
-                async with aiohttp.ClientSession() as session:
-                    payload = {
-                        "model": model_id,
-                        "prompt": "Hi",
-                        "stream": False
-                    }
-                    async with session.post(
-                        f"{self.providers['ollama']['base_url']}/api/generate",
-                        json=payload,
-                        timeout=aiohttp.ClientTimeout(total=5)
-                    ) as resp:
-                        return resp.status == 200
-                        
-        except Exception:
-            return False
-        
-        return False
-                                provider='ollama',
-                                model_id=model_name,
-                                estimated_vram_mb=max(size_mb, self._estimate_vram_from_name(model_name))
-                            )
-                        self.logger.info(f"Found {len(data.get('models', []))} Ollama models")
-        except Exception as e:
-            self.logger.warning(f"Ollama not available: {e}")
+    async def close(self):
+        """Stop receiving registry updates"""
+        self.registry.unsubscribe(self._on_registry_change)
+        self.footprints.detach_registry(self.registry)
+    
+    def _on_registry_change(self, snapshot: RegistrySnapshot, events: List[RegistryEvent]):
+        """Registry subscriber: keep load status in step with every other manager's view"""
+        self._apply_snapshot(snapshot)
+    
+    def _apply_snapshot(self, snapshot: RegistrySnapshot):
+        """Update available and loaded models from a registry snapshot"""
+        labels = {'lmstudio': 'LM Studio', 'ollama': 'Ollama'}
+        for provider in self.providers:
+            state = snapshot.providers.get(provider)
+            label = labels.get(provider, provider)
+            if state is None or not state.online:
+                # Warn once per outage, not on every snapshot
+                if provider not in self._offline_providers:
+                    self.logger.warning(f"{label} not available: {state.error if state else 'not in registry'}")
+                self._offline_providers.add(provider)
+                listed = {}
+            else:
+                self._offline_providers.discard(provider)
+                listed = {model.model_id: model for model in state.models}
+            
+            for model_id, model in listed.items():
+                model_key = f"{provider}:{model_id}"
+                model_info = self.available_models.get(model_key)
+                if model_info is None:
+                    model_info = ModelInfo(
+                        provider=provider,
+                        model_id=model_id,
+                        last_used=datetime.now()
+                    )
+                    self.available_models[model_key] = model_info
+                model_info.estimated_vram_mb = self._estimate_vram(provider, model)
+                if model.loaded and not model_info.is_loaded:
+                    model_info.last_used = datetime.now()
+                model_info.is_loaded = model.loaded
+            
+            # Models the provider no longer lists are not loaded
+            for model_info in self.available_models.values():
+                if model_info.provider == provider and model_info.model_id not in listed:
+                    model_info.is_loaded = False
+            
+            if listed:
+                loaded_count = sum(1 for model in listed.values() if model.loaded)
+                self.logger.info(f"{label}: {len(listed)} models available, {loaded_count} loaded")
+        
+        # Keep the order models were loaded in; newly loaded ones go last
+        loaded = {key for key, model_info in self.available_models.items() if model_info.is_loaded}
+        self.loaded_models = [key for key in self.loaded_models if key in loaded] + sorted(loaded - set(self.loaded_models))
+        self.current_vram_usage = sum(self.available_models[key].estimated_vram_mb for key in self.loaded_models)
+    
+    def _estimate_vram(self, provider: str, model: RegisteredModel) -> int:
+        """Measured footprint if the model has been profiled, else a guess from its name and file size"""
+        measured_mb = self.footprints.estimate_mb(provider, model.model_id)
+        if measured_mb is not None:
+            return int(measured_mb)
+        estimated_vram_mb = self._estimate_vram_from_name(model.model_id)
+        if model.size_bytes:
+            estimated_vram_mb = max(model.size_bytes // (1024 * 1024), estimated_vram_mb)
+        return estimated_vram_mb
     
     def _estimate_vram_from_name(self, model_name: str) -> int:
         """Estimate VRAM usage from model name"""
@@ -262,8 +232,9 @@ class MemoryAwareModelManager:
         candidates.sort(key=lambda x: self._calculate_task_score(x[1], task_type, agent_role), reverse=True)
         best_key, best_model = candidates[0]
         
-        # Load the best model (this will handle unloading if needed)
-        success = await self._load_model(best_key)
+        # Load the best model (this will handle unloading if needed); one manager decides at a time
+        async with self.registry.load_lock:
+            success = await self._load_model(best_key)
         return best_key if success else None
     
     def _is_suitable_for_task(self, model: ModelInfo, task_type: str, agent_role: str) -> bool:
@@ -4,19 +4,49 @@ Persistent Agent Intelligence System
 
 This system enables agents to accumulate knowledge, patterns, and expertise
 across all projects they work on, creating truly intelligent and experienced agents.
+
+Experience retrieval goes through inverted indexes (context tokens and tags),
+so a lookup only scores experiences that share a word or tag with the query.
+With ``index_mode="fts5"`` the indexes live in an SQLite FTS5 table instead of
+memory and startup does not load the experiences at all.
+
+All instances in a process share one ``IntelligenceStore`` per database: a
+single WAL-mode connection whose writes are queued and committed in batches
+by a background thread. Agents get a shared instance from
+``get_shared_intelligence()`` and use the ``*_async`` wrappers from the event
+loop.
 """
 
 import json
 import os
+import atexit
+import heapq
+import asyncio
 import hashlib
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from functools import partial
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional, Set
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Any, Optional, Set, Tuple
 from dataclasses import dataclass, field, asdict
 from enum import Enum
 import sqlite3
 import pickle
 from pathlib import Path
 
+from core.memory_keyword_index import tokenize
+
+logger = logging.getLogger(__name__)
+
+INDEX_MODES = ("memory", "fts5")
+# Experiences fetched from FTS5 per lookup before the full relevance scoring
+DEFAULT_FTS_CANDIDATES = 500
+DEFAULT_FLUSH_INTERVAL_MS = 50
+# A batch this large is committed without waiting for the rest of the interval
+MAX_WRITE_BATCH = 2000
+
 class ExperienceType(Enum):
     SOLUTION_PATTERN = "solution_pattern"
     ERROR_RESOLUTION = "error_resolution"
@@ -54,12 +84,238 @@ class ProjectLearning:
     successful_strategies: List[str]
     timestamp: datetime
 
+class ExperienceIndex:
+    """Token and tag inverted indexes over one agent role's experiences"""
+    
+    def __init__(self):
+        self.experiences: Dict[str, Experience] = {}
+        self.token_sets: Dict[str, FrozenSet[str]] = {}
+        self.token_postings: Dict[str, Set[str]] = {}
+        self.tag_postings: Dict[str, Set[str]] = {}
+    
+    def __len__(self) -> int:
+        return len(self.experiences)
+    
+    def add(self, experience: Experience):
+        """Index (or re-index) an experience"""
+        self.remove(experience.id)
+        tokens = frozenset(tokenize(experience.context))
+        self.experiences[experience.id] = experience
+        self.token_sets[experience.id] = tokens
+        for token in tokens:
+            self.token_postings.setdefault(token, set()).add(experience.id)
+        for tag in experience.tags:
+            self.tag_postings.setdefault(tag.lower(), set()).add(experience.id)
+    
+    def remove(self, experience_id: str):
+        experience = self.experiences.pop(experience_id, None)
+        if experience is None:
+            return
+        for token in self.token_sets.pop(experience_id):
+            self._discard(self.token_postings, token, experience_id)
+        for tag in experience.tags:
+            self._discard(self.tag_postings, tag.lower(), experience_id)
+    
+    @staticmethod
+    def _discard(postings: Dict[str, Set[str]], key: str, experience_id: str):
+        posting = postings.get(key)
+        if posting is not None:
+            posting.discard(experience_id)
+            if not posting:
+                del postings[key]
+    
+    def candidates(self, tokens: Iterable[str]) -> Dict[str, List[int]]:
+        """[word overlap, tag hits] for every experience sharing a token or tag with the query"""
+        matches: Dict[str, List[int]] = {}
+        for token in tokens:
+            for experience_id in self.token_postings.get(token, ()):
+                matches.setdefault(experience_id, [0, 0])[0] += 1
+            for experience_id in self.tag_postings.get(token, ()):
+                matches.setdefault(experience_id, [0, 0])[1] += 1
+        return matches
+
+class IntelligenceStore:
+    """
+    One SQLite connection to an intelligence database, shared by the whole process.
+    
+    ``write()`` only queues a statement; a background thread commits everything
+    queued within ``flush_interval_ms`` in a single transaction. Reads run
+    directly on the same connection and see committed batches, so a write shows
+    up in SQL queries at most one interval later (``flush()`` waits for it).
+    """
+    
+    PRAGMAS = (
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",  # WAL commits skip the fsync; checkpoints still sync
+        "PRAGMA temp_store=MEMORY",
+        "PRAGMA cache_size=-16384",  # 16MB page cache
+        "PRAGMA mmap_size=67108864",
+        "PRAGMA busy_timeout=5000",
+    )
+    
+    def __init__(self, db_path: str, flush_interval_ms: float = DEFAULT_FLUSH_INTERVAL_MS,
+                 max_batch: int = MAX_WRITE_BATCH):
+        self.db_path = str(db_path)
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_batch = max_batch
+        
+        # Autocommit mode; batches and schema changes open their own transactions
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        for pragma in self.PRAGMAS:
+            self._conn.execute(pragma)
+        self._conn_lock = threading.RLock()
+        
+        self._pending: List[Tuple[str, Tuple]] = []
+        self._cond = threading.Condition()
+        self._submitted = 0
+        self._committed = 0
+        self._flush_requested = False
+        self._closed = False
+        self.stats = {"writes": 0, "batches": 0, "failed_writes": 0}
+        # Set once the database has an FTS5 index; every instance then keeps it up to date
+        self.fts_enabled = False
+        
+        self._writer = threading.Thread(target=self._write_loop, name="intelligence-writer", daemon=True)
+        self._writer.start()
+    
+    @contextmanager
+    def read(self) -> Iterator[sqlite3.Cursor]:
+        """A cursor for queries; holds the connection until the block ends"""
+        with self._conn_lock:
+            cursor = self._conn.cursor()
+            try:
+                yield cursor
+            finally:
+                cursor.close()
+    
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Cursor]:
+        """Run statements immediately in one transaction (schema setup, rebuilds)"""
+        with self._conn_lock:
+            cursor = self._conn.cursor()
+            cursor.execute("BEGIN")
+            try:
+                yield cursor
+                cursor.execute("COMMIT")
+            except BaseException:
+                cursor.execute("ROLLBACK")
+                raise
+            finally:
+                cursor.close()
+    
+    def write(self, sql: str, params: Tuple = ()):
+        """Queue a statement for the next batch"""
+        with self._cond:
+            if self._closed:
+                raise RuntimeError(f"Intelligence store {self.db_path} is closed")
+            self._pending.append((sql, params))
+            self._submitted += 1
+            # Wake the writer for the first write of a batch, or when the batch is full
+            if len(self._pending) == 1 or len(self._pending) >= self.max_batch:
+                self._cond.notify_all()
+    
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Commit everything queued so far now; False if that took longer than ``timeout``"""
+        with self._cond:
+            target = self._submitted
+            if self._committed >= target:
+                return True
+            self._flush_requested = True
+            self._cond.notify_all()
+            return self._cond.wait_for(lambda: self._committed >= target, timeout)
+    
+    def _write_loop(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or self._closed)
+                if not self._pending:
+                    return
+                
+                # Let more writes join the batch unless someone is waiting on it
+                deadline = time.monotonic() + self.flush_interval
+                while not (self._closed or self._flush_requested or len(self._pending) >= self.max_batch):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch, self._pending = self._pending, []
+                self._flush_requested = False
+            
+            self._commit(batch)
+            
+            with self._cond:
+                self._committed += len(batch)
+                self._cond.notify_all()
+    
+    def _commit(self, batch: List[Tuple[str, Tuple]]):
+        with self._conn_lock:
+            try:
+                self._conn.execute("BEGIN")
+                for sql, params in batch:
+                    self._conn.execute(sql, params)
+                self._conn.execute("COMMIT")
+                self.stats["writes"] += len(batch)
+                self.stats["batches"] += 1
+                return
+            except sqlite3.Error as e:
+                if self._conn.in_transaction:
+                    self._conn.execute("ROLLBACK")
+                logger.warning(f"Intelligence batch of {len(batch)} writes failed ({e}), retrying one by one")
+            
+            # Keep the good writes of a failed batch
+            for sql, params in batch:
+                try:
+                    self._conn.execute(sql, params)
+                    self.stats["writes"] += 1
+                except sqlite3.Error as e:
+                    self.stats["failed_writes"] += 1
+                    logger.error(f"Intelligence write failed: {e}")
+    
+    def close(self):
+        """Commit pending writes, stop the writer and close the connection"""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._writer.join()
+        with self._conn_lock:
+            self._conn.close()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        with self._cond:
+            pending = len(self._pending)
+        return {**self.stats, "pending": pending, "db_path": self.db_path}
+
+_stores: Dict[str, IntelligenceStore] = {}
+_stores_lock = threading.Lock()
+
+def get_intelligence_store(db_path, flush_interval_ms: float = DEFAULT_FLUSH_INTERVAL_MS) -> IntelligenceStore:
+    """The process-wide store for a database file"""
+    key = os.path.realpath(str(db_path))
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = _stores[key] = IntelligenceStore(key, flush_interval_ms)
+        return store
+
+@atexit.register
+def close_intelligence_stores():
+    """Commit queued writes of every store (runs at interpreter exit)"""
+    with _stores_lock:
+        stores = list(_stores.values())
+        _stores.clear()
+    for store in stores:
+        store.close()
+
 class PersistentAgentIntelligence:
     """
     Manages persistent intelligence across all agent sessions and projects
     """
     
-    def __init__(self, intelligence_dir: str = None):
+    def __init__(self, intelligence_dir: str = None, index_mode: str = "memory",
+                 fts_candidates: int = DEFAULT_FTS_CANDIDATES,
+                 flush_interval_ms: float = DEFAULT_FLUSH_INTERVAL_MS):
         # Use a global intelligence directory that persists across workspaces
         if intelligence_dir is None:
             home_dir = Path.home()
@@ -69,12 +325,24 @@ class PersistentAgentIntelligence:
         
         self.intelligence_dir.mkdir(parents=True, exist_ok=True)
         
+        if index_mode not in INDEX_MODES:
+            raise ValueError(f"Unknown index mode {index_mode!r}, expected one of {INDEX_MODES}")
+        if index_mode == "fts5" and not self._fts5_available():
+            logger.warning("SQLite was built without FTS5, keeping experiences in memory")
+            index_mode = "memory"
+        self.index_mode = index_mode
+        self.fts_candidates = fts_candidates
+        
         # Initialize database for persistent storage
         self.db_path = self.intelligence_dir / "agent_intelligence.db"
+        self.store = get_intelligence_store(self.db_path, flush_interval_ms)
+        # Start from everything other instances have written so far
+        self.store.flush()
         self._init_database()
         
-        # In-memory cache for faster access
-        self.experience_cache: Dict[str, List[Experience]] = {}
+        # In-memory indexes per agent role (memory mode only); the async wrappers use them from worker threads
+        self.experience_indexes: Dict[str, ExperienceIndex] = {}
+        self._index_lock = threading.RLock()
         self.project_patterns: Dict[str, List[str]] = {}
         
         # Load existing intelligence
@@ -82,9 +350,13 @@ class PersistentAgentIntelligence:
     
     def _init_database(self):
         """Initialize SQLite database for persistent storage"""
-        conn = sqlite3.connect(str(self.db_path))
-        cursor = conn.cursor()
-        
+        with self.store.transaction() as cursor:
+            self._create_tables(cursor)
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'experiences_fts'")
+            if cursor.fetchone():
+                self.store.fts_enabled = True
+    
+    def _create_tables(self, cursor: sqlite3.Cursor):
         # Experiences table
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS experiences (
@@ -130,37 +402,82 @@ class PersistentAgentIntelligence:
             )
         """)
         
-        conn.commit()
-        conn.close()
+        if self.index_mode == "fts5":
+            # Full-text index over experience contexts and tags; id and role are stored for lookups only.
+            # Rows share their rowid with the experiences row, so updates find them without a scan
+            cursor.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS experiences_fts USING fts5(
+                    id UNINDEXED, agent_role UNINDEXED, context, tags
+                )
+            """)
+            
+            # Rebuild when the table is new or was not kept up to date (memory mode writes)
+            cursor.execute("SELECT COUNT(*) FROM experiences")
+            experience_count = cursor.fetchone()[0]
+            cursor.execute("SELECT COUNT(*) FROM experiences_fts")
+            fts_count = cursor.fetchone()[0]
+            cursor.execute("""
+                SELECT COUNT(*) FROM experiences_fts f JOIN experiences e ON e.rowid = f.rowid AND e.id = f.id
+            """)
+            if not experience_count == fts_count == cursor.fetchone()[0]:
+                cursor.execute("DELETE FROM experiences_fts")
+                cursor.execute("""
+                    INSERT INTO experiences_fts (rowid, id, agent_role, context, tags)
+                    SELECT rowid, id, agent_role, context, REPLACE(tags, ',', ' ') FROM experiences
+                """)
+    
+    @staticmethod
+    def _fts5_available() -> bool:
+        conn = sqlite3.connect(":memory:")
+        try:
+            conn.execute("CREATE VIRTUAL TABLE probe USING fts5(text)")
+            return True
+        except sqlite3.OperationalError:
+            return False
+        finally:
+            conn.close()
+    
+    @staticmethod
+    def _row_to_experience(row) -> Experience:
+        return Experience(
+            id=row[0],
+            agent_role=row[1],
+            experience_type=ExperienceType(row[2]),
+            context=row[3],
+            solution=row[4],
+            outcome=row[5],
+            confidence=row[6],
+            project_context=json.loads(row[7]),
+            timestamp=datetime.fromisoformat(row[8]),
+            usage_count=row[9],
+            success_rate=row[10],
+            tags=set(row[11].split(',')) if row[11] else set()
+        )
     
     def _load_intelligence(self):
         """Load existing intelligence from database"""
-        conn = sqlite3.connect(str(self.db_path))
-        cursor = conn.cursor()
+        if self.index_mode == "fts5":
+            # Experiences stay in SQLite and are fetched per lookup
+            return
         
         # Load experiences
-        cursor.execute("SELECT * FROM experiences")
-        for row in cursor.fetchall():
-            exp = Experience(
-                id=row[0],
-                agent_role=row[1],
-                experience_type=ExperienceType(row[2]),
-                context=row[3],
-                solution=row[4],
-                outcome=row[5],
-                confidence=row[6],
-                project_context=json.loads(row[7]),
-                timestamp=datetime.fromisoformat(row[8]),
-                usage_count=row[9],
-                success_rate=row[10],
-                tags=set(row[11].split(',')) if row[11] else set()
-            )
-            
-            if exp.agent_role not in self.experience_cache:
-                self.experience_cache[exp.agent_role] = []
-            self.experience_cache[exp.agent_role].append(exp)
-        
-        conn.close()
+        with self.store.read() as cursor:
+            rows = cursor.execute("SELECT * FROM experiences").fetchall()
+        with self._index_lock:
+            for row in rows:
+                exp = self._row_to_experience(row)
+                self.experience_indexes.setdefault(exp.agent_role, ExperienceIndex()).add(exp)
+    
+    def _role_experiences(self, agent_role: str) -> List[Experience]:
+        """All experiences of a role"""
+        if self.index_mode == "memory":
+            with self._index_lock:
+                index = self.experience_indexes.get(agent_role)
+                return list(index.experiences.values()) if index else []
+        
+        with self.store.read() as cursor:
+            rows = cursor.execute("SELECT * FROM experiences WHERE agent_role = ?", (agent_role,)).fetchall()
+        return [self._row_to_experience(row) for row in rows]
     
     def record_experience(self, agent_role: str, experience_type: ExperienceType, 
                          context: str, solution: str, outcome: str, 
@@ -185,11 +502,11 @@ class PersistentAgentIntelligence:
             tags=tags or set()
         )
         
-        # Save to database
-        conn = sqlite3.connect(str(self.db_path))
-        cursor = conn.cursor()
-        
-        cursor.execute("""
+        # Save to database (queued for the next batch); a replaced experience gets a new rowid
+        if self.store.fts_enabled:
+            self.store.write("DELETE FROM experiences_fts WHERE rowid = (SELECT rowid FROM experiences WHERE id = ?)",
+                             (experience.id,))
+        self.store.write("""
             INSERT OR REPLACE INTO experiences 
             (id, agent_role, experience_type, context, solution, outcome, 
              confidence, project_context, timestamp, usage_count, success_rate, tags)
@@ -202,13 +519,16 @@ class PersistentAgentIntelligence:
             experience.success_rate, ','.join(experience.tags)
         ))
         
-        conn.commit()
-        conn.close()
+        if self.store.fts_enabled:
+            self.store.write("""
+                INSERT INTO experiences_fts (rowid, id, agent_role, context, tags)
+                SELECT rowid, id, agent_role, context, ? FROM experiences WHERE id = ?
+            """, (' '.join(experience.tags), experience.id))
         
-        # Update cache
-        if agent_role not in self.experience_cache:
-            self.experience_cache[agent_role] = []
-        self.experience_cache[agent_role].append(experience)
+        # Update indexes; recording the same experience again replaces it
+        if self.index_mode == "memory":
+            with self._index_lock:
+                self.experience_indexes.setdefault(agent_role, ExperienceIndex()).add(experience)
         
         return exp_id
     
@@ -218,50 +538,85 @@ class PersistentAgentIntelligence:
                                limit: int = 10) -> List[Experience]:
         """Get relevant experiences for a given context"""
         
-        experiences = self.experience_cache.get(agent_role, [])
-        
-        if not experiences:
+        # Only experiences sharing a word or tag with the context are scored
+        context_tokens = set(tokenize(context))
+        if not context_tokens:
             return []
         
-        # Filter by experience type if specified
+        if self.index_mode == "fts5":
+            candidates = self._fts_candidates(agent_role, context_tokens, experience_types)
+        else:
+            with self._index_lock:
+                index = self.experience_indexes.get(agent_role)
+                if index is None:
+                    return []
+                candidates = []
+                for experience_id, (overlap, tag_hits) in index.candidates(context_tokens).items():
+                    exp = index.experiences[experience_id]
+                    if not experience_types or exp.experience_type in experience_types:
+                        candidates.append((exp, overlap, tag_hits))
+        
+        # Score experiences by relevance and keep the top results
+        now = datetime.now()
+        scored_experiences = (
+            (self._score_experience(exp, overlap, tag_hits, project_context, now), exp)
+            for exp, overlap, tag_hits in candidates
+        )
+        return [exp for score, exp in heapq.nlargest(limit, scored_experiences, key=lambda x: x[0])]
+    
+    def _fts_candidates(self, agent_role: str, context_tokens: Set[str],
+                        experience_types: List[ExperienceType] = None) -> List[Tuple[Experience, int, int]]:
+        """Best FTS5 matches for the context, with their word overlap and tag hits"""
+        query = " OR ".join(f'"{token}"' for token in context_tokens)
+        sql = """
+            SELECT e.* FROM experiences_fts f JOIN experiences e ON e.rowid = f.rowid
+            WHERE experiences_fts MATCH ? AND e.agent_role = ?
+        """
+        params: List[Any] = [query, agent_role]
         if experience_types:
-            experiences = [exp for exp in experiences if exp.experience_type in experience_types]
-        
-        # Score experiences by relevance
-        scored_experiences = []
-        context_words = set(context.lower().split())
-        
-        for exp in experiences:
-            score = 0.0
-            
-            # Context similarity
-            exp_context_words = set(exp.context.lower().split())
-            context_overlap = len(context_words.intersection(exp_context_words))
-            score += context_overlap * 2.0
-            
-            # Project context similarity
-            if project_context and exp.project_context:
-                for key, value in project_context.items():
-                    if key in exp.project_context and exp.project_context[key] == value:
-                        score += 3.0
-            
-            # Confidence and success rate
-            score += exp.confidence * 2.0
-            score += exp.success_rate * 2.0
-            
-            # Usage frequency (popular solutions)
-            score += min(exp.usage_count * 0.1, 2.0)
-            
-            # Recency bonus
-            days_old = (datetime.now() - exp.timestamp).days
-            recency_bonus = max(0, 2.0 - (days_old * 0.01))
-            score += recency_bonus
-            
-            scored_experiences.append((score, exp))
-        
-        # Sort by score and return top results
-        scored_experiences.sort(key=lambda x: x[0], reverse=True)
-        return [exp for score, exp in scored_experiences[:limit]]
+            sql += f" AND e.experience_type IN ({','.join('?' * len(experience_types))})"
+            params.extend(exp_type.value for exp_type in experience_types)
+        sql += " ORDER BY f.rank LIMIT ?"
+        params.append(self.fts_candidates)
+        
+        with self.store.read() as cursor:
+            rows = cursor.execute(sql, params).fetchall()
+        
+        candidates = []
+        for row in rows:
+            exp = self._row_to_experience(row)
+            overlap = len(context_tokens.intersection(tokenize(exp.context)))
+            tag_hits = sum(1 for tag in exp.tags if tag.lower() in context_tokens)
+            candidates.append((exp, overlap, tag_hits))
+        return candidates
+    
+    @staticmethod
+    def _score_experience(exp: Experience, overlap: int, tag_hits: int,
+                          project_context: Optional[Dict[str, Any]], now: datetime) -> float:
+        # Context similarity
+        score = overlap * 2.0
+        # Tags named in the context
+        score += tag_hits * 1.0
+        
+        # Project context similarity
+        if project_context and exp.project_context:
+            for key, value in project_context.items():
+                if key in exp.project_context and exp.project_context[key] == value:
+                    score += 3.0
+        
+        # Confidence and success rate
+        score += exp.confidence * 2.0
+        score += exp.success_rate * 2.0
+        
+        # Usage frequency (popular solutions)
+        score += min(exp.usage_count * 0.1, 2.0)
+        
+        # Recency bonus
+        days_old = (now - exp.timestamp).days
+        recency_bonus = max(0, 2.0 - (days_old * 0.01))
+        score += recency_bonus
+        
+        return score
     
     def record_project_completion(self, project_id: str, workspace_path: str,
                                 technologies: Set[str], patterns_discovered: List[str],
@@ -279,11 +634,8 @@ class PersistentAgentIntelligence:
             timestamp=datetime.now()
         )
         
-        # Save to database
-        conn = sqlite3.connect(str(self.db_path))
-        cursor = conn.cursor()
-        
-        cursor.execute("""
+        # Save to database (queued for the next batch)
+        self.store.write("""
             INSERT OR REPLACE INTO projects 
             (project_id, workspace_path, technologies, patterns_discovered,
              challenges_overcome, successful_strategies, timestamp)
@@ -296,50 +648,66 @@ class PersistentAgentIntelligence:
             json.dumps(project_learning.successful_strategies),
             project_learning.timestamp.isoformat()
         ))
-        
-        conn.commit()
-        conn.close()
     
     def update_experience_success(self, experience_id: str, was_successful: bool):
         """Update the success rate of an experience based on usage outcome"""
         
-        conn = sqlite3.connect(str(self.db_path))
-        cursor = conn.cursor()
-        
-        # Get current stats
-        cursor.execute("SELECT usage_count, success_rate FROM experiences WHERE id = ?", (experience_id,))
-        result = cursor.fetchone()
-        
-        if result:
-            usage_count, success_rate = result
-            
-            # Calculate new success rate
-            total_successes = success_rate * usage_count
-            new_usage_count = usage_count + 1
-            
-            if was_successful:
-                total_successes += 1
-            
-            new_success_rate = total_successes / new_usage_count
-            
-            # Update database
-            cursor.execute("""
-                UPDATE experiences 
-                SET usage_count = ?, success_rate = ?
-                WHERE id = ?
-            """, (new_usage_count, new_success_rate, experience_id))
-            
-            conn.commit()
-        
-        conn.close()
+        # Computed from the stored values, so the update needs no read and can be batched
+        self.store.write("""
+            UPDATE experiences 
+            SET usage_count = usage_count + 1,
+                success_rate = (success_rate * usage_count + ?) / (usage_count + 1)
+            WHERE id = ?
+        """, (1.0 if was_successful else 0.0, experience_id))
+        
+        # Keep the cached copy in step for scoring
+        with self._index_lock:
+            for index in self.experience_indexes.values():
+                exp = index.experiences.get(experience_id)
+                if exp is not None:
+                    total_successes = exp.success_rate * exp.usage_count + (1 if was_successful else 0)
+                    exp.usage_count += 1
+                    exp.success_rate = total_successes / exp.usage_count
+                    break
     
     def get_agent_expertise_summary(self, agent_role: str) -> Dict[str, Any]:
         """Get a summary of an agent's accumulated expertise"""
         
-        experiences = self.experience_cache.get(agent_role, [])
+        if self.index_mode == "fts5":
+            metrics = self._sql_expertise_metrics(agent_role)
+        else:
+            metrics = self._expertise_metrics(self._role_experiences(agent_role))
         
-        if not experiences:
+        if metrics is None:
             return {"expertise_level": "novice", "experience_count": 0}
+        (total_experiences, avg_confidence, avg_success_rate, total_usage,
+         type_counts, technologies, top_patterns) = metrics
+        
+        # Determine expertise level
+        if total_experiences < 10:
+            expertise_level = "novice"
+        elif total_experiences < 50:
+            expertise_level = "intermediate"
+        elif total_experiences < 200:
+            expertise_level = "advanced"
+        else:
+            expertise_level = "expert"
+        
+        return {
+            "expertise_level": expertise_level,
+            "experience_count": total_experiences,
+            "average_confidence": avg_confidence,
+            "average_success_rate": avg_success_rate,
+            "total_usage": total_usage,
+            "specializations": type_counts,
+            "technologies": list(technologies),
+            "most_successful_patterns": top_patterns
+        }
+    
+    @staticmethod
+    def _expertise_metrics(experiences: List[Experience]) -> Optional[Tuple]:
+        if not experiences:
+            return None
         
         # Calculate expertise metrics
         total_experiences = len(experiences)
@@ -361,28 +729,42 @@ class PersistentAgentIntelligence:
             if 'framework' in exp.project_context:
                 technologies.add(exp.project_context['framework'])
         
-        # Determine expertise level
-        if total_experiences < 10:
-            expertise_level = "novice"
-        elif total_experiences < 50:
-            expertise_level = "intermediate"
-        elif total_experiences < 200:
-            expertise_level = "advanced"
-        else:
-            expertise_level = "expert"
-        
-        return {
-            "expertise_level": expertise_level,
-            "experience_count": total_experiences,
-            "average_confidence": avg_confidence,
-            "average_success_rate": avg_success_rate,
-            "total_usage": total_usage,
-            "specializations": type_counts,
-            "technologies": list(technologies),
-            "most_successful_patterns": [
-                exp.solution for exp in sorted(experiences, key=lambda x: x.success_rate, reverse=True)[:5]
-            ]
-        }
+        top_patterns = [exp.solution for exp in heapq.nlargest(5, experiences, key=lambda x: x.success_rate)]
+        return (total_experiences, avg_confidence, avg_success_rate, total_usage,
+                type_counts, technologies, top_patterns)
+    
+    def _sql_expertise_metrics(self, agent_role: str) -> Optional[Tuple]:
+        """The same metrics aggregated by SQLite, without loading the experiences"""
+        with self.store.read() as cursor:
+            cursor.execute("""
+                SELECT COUNT(*), AVG(confidence), AVG(success_rate), SUM(usage_count)
+                FROM experiences WHERE agent_role = ?
+            """, (agent_role,))
+            total_experiences, avg_confidence, avg_success_rate, total_usage = cursor.fetchone()
+            if not total_experiences:
+                return None
+            
+            cursor.execute("""
+                SELECT experience_type, COUNT(*) FROM experiences
+                WHERE agent_role = ? GROUP BY experience_type
+            """, (agent_role,))
+            type_counts = dict(cursor.fetchall())
+            
+            technologies = set()
+            for field_name in ("language", "framework"):
+                cursor.execute(f"""
+                    SELECT DISTINCT json_extract(project_context, '$.{field_name}') FROM experiences
+                    WHERE agent_role = ? AND json_type(project_context, '$.{field_name}') IS NOT NULL
+                """, (agent_role,))
+                technologies.update(row[0] for row in cursor.fetchall())
+            
+            cursor.execute("""
+                SELECT solution FROM experiences WHERE agent_role = ?
+                ORDER BY success_rate DESC, rowid LIMIT 5
+            """, (agent_role,))
+            top_patterns = [row[0] for row in cursor.fetchall()]
+        return (total_experiences, avg_confidence, avg_success_rate, total_usage,
+                type_counts, technologies, top_patterns)
     
     def suggest_approach(self, agent_role: str, task_description: str, 
                         project_context: Dict[str, Any]) -> Dict[str, Any]:
@@ -437,18 +819,22 @@ class PersistentAgentIntelligence:
             "export_timestamp": datetime.now().isoformat()
         }
         
+        # Include writes still waiting for their batch
+        self.store.flush()
+        
         # Export experiences
-        for agent_role, experiences in self.experience_cache.items():
+        with self.store.read() as cursor:
+            agent_roles = [row[0] for row in cursor.execute("SELECT DISTINCT agent_role FROM experiences")]
+        for agent_role in agent_roles:
             export_data["experiences"][agent_role] = [
-                asdict(exp) for exp in experiences
+                asdict(exp) for exp in self._role_experiences(agent_role)
             ]
         
         # Export projects from database
-        conn = sqlite3.connect(str(self.db_path))
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM projects")
+        with self.store.read() as cursor:
+            project_rows = cursor.execute("SELECT * FROM projects").fetchall()
         
-        for row in cursor.fetchall():
+        for row in project_rows:
             export_data["projects"].append({
                 "project_id": row[0],
                 "workspace_path": row[1],
@@ -459,10 +845,48 @@ class PersistentAgentIntelligence:
                 "timestamp": row[6]
             })
         
-        conn.close()
-        
         with open(export_path, 'w') as f:
             json.dump(export_data, f, indent=2, default=str)
+    
+    # Async wrappers: run in the default executor so agents never wait on SQLite in the event loop
+    
+    async def _run_blocking(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, partial(func, *args, **kwargs))
+    
+    async def record_experience_async(self, *args, **kwargs) -> str:
+        return await self._run_blocking(self.record_experience, *args, **kwargs)
+    
+    async def get_relevant_experiences_async(self, *args, **kwargs) -> List[Experience]:
+        return await self._run_blocking(self.get_relevant_experiences, *args, **kwargs)
+    
+    async def record_project_completion_async(self, *args, **kwargs):
+        return await self._run_blocking(self.record_project_completion, *args, **kwargs)
+    
+    async def update_experience_success_async(self, experience_id: str, was_successful: bool):
+        return await self._run_blocking(self.update_experience_success, experience_id, was_successful)
+    
+    async def get_agent_expertise_summary_async(self, agent_role: str) -> Dict[str, Any]:
+        return await self._run_blocking(self.get_agent_expertise_summary, agent_role)
+    
+    async def suggest_approach_async(self, *args, **kwargs) -> Dict[str, Any]:
+        return await self._run_blocking(self.suggest_approach, *args, **kwargs)
+    
+    async def flush_async(self, timeout: Optional[float] = None) -> bool:
+        """Wait until queued writes are committed"""
+        return await self._run_blocking(self.store.flush, timeout)
+
+_shared_intelligence: Dict[Tuple[Optional[str], str], PersistentAgentIntelligence] = {}
+_shared_intelligence_lock = threading.Lock()
+
+def get_shared_intelligence(intelligence_dir: str = None, index_mode: str = "memory") -> PersistentAgentIntelligence:
+    """The process-wide intelligence instance, so agents share one cache and one database connection"""
+    key = (str(intelligence_dir) if intelligence_dir is not None else None, index_mode)
+    with _shared_intelligence_lock:
+        intelligence = _shared_intelligence.get(key)
+        if intelligence is None:
+            intelligence = _shared_intelligence[key] = PersistentAgentIntelligence(intelligence_dir, index_mode)
+        return intelligence
 
 def test_persistent_intelligence():
     """Test the persistent intelligence system"""
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Multi-node simulation of gossip membership and task redistribution on localhost
+"""
+
+import asyncio
+import logging
+import time
+
+from core.cluster_membership import ALIVE, DEAD, LEFT, GossipMembership
+from core.distributed_agent_manager import DistributedAgentManager
+
+# Setup logging
+logging.basicConfig(level=logging.WARNING, format='[%(levelname)s] %(message)s')
+
+DETECTION_LIMIT_SECONDS = 5.0
+
+
+async def wait_for(condition, timeout):
+    """Poll ``condition`` until it holds; returns the seconds it took"""
+    started = time.monotonic()
+    while not condition():
+        if time.monotonic() - started > timeout:
+            raise TimeoutError(f"condition not met within {timeout}s")
+        await asyncio.sleep(0.02)
+    return time.monotonic() - started
+
+
+async def test_gossip_membership(node_count=5):
+    """Convergence, piggybacked load, crash detection, leader failover and graceful leave"""
+    print(f"\n--- Gossip membership with {node_count} nodes ---")
+    nodes = [GossipMembership(f"node-{i}", load_provider=lambda i=i: {'in_flight': i}) for i in range(node_count)]
+    for node in nodes:
+        await node.start()
+    seed = [(nodes[0].host, nodes[0].port)]
+    for node in nodes[1:]:
+        node.join(seed)
+
+    others = lambda node, group: [other for other in group if other is not node]
+    elapsed = await wait_for(lambda: all(
+        len([m for m in node.members.values() if m.status == ALIVE]) == node_count - 1 for node in nodes), 5)
+    print(f"✓ Membership converged in {elapsed:.2f}s")
+
+    await wait_for(lambda: len({node.leader for node in nodes}) == 1 and nodes[0].leader is not None, 5)
+    leader = next(node for node in nodes if node.is_leader)
+    print(f"✓ All nodes agree on leader {leader.node_id} (term {leader.term})")
+
+    await wait_for(lambda: nodes[0].members['node-3'].load.get('in_flight') == 3, 2)
+    print("✓ Load reports piggybacked on gossip")
+
+    # Crash the leader: no leave message, it just goes silent
+    survivors = others(leader, nodes)
+    await leader.stop(leave=False)
+    detected = await wait_for(lambda: all(node.members[leader.node_id].status == DEAD for node in survivors),
+                              DETECTION_LIMIT_SECONDS)
+    print(f"✓ Crash confirmed by every node in {detected:.2f}s")
+    await wait_for(lambda: len({node.leader for node in survivors}) == 1 and survivors[0].leader != leader.node_id, 5)
+    print(f"✓ New leader {survivors[0].leader} (term {survivors[0].term})")
+
+    # Graceful leave spreads without waiting for failure detection
+    leaving = survivors[-1]
+    await leaving.stop(leave=True)
+    remaining = others(leaving, survivors)
+    elapsed = await wait_for(lambda: all(node.members[leaving.node_id].status == LEFT for node in remaining), 2)
+    print(f"✓ Leave seen by every node in {elapsed:.2f}s")
+
+    for node in remaining:
+        await node.stop()
+    return True
+
+
+class SimulatedAgent:
+    """Agent that takes ``delay`` seconds per task"""
+
+    def __init__(self, name, delay):
+        self.name = name
+        self.delay = delay
+
+    def add_token_listener(self, listener):
+        pass
+
+    def remove_token_listener(self, listener):
+        pass
+
+    async def execute_intelligent_task(self, task):
+        await asyncio.sleep(self.delay)
+        return {'success': True, 'output': f"done by {self.name}"}
+
+
+class SimulatedAgentManager:
+    def __init__(self, agents):
+        self.agents = agents
+
+
+async def test_task_redistribution(base_port=18970):
+    """A task on a node that dies moves to a live node once gossip confirms the death"""
+    print("\n--- Task redistribution across distributed agent managers ---")
+    agents = [None, SimulatedAgent('stuck', 60), SimulatedAgent('healthy-1', 0.1), SimulatedAgent('healthy-2', 0.1)]
+    managers = []
+    for i, agent in enumerate(agents):
+        manager = DistributedAgentManager({
+            'communication_host': '127.0.0.1',
+            'communication_port': base_port + i,
+            'gossip_port': base_port + 10 + i
+        }, agent_manager=SimulatedAgentManager({'developer': agent} if agent else {}))
+        for agent_id in manager.agent_manager.agents:
+            await manager.register_local_agent(agent_id)
+        await manager.start_communication_server()
+        await manager.membership.start()
+        manager.membership.join([('127.0.0.1', base_port + 10)])
+        managers.append(manager)
+    caller, stuck = managers[0], managers[1]
+
+    await wait_for(lambda: all(len(manager.nodes) == len(managers) - 1 for manager in managers), 5)
+    for manager in managers:
+        await manager.join_cluster()
+    coordinators = {manager.coordinator_node for manager in managers}
+    assert len(coordinators) == 1, coordinators
+    print(f"✓ Nodes found each other over gossip; coordinator {coordinators.pop()}")
+
+    # Make the stuck node the preferred target, then crash its gossip while the task runs
+    caller.node_latency[stuck.node_id] = 0.001
+    job = asyncio.create_task(caller.execute_distributed_task({'agent': 'developer', 'title': 'simulated'}))
+    await wait_for(lambda: stuck.node_id in caller.task_distribution, 2)
+    started = time.monotonic()
+    await stuck.membership.stop(leave=False)
+    result = await asyncio.wait_for(job, DETECTION_LIMIT_SECONDS + 1)
+    elapsed = time.monotonic() - started
+    assert result['success'] and result['target_node'] != stuck.node_id, result
+    assert elapsed < DETECTION_LIMIT_SECONDS + 1, elapsed
+    assert stuck.node_id not in caller.nodes
+    print(f"✓ Task redistributed to {result['target_node']} and finished {elapsed:.2f}s after the crash")
+
+    for manager in managers:
+        await manager.stop()
+    return True
+
+
+async def main():
+    try:
+        results = [await test_gossip_membership(), await test_task_redistribution()]
+        return all(results)
+    except Exception as e:
+        print(f"✗ ERROR: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+if __name__ == "__main__":
+    success = asyncio.run(main())
+    print(f"\nResult: {'PASSED' if success else 'FAILED'}")
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Test that streamed agent LLM tokens reach dashboard websockets
+"""
+
+import asyncio
+import logging
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "frontend"))
+
+from agents.base_agent import BaseAgent
+from dashboard_backend_clean import CleanDashboardBackend
+
+# Setup logging
+logging.basicConfig(level=logging.WARNING, format='[%(levelname)s] %(message)s')
+
+
+class StreamingLLMManager:
+    """LLM manager that streams a fixed response in chunks"""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    async def generate_response_stream(self, agent_role, prompt, model=None, **kwargs):
+        for chunk in self.chunks:
+            yield chunk
+
+
+class RecordingWebSocket:
+    """Stands in for a connected dashboard client"""
+
+    def __init__(self):
+        self.messages = []
+
+    async def send_json(self, message):
+        self.messages.append(message)
+
+
+class StreamingAgent(BaseAgent):
+    async def agent_initialize(self):
+        pass
+
+    async def process_task(self, task, context):
+        return {"success": True}
+
+    async def agent_health_check(self):
+        return True
+
+    async def agent_cleanup(self):
+        pass
+
+
+async def test_dashboard_streaming():
+    """Chunks an agent streams are broadcast to every dashboard websocket"""
+    print("=== TESTING DASHBOARD TOKEN STREAMING ===")
+    backend = CleanDashboardBackend()
+    await backend.initialize()
+    websocket = RecordingWebSocket()
+    backend.active_websockets.add(websocket)
+
+    try:
+        # Created after the dashboard started, like agents spawned at runtime
+        agent = StreamingAgent("streamer", {"role": "developer", "response_cache": {"enabled": False}},
+                               StreamingLLMManager(["Hello", ", ", "world"]), None)
+        content = await agent.generate_llm_response("Say hello")
+        assert content == "Hello, world", content
+        print("✓ Agent streamed its response")
+
+        tokens = [m["chunk"] for m in websocket.messages if m.get("type") == "llm_token"]
+        assert tokens == ["Hello", ", ", "world"], websocket.messages
+        assert all(m["agent_id"] == "streamer" for m in websocket.messages)
+        assert websocket.messages[-1]["type"] == "llm_done"
+        print(f"✓ Dashboard websocket received {len(tokens)} chunks and the done event")
+        return True
+
+    except Exception as e:
+        print(f"✗ ERROR: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+    finally:
+        BaseAgent.remove_global_token_listener(backend.broadcast_llm_event)
+
+
+if __name__ == "__main__":
+    success = asyncio.run(test_dashboard_streaming())
+    print(f"\nResult: {'PASSED' if success else 'FAILED'}")
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Hedged distributed tasks, idempotent execution and cancellation of the losing copy on localhost
+"""
+
+import asyncio
+import logging
+import time
+
+from core.distributed_agent_manager import DistributedAgentManager
+
+# Setup logging
+logging.basicConfig(level=logging.WARNING, format='[%(levelname)s] %(message)s')
+
+HEDGE_AFTER = 0.3
+SLOW_SECONDS = 1.5
+
+
+class SimulatedAgent:
+    """Agent that takes ``delay`` seconds per task and counts runs and cancellations"""
+
+    def __init__(self, name, delay):
+        self.name = name
+        self.delay = delay
+        self.runs = 0
+        self.cancelled = 0
+
+    def add_token_listener(self, listener):
+        pass
+
+    def remove_token_listener(self, listener):
+        pass
+
+    async def execute_intelligent_task(self, task):
+        self.runs += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return {'success': True, 'output': f"done by {self.name}"}
+
+
+class SimulatedAgentManager:
+    def __init__(self, agents):
+        self.agents = agents
+
+
+async def start_node(port, agent, **config):
+    manager = DistributedAgentManager({
+        'communication_host': '127.0.0.1',
+        'communication_port': port,
+        'gossip_port': port + 100,
+        **config
+    }, agent_manager=SimulatedAgentManager({'developer': agent} if agent else {}))
+    for agent_id in manager.agent_manager.agents:
+        await manager.register_local_agent(agent_id)
+    await manager.start_communication_server()
+    return manager
+
+
+async def run_task(caller, slow, fast, task):
+    """Run ``task`` with the slow node ranked first; returns the result and the seconds it took"""
+    caller.node_latency[slow.node_id] = 0.01
+    caller.node_latency[fast.node_id] = 0.2
+    started = time.monotonic()
+    result = await caller.execute_distributed_task(task)
+    return result, time.monotonic() - started
+
+
+async def test_hedging(base_port=18750):
+    print("\n--- Hedging ---")
+    slow_agent, fast_agent = SimulatedAgent('slow', SLOW_SECONDS), SimulatedAgent('fast', 0.05)
+    caller = await start_node(base_port, None, hedge_after=HEDGE_AFTER)
+    hedging_caller = await start_node(base_port + 1, None, hedge_after=HEDGE_AFTER, hedge_tasks=True)
+    slow = await start_node(base_port + 2, slow_agent)
+    fast = await start_node(base_port + 3, fast_agent)
+    try:
+        for manager in (caller, hedging_caller):
+            for node in (slow, fast):
+                assert await manager.join_peer('127.0.0.1', node.communication_port)
+
+        # Off by default: the slow first node is waited for
+        result, elapsed = await run_task(caller, slow, fast, {'agent': 'developer'})
+        assert result['success'] and result['target_node'] == slow.node_id, result
+        assert not result['hedged'] and caller.rpc_stats['hedges'] == 0
+        assert fast_agent.runs == 0 and elapsed >= SLOW_SECONDS
+        print(f"✓ No hedge by default ({elapsed:.2f}s on the slow node)")
+
+        # Asked for by the task: a copy on the second node wins, the slow copy is cancelled
+        result, elapsed = await run_task(caller, slow, fast, {'agent': 'developer', 'hedge': True})
+        assert result['success'] and result['target_node'] == fast.node_id, result
+        assert result['hedged'] and caller.rpc_stats['hedges'] == 1
+        assert HEDGE_AFTER <= elapsed < SLOW_SECONDS, elapsed
+        print(f"✓ 'hedge': True raced a copy on the second node after {HEDGE_AFTER}s ({elapsed:.2f}s)")
+
+        await asyncio.sleep(0.3)
+        assert slow.rpc_stats['cancelled'] == 1 and slow_agent.cancelled == 1, slow.rpc_stats
+        print("✓ Losing copy cancelled on the slow node")
+
+        # Enabled for the cluster, with a task opting out
+        result, _ = await run_task(hedging_caller, slow, fast, {'agent': 'developer'})
+        assert result['hedged'] and hedging_caller.rpc_stats['hedges'] == 1
+        result, _ = await run_task(hedging_caller, slow, fast, {'agent': 'developer', 'hedge': False})
+        assert not result['hedged'] and result['target_node'] == slow.node_id
+        print("✓ hedge_tasks enables hedging for every task; 'hedge': False opts out")
+        return True
+
+    finally:
+        for manager in (caller, hedging_caller, slow, fast):
+            await manager.stop()
+
+
+async def test_idempotent_execution(base_port=18760):
+    print("\n--- Idempotent execution ---")
+    agent = SimulatedAgent('worker', 0.2)
+    caller = await start_node(base_port, None)
+    worker = await start_node(base_port + 1, agent)
+    try:
+        assert await caller.join_peer('127.0.0.1', worker.communication_port)
+        task = {'agent': 'developer', 'idempotency_key': 'same-task'}
+        first, second = await asyncio.gather(caller.execute_remote_task(dict(task), worker.node_id),
+                                             caller.execute_remote_task(dict(task), worker.node_id))
+        retry = await caller.execute_remote_task(dict(task), worker.node_id)
+        assert agent.runs == 1, agent.runs
+        assert worker.rpc_stats['duplicates'] == 2, worker.rpc_stats
+        assert first['result'] == second['result'] == retry['result'], (first, second, retry)
+        print("✓ Three requests with one idempotency key ran the task once")
+        return True
+
+    finally:
+        for manager in (caller, worker):
+            await manager.stop()
+
+
+async def main():
+    try:
+        results = [await test_hedging(), await test_idempotent_execution()]
+        return all(results)
+    except Exception as e:
+        print(f"✗ ERROR: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+if __name__ == "__main__":
+    success = asyncio.run(main())
+    print(f"\nResult: {'PASSED' if success else 'FAILED'}")
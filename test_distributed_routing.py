@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Routing of distributed tasks between warm and cold nodes on localhost
+"""
+
+import asyncio
+import collections
+import logging
+
+from core.distributed_agent_manager import DistributedAgentManager
+from core.model_footprint import FakeSensor, ModelFootprintProfiler
+from core.model_registry import ModelRegistry
+from core.vram_manager import VRAMManager
+
+# Setup logging
+logging.basicConfig(level=logging.WARNING, format='[%(levelname)s] %(message)s')
+
+MODEL = 'ollama/codellama:7b'
+TASK = {'agent': 'developer', 'model': MODEL}
+
+
+async def start_node(port, loaded_models, latency_ewma, with_agent=True):
+    """A node on 127.0.0.1 with ``loaded_models`` warm and a measured task latency"""
+    vram_manager = VRAMManager(max_vram_gb=16, registry=ModelRegistry({}),
+                               footprints=ModelFootprintProfiler(None, sensor=FakeSensor()))
+    for model in loaded_models:
+        await vram_manager.load_model(model)
+    manager = DistributedAgentManager({
+        'communication_host': '127.0.0.1',
+        'communication_port': port,
+        'gossip_port': port + 100
+    }, vram_manager=vram_manager)
+    manager.latency_ewma = latency_ewma
+    if with_agent:
+        await manager.register_local_agent('developer')
+    await manager.start_communication_server()
+    return manager
+
+
+async def refresh_reports(caller, nodes):
+    """Have the caller pick up the current load report of every node"""
+    for node in nodes:
+        assert await caller.join_peer('127.0.0.1', node.communication_port)
+
+
+async def test_distributed_routing(base_port=18730):
+    print("=== TESTING WARM/COLD ROUTING ===")
+    caller = await start_node(base_port, [], None, with_agent=False)
+    warm = [await start_node(base_port + 1 + i, [MODEL], latency) for i, latency in enumerate((1.0, 1.5, 2.0))]
+    cold = [await start_node(base_port + 4 + i, [], 1.0) for i in range(2)]
+    nodes = warm + cold
+    warm_ids = {node.node_id for node in warm}
+    cold_ids = {node.node_id for node in cold}
+
+    try:
+        await refresh_reports(caller, nodes)
+        assert len(caller.nodes) == len(nodes), caller.nodes
+
+        # Idle warm node against equally fast idle cold nodes
+        chosen = await caller.select_optimal_node(TASK)
+        assert chosen == warm[0].node_id, chosen
+        print("✓ Warm node wins over a cold one")
+
+        # Every warm node is backed up: paying for the cold load is quicker than queueing
+        for node in warm:
+            node.in_flight = 20
+        await refresh_reports(caller, nodes)
+        chosen = await caller.select_optimal_node(TASK)
+        assert chosen in cold_ids, chosen
+        print("✓ Backed-up warm node loses to an idle cold node")
+
+        # Power of two: with a warm node best, the random pair is drawn from warm nodes only
+        for node in warm:
+            node.in_flight = 0
+        await refresh_reports(caller, nodes)
+        caller.routing_strategy = 'power_of_two'
+        picks = collections.Counter([await caller.select_optimal_node(TASK) for _ in range(200)])
+        assert set(picks) <= warm_ids, picks
+        assert len(picks) > 1, picks
+        print(f"✓ power_of_two sampled only warm nodes ({len(picks)} of {len(warm)} picked)")
+
+        # ...but once the warm nodes are backed up, cold nodes are sampled again
+        for node in warm:
+            node.in_flight = 20
+        await refresh_reports(caller, nodes)
+        picks = collections.Counter([await caller.select_optimal_node(TASK) for _ in range(200)])
+        assert set(picks) & cold_ids, picks
+        print("✓ power_of_two samples cold nodes when no warm node is best")
+        return True
+
+    except Exception as e:
+        print(f"✗ ERROR: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+    finally:
+        for manager in [caller] + nodes:
+            await manager.stop()
+
+
+if __name__ == "__main__":
+    success = asyncio.run(test_distributed_routing())
+    print(f"\nResult: {'PASSED' if success else 'FAILED'}")
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Test indexed experience retrieval in memory and FTS5 index modes
+"""
+
+import logging
+import tempfile
+
+from persistent_agent_intelligence import (ExperienceType, PersistentAgentIntelligence,
+                                           close_intelligence_stores)
+
+# Setup logging
+logging.basicConfig(level=logging.WARNING, format='[%(levelname)s] %(message)s')
+
+ROLE = "developer"
+PROJECT = {"language": "python"}
+
+EXPERIENCES = [
+    ("Implementing database connection pooling in FastAPI", "Use SQLAlchemy pools", {"database", "performance"}),
+    ("Caching database query results with Redis", "Cache hot queries", {"cache", "redis"}),
+    ("Writing unit tests for the payment service", "Mock the gateway", {"testing"}),
+    ("Profiling slow API endpoints", "Use py-spy", {"performance", "api"}),
+    ("Migrating the frontend build to Vite", "Swap webpack config", {"frontend"}),
+]
+
+QUERIES = [
+    "Need to optimize database performance",
+    "slow api",
+    "redis",
+    "payment tests",
+    "Kubernetes deployment rollout",
+]
+
+
+def record_all(intelligence):
+    return [intelligence.record_experience(ROLE, ExperienceType.SOLUTION_PATTERN, context, solution, "worked",
+                                           PROJECT, tags=tags)
+            for context, solution, tags in EXPERIENCES]
+
+
+def lookup(intelligence, context):
+    return [exp.id for exp in intelligence.get_relevant_experiences(ROLE, context, limit=len(EXPERIENCES))]
+
+
+def test_candidates(intelligence):
+    """Only experiences sharing a word or tag with the query come back"""
+    print(f"\n--- Candidates ({intelligence.index_mode}) ---")
+    ids = dict(zip((context for context, _, _ in EXPERIENCES), record_all(intelligence)))
+    intelligence.store.flush()
+
+    found = lookup(intelligence, "Kubernetes deployment rollout")
+    assert found == [], found
+    assert lookup(intelligence, "") == []
+    assert intelligence.get_relevant_experiences("architect", "database performance") == []
+    print("✓ Nothing returned without a shared word or tag")
+
+    found = lookup(intelligence, "redis")
+    assert found == [ids["Caching database query results with Redis"]], found
+    # "frontend" is only a tag of the Vite experience, not a word of its context
+    assert lookup(intelligence, "frontend") == [ids["Migrating the frontend build to Vite"]]
+    found = set(lookup(intelligence, "performance"))
+    assert found == {ids["Implementing database connection pooling in FastAPI"],
+                     ids["Profiling slow API endpoints"]}, found
+    print("✓ Matching words and tags return only their experiences")
+    return True
+
+
+def test_rerecord(intelligence):
+    """Recording an experience with the same id replaces it, in the index too"""
+    print(f"\n--- Re-recording ({intelligence.index_mode}) ---")
+    context, solution = "Tuning the garbage collector", "Raise gen0 threshold"
+    first = intelligence.record_experience(ROLE, ExperienceType.OPTIMIZATION, context, solution, "worked",
+                                           PROJECT, tags={"legacy"})
+    second = intelligence.record_experience(ROLE, ExperienceType.OPTIMIZATION, context, solution, "worked again",
+                                            PROJECT, confidence=0.5, tags={"memory"})
+    assert first == second
+    intelligence.store.flush()
+
+    assert lookup(intelligence, "legacy") == [], "the replaced experience's tag is still indexed"
+    found = intelligence.get_relevant_experiences(ROLE, "garbage collector memory")
+    assert [exp.id for exp in found] == [first], found
+    assert found[0].outcome == "worked again" and found[0].tags == {"memory"}
+    assert sum(1 for exp in intelligence._role_experiences(ROLE) if exp.id == first) == 1
+    print("✓ Same id replaced the old experience and its index entries")
+    return True
+
+
+def test_modes_agree(memory_dir, fts_dir):
+    """FTS5 lookups return the same experiences as the in-memory index"""
+    print("\n--- memory and fts5 agree ---")
+    memory = PersistentAgentIntelligence(memory_dir, index_mode="memory")
+    fts = PersistentAgentIntelligence(fts_dir, index_mode="fts5")
+    record_all(memory)
+    record_all(fts)
+    fts.store.flush()
+    for query in QUERIES:
+        expected, found = lookup(memory, query), lookup(fts, query)
+        assert set(expected) == set(found), (query, expected, found)
+        assert expected[:1] == found[:1], (query, expected, found)
+    print(f"✓ Same results for {len(QUERIES)} queries")
+    return True
+
+
+def test_fts_flush_visibility(fts_dir):
+    """In FTS5 mode a recorded experience is found once the store has been flushed"""
+    print("\n--- FTS5 visibility after flush ---")
+    intelligence = PersistentAgentIntelligence(fts_dir, index_mode="fts5", flush_interval_ms=60_000)
+    exp_id = intelligence.record_experience(ROLE, ExperienceType.WORKFLOW, "Rotating structured log files",
+                                            "Use a size based handler", "worked", PROJECT, tags={"logging"})
+    # Still queued for the writer thread, which waits out the flush interval
+    assert lookup(intelligence, "rotating logs") == []
+    assert intelligence.store.flush(timeout=5)
+    assert lookup(intelligence, "rotating logs") == [exp_id]
+    assert lookup(intelligence, "logging") == [exp_id]
+
+    # Another instance on the same database sees it as well
+    other = PersistentAgentIntelligence(fts_dir, index_mode="fts5")
+    assert lookup(other, "structured log") == [exp_id]
+    print("✓ Flushed experience found through FTS5")
+    return True
+
+
+def main():
+    try:
+        fts5 = PersistentAgentIntelligence._fts5_available()
+        with tempfile.TemporaryDirectory() as directory:
+            results = [test_candidates(PersistentAgentIntelligence(directory))]
+        with tempfile.TemporaryDirectory() as directory:
+            results.append(test_rerecord(PersistentAgentIntelligence(directory)))
+        if not fts5:
+            print("\nSQLite was built without FTS5, skipping the fts5 mode tests")
+            return all(results)
+        with tempfile.TemporaryDirectory() as directory:
+            results.append(test_candidates(PersistentAgentIntelligence(directory, index_mode="fts5")))
+        with tempfile.TemporaryDirectory() as directory:
+            results.append(test_rerecord(PersistentAgentIntelligence(directory, index_mode="fts5")))
+        with tempfile.TemporaryDirectory() as memory_dir, tempfile.TemporaryDirectory() as fts_dir:
+            results.append(test_modes_agree(memory_dir, fts_dir))
+        with tempfile.TemporaryDirectory() as directory:
+            results.append(test_fts_flush_visibility(directory))
+        return all(results)
+    except Exception as e:
+        print(f"✗ ERROR: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+    finally:
+        close_intelligence_stores()
+
+
+if __name__ == "__main__":
+    success = main()
+    print(f"\nResult: {'PASSED' if success else 'FAILED'}")
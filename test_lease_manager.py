@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Test lease expiry with cross-process (flock backed) leases
+"""
+
+import asyncio
+import logging
+import subprocess
+import sys
+import tempfile
+import time
+
+from core.lease_manager import HAS_FCNTL, LeaseManager
+
+# Setup logging
+logging.basicConfig(level=logging.ERROR, format='[%(levelname)s] %(message)s')
+
+LEASE_TIMEOUT = 0.2
+
+# Exits 0 if the lock file can be locked exclusively from another process
+PROBE = """
+import fcntl, os, sys
+fd = os.open(sys.argv[1], os.O_RDWR | os.O_CREAT, 0o644)
+try:
+    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+except BlockingIOError:
+    sys.exit(1)
+"""
+
+
+def lockable_from_other_process(lock_file) -> bool:
+    return subprocess.run([sys.executable, "-c", PROBE, str(lock_file)]).returncode == 0
+
+
+def test_expired_lease_releases_flock(lock_dir):
+    """A waiter reclaiming an expired lease also gets the file lock"""
+    print("\n--- Expiry with threads ---")
+    leases = LeaseManager(lease_timeout=LEASE_TIMEOUT, cross_process=True, lock_dir=lock_dir)
+    holder = leases.acquire("shared.txt", "agent-a")
+    lock_file = leases._lock_path("shared.txt")
+    assert not lockable_from_other_process(lock_file)
+    print("✓ Holder's flock excludes other processes")
+
+    time.sleep(LEASE_TIMEOUT + 0.1)
+    started = time.monotonic()
+    reclaimed = leases.acquire("shared.txt", "agent-b", timeout=1)
+    assert time.monotonic() - started < 0.5
+    assert holder.lock_fd is None and reclaimed.lock_fd is not None
+    assert leases.get_stats()["expired"] == 1
+    print("✓ Expired lease reclaimed without waiting for the file lock")
+
+    # The late release of the expired holder must not touch the new holder's lock
+    assert not leases.release(holder)
+    assert not lockable_from_other_process(lock_file)
+    leases.release(reclaimed)
+    assert lockable_from_other_process(lock_file)
+    print("✓ File lock follows the lease, not the expired holder")
+    return True
+
+
+async def test_expired_lease_releases_flock_async(lock_dir):
+    """Same as above for a coroutine waiting while the lease expires"""
+    print("\n--- Expiry with asyncio, waiter already queued ---")
+    leases = LeaseManager(lease_timeout=LEASE_TIMEOUT, cross_process=True, lock_dir=lock_dir)
+    holder = await leases.acquire_async("shared.txt", "agent-a")
+
+    started = time.monotonic()
+    reclaimed = await leases.acquire_async("shared.txt", "agent-b", timeout=2)
+    elapsed = time.monotonic() - started
+    assert LEASE_TIMEOUT * 0.9 <= elapsed < LEASE_TIMEOUT + 0.5, elapsed
+    assert holder.lock_fd is None and reclaimed.lock_fd is not None
+    print(f"✓ Queued waiter took over {elapsed:.2f}s after acquiring, at expiry")
+
+    leases.release(reclaimed)
+    assert lockable_from_other_process(leases._lock_path("shared.txt"))
+    print("✓ File lock released with the reclaimed lease")
+    return True
+
+
+def main():
+    if not HAS_FCNTL:
+        print("Cross-process leases need fcntl, skipping")
+        return True
+    try:
+        with tempfile.TemporaryDirectory() as lock_dir:
+            results = [test_expired_lease_releases_flock(lock_dir)]
+        with tempfile.TemporaryDirectory() as lock_dir:
+            results.append(asyncio.run(test_expired_lease_releases_flock_async(lock_dir)))
+        return all(results)
+    except Exception as e:
+        print(f"✗ ERROR: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    print(f"\nResult: {'PASSED' if success else 'FAILED'}")
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Test measured model footprints on a CPU-only machine using FakeSensor
+"""
+
+import asyncio
+import logging
+import os
+import tempfile
+
+from core.model_footprint import (MIN_FOOTPRINT_MB, FakeSensor, FootprintKey, ModelFootprintProfiler,
+                                  parse_quantization)
+from core.model_registry import ModelRegistry
+from core.vram_manager import VRAMManager
+
+# Setup logging
+logging.basicConfig(level=logging.WARNING, format='[%(levelname)s] %(message)s')
+
+MODEL = 'llama3:8b-instruct-q4_0'
+
+
+def make_profiler(store_path=None, sensor=None):
+    return ModelFootprintProfiler(store_path, sensor=sensor or FakeSensor(used_mb=1000),
+                                  settle_seconds=0.01, settle_samples=3)
+
+
+async def test_measure_load():
+    """The sensor delta across a load is recorded; tiny deltas are ignored"""
+    print("\n--- measure_load ---")
+    sensor = FakeSensor(used_mb=1000)
+    profiler = make_profiler(sensor=sensor)
+    key = FootprintKey.for_model('ollama', MODEL)
+
+    async def load():
+        sensor.allocate(4700)
+        return "loaded"
+
+    result, measured_mb = await profiler.measure_load(key, load)
+    assert result == "loaded" and measured_mb == 4700, (result, measured_mb)
+    assert profiler.estimate_mb('ollama', MODEL) == 4700
+    print("✓ Allocation during the load recorded as the footprint")
+
+    async def already_resident():
+        sensor.allocate(MIN_FOOTPRINT_MB / 2)
+        return True
+
+    reads = sensor.reads
+    result, measured_mb = await profiler.measure_load(FootprintKey.for_model('ollama', 'phi3:mini'), already_resident)
+    assert result is True and measured_mb is None
+    assert profiler.estimate_mb('ollama', 'phi3:mini') is None
+    assert sensor.reads - reads == 2, "no settling wait when nothing was allocated"
+    print(f"✓ Deltas below MIN_FOOTPRINT_MB ({MIN_FOOTPRINT_MB:.0f}MB) are not recorded")
+
+    async def failed():
+        sensor.allocate(3000)
+        return False
+
+    _, measured_mb = await profiler.measure_load(FootprintKey.for_model('ollama', 'mistral:7b'), failed)
+    assert measured_mb is None and profiler.estimate_mb('ollama', 'mistral:7b') is None
+    print("✓ Failed loads are not recorded")
+    return True
+
+
+def test_outliers_and_keys():
+    """Estimates follow the smoothed value and are keyed by quantization and context length"""
+    print("\n--- Estimates and keys ---")
+    profiler = make_profiler()
+    assert parse_quantization(MODEL) == 'q4_0'
+    assert parse_quantization('llama3:8b') == 'default'
+
+    profiler.record(FootprintKey.for_model('ollama', MODEL), 4700)
+    # Someone else allocated during this load
+    profiler.record(FootprintKey.for_model('ollama', MODEL), 12000)
+    estimate = profiler.estimate_mb('ollama', MODEL)
+    assert 4700 < estimate < 12000, estimate
+    for _ in range(10):
+        profiler.record(FootprintKey.for_model('ollama', MODEL), 4700)
+    assert abs(profiler.estimate_mb('ollama', MODEL) - 4700) < 100
+    assert profiler.get(FootprintKey.for_model('ollama', MODEL)).peak_mb == 12000
+    print("✓ One skewed reading does not set the estimate for good")
+
+    profiler.record(FootprintKey.for_model('ollama', 'llama3:8b-instruct-q8_0'), 8500)
+    profiler.record(FootprintKey.for_model('ollama', MODEL, context_length=8192), 5600)
+    assert profiler.estimate_mb('ollama', 'llama3:8b-instruct-q8_0') == 8500
+    assert profiler.estimate_mb('ollama', MODEL, context_length=8192) == 5600
+    assert profiler.estimate_mb('ollama', MODEL, quantization='q8_0', context_length=0) is None
+    print("✓ Quantizations and context lengths are kept apart")
+
+    # Unmeasured context length: the nearest measured one of the same model and quantization
+    assert profiler.estimate_mb('ollama', MODEL, context_length=7000) == 5600
+    assert abs(profiler.estimate_mb('ollama', MODEL, context_length=1024) - 4700) < 100
+    print("✓ Nearest measured context length used for unmeasured ones")
+    return True
+
+
+def test_persistence(directory):
+    """Footprints survive a restart"""
+    print("\n--- Persistence ---")
+    store_path = os.path.join(directory, 'footprints.json')
+    profiler = make_profiler(store_path)
+    profiler.record(FootprintKey.for_model('ollama', MODEL, context_length=4096), 5000, 'fake')
+    profiler.record(FootprintKey.for_model('lmstudio', 'phi-2'), 1500, 'fake')
+
+    reloaded = make_profiler(store_path)
+    assert reloaded.footprints == profiler.footprints, reloaded.footprints
+    assert reloaded.estimate_mb('ollama', MODEL, context_length=4096) == 5000
+    print(f"✓ {len(reloaded.footprints)} footprints reloaded from {os.path.basename(store_path)}")
+    return True
+
+
+async def test_vram_manager():
+    """can_load_model and loads use measured sizes; only real provider loads are measured"""
+    print("\n--- VRAMManager with measured footprints ---")
+    sensor = FakeSensor(used_mb=500)
+    profiler = make_profiler(sensor=sensor)
+    model_id = f'ollama/{MODEL}'
+
+    async def provider_load(model):
+        sensor.allocate(5 * 1024)
+        return True
+
+    manager = VRAMManager(max_vram_gb=8, registry=ModelRegistry({}), footprints=profiler, loader=provider_load)
+    bookkeeping_only = VRAMManager(max_vram_gb=8, registry=ModelRegistry({}), footprints=profiler)
+    try:
+        assert manager.estimate_model_size(model_id) == 4.0  # Size table default
+        assert await manager.load_model(model_id)
+        assert manager.loaded_models[model_id]['size_gb'] == 5.0
+        print("✓ Provider load measured at 5GB")
+
+        # By the size table, unmeasured models count as 4GB
+        assert not await manager.can_load_model('ollama/smollm:1.7b')
+        assert await bookkeeping_only.can_load_model('ollama/mixtral:8x7b')
+        profiler.record(FootprintKey.for_model('ollama', 'smollm:1.7b'), 2 * 1024)
+        profiler.record(FootprintKey.for_model('ollama', 'mixtral:8x7b'), 26 * 1024)
+        assert await manager.can_load_model('ollama/smollm:1.7b')
+        assert not await bookkeeping_only.can_load_model('ollama/mixtral:8x7b')
+        print("✓ can_load_model uses measured sizes")
+
+        # Without a provider loader nothing is loaded for real, so nothing is measured
+        samples = len(profiler.footprints)
+        sensor.allocate(3000)  # Another process allocating meanwhile
+        assert await bookkeeping_only.load_model('ollama/gemma:2b')
+        assert len(profiler.footprints) == samples
+        print("✓ Bookkeeping-only loads are not measured")
+    finally:
+        manager.close()
+        bookkeeping_only.close()
+    return True
+
+
+async def main():
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            results = [
+                await test_measure_load(),
+                test_outliers_and_keys(),
+                test_persistence(directory),
+                await test_vram_manager(),
+            ]
+        return all(results)
+    except Exception as e:
+        print(f"✗ ERROR: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+if __name__ == "__main__":
+    success = asyncio.run(main())
+    print(f"\nResult: {'PASSED' if success else 'FAILED'}")
@@ -0,0 +1,127 @@
+"""
+File Content Cache
+Bounded LRU cache of decoded file text, loaded on demand. Entries are keyed
+by path and validated against the file's size and mtime, so edits made
+behind the cache's back are picked up on the next read. The cache holds at
+most ``max_bytes`` of text; files larger than ``max_entry_bytes`` are
+returned to the caller but never retained. Large files can be read through
+mmap so decoding does not need a second full-size buffer.
+"""
+
+import os
+import mmap
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_MMAP_THRESHOLD = 1024 * 1024
+
+
+class FileContentCache:
+    """Size-bounded, stat-validated LRU cache of file contents"""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, max_entry_bytes: Optional[int] = None,
+                 use_mmap: bool = True, mmap_threshold: int = DEFAULT_MMAP_THRESHOLD,
+                 encoding: str = "utf-8"):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes if max_entry_bytes is not None else max_bytes // 8
+        self.use_mmap = use_mmap
+        self.mmap_threshold = mmap_threshold
+        self.encoding = encoding
+
+        # path -> (size, mtime_ns, text)
+        self._entries: "OrderedDict[str, Tuple[int, int, str]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {
+            "hits": 0, "misses": 0, "stale": 0, "evictions": 0, "evicted_bytes": 0,
+            "not_retained": 0, "mmap_reads": 0,
+        }
+
+    def get(self, path: str) -> Optional[str]:
+        """Return the file's text, or None if it does not exist"""
+        path = os.path.abspath(path)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            self.invalidate(path)
+            return None
+
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None:
+                if entry[0] == st.st_size and entry[1] == st.st_mtime_ns:
+                    self._entries.move_to_end(path)
+                    self.stats["hits"] += 1
+                    return entry[2]
+                self._remove(path)
+                self.stats["stale"] += 1
+            self.stats["misses"] += 1
+
+        text = self._load(path, st.st_size)
+        self._store(path, st.st_size, st.st_mtime_ns, text)
+        return text
+
+    def put(self, path: str, text: str) -> None:
+        """Record text just written to ``path`` so the next read is a hit"""
+        path = os.path.abspath(path)
+        try:
+            st = os.stat(path)
+        except OSError:
+            self.invalidate(path)
+            return
+        self._store(path, st.st_size, st.st_mtime_ns, text)
+
+    def invalidate(self, path: str) -> None:
+        with self._lock:
+            self._remove(os.path.abspath(path))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _load(self, path: str, size: int) -> str:
+        if self.use_mmap and size >= self.mmap_threshold:
+            with open(path, "rb") as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    self.stats["mmap_reads"] += 1
+                    # Decoding straight from the mapping skips the intermediate bytes copy
+                    return str(mapped, self.encoding)
+        # newline="" keeps line endings identical to the mmap path
+        with open(path, "r", encoding=self.encoding, newline="") as f:
+            return f.read()
+
+    def _store(self, path: str, size: int, mtime_ns: int, text: str) -> None:
+        with self._lock:
+            self._remove(path)
+            if size > self.max_entry_bytes:
+                self.stats["not_retained"] += 1
+                return
+            self._entries[path] = (size, mtime_ns, text)
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._entries:
+                _, (evicted_size, _, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.stats["evictions"] += 1
+                self.stats["evicted_bytes"] += evicted_size
+
+    def _remove(self, path: str) -> None:
+        entry = self._entries.pop(path, None)
+        if entry is not None:
+            self._bytes -= entry[0]
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return {
+                **self.stats,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hit_rate": self.stats["hits"] / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,235 @@
+"""
+File Event Pipeline
+
+Carries file watcher events from the observer thread into the asyncio loop.
+Events are merged per path as they arrive, so a burst of writes to one file
+(or a create followed by a delete) collapses into a single pending change.
+A change is delivered once it has been quiet for ``debounce`` seconds, or
+after ``max_delay`` if the path never settles, and every change that settles
+together is handed to the handler as one batch.
+
+The observer thread only takes a lock and, when the loop is idle, schedules
+one wake-up with ``call_soon_threadsafe``; no threads or event loops are
+created per event. The number of pending paths is bounded: events for new
+paths beyond ``max_pending`` are dropped and the next batch is flagged as
+overflowed so consumers know to resynchronise.
+"""
+
+import time
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DEBOUNCE = 0.25
+DEFAULT_MAX_DELAY = 2.0
+DEFAULT_MAX_PENDING = 10000
+
+CREATED = "created"
+MODIFIED = "modified"
+DELETED = "deleted"
+
+# (pending, incoming) -> merged change type; None cancels the pending change
+_MERGE = {
+    (CREATED, MODIFIED): CREATED,
+    (CREATED, DELETED): None,  # Transient file, nothing to report
+    (CREATED, CREATED): CREATED,
+    (MODIFIED, MODIFIED): MODIFIED,
+    (MODIFIED, DELETED): DELETED,
+    (MODIFIED, CREATED): MODIFIED,
+    (DELETED, CREATED): MODIFIED,  # Replaced, e.g. an editor's atomic save
+    (DELETED, MODIFIED): MODIFIED,
+    (DELETED, DELETED): DELETED,
+}
+
+
+@dataclass
+class FileChange:
+    """A settled change to one path"""
+    path: str
+    event_type: str
+    first_seen: float
+    last_seen: float
+    events: int = 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"type": self.event_type, "path": self.path, "events": self.events}
+
+
+@dataclass
+class FileChangeBatch:
+    """Changes that settled in the same window"""
+    changes: List[FileChange] = field(default_factory=list)
+    # Events were dropped since the previous batch; the change list is incomplete
+    overflow: bool = False
+    dropped: int = 0
+
+
+class FileEventPipeline:
+    """Debouncing, coalescing bridge from a watcher thread to an async handler"""
+
+    def __init__(self, handler: Callable[[FileChangeBatch], Awaitable[None]],
+                 debounce: float = DEFAULT_DEBOUNCE, max_delay: float = DEFAULT_MAX_DELAY,
+                 max_pending: int = DEFAULT_MAX_PENDING):
+        self.handler = handler
+        self.debounce = debounce
+        self.max_delay = max(max_delay, debounce)
+        self.max_pending = max_pending
+
+        self._pending: "OrderedDict[str, FileChange]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        # True while a wake-up is scheduled or the consumer is draining
+        self._signalled = False
+        self._dropped_since_batch = 0
+
+        self.stats = {
+            "received": 0, "merged": 0, "cancelled": 0, "dropped": 0,
+            "batches": 0, "delivered": 0, "handler_errors": 0, "max_pending_seen": 0,
+        }
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> None:
+        """Start consuming on ``loop`` (default: the running loop)"""
+        if self.running:
+            return
+        self._loop = loop or asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        with self._lock:
+            self._signalled = bool(self._pending)
+        if self._pending:
+            self._wake.set()
+        self._task = self._loop.create_task(self._run())
+
+    async def stop(self, flush: bool = True) -> None:
+        """Stop the consumer, delivering whatever is still pending unless ``flush`` is False"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if flush:
+            await self.flush()
+
+    # ------------------------------------------------------------------
+    # Producer side (any thread)
+    # ------------------------------------------------------------------
+
+    def submit(self, event_type: str, path: str) -> bool:
+        """Queue a created/modified/deleted event; returns False if it was dropped"""
+        now = time.monotonic()
+        with self._lock:
+            self.stats["received"] += 1
+            change = self._pending.get(path)
+            if change is not None:
+                merged = _MERGE.get((change.event_type, event_type), event_type)
+                self.stats["merged"] += 1
+                if merged is None:
+                    del self._pending[path]
+                    self.stats["cancelled"] += 1
+                    return True
+                change.event_type = merged
+                change.last_seen = now
+                change.events += 1
+                self._pending.move_to_end(path)
+            elif len(self._pending) >= self.max_pending:
+                self.stats["dropped"] += 1
+                self._dropped_since_batch += 1
+                return False
+            else:
+                self._pending[path] = FileChange(path, event_type, now, now)
+                if len(self._pending) > self.stats["max_pending_seen"]:
+                    self.stats["max_pending_seen"] = len(self._pending)
+
+            if self._signalled or self._loop is None:
+                return True
+            self._signalled = True
+        try:
+            self._loop.call_soon_threadsafe(self._wake.set)
+        except RuntimeError:
+            # Loop already closed; the change stays pending for flush()
+            pass
+        return True
+
+    def submit_move(self, src_path: str, dest_path: str) -> None:
+        self.submit(DELETED, src_path)
+        self.submit(CREATED, dest_path)
+
+    # ------------------------------------------------------------------
+    # Consumer side (event loop)
+    # ------------------------------------------------------------------
+
+    async def _run(self) -> None:
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            while True:
+                with self._lock:
+                    deadline = self._next_deadline()
+                    if deadline is None:
+                        # Idle again; the next submit schedules a wake-up
+                        self._signalled = False
+                        break
+                delay = deadline - time.monotonic()
+                if delay > 0:
+                    # More events may arrive meanwhile and push deadlines back
+                    await asyncio.sleep(delay)
+                    continue
+                batch = self._take(settled_only=True)
+                if batch.changes or batch.overflow:
+                    await self._deliver(batch)
+
+    def _next_deadline(self) -> Optional[float]:
+        deadline = None
+        for change in self._pending.values():
+            due = min(change.last_seen + self.debounce, change.first_seen + self.max_delay)
+            if deadline is None or due < deadline:
+                deadline = due
+        return deadline
+
+    def _take(self, settled_only: bool) -> FileChangeBatch:
+        now = time.monotonic()
+        batch = FileChangeBatch()
+        with self._lock:
+            if settled_only:
+                for path, change in list(self._pending.items()):
+                    if now >= change.last_seen + self.debounce or now >= change.first_seen + self.max_delay:
+                        batch.changes.append(self._pending.pop(path))
+            else:
+                batch.changes = list(self._pending.values())
+                self._pending.clear()
+            if self._dropped_since_batch:
+                batch.overflow = True
+                batch.dropped = self._dropped_since_batch
+                self._dropped_since_batch = 0
+        return batch
+
+    async def _deliver(self, batch: FileChangeBatch) -> None:
+        self.stats["batches"] += 1
+        self.stats["delivered"] += len(batch.changes)
+        try:
+            await self.handler(batch)
+        except Exception as e:
+            self.stats["handler_errors"] += 1
+            logger.error(f"File change handler failed for batch of {len(batch.changes)}: {e}")
+
+    async def flush(self) -> None:
+        """Deliver every pending change now, settled or not"""
+        batch = self._take(settled_only=False)
+        if batch.changes or batch.overflow:
+            await self._deliver(batch)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.stats, "pending": len(self._pending), "running": self.running}
@@ -9,31 +9,60 @@ from pathlib import Path
 from typing import Dict, List, Any, Optional
 import logging
 
+from utils.workspace_scanner import WorkspaceScanner, ScanResult, DEFAULT_IGNORE_DIRS
+from utils.workspace_index import get_workspace_index
+
 class WorkspaceAnalyzer:
-    def __init__(self):
+    def __init__(self, max_workers: Optional[int] = None, use_gitignore: bool = True,
+                 prune_ignored: bool = True, use_index: bool = True):
         self.logger = logging.getLogger("WorkspaceAnalyzer")
+        # One traversal feeds every facet; ignored directories are never entered
+        self.scanner = WorkspaceScanner(
+            ignore_dirs=DEFAULT_IGNORE_DIRS,
+            use_gitignore=use_gitignore,
+            prune=prune_ignored,
+            max_workers=max_workers
+        )
+        # The persistent index only mirrors pruned scans
+        self.use_index = use_index and prune_ignored
+        
+    def _scan(self, workspace_path: str) -> ScanResult:
+        """Scan via the persistent index when enabled, falling back to a full walk"""
+        if self.use_index:
+            try:
+                index = get_workspace_index(workspace_path, ignore_dirs=self.scanner.ignore_dirs,
+                                            use_gitignore=self.scanner.use_gitignore)
+                index.refresh()
+                return index.scan_result()
+            except Exception as e:
+                self.logger.warning(f"Workspace index unavailable, scanning directly: {e}")
+        return self.scanner.scan(workspace_path)
         
     def analyze_workspace(self, workspace_path: str) -> Dict[str, Any]:
         """Comprehensive workspace analysis"""
         if not os.path.exists(workspace_path):
             return {"error": "Workspace path does not exist"}
-            
+        
+        scan = self._scan(workspace_path)
         analysis = {
             "path": workspace_path,
             "timestamp": str(os.path.getctime(workspace_path)),
-            "project_type": self._detect_project_type(workspace_path),
-            "structure": self._analyze_structure(workspace_path),
+            "project_type": self._detect_project_type(workspace_path, scan),
+            "structure": self._analyze_structure(workspace_path, scan),
             "dependencies": self._analyze_dependencies(workspace_path),
-            "size_info": self._get_size_info(workspace_path),
-            "languages": self._detect_languages(workspace_path),
+            "size_info": self._get_size_info(workspace_path, scan),
+            "languages": self._detect_languages(workspace_path, scan),
             "recommendations": []
         }
         
         analysis["recommendations"] = self._generate_recommendations(analysis)
         return analysis
     
-    def _detect_project_type(self, workspace_path: str) -> Dict[str, Any]:
+    def _detect_project_type(self, workspace_path: str, scan: Optional[ScanResult] = None) -> Dict[str, Any]:
         """Detect project type based on files and structure"""
+        if scan is None:
+            scan = self._scan(workspace_path)
+        
         project_types = {
             "python": {
                 "files": ["requirements.txt", "setup.py", "pyproject.toml", "Pipfile"],
@@ -63,14 +92,10 @@ class WorkspaceAnalyzer:
                     project_types[project_type]["confidence"] += 30
                     
         # Check for extensions
-        for root, dirs, files in os.walk(workspace_path):
-            if any(ignore in root for ignore in ['.git', 'node_modules', '__pycache__', '.venv']):
-                continue
-            for file in files:
-                ext = os.path.splitext(file)[1].lower()
-                for project_type, criteria in project_types.items():
-                    if ext in criteria.get("extensions", []):
-                        project_types[project_type]["confidence"] += 5
+        for ext, count in scan.source_extensions.items():
+            for project_type, criteria in project_types.items():
+                if ext in criteria.get("extensions", []):
+                    project_types[project_type]["confidence"] += 5 * count
         
         # Find most likely project type
         best_match = max(project_types.items(), key=lambda x: x[1]["confidence"])
@@ -81,40 +106,17 @@ class WorkspaceAnalyzer:
             "all_matches": {k: v["confidence"] for k, v in project_types.items() if v["confidence"] > 0}
         }
     
-    def _analyze_structure(self, workspace_path: str) -> Dict[str, Any]:
+    def _analyze_structure(self, workspace_path: str, scan: Optional[ScanResult] = None) -> Dict[str, Any]:
         """Analyze directory structure"""
-        structure = {
-            "total_files": 0,
-            "total_directories": 0,
-            "file_types": {},
-            "large_files": []
-        }
-        
-        for root, dirs, files in os.walk(workspace_path):
-            structure["total_directories"] += len(dirs)
-            structure["total_files"] += len(files)
-            
-            for file in files:
-                ext = os.path.splitext(file)[1].lower()
-                if ext:
-                    structure["file_types"][ext] = structure["file_types"].get(ext, 0) + 1
-                else:
-                    structure["file_types"]["no_extension"] = structure["file_types"].get("no_extension", 0) + 1
-                
-                # Check file size
-                file_path = os.path.join(root, file)
-                try:
-                    size = os.path.getsize(file_path)
-                    if size > 10 * 1024 * 1024:  # Files larger than 10MB
-                        rel_path = os.path.relpath(file_path, workspace_path)
-                        structure["large_files"].append({
-                            "path": rel_path,
-                            "size_mb": round(size / (1024 * 1024), 2)
-                        })
-                except OSError:
-                    pass
+        if scan is None:
+            scan = self._scan(workspace_path)
         
-        return structure
+        return {
+            "total_files": scan.total_files,
+            "total_directories": scan.total_directories,
+            "file_types": dict(scan.file_types),
+            "large_files": list(scan.large_files)
+        }
     
     def _analyze_dependencies(self, workspace_path: str) -> Dict[str, Any]:
         """Analyze project dependencies"""
@@ -151,29 +153,22 @@ class WorkspaceAnalyzer:
         
         return dependencies
     
-    def _get_size_info(self, workspace_path: str) -> Dict[str, Any]:
+    def _get_size_info(self, workspace_path: str, scan: Optional[ScanResult] = None) -> Dict[str, Any]:
         """Get workspace size information"""
-        total_size = 0
-        file_count = 0
-        
-        for root, dirs, files in os.walk(workspace_path):
-            for file in files:
-                try:
-                    file_path = os.path.join(root, file)
-                    size = os.path.getsize(file_path)
-                    total_size += size
-                    file_count += 1
-                except OSError:
-                    pass
+        if scan is None:
+            scan = self._scan(workspace_path)
         
         return {
-            "total_size_bytes": total_size,
-            "total_size_mb": round(total_size / (1024 * 1024), 2),
-            "file_count": file_count
+            "total_size_bytes": scan.total_size,
+            "total_size_mb": round(scan.total_size / (1024 * 1024), 2),
+            "file_count": scan.sized_files
         }
     
-    def _detect_languages(self, workspace_path: str) -> Dict[str, int]:
+    def _detect_languages(self, workspace_path: str, scan: Optional[ScanResult] = None) -> Dict[str, int]:
         """Detect programming languages used"""
+        if scan is None:
+            scan = self._scan(workspace_path)
+        
         language_extensions = {
             "Python": [".py", ".pyw", ".pyx"],
             "JavaScript": [".js", ".jsx"],
@@ -188,15 +183,10 @@ class WorkspaceAnalyzer:
         
         language_counts = {}
         
-        for root, dirs, files in os.walk(workspace_path):
-            if any(ignore in root for ignore in ['.git', 'node_modules', '__pycache__', '.venv']):
-                continue
-                
-            for file in files:
-                ext = os.path.splitext(file)[1].lower()
-                for language, extensions in language_extensions.items():
-                    if ext in extensions:
-                        language_counts[language] = language_counts.get(language, 0) + 1
+        for ext, count in scan.source_extensions.items():
+            for language, extensions in language_extensions.items():
+                if ext in extensions:
+                    language_counts[language] = language_counts.get(language, 0) + count
         
         return language_counts
     
@@ -231,26 +221,15 @@ class WorkspaceAnalyzer:
         if not os.path.exists(workspace_path):
             return {"error": "Workspace path does not exist"}
         
-        file_count = 0
-        dir_count = 0
-        size = 0
-        
         try:
-            for root, dirs, files in os.walk(workspace_path):
-                dir_count += len(dirs)
-                file_count += len(files)
-                for file in files:
-                    try:
-                        size += os.path.getsize(os.path.join(root, file))
-                    except OSError:
-                        pass
+            scan = self._scan(workspace_path)
         except Exception as e:
             return {"error": str(e)}
         
         return {
             "path": workspace_path,
-            "file_count": file_count,
-            "directory_count": dir_count,
-            "total_size_mb": round(size / (1024 * 1024), 2),
-            "project_type": self._detect_project_type(workspace_path)["primary"]
+            "file_count": scan.total_files,
+            "directory_count": scan.total_directories,
+            "total_size_mb": round(scan.total_size / (1024 * 1024), 2),
+            "project_type": self._detect_project_type(workspace_path, scan)["primary"]
         }
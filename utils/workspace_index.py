@@ -0,0 +1,629 @@
+"""
+Workspace Index
+Persistent, incrementally refreshed index of a workspace's files. Every
+indexed file keeps its size, mtime, language, line count and content hash in
+a SQLite database so later analyses only stat what is already known:
+directories whose mtime is unchanged are not listed again, and files are only
+re-read when their size or mtime differ from the stored values.
+
+Pruning matches WorkspaceScanner: ignored directory names and .gitignore
+matches are never entered, so the index reports the same facets as a pruned
+scan. File watcher events can be applied with update_path/remove_path to keep
+the index current between refreshes.
+"""
+
+import os
+import sqlite3
+import hashlib
+import threading
+from collections import Counter
+from itertools import groupby
+from operator import itemgetter
+from pathlib import Path
+from typing import Dict, List, Any, Callable, Optional, Iterable, Iterator, Tuple
+import logging
+
+from utils.workspace_scanner import (
+    GitignoreRules, ScanResult, is_gitignored, DEFAULT_IGNORE_DIRS, LARGE_FILE_BYTES
+)
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 1
+READ_CHUNK_BYTES = 256 * 1024
+BINARY_SNIFF_BYTES = 8192
+STALE = -1  # Stored directory mtime that forces its subtree to be listed again
+
+LANGUAGE_BY_EXTENSION = {
+    '.py': 'python', '.pyw': 'python', '.pyx': 'python',
+    '.js': 'javascript', '.jsx': 'javascript', '.mjs': 'javascript', '.cjs': 'javascript',
+    '.ts': 'typescript', '.tsx': 'typescript',
+    '.java': 'java', '.cpp': 'cpp', '.cc': 'cpp', '.hpp': 'cpp', '.c': 'c', '.h': 'c',
+    '.cs': 'csharp', '.go': 'go', '.rs': 'rust', '.php': 'php', '.rb': 'ruby',
+    '.html': 'html', '.htm': 'html', '.css': 'css', '.scss': 'scss', '.sass': 'sass', '.less': 'less',
+    '.json': 'json', '.yaml': 'yaml', '.yml': 'yaml', '.xml': 'xml', '.toml': 'toml',
+    '.md': 'markdown', '.markdown': 'markdown', '.sh': 'shell', '.sql': 'sql',
+}
+
+
+def language_for(name: str) -> str:
+    return LANGUAGE_BY_EXTENSION.get(os.path.splitext(name)[1].lower(), 'text')
+
+
+def default_index_path(workspace_path: str) -> Path:
+    """One database per workspace, kept outside the workspace itself"""
+    digest = hashlib.sha1(os.path.realpath(workspace_path).encode("utf-8")).hexdigest()[:16]
+    return Path.home() / ".ultimate_copilot" / "workspace_index" / f"{digest}.db"
+
+
+def read_file_stats(path: str, size: Optional[int]) -> Tuple[Optional[int], Optional[str]]:
+    """Return ``(line_count, content_hash)``; binary files have no line count"""
+    if size is None or size > LARGE_FILE_BYTES:
+        return None, None
+
+    digest = hashlib.blake2b(digest_size=16)
+    lines = 0
+    binary = False
+    last = b""
+    try:
+        with open(path, "rb") as f:
+            first = True
+            while True:
+                chunk = f.read(READ_CHUNK_BYTES)
+                if not chunk:
+                    break
+                if first:
+                    binary = b"\0" in chunk[:BINARY_SNIFF_BYTES]
+                    first = False
+                digest.update(chunk)
+                lines += chunk.count(b"\n")
+                last = chunk[-1:]
+    except OSError:
+        return None, None
+
+    if last and last != b"\n":
+        lines += 1
+    return (None if binary else lines), digest.hexdigest()
+
+
+class WorkspaceIndex:
+    """SQLite-backed file index with incremental refresh"""
+
+    def __init__(self, workspace_path: str, db_path: Optional[str] = None,
+                 ignore_dirs: Iterable[str] = DEFAULT_IGNORE_DIRS, use_gitignore: bool = True):
+        self.workspace_path = os.path.abspath(workspace_path)
+        self.db_path = Path(db_path) if db_path else default_index_path(self.workspace_path)
+        self.ignore_dirs = frozenset(ignore_dirs)
+        self.use_gitignore = use_gitignore
+
+        self._lock = threading.RLock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._loaded = False
+        # dir rel -> [mtime_ns, is_link, {subdir names}]
+        self._dirs: Dict[str, list] = {}
+        # dir rel -> {name: (size, mtime_ns, language, line_count, content_hash)}
+        self._files: Dict[str, Dict[str, tuple]] = {}
+        # dir rel -> ((mtime_ns, size) of its .gitignore or None, parsed rules)
+        self._rules: Dict[str, Tuple[Optional[Tuple[int, int]], Optional[GitignoreRules]]] = {}
+
+        self._scan_cache: Optional[ScanResult] = None
+        # Set while a file watcher applies events through update_path/remove_path
+        self.watching = False
+        self._verified = False
+
+        # Called with (path, entry) for every indexed or re-indexed file and (path, None) on removal
+        self._listeners: List[Callable[[str, Optional[Dict[str, Any]]], None]] = []
+
+        self.stats = {"refreshes": 0, "dirs_listed": 0, "files_read": 0, "live_updates": 0}
+
+    # ------------------------------------------------------------------
+    # Storage
+    # ------------------------------------------------------------------
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(self.db_path), check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS dirs "
+                "(path TEXT PRIMARY KEY, mtime_ns INTEGER, is_link INTEGER) WITHOUT ROWID"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS files "
+                "(dir TEXT, name TEXT, size INTEGER, mtime_ns INTEGER, language TEXT, "
+                "line_count INTEGER, content_hash TEXT, PRIMARY KEY (dir, name)) WITHOUT ROWID"
+            )
+
+            # An index built with different settings or for another path is discarded
+            signature = repr((INDEX_VERSION, self.workspace_path, sorted(self.ignore_dirs), self.use_gitignore))
+            row = self._db.execute("SELECT value FROM meta WHERE key = 'signature'").fetchone()
+            if row is None or row[0] != signature:
+                with self._db:
+                    self._db.execute("DELETE FROM dirs")
+                    self._db.execute("DELETE FROM files")
+                    self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('signature', ?)",
+                                     (signature,))
+        return self._db
+
+    def _load(self) -> None:
+        if self._loaded:
+            return
+        db = self._connect()
+        for path, mtime_ns, is_link in db.execute("SELECT path, mtime_ns, is_link FROM dirs"):
+            self._dirs[path] = [mtime_ns, bool(is_link), set()]
+        for path in self._dirs:
+            if path:
+                parent, _, name = path.rpartition("/")
+                if parent in self._dirs:
+                    self._dirs[parent][2].add(name)
+
+        rows = db.execute(
+            "SELECT dir, name, size, mtime_ns, language, line_count, content_hash FROM files ORDER BY dir, name"
+        ).fetchall()
+        self._files = {directory: {row[1]: row[2:] for row in group}
+                       for directory, group in groupby(rows, key=itemgetter(0))}
+        self._loaded = True
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    # ------------------------------------------------------------------
+    # Refresh
+    # ------------------------------------------------------------------
+
+    def refresh(self, verify_files: Optional[bool] = None) -> Dict[str, int]:
+        """
+        Bring the index up to date with the file system.
+
+        Directories are always stat'ed and re-listed when their mtime changed.
+        Files in unchanged directories are stat'ed too unless ``verify_files``
+        is False, which is the default once a verified refresh has run while a
+        file watcher feeds live updates: in-place edits then arrive through
+        update_path instead.
+        """
+        if verify_files is None:
+            verify_files = not (self.watching and self._verified)
+        with self._lock:
+            self._load()
+            changes = {"added": 0, "modified": 0, "removed": 0, "dirs_listed": 0}
+            dir_rows: List[tuple] = []
+            file_rows: List[tuple] = []
+            removed_files: List[Tuple[str, str]] = []
+            seen = set()
+
+            stack = [(self.workspace_path, "", (), False)]
+            while stack:
+                path, rel, rules, dirty = stack.pop()
+                try:
+                    mtime_ns = os.stat(path).st_mtime_ns
+                except OSError:
+                    continue
+                seen.add(rel)
+
+                rules, rules_changed = self._dir_rules(path, rel, rules)
+                dirty = dirty or rules_changed
+                known = self._dirs.get(rel)
+
+                if known is not None and not dirty and known[0] == mtime_ns:
+                    subdirs = self._restat_files(path, rel, verify_files, changes, file_rows, removed_files)
+                else:
+                    subdirs = self._list_dir(path, rel, rules, changes, file_rows, removed_files)
+                    changes["dirs_listed"] += 1
+                    self._dirs[rel] = [mtime_ns, False, {name for name, _ in subdirs}]
+                    dir_rows.append((rel, mtime_ns, 0))
+
+                children = []
+                for name, is_link in subdirs:
+                    child_rel = f"{rel}/{name}" if rel else name
+                    child = self._dirs.get(child_rel)
+                    if is_link:
+                        # Counted like os.walk but never followed
+                        seen.add(child_rel)
+                        if child is None or not child[1]:
+                            self._dirs[child_rel] = [0, True, set()]
+                            dir_rows.append((child_rel, 0, 1))
+                            for file_name in self._files.pop(child_rel, {}):
+                                removed_files.append((child_rel, file_name))
+                                changes["removed"] += 1
+                        continue
+                    if child is not None and child[1]:
+                        # A symlink replaced by a real directory has never been listed
+                        self._dirs[child_rel] = [STALE, False, set()]
+                    children.append((os.path.join(path, name), child_rel, rules, dirty))
+                # Reversed so directories are visited in os.walk's top-down order
+                stack.extend(reversed(children))
+
+            removed_dirs = [rel for rel in self._dirs if rel not in seen]
+            for rel in removed_dirs:
+                del self._dirs[rel]
+                self._rules.pop(rel, None)
+                for name in self._files.pop(rel, {}):
+                    removed_files.append((rel, name))
+                    changes["removed"] += 1
+
+            self._write(dir_rows, removed_dirs, file_rows, removed_files)
+            self._verified = self._verified or verify_files
+            self.stats["refreshes"] += 1
+            self.stats["dirs_listed"] += changes["dirs_listed"]
+            return changes
+
+    def _dir_rules(self, path: str, rel: str, rules: tuple) -> Tuple[tuple, bool]:
+        """Rules in effect below ``rel`` and whether its .gitignore changed"""
+        if not self.use_gitignore:
+            return rules, False
+
+        try:
+            st = os.stat(os.path.join(path, ".gitignore"))
+            signature = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            signature = None
+
+        cached = self._rules.get(rel)
+        if cached is None:
+            # Compare against the .gitignore the stored listing was built with
+            known = self._files.get(rel, {}).get(".gitignore")
+            indexed = (known[1], known[0]) if known and rel in self._dirs else None
+            cached = (indexed, None)
+
+        changed = signature != cached[0]
+        rule_set = cached[1]
+        if signature is not None and (changed or rule_set is None):
+            rule_set = GitignoreRules.from_file(os.path.join(path, ".gitignore"), rel)
+        elif signature is None:
+            rule_set = None
+        self._rules[rel] = (signature, rule_set)
+
+        return (rules + (rule_set,) if rule_set else rules), changed
+
+    def _restat_files(self, path: str, rel: str, verify_files: bool, changes: Dict[str, int],
+                      file_rows: List[tuple], removed_files: List[Tuple[str, str]]) -> List[Tuple[str, bool]]:
+        """Directory listing is unchanged: only stat the files already indexed"""
+        known = self._files.get(rel)
+        if known and verify_files:
+            stat = os.stat
+            prefix = path + os.sep
+            modified, missing = [], []
+            for name, record in known.items():
+                try:
+                    st = stat(prefix + name)
+                except FileNotFoundError:
+                    missing.append(name)
+                    continue
+                except OSError:
+                    continue
+                if record[1] != st.st_mtime_ns or record[0] != st.st_size:
+                    modified.append((name, st.st_size, st.st_mtime_ns))
+
+            for name in missing:
+                del known[name]
+                removed_files.append((rel, name))
+            for name, size, mtime_ns in modified:
+                self._index_file(path, rel, name, size, mtime_ns, file_rows)
+            changes["removed"] += len(missing)
+            changes["modified"] += len(modified)
+
+        dirs = self._dirs
+        return [(name, dirs.get(f"{rel}/{name}" if rel else name, (0, False))[1])
+                for name in sorted(dirs[rel][2])]
+
+    def _list_dir(self, path: str, rel: str, rules: tuple, changes: Dict[str, int],
+                  file_rows: List[tuple], removed_files: List[Tuple[str, str]]) -> List[Tuple[str, bool]]:
+        try:
+            with os.scandir(path) as iterator:
+                entries = list(iterator)
+        except OSError:
+            entries = []
+
+        known = self._files.get(rel, {})
+        current: Dict[str, tuple] = {}
+        subdirs = []
+        for entry in entries:
+            name = entry.name
+            entry_rel = f"{rel}/{name}" if rel else name
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+
+            if is_dir:
+                if name in self.ignore_dirs or (rules and is_gitignored(rules, entry_rel, name, True)):
+                    continue
+                try:
+                    is_link = entry.is_symlink()
+                except OSError:
+                    continue
+                subdirs.append((name, is_link))
+                continue
+
+            if rules and is_gitignored(rules, entry_rel, name, False):
+                continue
+
+            try:
+                st = entry.stat()
+                size, mtime_ns = st.st_size, st.st_mtime_ns
+            except OSError:
+                size, mtime_ns = None, None
+
+            record = known.get(name)
+            if record is not None and record[0] == size and record[1] == mtime_ns:
+                current[name] = record
+                continue
+            current[name] = self._index_file(path, rel, name, size, mtime_ns, file_rows, store=False)
+            changes["modified" if record is not None else "added"] += 1
+
+        for name in known:
+            if name not in current:
+                removed_files.append((rel, name))
+                changes["removed"] += 1
+        if current:
+            self._files[rel] = current
+        else:
+            self._files.pop(rel, None)
+
+        subdirs.sort()
+        return subdirs
+
+    def _index_file(self, path: str, rel: str, name: str, size: Optional[int], mtime_ns: Optional[int],
+                    file_rows: List[tuple], store: bool = True) -> tuple:
+        line_count, content_hash = read_file_stats(os.path.join(path, name), size)
+        record = (size, mtime_ns, language_for(name), line_count, content_hash)
+        if store:
+            self._files.setdefault(rel, {})[name] = record
+        file_rows.append((rel, name) + record)
+        self.stats["files_read"] += 1
+        return record
+
+    def _write(self, dir_rows: List[tuple], removed_dirs: List[str],
+               file_rows: List[tuple], removed_files: List[Tuple[str, str]]) -> None:
+        if not (dir_rows or removed_dirs or file_rows or removed_files):
+            return
+        self._scan_cache = None
+        db = self._connect()
+        with db:
+            if removed_files:
+                db.executemany("DELETE FROM files WHERE dir = ? AND name = ?", removed_files)
+            if removed_dirs:
+                db.executemany("DELETE FROM dirs WHERE path = ?", [(rel,) for rel in removed_dirs])
+            if dir_rows:
+                db.executemany("INSERT OR REPLACE INTO dirs (path, mtime_ns, is_link) VALUES (?, ?, ?)",
+                               dir_rows)
+            if file_rows:
+                db.executemany(
+                    "INSERT OR REPLACE INTO files (dir, name, size, mtime_ns, language, line_count, content_hash) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)", file_rows
+                )
+
+        for listener in self._listeners:
+            try:
+                for rel_dir, name in removed_files:
+                    listener(f"{rel_dir}/{name}" if rel_dir else name, None)
+                for rel_dir, name, *record in file_rows:
+                    listener(f"{rel_dir}/{name}" if rel_dir else name, self._as_dict(rel_dir, name, record))
+            except Exception as e:
+                logger.warning(f"Workspace index listener failed: {e}")
+
+    def add_listener(self, listener: Callable[[str, Optional[Dict[str, Any]]], None]) -> None:
+        """Subscribe to file changes applied by refresh() and live updates"""
+        with self._lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[str, Optional[Dict[str, Any]]], None]) -> None:
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    # ------------------------------------------------------------------
+    # Live updates (file watcher events)
+    # ------------------------------------------------------------------
+
+    def _relative(self, path: str) -> Optional[str]:
+        rel = os.path.relpath(os.path.abspath(path), self.workspace_path)
+        if rel == "." or rel.startswith(".."):
+            return None
+        rel = rel.replace(os.sep, "/")
+        if any(part in self.ignore_dirs for part in rel.split("/")[:-1]):
+            return None
+        return rel
+
+    def _mark_stale(self, rel_dir: str) -> None:
+        """Force the nearest indexed ancestor to be listed on the next refresh"""
+        while rel_dir not in self._dirs and rel_dir:
+            rel_dir = rel_dir.rpartition("/")[0]
+        entry = self._dirs.get(rel_dir)
+        if entry is not None and entry[0] != STALE:
+            entry[0] = STALE
+            self._write([(rel_dir, STALE, int(entry[1]))], [], [], [])
+
+    def _rules_for(self, rel_dir: str) -> tuple:
+        rules = []
+        parts = rel_dir.split("/") if rel_dir else []
+        for depth in range(len(parts) + 1):
+            cached = self._rules.get("/".join(parts[:depth]))
+            if cached and cached[1]:
+                rules.append(cached[1])
+        return tuple(rules)
+
+    def set_watching(self, active: bool) -> None:
+        """Record whether a file watcher is applying live updates"""
+        with self._lock:
+            # Edits made before the watcher started are only caught by a verified refresh
+            if active and not self.watching:
+                self._verified = False
+            self.watching = active
+
+    def update_path(self, path: str) -> None:
+        """Re-index one created or modified file"""
+        rel = self._relative(path)
+        if rel is None:
+            return
+        with self._lock:
+            self._load()
+            rel_dir, _, name = rel.rpartition("/")
+            if rel_dir not in self._dirs or self._dirs[rel_dir][1]:
+                self._mark_stale(rel_dir)
+                return
+            if name == ".gitignore" or os.path.isdir(path):
+                # Inclusion below this directory may change: re-list it on refresh
+                self._mark_stale(rel_dir)
+                return
+            rules = self._rules_for(rel_dir)
+            if rules and is_gitignored(rules, rel, name, False):
+                return
+
+            try:
+                st = os.stat(path)
+            except OSError:
+                self.remove_path(path)
+                return
+            record = self._files.get(rel_dir, {}).get(name)
+            if record is not None and record[0] == st.st_size and record[1] == st.st_mtime_ns:
+                return
+            file_rows: List[tuple] = []
+            self._index_file(os.path.dirname(os.path.abspath(path)), rel_dir, name,
+                             st.st_size, st.st_mtime_ns, file_rows)
+            self._write([], [], file_rows, [])
+            self.stats["live_updates"] += 1
+
+    def remove_path(self, path: str) -> None:
+        """Drop a deleted file, or a deleted directory's whole subtree"""
+        rel = self._relative(path)
+        if rel is None:
+            return
+        with self._lock:
+            self._load()
+            rel_dir, _, name = rel.rpartition("/")
+            removed_files: List[Tuple[str, str]] = []
+            removed_dirs: List[str] = []
+
+            bucket = self._files.get(rel_dir)
+            if bucket is not None and name in bucket:
+                del bucket[name]
+                removed_files.append((rel_dir, name))
+                if name == ".gitignore":
+                    self._mark_stale(rel_dir)
+
+            if rel in self._dirs:
+                prefix = rel + "/"
+                removed_dirs = [d for d in self._dirs if d == rel or d.startswith(prefix)]
+                for directory in removed_dirs:
+                    del self._dirs[directory]
+                    self._rules.pop(directory, None)
+                    removed_files.extend((directory, file_name) for file_name in self._files.pop(directory, {}))
+                if rel_dir in self._dirs:
+                    self._dirs[rel_dir][2].discard(name)
+
+            if removed_files or removed_dirs:
+                self._write([], removed_dirs, [], removed_files)
+                self.stats["live_updates"] += 1
+
+    def move_path(self, src_path: str, dest_path: str) -> None:
+        self.remove_path(src_path)
+        if os.path.isdir(dest_path):
+            rel = self._relative(dest_path)
+            if rel is not None:
+                with self._lock:
+                    self._mark_stale(rel.rpartition("/")[0])
+        else:
+            self.update_path(dest_path)
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def get(self, rel_path: str) -> Optional[Dict[str, Any]]:
+        rel_path = rel_path.replace(os.sep, "/")
+        rel_dir, _, name = rel_path.rpartition("/")
+        with self._lock:
+            self._load()
+            record = self._files.get(rel_dir, {}).get(name)
+        return self._as_dict(rel_dir, name, record) if record else None
+
+    def iter_files(self, extensions: Optional[Iterable[str]] = None) -> Iterator[Dict[str, Any]]:
+        """Indexed files (as of the last refresh), optionally filtered by extension"""
+        wanted = {ext.lower() for ext in extensions} if extensions is not None else None
+        with self._lock:
+            self._load()
+            snapshot = [(rel_dir, dict(bucket)) for rel_dir, bucket in self._files.items()]
+        for rel_dir, bucket in snapshot:
+            for name, record in bucket.items():
+                if wanted is None or os.path.splitext(name)[1].lower() in wanted:
+                    yield self._as_dict(rel_dir, name, record)
+
+    @staticmethod
+    def _as_dict(rel_dir: str, name: str, record: tuple) -> Dict[str, Any]:
+        size, mtime_ns, language, line_count, content_hash = record
+        return {
+            "path": f"{rel_dir}/{name}" if rel_dir else name,
+            "size": size,
+            "last_modified": mtime_ns / 1e9 if mtime_ns is not None else None,
+            "language": language,
+            "line_count": line_count,
+            "content_hash": content_hash,
+        }
+
+    def scan_result(self) -> ScanResult:
+        """The facets a pruned WorkspaceScanner.scan would report"""
+        with self._lock:
+            if self._scan_cache is None:
+                self._scan_cache = self._build_scan_result()
+            result = ScanResult()
+            result.merge(self._scan_cache)
+            return result
+
+    def _build_scan_result(self) -> ScanResult:
+        result = ScanResult()
+        splitext = os.path.splitext
+        extensions: Counter = Counter()
+        with self._lock:
+            self._load()
+            result.total_directories = len(self._dirs) - (1 if "" in self._dirs else 0)
+            for rel_dir, bucket in self._files.items():
+                result.total_files += len(bucket)
+                extensions.update([splitext(name)[1].lower() for name in bucket])
+                sizes = [record[0] for record in bucket.values() if record[0] is not None]
+                result.total_size += sum(sizes)
+                result.sized_files += len(sizes)
+                if sizes and max(sizes) > LARGE_FILE_BYTES:
+                    for name, record in bucket.items():
+                        if record[0] is not None and record[0] > LARGE_FILE_BYTES:
+                            result.large_files.append({
+                                "path": os.path.join(rel_dir, name) if rel_dir else name,
+                                "size_mb": round(record[0] / (1024 * 1024), 2)
+                            })
+
+        result.source_extensions = dict(extensions)
+        result.file_types = {(ext or "no_extension"): count for ext, count in extensions.items()}
+        return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self.stats,
+                "db_path": str(self.db_path),
+                "directories": len(self._dirs),
+                "files": sum(len(bucket) for bucket in self._files.values()),
+            }
+
+
+_indexes: Dict[tuple, WorkspaceIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_workspace_index(workspace_path: str, db_path: Optional[str] = None,
+                        ignore_dirs: Iterable[str] = DEFAULT_IGNORE_DIRS,
+                        use_gitignore: bool = True) -> WorkspaceIndex:
+    """Shared index per workspace and settings, so every caller reuses the loaded state"""
+    ignore_dirs = frozenset(ignore_dirs)
+    key = (os.path.realpath(workspace_path), str(db_path or ""), ignore_dirs, use_gitignore)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = WorkspaceIndex(workspace_path, db_path=db_path, ignore_dirs=ignore_dirs,
+                                                   use_gitignore=use_gitignore)
+        return index
@@ -0,0 +1,263 @@
+"""
+Workspace Scanner
+Single-pass os.scandir traversal that collects every facet the Workspace
+Analyzer reports (structure, sizes, extensions) in one walk. Ignored
+directories and .gitignore matches are pruned before they are entered, and
+large trees can be split into subtrees scanned on a thread pool.
+"""
+
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional, Iterable, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_IGNORE_DIRS = frozenset({".git", "node_modules", "__pycache__", ".venv"})
+LARGE_FILE_BYTES = 10 * 1024 * 1024  # Files larger than 10MB
+
+
+class GitignoreRules:
+    """Patterns from one .gitignore file, matched relative to its directory"""
+
+    def __init__(self, base: str, lines: Iterable[str]):
+        self.base = base  # Workspace-relative directory of the .gitignore ("" for root)
+        self.rules: List[Tuple[re.Pattern, bool, bool, bool]] = []
+        for line in lines:
+            rule = self._parse(line)
+            if rule is not None:
+                self.rules.append(rule)
+
+    @classmethod
+    def from_file(cls, path: str, base: str) -> Optional["GitignoreRules"]:
+        try:
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                rules = cls(base, f.read().splitlines())
+        except OSError:
+            return None
+        return rules if rules.rules else None
+
+    @staticmethod
+    def _parse(line: str):
+        line = line.rstrip()
+        if not line or line.startswith("#"):
+            return None
+
+        negate = line.startswith("!")
+        if negate:
+            line = line[1:]
+        elif line.startswith("\\"):
+            line = line[1:]
+
+        dir_only = line.endswith("/")
+        line = line.strip("/") if dir_only else line
+        anchored = "/" in line
+        line = line.lstrip("/")
+        if not line:
+            return None
+
+        return re.compile(GitignoreRules._translate(line)), negate, dir_only, anchored
+
+    @staticmethod
+    def _translate(pattern: str) -> str:
+        """Translate a gitignore glob into an anchored regex"""
+        i, parts = 0, []
+        while i < len(pattern):
+            if pattern.startswith("**/", i):
+                parts.append("(?:.*/)?")
+                i += 3
+            elif pattern.startswith("/**", i) and i + 3 == len(pattern):
+                parts.append("/.*")
+                i += 3
+            elif pattern.startswith("**", i):
+                parts.append(".*")
+                i += 2
+            elif pattern[i] == "*":
+                parts.append("[^/]*")
+                i += 1
+            elif pattern[i] == "?":
+                parts.append("[^/]")
+                i += 1
+            elif pattern[i] == "[":
+                end = pattern.find("]", i + 1)
+                if end == -1:
+                    parts.append(re.escape(pattern[i]))
+                    i += 1
+                else:
+                    body = pattern[i + 1:end]
+                    if body.startswith("!"):
+                        body = "^" + body[1:]
+                    parts.append(f"[{body}]")
+                    i = end + 1
+            else:
+                parts.append(re.escape(pattern[i]))
+                i += 1
+        return "".join(parts) + r"\Z"
+
+    def match(self, rel_path: str, name: str, is_dir: bool) -> Optional[bool]:
+        """True if ignored, False if re-included, None if no rule applies"""
+        if self.base:
+            rel_path = rel_path[len(self.base) + 1:]
+        result = None
+        for regex, negate, dir_only, anchored in self.rules:
+            if dir_only and not is_dir:
+                continue
+            if regex.match(rel_path if anchored else name):
+                result = not negate
+        return result
+
+
+def is_gitignored(rules: Tuple[GitignoreRules, ...], rel_path: str, name: str, is_dir: bool) -> bool:
+    """Deeper .gitignore files override shallower ones; the last match wins"""
+    ignored = False
+    for rule_set in rules:
+        matched = rule_set.match(rel_path, name, is_dir)
+        if matched is not None:
+            ignored = matched
+    return ignored
+
+
+class ScanResult:
+    """Facets collected by a workspace scan"""
+
+    def __init__(self):
+        self.total_files = 0
+        self.total_directories = 0
+        self.file_types: Dict[str, int] = {}
+        self.large_files: List[Dict[str, Any]] = []
+        self.total_size = 0
+        self.sized_files = 0
+        # Extension counts outside ignored directories, for language detection
+        self.source_extensions: Dict[str, int] = {}
+
+    def merge(self, other: "ScanResult") -> None:
+        self.total_files += other.total_files
+        self.total_directories += other.total_directories
+        for ext, count in other.file_types.items():
+            self.file_types[ext] = self.file_types.get(ext, 0) + count
+        for ext, count in other.source_extensions.items():
+            self.source_extensions[ext] = self.source_extensions.get(ext, 0) + count
+        self.large_files.extend(other.large_files)
+        self.total_size += other.total_size
+        self.sized_files += other.sized_files
+
+
+class WorkspaceScanner:
+    """
+    One-pass workspace traversal.
+
+    With ``prune=True`` (the default) directories named in ``ignore_dirs`` and
+    anything matched by .gitignore files are skipped entirely. With
+    ``prune=False`` every file is counted and ignored directories are only
+    excluded from the extension facet, matching the original os.walk passes.
+    """
+
+    def __init__(self, ignore_dirs: Iterable[str] = DEFAULT_IGNORE_DIRS, use_gitignore: bool = True,
+                 prune: bool = True, max_workers: Optional[int] = None):
+        self.ignore_dirs = frozenset(ignore_dirs)
+        self.use_gitignore = use_gitignore and prune
+        self.prune = prune
+        self.max_workers = max_workers
+
+    def scan(self, workspace_path: str) -> ScanResult:
+        result = ScanResult()
+        rules: Tuple[GitignoreRules, ...] = ()
+        if not self.max_workers or self.max_workers <= 1:
+            self._scan_tree(workspace_path, workspace_path, "", rules, result)
+            return result
+
+        # Expand the top of the tree until there are enough subtrees to share out
+        frontier = [(workspace_path, "", rules)]
+        target = self.max_workers * 4
+        for _ in range(3):
+            if not frontier or len(frontier) >= target:
+                break
+            next_frontier = []
+            for path, rel, dir_rules in frontier:
+                next_frontier.extend(self._scan_dir(workspace_path, path, rel, dir_rules, result))
+            frontier = next_frontier
+
+        def scan_subtree(item):
+            partial = ScanResult()
+            self._scan_tree(workspace_path, *item, partial)
+            return partial
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="workspace-scan") as pool:
+            for partial in pool.map(scan_subtree, frontier):
+                result.merge(partial)
+        return result
+
+    def _scan_tree(self, workspace_path: str, path: str, rel: str,
+                   rules: Tuple[GitignoreRules, ...], result: ScanResult) -> None:
+        stack = [(path, rel, rules)]
+        while stack:
+            # Reversed so directories are visited in os.walk's top-down order
+            stack.extend(reversed(self._scan_dir(workspace_path, *stack.pop(), result)))
+
+    def _scan_dir(self, workspace_path: str, path: str, rel: str,
+                  rules: Tuple[GitignoreRules, ...], result: ScanResult) -> List[Tuple[str, str, tuple]]:
+        """Scan one directory, returning the subdirectories to descend into"""
+        try:
+            with os.scandir(path) as iterator:
+                entries = list(iterator)
+        except OSError:
+            return []
+
+        # A .gitignore applies to its own directory and everything below it
+        if self.use_gitignore and any(entry.name == ".gitignore" for entry in entries):
+            rule_set = GitignoreRules.from_file(os.path.join(path, ".gitignore"), rel)
+            if rule_set:
+                rules = rules + (rule_set,)
+
+        subdirs = []
+        count_extensions = self.prune or not any(ignore in path for ignore in self.ignore_dirs)
+        file_types = result.file_types
+        source_extensions = result.source_extensions
+
+        for entry in entries:
+            name = entry.name
+            entry_rel = f"{rel}/{name}" if rel else name
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+
+            if is_dir:
+                if self.prune and (name in self.ignore_dirs or
+                                   (rules and is_gitignored(rules, entry_rel, name, True))):
+                    continue
+                result.total_directories += 1
+                # Like os.walk, count symlinked directories but don't follow them
+                try:
+                    if entry.is_symlink():
+                        continue
+                except OSError:
+                    continue
+                child_path = os.path.join(path, name)
+                subdirs.append((child_path, entry_rel, rules))
+                continue
+
+            if rules and is_gitignored(rules, entry_rel, name, False):
+                continue
+
+            result.total_files += 1
+            ext = os.path.splitext(name)[1].lower()
+            key = ext or "no_extension"
+            file_types[key] = file_types.get(key, 0) + 1
+            if count_extensions:
+                source_extensions[ext] = source_extensions.get(ext, 0) + 1
+
+            try:
+                size = entry.stat().st_size
+            except OSError:
+                continue
+            result.total_size += size
+            result.sized_files += 1
+            if size > LARGE_FILE_BYTES:
+                result.large_files.append({
+                    "path": os.path.relpath(os.path.join(path, name), workspace_path),
+                    "size_mb": round(size / (1024 * 1024), 2)
+                })
+
+        return subdirs
@@ -0,0 +1,343 @@
+"""
+Workspace Search
+Trigram index over workspace text files used by the editor integrations'
+search_in_files. Queries only read files whose trigram postings contain
+every trigram of the literal text the query requires, so latency follows the
+number of candidate files instead of the size of the workspace.
+
+The file list comes from WorkspaceIndex: its change notifications (from
+refreshes and file watcher events) mark files for re-indexing, and the
+pending files are indexed lazily before the next query.
+"""
+
+import os
+import re
+import threading
+from array import array
+from pathlib import PurePosixPath
+from typing import Dict, List, Any, Optional, Set, Iterable
+import logging
+
+try:
+    from re import _parser as sre_parse, _constants as sre_constants
+except ImportError:  # Python < 3.11
+    import sre_parse
+    import sre_constants
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    np = None
+    HAS_NUMPY = False
+
+from utils.workspace_index import WorkspaceIndex
+from utils.file_content_cache import FileContentCache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_FILE_BYTES = 1024 * 1024  # Larger text files are scanned instead of indexed
+COMPACT_DEAD_RATIO = 0.5
+
+_REPEATS = {sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT}
+if hasattr(sre_constants, "POSSESSIVE_REPEAT"):
+    _REPEATS.add(sre_constants.POSSESSIVE_REPEAT)
+
+
+def trigrams(text: str) -> Iterable:
+    """Distinct byte trigrams of the lowercased UTF-8 text"""
+    data = text.lower().encode("utf-8", "surrogatepass")
+    if HAS_NUMPY:
+        if len(data) < 3:
+            return []
+        values = np.frombuffer(data, dtype=np.uint8).astype(np.uint32)
+        return np.unique((values[:-2] << 16) | (values[1:-1] << 8) | values[2:]).tolist()
+    return set(zip(data, data[1:], data[2:]))
+
+
+def required_literals(pattern: str, flags: int = 0) -> List[str]:
+    """Literal substrings every match of ``pattern`` must contain"""
+    literals: List[str] = []
+
+    def walk(subpattern) -> None:
+        run: List[str] = []
+        for op, av in subpattern:
+            if op is sre_constants.LITERAL:
+                run.append(chr(av))
+                continue
+            if run:
+                literals.append("".join(run))
+                run = []
+            if op is sre_constants.SUBPATTERN:
+                walk(av[-1])
+            elif op in _REPEATS and av[0] >= 1:
+                walk(av[2])
+            # Branches, classes, anchors and optional parts guarantee nothing
+        if run:
+            literals.append("".join(run))
+
+    walk(sre_parse.parse(pattern, flags))
+    return literals
+
+
+class TrigramIndex:
+    """Trigram -> document postings with append-only updates"""
+
+    def __init__(self):
+        # Postings hold internal document numbers in increasing order; a
+        # re-indexed document gets a new number and the old one is left dead
+        self.postings: Dict[Any, array] = {}
+        self.doc_ids: Dict[str, int] = {}
+        self.docs: Dict[int, str] = {}
+        self._next_id = 0
+        self._dead = 0
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    def __contains__(self, doc: str) -> bool:
+        return doc in self.doc_ids
+
+    def add(self, doc: str, text: str) -> None:
+        """Index (or re-index) a document"""
+        self.remove(doc)
+        doc_id = self._next_id
+        self._next_id += 1
+        self.doc_ids[doc] = doc_id
+        self.docs[doc_id] = doc
+
+        postings = self.postings
+        for gram in trigrams(text):
+            posting = postings.get(gram)
+            if posting is None:
+                postings[gram] = array("I", (doc_id,))
+            else:
+                posting.append(doc_id)
+
+    def remove(self, doc: str) -> None:
+        doc_id = self.doc_ids.pop(doc, None)
+        if doc_id is None:
+            return
+        del self.docs[doc_id]
+        self._dead += 1
+        if self._dead > COMPACT_DEAD_RATIO * max(len(self.docs), 1) and self._dead > 64:
+            self.compact()
+
+    def compact(self) -> None:
+        """Drop dead document numbers from every posting"""
+        alive = self.docs
+        compacted = {}
+        for gram, posting in self.postings.items():
+            kept = array("I", [doc_id for doc_id in posting if doc_id in alive])
+            if kept:
+                compacted[gram] = kept
+        self.postings = compacted
+        self._dead = 0
+
+    def candidates(self, literals: Iterable[str]) -> Optional[Set[str]]:
+        """Documents containing every literal's trigrams, or None if nothing can be pruned"""
+        grams = set()
+        for literal in literals:
+            grams.update(trigrams(literal))
+        if not grams:
+            return None
+
+        postings = []
+        for gram in grams:
+            posting = self.postings.get(gram)
+            if posting is None:
+                return set()
+            postings.append(posting)
+
+        postings.sort(key=len)
+        result = set(postings[0])
+        for posting in postings[1:]:
+            result.intersection_update(posting)
+            if not result:
+                return set()
+        docs = self.docs
+        return {docs[doc_id] for doc_id in result if doc_id in docs}
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "documents": len(self.doc_ids),
+            "trigrams": len(self.postings),
+            "postings": sum(len(posting) for posting in self.postings.values()),
+            "dead_documents": self._dead,
+        }
+
+
+class WorkspaceSearch:
+    """Substring and regex search over a workspace, pruned by a trigram index"""
+
+    def __init__(self, workspace_index: WorkspaceIndex, content_cache: Optional[FileContentCache] = None,
+                 max_file_bytes: int = DEFAULT_MAX_FILE_BYTES):
+        self.workspace_index = workspace_index
+        self.workspace_path = workspace_index.workspace_path
+        self.content_cache = content_cache or FileContentCache()
+        self.max_file_bytes = max_file_bytes
+
+        self.index = TrigramIndex()
+        self._lock = threading.RLock()
+        # path -> True to (re-)index, False to drop; applied before the next query
+        self._pending: Dict[str, bool] = {}
+        # Text files too large to index are always scanned
+        self._unindexed: Set[str] = set()
+        # Changes are only tracked once build() has taken its snapshot of the file list
+        self._tracking = False
+        self._built = False
+
+        self.stats = {"queries": 0, "candidates": 0, "files_indexed": 0, "full_scans": 0}
+        workspace_index.add_listener(self._on_file_changed)
+
+    def close(self) -> None:
+        self.workspace_index.remove_listener(self._on_file_changed)
+
+    def _on_file_changed(self, path: str, entry: Optional[Dict[str, Any]]) -> None:
+        with self._lock:
+            if self._tracking:
+                self._pending[path] = entry is not None and entry.get("line_count") is not None
+
+    # ------------------------------------------------------------------
+    # Index maintenance
+    # ------------------------------------------------------------------
+
+    def build(self) -> None:
+        """Index every text file the workspace index knows about"""
+        # The workspace index calls back into this object under its own lock, so
+        # read from it before taking ours
+        with self._lock:
+            self._tracking = True
+        if not self.workspace_index.stats["refreshes"]:
+            self.workspace_index.refresh()
+        paths = [entry["path"] for entry in self.workspace_index.iter_files() if entry["line_count"] is not None]
+        with self._lock:
+            for path in paths:
+                # A deletion notified since the snapshot wins
+                self._pending.setdefault(path, True)
+            self._built = True
+            self._apply_pending()
+
+    def _apply_pending(self) -> None:
+        pending, self._pending = self._pending, {}
+        for path, present in pending.items():
+            self._unindexed.discard(path)
+            if not present:
+                self.index.remove(path)
+                continue
+
+            full_path = os.path.join(self.workspace_path, path)
+            try:
+                if os.path.getsize(full_path) > self.max_file_bytes:
+                    self.index.remove(path)
+                    self._unindexed.add(path)
+                    continue
+                # Read directly so building the index does not churn the content cache
+                with open(full_path, "r", encoding="utf-8") as f:
+                    text = f.read()
+            except (OSError, UnicodeDecodeError):
+                self.index.remove(path)
+                continue
+            self.index.add(path, text)
+            self.stats["files_indexed"] += 1
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def search(self, query: str, file_pattern: str = "*", regex: bool = False,
+               case_sensitive: bool = False, max_results: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Matching lines as ``{'file', 'line', 'content', 'context'}`` dicts"""
+        compiled = prefilter = None
+        if regex:
+            flags = 0 if case_sensitive else re.IGNORECASE
+            compiled = re.compile(query, flags)
+            literals = required_literals(query, flags)
+            # Whole-file check that skips candidates before splitting them into lines;
+            # \A and \Z mean something different once lines are joined
+            if "\\A" not in query and "\\Z" not in query:
+                prefilter = re.compile(query, flags | re.MULTILINE)
+        else:
+            literals = [query]
+        needle = query if case_sensitive else query.lower()
+
+        if not self._built:
+            self.build()
+        with self._lock:
+            if self._pending:
+                self._apply_pending()
+            candidates = self.index.candidates(literals)
+            if candidates is None:
+                candidates = set(self.index.doc_ids)
+                self.stats["full_scans"] += 1
+            candidates |= self._unindexed
+            self.stats["queries"] += 1
+            self.stats["candidates"] += len(candidates)
+
+        results: List[Dict[str, Any]] = []
+        for path in sorted(candidates):
+            if file_pattern not in ("*", "**/*") and not PurePosixPath(path).match(file_pattern):
+                continue
+            try:
+                content = self.content_cache.get(os.path.join(self.workspace_path, path))
+            except (OSError, UnicodeDecodeError):
+                continue
+            if content is None:
+                continue
+            if "\r" in content:
+                content = content.replace("\r\n", "\n").replace("\r", "\n")
+
+            if compiled is not None:
+                if prefilter is not None and prefilter.search(content) is None:
+                    continue
+                lines = content.split("\n")
+                line_numbers = [number for number, line in enumerate(lines, 1) if compiled.search(line)]
+            else:
+                line_numbers = self._substring_lines(content, needle, case_sensitive)
+                if not line_numbers:
+                    continue
+                lines = content.split("\n")
+
+            for line_num in line_numbers:
+                line = lines[line_num - 1]
+                results.append({
+                    'file': path,
+                    'line': line_num,
+                    'content': line.strip(),
+                    'context': lines[max(0, line_num - 2):line_num + 2]
+                })
+                if max_results is not None and len(results) >= max_results:
+                    return results
+        return results
+
+    @staticmethod
+    def _substring_lines(content: str, needle: str, case_sensitive: bool) -> List[int]:
+        """Line numbers containing ``needle``, found without a per-line loop"""
+        haystack = content if case_sensitive else content.lower()
+        if len(haystack) != len(content):
+            # Lowercasing changed offsets; fall back to comparing line by line
+            return [number for number, line in enumerate(content.split("\n"), 1) if needle in line.lower()]
+
+        line_numbers = []
+        position = haystack.find(needle)
+        line_num, counted_to = 1, 0
+        while position != -1:
+            line_num += haystack.count("\n", counted_to, position)
+            line_numbers.append(line_num)
+            # Continue after this line so each line is reported once
+            line_end = haystack.find("\n", position)
+            if line_end == -1:
+                break
+            counted_to = line_end + 1
+            line_num += 1
+            position = haystack.find(needle, counted_to)
+        return line_numbers
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self.stats,
+                **self.index.get_stats(),
+                "pending": len(self._pending),
+                "unindexed_large_files": len(self._unindexed),
+            }